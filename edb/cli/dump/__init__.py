@@ -25,6 +25,7 @@ import edgedb
 from edb.cli import cli
 from edb.cli import utils
 
+from . import consts
 from . import dump as dumpmod
 from . import restore as restoremod
 
@@ -32,13 +33,17 @@ from . import restore as restoremod
 @cli.command(help="Create a database backup")
 @utils.connect_command
 @click.pass_context
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1,
+              help='Number of backend connections to dump data with')
+@click.option('--compression', type=click.Choice(consts.COMPRESSION_CODECS),
+              help='Compress the data blocks with the given codec')
 @click.argument('file', type=click.Path(exists=False, dir_okay=False,
                                         resolve_path=True))
-def dump(ctx, file: str) -> None:
+def dump(ctx, file: str, jobs: int, compression: Optional[str]) -> None:
     cargs = ctx.obj['connargs']
     conn = cargs.new_connection()
     try:
-        dumper = dumpmod.DumpImpl(conn)
+        dumper = dumpmod.DumpImpl(conn, jobs=jobs, compression=compression)
         dumper.dump(file)
     finally:
         conn.close()
@@ -64,9 +69,21 @@ def is_empty_db(conn: edgedb.BlockingIOConnection) -> bool:
 @utils.connect_command
 @click.pass_context
 @click.option('--allow-nonempty', is_flag=True)
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1,
+              help='Number of backend connections to restore data with')
+@click.option('--allow-non-atomic', is_flag=True,
+              help='Allow a restore with several jobs, which is not atomic')
 @click.argument('file', type=click.Path(exists=True, dir_okay=False,
                                         resolve_path=True))
-def restore(ctx, file: str, allow_nonempty: bool) -> None:
+def restore(ctx, file: str, allow_nonempty: bool, jobs: int,
+            allow_non_atomic: bool) -> None:
+    if jobs > 1 and not allow_non_atomic:
+        raise click.ClickException(
+            'a restore with more than one job is not atomic: '
+            'the schema is committed before the data is loaded; '
+            'use the --allow-non-atomic option to restore anyway'
+        )
+
     cargs = ctx.obj['connargs']
     conn = cargs.new_connection()
     dbname = conn.dbname
@@ -79,7 +96,16 @@ def restore(ctx, file: str, allow_nonempty: bool) -> None:
                 f'consider using the --allow-nonempty option'
             )
 
-        restorer = restoremod.RestoreImpl()
-        restorer.restore(conn, file)
+        restorer = restoremod.RestoreImpl(jobs=jobs)
+        try:
+            restorer.restore(conn, file)
+        except Exception as ex:
+            if jobs == 1:
+                raise
+            raise click.ClickException(
+                f'could not restore the {dbname!r} database: {ex}; '
+                f'the database may have been partially restored and must '
+                f'be dropped and re-created before restoring it again'
+            ) from ex
     finally:
         conn.close()
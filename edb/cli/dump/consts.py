@@ -32,5 +32,12 @@ HEADER_TITLE_LEN = len(HEADER_TITLE)
 
 COPY_BUFFER_SIZE = 1024 * 1024 * 10
 
+# Protocol headers of the Dump message requesting a number of
+# server-side jobs and a compression codec for the data blocks.
+DUMP_OPT_JOBS = 0xFF10
+DUMP_OPT_COMPRESSION = 0xFF11
+
+COMPRESSION_CODECS = ('zlib', 'lzma')
+
 DUMP_PROTO_VER = 1
 MAX_SUPPORTED_DUMP_VER = 1
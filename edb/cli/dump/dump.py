@@ -34,9 +34,19 @@ from . import consts
 class DumpImpl:
 
     conn: edgedb.BlockingIOConnection
+    jobs: int
+    compression: Optional[str]
 
-    def __init__(self, conn: edgedb.BlockingIOConnection) -> None:
+    def __init__(
+        self,
+        conn: edgedb.BlockingIOConnection,
+        *,
+        jobs: int = 1,
+        compression: Optional[str] = None,
+    ) -> None:
         self.conn = conn
+        self.jobs = jobs
+        self.compression = compression
 
     def _header_callback(
         self,
@@ -62,6 +72,21 @@ class DumpImpl:
             buf.write_bytes(consts.HEADER_TITLE)
             buf.write_ui64(consts.DUMP_PROTO_VER)
 
+            headers: Dict[int, bytes] = {}
+            if self.jobs > 1:
+                headers[consts.DUMP_OPT_JOBS] = str(self.jobs).encode()
+            if self.compression is not None:
+                # The server compresses the data blocks and records
+                # the codec in the dump header, so the blocks are
+                # stored (and checksummed) exactly as received.
+                headers[consts.DUMP_OPT_COMPRESSION] = \
+                    self.compression.encode()
+
+            kwargs: Dict[str, Any] = {}
+            if headers:
+                kwargs['headers'] = headers
+
             self.conn._dump(
                 on_header=functools.partial(self._header_callback, buf),
-                on_data=functools.partial(self._block_callback, buf))
+                on_data=functools.partial(self._block_callback, buf),
+                **kwargs)
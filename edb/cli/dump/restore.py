@@ -33,6 +33,11 @@ from . import consts
 
 class RestoreImpl:
 
+    jobs: int
+
+    def __init__(self, *, jobs: int = 1) -> None:
+        self.jobs = jobs
+
     def _parse(
         self,
         f: io.FileIO,
@@ -89,7 +94,12 @@ class RestoreImpl:
         with open(dumpfn, 'rb') as f:
             header, reader = self._parse(f)
 
+            kwargs: Dict[str, Any] = {}
+            if self.jobs > 1:
+                kwargs['jobs'] = self.jobs
+
             conn._restore(
                 header=header,
                 data_gen=reader,
+                **kwargs,
             )
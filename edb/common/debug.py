@@ -108,6 +108,10 @@ class flags(metaclass=FlagsMeta):
     disable_qcache = Flag(
         doc="Disable server query cache. Parse/Execute will always recompile.")
 
+    disable_forkserver = Flag(
+        doc="Spawn compiler workers as fresh processes instead of forking "
+            "them from a warmed-up template process.")
+
     typecheck = Flag(
         doc="Perform runtime type checking.")
 
@@ -1004,6 +1004,16 @@ class DescribeStmt(Statement):
     options: Options
 
 
+#
+# Explain
+#
+
+class ExplainStmt(Statement):
+
+    query: Statement
+    analyze: bool = False
+
+
 #
 # SDL
 #
@@ -104,7 +104,10 @@ class EdgeQLSourceGenerator(codegen.SourceGenerator):
         # can be inferred by static typing we ignore typing for this
         # function.
         return (
-            node._parent is not None and (
+            node._parent is not None
+            # The statement of EXPLAIN is not an expression.
+            and not isinstance(node._parent, qlast.ExplainStmt)
+            and (
                 not isinstance(node._parent, qlast.Base)
                 or not isinstance(node._parent, qlast.DDL)
                 or isinstance(node._parent, qlast.SetField)
@@ -1611,6 +1614,12 @@ class EdgeQLSourceGenerator(codegen.SourceGenerator):
             self.write(' ')
             self.visit(node.options)
 
+    def visit_ExplainStmt(self, node: qlast.ExplainStmt) -> None:
+        self.write('EXPLAIN ')
+        if node.analyze:
+            self.write('ANALYZE ')
+        self.visit(node.query)
+
     def visit_Options(self, node: qlast.Options) -> None:
         for i, opt in enumerate(node.options.values()):
             if i > 0:
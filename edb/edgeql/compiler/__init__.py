@@ -186,6 +186,7 @@ def compile_ast_to_ir(
     session_mode: bool = False,
     disable_constant_folding: bool = False,
     json_parameters: bool = False,
+    literal_parameters: AbstractSet[str] = frozenset(),
     allow_generic_type_output: bool = False,
 ) -> irast.Command:
     """Compile given EdgeQL AST into EdgeDB IR.
@@ -267,6 +268,11 @@ def compile_ast_to_ir(
             When ``True``, the argument values are assumed to be in JSON
             format.
 
+        literal_parameters:
+            Names of the parameters that stand for literals extracted
+            from the query text.  These are typed by the casts applied
+            to them and are not part of the query parameters.
+
         allow_generic_type_output:
             If ``True``, allows the expression to return a generic type.
             By default, expressions must resolve into concrete types.
@@ -294,6 +300,7 @@ def compile_ast_to_ir(
         schema_view_mode=schema_view_mode,
         disable_constant_folding=disable_constant_folding,
         json_parameters=json_parameters,
+        literal_parameters=literal_parameters,
         session_mode=session_mode,
         allow_generic_type_output=allow_generic_type_output,
         parent_object_type=parent_object_type,
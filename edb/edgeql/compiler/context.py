@@ -201,6 +201,9 @@ class Environment:
     json_parameters: bool
     """Force types of all parameters to std::json"""
 
+    literal_parameters: AbstractSet[str]
+    """Names of the parameters standing for extracted literals."""
+
     session_mode: bool
     """Whether there is a specific session."""
 
@@ -226,6 +229,7 @@ class Environment:
         schema_view_mode: bool=False,
         constant_folding: bool=True,
         json_parameters: bool=False,
+        literal_parameters: AbstractSet[str]=frozenset(),
         session_mode: bool=False,
         allow_generic_type_output: bool=False,
         func_params: Optional[s_func.ParameterLikeList]=None,
@@ -244,6 +248,7 @@ class Environment:
         self.view_shapes_metadata = collections.defaultdict(
             irast.ViewShapeMetadata)
         self.json_parameters = json_parameters
+        self.literal_parameters = literal_parameters
         self.session_mode = session_mode
         self.allow_generic_type_output = allow_generic_type_output
         self.schema_refs = set()
@@ -430,6 +430,17 @@ def compile_TypeCast(
             )
 
         param_name = expr.expr.name
+        if param_name in ctx.env.literal_parameters:
+            return setgen.ensure_set(
+                irast.Parameter(
+                    typeref=typegen.type_to_typeref(pt, env=ctx.env),
+                    name=param_name,
+                    is_literal=True,
+                    context=expr.expr.context,
+                ),
+                ctx=ctx,
+            )
+
         if param_name not in ctx.env.query_parameters:
             if ctx.env.query_parameters:
                 first_key: str = next(iter(ctx.env.query_parameters))
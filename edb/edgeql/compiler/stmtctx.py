@@ -79,6 +79,7 @@ def init_context(
         implicit_id_in_shapes: bool=False,
         implicit_tid_in_shapes: bool=False,
         json_parameters: bool=False,
+        literal_parameters: AbstractSet[str]=frozenset(),
         session_mode: bool=False) -> \
         context.ContextLevel:
     if not schema.get_global(s_mod.Module, '__derived__', None):
@@ -91,6 +92,7 @@ def init_context(
         parent_object_type=parent_object_type,
         schema_view_mode=schema_view_mode,
         json_parameters=json_parameters,
+        literal_parameters=literal_parameters,
         session_mode=session_mode,
         allow_generic_type_output=allow_generic_type_output)
     ctx = context.ContextLevel(None, context.ContextSwitchMode.NEW, env=env)
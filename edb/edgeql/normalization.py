@@ -0,0 +1,456 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Normalization of EdgeQL source text and a parse-tree cache.
+
+Normalization lexes the source and replaces literal constants with
+placeholder parameters.  The resulting token stream is hashed into
+a fingerprint that doesn't depend on whitespace, comments, keyword
+case or the values of the extracted literals, so queries that only
+differ in the constants they inline share the fingerprint.
+
+ParseCache keeps the parsed block of every fingerprint with the
+placeholders in place, and produces the parse tree of a new source
+text by copying the cached tree and substituting the literals back,
+which is much cheaper than running the LR parser again.  It can also
+produce the tree with the literals replaced by typed parameters, so
+that all sources with the same normalized text can share a single
+compiled query, the literals being passed as its arguments.
+"""
+
+
+from __future__ import annotations
+from typing import *  # NoQA
+
+import ast as pyast
+import copy
+import hashlib
+
+from edb.common import ast
+from edb.common import lexer as edb_lexer
+from edb.common import lru
+
+from edb.edgeql import ast as qlast
+from edb.edgeql.parser import parser as ql_parser
+from edb.edgeql.parser.grammar import lexer
+from edb.edgeql.parser.grammar import lexutils
+
+
+PLACEHOLDER_PREFIX = '__edb_lit_'
+
+# Tokens that carry their value into the fingerprint.
+_VALUE_TOKENS = frozenset(('IDENT', 'ARGUMENT', 'OP'))
+_LITERAL_TOKENS = frozenset((
+    'ICONST', 'FCONST', 'NICONST', 'NFCONST', 'SCONST', 'RSCONST', 'BCONST',
+))
+
+# Statements that only read or modify data.  The parse trees of
+# anything else (DDL in particular) are not templated.
+_QUERY_STATEMENTS = (
+    qlast.SelectQuery,
+    qlast.InsertQuery,
+    qlast.UpdateQuery,
+    qlast.DeleteQuery,
+    qlast.ForQuery,
+)
+
+# The types of the parameters replacing the literals.  Big integer
+# and decimal literals are always left inline.
+_PARAM_TYPES = {
+    qlast.IntegerConstant: 'int64',
+    qlast.FloatConstant: 'float64',
+    qlast.StringConstant: 'str',
+    qlast.RawStringConstant: 'str',
+    qlast.BytesConstant: 'bytes',
+}
+
+
+class NormalizedSource(NamedTuple):
+
+    #: The source text with the literals replaced by placeholders.
+    text: str
+    #: A hash of the normalized token stream.
+    fingerprint: bytes
+    #: The extracted literals, in the order of their placeholders.
+    literals: List[qlast.BaseConstant]
+    #: The normalized text qualified with the kinds of the literals;
+    #: sources with the same key are parsed and compiled alike.
+    key: str
+
+
+class ParametrizedSource(NamedTuple):
+
+    #: The parsed statements with the literals replaced by parameters.
+    statements: List[qlast.Base]
+    #: The index of the literal each parameter stands for, by name,
+    #: and whether the literal is negated.
+    params: Dict[str, Tuple[int, bool]]
+    #: The indexes and values of the literals left inline.
+    inline_literals: Tuple[Tuple[int, str], ...]
+
+
+class _NotNormalizable(Exception):
+    pass
+
+
+def _make_constant(tok: edb_lexer.Token) -> qlast.BaseConstant:
+    # Mirrors the handling of literal tokens in the grammar; malformed
+    # literals are left to the parser to report.
+    tok_type = tok.type
+    val = tok.value
+
+    if tok_type == 'ICONST':
+        return qlast.IntegerConstant(value=val)
+    elif tok_type == 'FCONST':
+        return qlast.FloatConstant(value=val)
+    elif tok_type == 'NICONST':
+        return qlast.BigintConstant(value=val)
+    elif tok_type == 'NFCONST':
+        return qlast.DecimalConstant(value=val)
+
+    elif tok_type == 'SCONST':
+        match = lexutils.VALID_STRING_RE.match(val)
+        if (not match or match.group('err_esc')
+                or match.group('err_cont')):
+            raise _NotNormalizable
+        return qlast.StringConstant(
+            value=lexutils.collapse_newline_whitespace(match.group('body')),
+            quote=match.group('Q'))
+
+    elif tok_type == 'RSCONST':
+        match = lexutils.VALID_RAW_STRING_RE.match(val)
+        if not match:
+            raise _NotNormalizable
+        return qlast.RawStringConstant(
+            value=match.group('body'), quote=match.group('Q'))
+
+    elif tok_type == 'BCONST':
+        match = lexutils.VALID_BYTES_RE.match(val)
+        if not match or match.group('err_esc') or match.group('err'):
+            raise _NotNormalizable
+        return qlast.BytesConstant(
+            value=match.group('body'), quote=match.group('BQ'))
+
+    else:
+        raise AssertionError(f'unexpected literal token {tok_type}')
+
+
+def normalize(source: str) -> Optional[NormalizedSource]:
+    """Extract the literals of *source* into placeholder parameters.
+
+    Returns None if the source cannot be normalized, e.g. if it
+    doesn't lex; such sources should be parsed as is.
+    """
+    lex = lexer.EdgeQLLexer()
+    lex.setinputstr(source)
+
+    text = []
+    fingerprint = []
+    kinds = []
+    literals: List[qlast.BaseConstant] = []
+
+    try:
+        for tok in lex.lex():
+            tok_type = tok.type
+            if tok_type == 'EOF':
+                break
+
+            if tok_type in _LITERAL_TOKENS:
+                placeholder = f'${PLACEHOLDER_PREFIX}{len(literals)}'
+                literals.append(_make_constant(tok))
+                kinds.append(tok_type)
+                text.append(placeholder)
+                fingerprint.append('$')
+
+            elif tok_type == 'ARGUMENT' and tok.value.startswith(
+                    f'${PLACEHOLDER_PREFIX}'):
+                raise _NotNormalizable
+
+            else:
+                if tok_type == 'IDENT':
+                    # Preserve the quoting of identifiers.
+                    text.append(tok.text)
+                else:
+                    text.append(tok.value)
+
+                if tok_type in _VALUE_TOKENS:
+                    fingerprint.append(f'{tok_type}:{tok.value}')
+                else:
+                    fingerprint.append(tok_type)
+
+    except (edb_lexer.LexError, _NotNormalizable):
+        return None
+
+    normalized_text = ' '.join(text)
+    return NormalizedSource(
+        text=normalized_text,
+        fingerprint=hashlib.sha1(
+            '\x00'.join(fingerprint).encode()).digest(),
+        literals=literals,
+        key=f'{normalized_text}\x00{" ".join(kinds)}',
+    )
+
+
+class _Template(NamedTuple):
+
+    statements: List[qlast.Base]
+    placeholders: List[qlast.Parameter]
+    #: Unary minus nodes applied directly to a placeholder, by slot.
+    negations: Dict[int, qlast.UnaryOp]
+    #: Slots of the placeholders that make up a LIMIT clause.
+    limits: FrozenSet[int]
+    #: Source contexts of the template nodes, shared by all copies.
+    contexts: Dict[int, Any]
+
+
+def get_literal_value(
+    literal: qlast.BaseConstant,
+    *,
+    negated: bool = False,
+) -> Any:
+    """Return the value of a literal that is passed as a parameter."""
+    value: Any
+    if isinstance(literal, qlast.IntegerConstant):
+        value = int(literal.value)
+    elif isinstance(literal, qlast.FloatConstant):
+        value = float(literal.value)
+    elif isinstance(literal, qlast.StringConstant):
+        return lexutils.unescape_string(literal.value)
+    elif isinstance(literal, qlast.RawStringConstant):
+        return literal.value
+    elif isinstance(literal, qlast.BytesConstant):
+        return pyast.literal_eval(
+            f'b{literal.quote}{literal.value}{literal.quote}')
+    else:
+        raise AssertionError(
+            f'unexpected literal {type(literal).__name__}')
+
+    return -value if negated else value
+
+
+class SourceCache:
+    """An LRU cache of normalized sources keyed by source text."""
+
+    def __init__(self, *, maxsize: int) -> None:
+        # source -> NormalizedSource, or None if the source cannot be
+        # normalized; spares lexing sources that are seen repeatedly
+        self._sources: lru.LRUMapping = lru.LRUMapping(maxsize=maxsize)
+
+    def normalize(self, source: str) -> Optional[NormalizedSource]:
+        try:
+            return self._sources[source]
+        except KeyError:
+            norm = normalize(source)
+            self._sources[source] = norm
+            return norm
+
+
+class ParseCache:
+    """An LRU cache of parsed EdgeQL blocks keyed by fingerprint.
+
+    Parse trees produced from a cached template carry source contexts
+    pointing into the template rather than into the source, so any
+    error raised while compiling them should be reported by compiling
+    the result of a regular parse instead.
+    """
+
+    def __init__(self, *, maxsize: int) -> None:
+        self._sources = SourceCache(maxsize=maxsize)
+        # fingerprint -> _Template, or None if the source cannot be
+        # parsed from a template
+        self._templates: lru.LRUMapping = lru.LRUMapping(maxsize=maxsize)
+        self._parser = ql_parser.EdgeQLBlockParser()
+
+    def parse_block(self, source: str) -> Tuple[List[qlast.Base], bool]:
+        """Parse *source*, reusing a cached template if possible.
+
+        Returns a tuple of the parsed statements and a flag indicating
+        whether they were produced from a template.
+        """
+        norm = self._sources.normalize(source)
+        if norm is None:
+            return self._parser.parse(source), False
+
+        template = self._get_template(norm)
+        if template is None:
+            return self._parser.parse(source), False
+
+        # Deep-copy the template replacing the placeholder nodes with
+        # the literals via the memo.
+        memo: Dict[int, Any] = dict(template.contexts)
+        for idx, literal in enumerate(norm.literals):
+            _substitute_literal(memo, template, idx, literal)
+
+        return copy.deepcopy(template.statements, memo), True
+
+    def normalize(self, source: str) -> Optional[NormalizedSource]:
+        return self._sources.normalize(source)
+
+    def parse_block_with_params(
+        self,
+        source: str,
+    ) -> Optional[ParametrizedSource]:
+        """Parse *source* with its literals replaced by parameters.
+
+        The parameters are cast to the types of the literals.  Big
+        integer and decimal literals, as well as the literals making
+        up a LIMIT clause, which the cardinality inference depends on,
+        are left inline.  Returns None if *source* cannot be parsed
+        from a template.
+        """
+        norm = self._sources.normalize(source)
+        if norm is None:
+            return None
+
+        template = self._get_template(norm)
+        if template is None:
+            return None
+
+        memo: Dict[int, Any] = dict(template.contexts)
+        params = {}
+        inline_literals = []
+        for idx, literal in enumerate(norm.literals):
+            param_type = _PARAM_TYPES.get(type(literal))
+            if param_type is None or idx in template.limits:
+                _substitute_literal(memo, template, idx, literal)
+                inline_literals.append((idx, literal.value))
+                continue
+
+            placeholder = template.placeholders[idx]
+            neg = template.negations.get(idx)
+            negated = (neg is not None and
+                       isinstance(literal, qlast.BaseRealConstant))
+            params[placeholder.name] = (idx, negated)
+            node = neg if negated else placeholder
+            memo[id(node)] = qlast.TypeCast(
+                expr=qlast.Parameter(
+                    name=placeholder.name, context=node.context),
+                type=qlast.TypeName(
+                    maintype=qlast.ObjectRef(module='std', name=param_type),
+                    context=node.context,
+                ),
+                context=node.context,
+            )
+
+        return ParametrizedSource(
+            statements=copy.deepcopy(template.statements, memo),
+            params=params,
+            inline_literals=tuple(inline_literals),
+        )
+
+    def get_fingerprint(self, source: str) -> bytes:
+        """Return the fingerprint of *source*.
+
+        Sources that cannot be normalized are fingerprinted by
+        their text.
+        """
+        norm = self._sources.normalize(source)
+        if norm is None:
+            return hashlib.sha1(source.encode()).digest()
+        return norm.fingerprint
+
+    def _get_template(self, norm: NormalizedSource) -> Optional[_Template]:
+        try:
+            return self._templates[norm.fingerprint]
+        except KeyError:
+            template = self._make_template(norm)
+            self._templates[norm.fingerprint] = template
+            return template
+
+    def _make_template(self, norm: NormalizedSource) -> Optional[_Template]:
+        try:
+            statements = self._parser.parse(norm.text)
+        except Exception:
+            # A literal was used where the grammar doesn't accept
+            # a parameter.
+            return None
+
+        if not all(isinstance(s, _QUERY_STATEMENTS) for s in statements):
+            return None
+
+        placeholders: List[Optional[qlast.Parameter]]
+        placeholders = [None] * len(norm.literals)
+        negations = {}
+        limits = set()
+        contexts = {}
+        for stmt in statements:
+            for node in [stmt] + ast.find_children(
+                    stmt, lambda n: True, force_traversal=True):
+                if node.context is not None:
+                    contexts[id(node.context)] = node.context
+
+                if (isinstance(node, qlast.OffsetLimitMixin) and
+                        node.limit is not None and
+                        _is_placeholder_node(node.limit)):
+                    limit = node.limit
+                    if isinstance(limit, qlast.UnaryOp):
+                        limit = limit.operand
+                    limits.add(_get_placeholder_idx(limit))
+
+                if not _is_placeholder_node(node):
+                    continue
+                elif isinstance(node, qlast.UnaryOp):
+                    negations[_get_placeholder_idx(node.operand)] = node
+                else:
+                    idx = _get_placeholder_idx(node)
+                    if placeholders[idx] is not None:
+                        return None
+                    placeholders[idx] = node
+
+        if any(p is None for p in placeholders):
+            return None
+
+        return _Template(
+            statements=statements,
+            placeholders=cast(List[qlast.Parameter], placeholders),
+            negations=negations,
+            limits=frozenset(limits),
+            contexts=contexts,
+        )
+
+
+def _substitute_literal(
+    memo: Dict[int, Any],
+    template: _Template,
+    idx: int,
+    literal: qlast.BaseConstant,
+) -> None:
+    neg = template.negations.get(idx)
+    if neg is not None and isinstance(literal, qlast.BaseRealConstant):
+        # The parser folds "-<number>" into a negative constant,
+        # so that e.g. the minimal int64 value is typed correctly.
+        memo[id(neg)] = type(literal)(
+            value=literal.value, is_negative=True)
+    else:
+        memo[id(template.placeholders[idx])] = copy.copy(literal)
+
+
+def _is_placeholder(node: ast.AST) -> bool:
+    return (isinstance(node, qlast.Parameter) and
+            node.name.startswith(PLACEHOLDER_PREFIX))
+
+
+def _is_placeholder_node(node: ast.AST) -> bool:
+    return _is_placeholder(node) or (
+        isinstance(node, qlast.UnaryOp) and node.op == '-' and
+        _is_placeholder(node.operand)
+    )
+
+
+def _get_placeholder_idx(node: qlast.Parameter) -> int:
+    return int(node.name[len(PLACEHOLDER_PREFIX):])
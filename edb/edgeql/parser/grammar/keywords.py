@@ -104,7 +104,6 @@ unreserved_keywords = frozenset([
 
 
 future_reserved_keywords = frozenset([
-    "analyze",
     "anyarray",
     "begin",
     "case",
@@ -114,7 +113,6 @@ future_reserved_keywords = frozenset([
     "do",
     "end",
     "execute",
-    "explain",
     "fetch",
     "get",
     "global",
@@ -144,6 +142,7 @@ reserved_keywords = future_reserved_keywords | frozenset([
     "__subject__",
     "__type__",
     "alter",
+    "analyze",
     "and",
     "anytuple",
     "anytype",
@@ -159,6 +158,7 @@ reserved_keywords = future_reserved_keywords | frozenset([
     "else",
     "empty",
     "exists",
+    "explain",
     "extending",
     "false",
     "filter",
@@ -155,7 +155,8 @@ def unescape_string(st):
         except KeyError:
             pass
 
-        return chr(int(m.group(g), 16))
+        # \xhh, \uhhhh or \Uhhhhhhhh
+        return chr(int(m.group(0)[2:], 16))
 
     return STRING_ESCAPE_RE.sub(cb, st)
 
@@ -39,6 +39,10 @@ class Stmt(Nonterm):
         # DESCRIBE
         self.val = kids[0].val
 
+    def reduce_ExplainStmt(self, *kids):
+        # EXPLAIN
+        self.val = kids[0].val
+
     def reduce_ExprStmt(self, *kids):
         self.val = kids[0].val
 
@@ -202,3 +206,12 @@ class DescribeStmt(Nonterm):
             object=kids[2].val,
             options=kids[4].val,
         )
+
+
+class ExplainStmt(Nonterm):
+
+    def reduce_EXPLAIN_ExprStmt(self, *kids):
+        self.val = qlast.ExplainStmt(query=kids[1].val)
+
+    def reduce_EXPLAIN_ANALYZE_ExprStmt(self, *kids):
+        self.val = qlast.ExplainStmt(query=kids[2].val, analyze=True)
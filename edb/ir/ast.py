@@ -476,6 +476,9 @@ class Parameter(ImmutableExpr):
 
     name: str
     typeref: TypeRef
+    # True if the parameter stands for a literal extracted from
+    # the query text rather than for a query argument.
+    is_literal: bool = False
 
 
 class TupleElement(ImmutableBase):
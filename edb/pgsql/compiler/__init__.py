@@ -37,8 +37,10 @@ from . import stmt as _stmt_compiler  # NOQA
 
 from . import context
 from . import dispatch
+from . import explain
 
 from .context import OutputFormat  # NOQA
+from .context import ShapeStrategy  # NOQA
 
 
 def compile_ir_to_sql_tree(
@@ -48,7 +50,8 @@ def compile_ir_to_sql_tree(
         explicit_top_cast: Optional[irast.TypeRef]=None,
         singleton_mode: bool=False,
         use_named_params: bool=False,
-        expected_cardinality_one: bool=False) -> pgast.Base:
+        expected_cardinality_one: bool=False,
+        shape_strategy: ShapeStrategy=ShapeStrategy.AUTO) -> pgast.Base:
     try:
         # Transform to sql tree
         env = context.Environment(
@@ -56,7 +59,10 @@ def compile_ir_to_sql_tree(
             expected_cardinality_one=expected_cardinality_one,
             use_named_params=use_named_params,
             ignore_object_shapes=ignore_shapes,
-            explicit_top_cast=explicit_top_cast)
+            explicit_top_cast=explicit_top_cast,
+            shape_strategy=shape_strategy,
+            num_params=(len(ir_expr.params)
+                        if isinstance(ir_expr, irast.Statement) else 0))
 
         if isinstance(ir_expr, irast.Statement):
             scope_tree = ir_expr.scope_tree
@@ -77,6 +83,10 @@ def compile_ir_to_sql_tree(
         ctx.singleton_mode = singleton_mode
         qtree = dispatch.compile(ir_expr, ctx=ctx)
 
+        if env.literal_argmap:
+            assert isinstance(qtree, pgast.Query)
+            qtree.argnames = {**qtree.argnames, **env.literal_argmap}
+
     except Exception as e:  # pragma: no cover
         try:
             args = [e.args[0]]
@@ -94,6 +104,7 @@ def compile_ir_to_sql(
         explicit_top_cast: Optional[irast.TypeRef]=None,
         use_named_params: bool=False,
         expected_cardinality_one: bool=False,
+        shape_strategy: ShapeStrategy=ShapeStrategy.AUTO,
         pretty: bool=True) -> Tuple[str, Dict[str, int]]:
 
     qtree = compile_ir_to_sql_tree(
@@ -102,7 +113,8 @@ def compile_ir_to_sql(
         ignore_shapes=ignore_shapes,
         explicit_top_cast=explicit_top_cast,
         use_named_params=use_named_params,
-        expected_cardinality_one=expected_cardinality_one)
+        expected_cardinality_one=expected_cardinality_one,
+        shape_strategy=shape_strategy)
 
     if debug.flags.edgeql_compile:  # pragma: no cover
         debug.header('SQL Tree')
@@ -122,6 +134,46 @@ def compile_ir_to_sql(
     return sql_text, argmap
 
 
+def compile_ir_to_explain_sql(
+        ir_expr: irast.Base, *,
+        analyze: bool=False,
+        output_format: Optional[OutputFormat]=None,
+        expected_cardinality_one: bool=False,
+        shape_strategy: ShapeStrategy=ShapeStrategy.AUTO,
+        pretty: bool=True) -> str:
+    """Compile the SQL of EXPLAIN [ANALYZE] of the query *ir_expr*.
+
+    The query is compiled like a regular query in the native output
+    format, *output_format* only applies to the returned plan.
+    """
+    qtree = compile_ir_to_sql_tree(
+        ir_expr,
+        output_format=OutputFormat.NATIVE,
+        shape_strategy=shape_strategy)
+
+    assert isinstance(qtree, pgast.Query), "expected instance of ast.Query"
+    sql_text = ''.join(_run_codegen(qtree, pretty=False).result)
+
+    env = context.Environment(
+        output_format=output_format,
+        expected_cardinality_one=expected_cardinality_one,
+        use_named_params=False,
+        ignore_object_shapes=False,
+        explicit_top_cast=None)
+
+    explain_tree = explain.wrap_explain(
+        qtree, sql_text, analyze=analyze, env=env)
+
+    codegen = _run_codegen(explain_tree, pretty=pretty)
+    explain_text = ''.join(codegen.result)
+
+    if debug.flags.edgeql_compile:  # pragma: no cover
+        debug.header('SQL')
+        debug.dump_code(explain_text, lexer='sql')
+
+    return explain_text
+
+
 def _run_codegen(
     qtree: pgast.Base,
     *,
@@ -52,6 +52,22 @@ class OutputFormat(enum.Enum):
     NATIVE = enum.auto()
     JSON = enum.auto()
     JSONB = enum.auto()
+    #: Like JSON, but every element of the result set is returned as
+    #: a separate row instead of aggregating them into an array.
+    JSON_ELEMENTS = enum.auto()
+
+
+class ShapeStrategy(enum.Enum):
+    """How multi-cardinality shape elements are compiled."""
+
+    #: Pick the strategy based on the shape of the outer query.
+    AUTO = 'auto'
+    #: Aggregate the element with a subquery correlated to every
+    #: object of the outer set.
+    SUBQUERY = 'subquery'
+    #: Aggregate the element for all source objects at once with
+    #: a GROUP BY subquery joined to the outer set by source id.
+    JOIN = 'join'
 
 
 class NoVolatilitySentinel:
@@ -82,6 +98,9 @@ class CompilerContextLevel(compiler.ContextLevel):
     #: currently being compiled.
     stmt: pgast.SelectStmt
 
+    #: The IR statement currently being compiled, if any.
+    ir_stmt: Optional[irast.Stmt]
+
     #: Current SQL subquery
     rel: pgast.SelectStmt
 
@@ -168,6 +187,7 @@ class CompilerContextLevel(compiler.ContextLevel):
 
             self.toplevel_stmt = NO_STMT
             self.stmt = NO_STMT
+            self.ir_stmt = None
             self.rel = NO_STMT
             self.rel_hierarchy = {}
             self.dml_stmts = {}
@@ -195,6 +215,7 @@ class CompilerContextLevel(compiler.ContextLevel):
 
             self.toplevel_stmt = prevlevel.toplevel_stmt
             self.stmt = prevlevel.stmt
+            self.ir_stmt = prevlevel.ir_stmt
             self.rel = prevlevel.rel
             self.rel_hierarchy = prevlevel.rel_hierarchy
             self.dml_stmts = prevlevel.dml_stmts
@@ -232,6 +253,7 @@ class CompilerContextLevel(compiler.ContextLevel):
 
             if mode == ContextSwitchMode.SUBSTMT:
                 self.stmt = self.rel
+                self.ir_stmt = None
 
             if mode == ContextSwitchMode.NEWSCOPE:
                 self.path_scope = prevlevel.path_scope.new_child()
@@ -272,6 +294,9 @@ class Environment:
     expected_cardinality_one: bool
     ignore_object_shapes: bool
     explicit_top_cast: Optional[irast.TypeRef]
+    shape_strategy: ShapeStrategy
+    num_params: int
+    literal_argmap: Dict[str, int]
 
     def __init__(
         self,
@@ -281,6 +306,8 @@ class Environment:
         expected_cardinality_one: bool,
         ignore_object_shapes: bool,
         explicit_top_cast: Optional[irast.TypeRef],
+        shape_strategy: ShapeStrategy = ShapeStrategy.AUTO,
+        num_params: int = 0,
     ) -> None:
         self.aliases = aliases.AliasGenerator()
         self.output_format = output_format
@@ -289,3 +316,8 @@ class Environment:
         self.expected_cardinality_one = expected_cardinality_one
         self.ignore_object_shapes = ignore_object_shapes
         self.explicit_top_cast = explicit_top_cast
+        self.shape_strategy = shape_strategy
+        # The parameters standing for literals extracted from the
+        # query text are numbered after the query parameters.
+        self.num_params = num_params
+        self.literal_argmap = {}
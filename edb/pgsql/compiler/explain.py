@@ -0,0 +1,104 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+"""Compilation helpers for EXPLAIN."""
+
+from __future__ import annotations
+
+from typing import *  # NoQA
+
+import json
+
+from edb.common import ast
+
+from edb.pgsql import ast as pgast
+
+from . import context
+
+
+def get_path_annotations(qtree: pgast.Base) -> Dict[str, str]:
+    """Map the range variables of *qtree* to the EdgeQL paths.
+
+    The keys are the aliases of the range variables and the names
+    of the CTEs, which is how Postgres identifies the relations in
+    the nodes of a query plan.
+    """
+    paths = {}
+
+    nodes = ast.find_children(
+        qtree,
+        lambda n: isinstance(
+            n, (pgast.RelRangeVar, pgast.RangeSubselect,
+                pgast.CommonTableExpr)))
+
+    for node in nodes:
+        if isinstance(node, pgast.CommonTableExpr):
+            name = node.name
+            rel = node.query
+        else:
+            name = node.alias.aliasname if node.alias is not None else None
+            rel = node.query
+
+        path_id = getattr(rel, 'path_id', None)
+        if name and path_id is not None:
+            paths[name] = path_id.pformat()
+
+    return paths
+
+
+def wrap_explain(
+        qtree: pgast.Query, sql_text: str, *,
+        analyze: bool,
+        env: context.Environment) -> pgast.SelectStmt:
+    """Return the query that explains the query *sql_text*.
+
+    The query returns a single JSON document: the Postgres plan of
+    the query in the JSON format, with the nodes annotated with the
+    EdgeQL paths they compute (see get_path_annotations()).
+    """
+    paths = get_path_annotations(qtree)
+
+    val: pgast.BaseExpr = pgast.FuncCall(
+        name=('edgedb', '_explain'),
+        args=[
+            pgast.StringConstant(val=sql_text),
+            pgast.BooleanConstant(val='true' if analyze else 'false'),
+            pgast.TypeCast(
+                arg=pgast.StringConstant(val=json.dumps(paths)),
+                type_name=pgast.TypeName(name=('jsonb',)),
+            ),
+        ],
+    )
+
+    if env.output_format in (context.OutputFormat.JSON,
+                             context.OutputFormat.JSON_ELEMENTS):
+        val = pgast.TypeCast(
+            arg=val,
+            type_name=pgast.TypeName(name=('json',)),
+        )
+
+        if (env.output_format is context.OutputFormat.JSON
+                and not env.expected_cardinality_one):
+            val = pgast.FuncCall(name=('json_build_array',), args=[val])
+
+    return pgast.SelectStmt(
+        target_list=[
+            pgast.ResTarget(val=val),
+        ],
+    )
@@ -117,7 +117,15 @@ def compile_Parameter(
         ctx: context.CompilerContextLevel) -> pgast.BaseExpr:
 
     result: pgast.BaseParamRef
-    if expr.name.isdecimal():
+    if expr.is_literal:
+        if expr.name in ctx.env.literal_argmap:
+            index = ctx.env.literal_argmap[expr.name]
+        else:
+            index = ctx.env.num_params + len(ctx.env.literal_argmap) + 1
+            ctx.env.literal_argmap[expr.name] = index
+
+        result = pgast.ParamRef(number=index)
+    elif expr.name.isdecimal():
         index = int(expr.name) + 1
         result = pgast.ParamRef(number=index)
     else:
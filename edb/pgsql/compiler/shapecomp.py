@@ -23,6 +23,8 @@ from __future__ import annotations
 
 from typing import *  # NoQA
 
+from edb.common import ast
+
 from edb.edgeql import qltypes
 
 from edb.ir import ast as irast
@@ -79,6 +81,11 @@ def compile_shape(
                 if not is_singleton:
                     value = relgen.set_to_array(
                         ir_set=el, query=wrapper, ctx=shapectx)
+                    if not irutils.is_subquery_set(el):
+                        joined_value = _set_to_array_as_join(
+                            wrapper, value, ctx=shapectx)
+                        if joined_value is not None:
+                            value = joined_value
                 else:
                     value = wrapper
             else:
@@ -91,3 +98,173 @@ def compile_shape(
             elements.append(tuple_el)
 
     return pgast.TupleVar(elements=elements, named=True)
+
+
+def _set_to_array_as_join(
+        wrapper: pgast.Query, agg_query: pgast.Query, *,
+        ctx: context.CompilerContextLevel) -> Optional[pgast.BaseExpr]:
+    """Aggregate a shape element for all objects of the outer set at once.
+
+    *agg_query* is the array aggregate over *wrapper* produced by
+    relgen.set_to_array(), which is evaluated for every object of the
+    outer set, as *wrapper* is correlated to it by a single
+    ``<outer>.id = <link>.source`` condition.  The condition is
+    lifted from *wrapper*, the aggregate is grouped by the source
+    instead, and the result is LEFT JOIN-ed to the outer query:
+
+        SELECT ..., COALESCE(aggj.agg, ARRAY[])
+        FROM
+            Source
+            LEFT JOIN (
+                SELECT aggw.src, array_agg(aggw.v) AS agg
+                FROM (SELECT <link>.source AS src, ...) AS aggw
+                GROUP BY aggw.src
+            ) AS aggj ON (aggj.src = Source.id)
+
+    Return the value expression of the element, or None if the
+    correlated form should be used, either because of the
+    ``shape_strategy`` of the environment, or because the queries do
+    not have the expected form.
+    """
+    strategy = ctx.env.shape_strategy
+    if strategy is context.ShapeStrategy.SUBQUERY:
+        return None
+
+    rel = ctx.rel
+    if (not isinstance(rel, pgast.SelectStmt)
+            or astutils.is_set_op_query(rel)
+            or rel.group_clause
+            or not isinstance(wrapper, pgast.SelectStmt)
+            or astutils.is_set_op_query(wrapper)
+            or wrapper.group_clause
+            or wrapper.distinct_clause
+            or wrapper.sort_clause
+            or wrapper.limit_offset is not None
+            or wrapper.limit_count is not None):
+        return None
+
+    local_aliases = {
+        rvar.alias.aliasname
+        for rvar in ast.find_children(
+            wrapper, lambda n: isinstance(n, pgast.BaseRangeVar))
+        if rvar.alias is not None
+    }
+    outer_refs = set(ast.find_children(
+        wrapper,
+        lambda n: (isinstance(n, pgast.ColumnRef) and len(n.name) > 1
+                   and n.name[0] not in local_aliases)))
+    if len(outer_refs) != 1:
+        return None
+    outer_ref = next(iter(outer_refs))
+
+    conjuncts = _split_conjunction(wrapper.where_clause)
+    for i, cond in enumerate(conjuncts):
+        if (isinstance(cond, pgast.Expr)
+                and cond.kind is pgast.ExprKind.OP and cond.name == '='):
+            if cond.lexpr is outer_ref:
+                source_expr = cond.rexpr
+                break
+            elif cond.rexpr is outer_ref:
+                source_expr = cond.lexpr
+                break
+    else:
+        return None
+
+    for idx, from_rvar in enumerate(rel.from_clause):
+        outer_rvar = _find_rvar(from_rvar, outer_ref.name[0])
+        if outer_rvar is not None:
+            break
+    else:
+        return None
+
+    ir_stmt = ctx.ir_stmt
+    if strategy is context.ShapeStrategy.AUTO and (
+            # The outer set is bounded or filtered, so a few
+            # correlated lookups are cheaper than aggregating
+            # the link for all source objects.  The clauses of the
+            # statement are compiled after its result, so they are
+            # checked in the IR.
+            ctx.env.expected_cardinality_one
+            or rel is not ctx.stmt
+            or not isinstance(ir_stmt, irast.SelectStmt)
+            or ir_stmt.where is not None
+            or ir_stmt.limit is not None
+            or ir_stmt.offset is not None
+            or rel.where_clause is not None
+            or rel.limit_offset is not None
+            or rel.limit_count is not None
+            or not isinstance(outer_rvar, pgast.RelRangeVar)
+            or not isinstance(outer_rvar.relation, pgast.Relation)):
+        return None
+
+    del conjuncts[i]
+    wrapper.where_clause = (
+        astutils.extend_binop(None, *conjuncts) if conjuncts else None)
+    src_col = ctx.env.aliases.get('src')
+    wrapper.target_list.append(
+        pgast.ResTarget(name=src_col, val=source_expr))
+
+    assert isinstance(agg_query, pgast.SelectStmt)
+    agg_target = agg_query.target_list[0]
+    agg_expr = agg_target.val
+    assert isinstance(agg_expr, pgast.CoalesceExpr)
+    array_agg, empty_array = agg_expr.args
+    aggw_alias = agg_query.from_clause[0].alias.aliasname
+
+    agg_col = ctx.env.aliases.get('agg')
+    src_ref = pgast.ColumnRef(name=[aggw_alias, src_col])
+    agg_query.target_list = [
+        pgast.ResTarget(name=src_col, val=src_ref),
+        pgast.ResTarget(
+            name=agg_col, val=array_agg, ser_safe=agg_target.ser_safe),
+    ]
+    agg_query.group_clause = [src_ref]
+
+    aggj_alias = ctx.env.aliases.get('aggj')
+    rel.from_clause[idx] = pgast.JoinExpr(
+        type='left',
+        larg=from_rvar,
+        rarg=pgast.RangeSubselect(
+            subquery=agg_query,
+            alias=pgast.Alias(aliasname=aggj_alias),
+        ),
+        quals=astutils.new_binop(
+            pgast.ColumnRef(name=[aggj_alias, src_col]), outer_ref, op='='),
+    )
+
+    return pgast.CoalesceExpr(
+        args=[
+            pgast.ColumnRef(
+                name=[aggj_alias, agg_col],
+                nullable=True,
+                ser_safe=agg_expr.ser_safe,
+            ),
+            empty_array,
+        ],
+        ser_safe=agg_expr.ser_safe,
+        nullable=False,
+    )
+
+
+def _split_conjunction(
+        expr: Optional[pgast.BaseExpr]) -> List[pgast.BaseExpr]:
+    if expr is None:
+        return []
+    elif (isinstance(expr, pgast.Expr) and expr.kind is pgast.ExprKind.OP
+            and expr.name == 'AND'):
+        return (_split_conjunction(expr.lexpr)
+                + _split_conjunction(expr.rexpr))
+    else:
+        return [expr]
+
+
+def _find_rvar(
+        rvar: pgast.BaseRangeVar,
+        aliasname: str) -> Optional[pgast.BaseRangeVar]:
+    if isinstance(rvar, pgast.JoinExpr):
+        return (_find_rvar(rvar.larg, aliasname)
+                or _find_rvar(rvar.rarg, aliasname))
+    elif rvar.alias is not None and rvar.alias.aliasname == aliasname:
+        return rvar
+    else:
+        return None
@@ -49,6 +49,7 @@ def compile_SelectStmt(
         clauses.init_stmt(stmt, ctx=ctx, parent_ctx=parent_ctx)
 
         query = ctx.stmt
+        ctx.ir_stmt = stmt
 
         if not isinstance(stmt.result.expr, irast.MutatingStmt):
             iterators = irutils.get_iterator_sets(stmt)
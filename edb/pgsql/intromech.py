@@ -19,7 +19,9 @@
 """Low level introspection of the schema."""
 
 from __future__ import annotations
+from typing import *  # NoQA
 
+import asyncio
 import collections
 import json
 
@@ -47,6 +49,7 @@ from edb.schema import objects as s_obj
 from edb.schema import operators as s_opers
 from edb.schema import pseudo as s_pseudo
 from edb.schema import roles as s_roles
+from edb.schema import schema as s_schema
 from edb.schema import types as s_types
 
 from edb.pgsql import common
@@ -58,45 +61,195 @@ from .datasources import introspection
 from . import schemamech
 
 
+CatalogQuery = Tuple[Callable[..., Awaitable[Any]], Dict[str, Any]]
+
+
+def _get_catalog_queries(
+    modules: Optional[Iterable[str]],
+    exclude_modules: Optional[Iterable[str]],
+) -> Dict[str, CatalogQuery]:
+    """Return the catalog queries the schema is read from.
+
+    The queries are independent of each other and can be run in any
+    order, or concurrently in the same snapshot.
+    """
+    ds = datasources.schema
+    mods = {'modules': modules, 'exclude_modules': exclude_modules}
+
+    return {
+        'roles': (ds.roles.fetch, {}),
+        'pg_schemas': (
+            introspection.schemas.fetch,
+            {'schema_pattern': 'edgedb_%'},
+        ),
+        'pg_sequences': (
+            introspection.sequences.fetch,
+            {'schema_pattern': 'edgedb%', 'sequence_pattern': '%_sequence'},
+        ),
+        'pg_indexes': (
+            introspection.tables.fetch_indexes,
+            {'schema_pattern': 'edgedb%', 'index_pattern': '%_index'},
+        ),
+        'modules': (ds.modules.fetch, mods),
+        'scalars': (ds.scalars.fetch, mods),
+        'annotations': (ds.annos.fetch, mods),
+        'annotation_values': (ds.annos.fetch_values, mods),
+        'objtypes': (ds.objtypes.fetch, mods),
+        'casts': (ds.casts.fetch, mods),
+        'links': (ds.links.fetch, mods),
+        'link_properties': (ds.links.fetch_properties, mods),
+        'operators': (ds.operators.fetch, mods),
+        'functions': (ds.functions.fetch, mods),
+        'params': (ds.functions.fetch_params, mods),
+        'constraints': (ds.constraints.fetch, mods),
+        'indexes': (ds.indexes.fetch, mods),
+        'tuple_views': (ds.types.fetch_tuple_views, mods),
+        'array_views': (ds.types.fetch_array_views, mods),
+    }
+
+
 class IntrospectionMech:
 
-    def __init__(self, connection):
+    def __init__(
+        self,
+        connection: Any,
+        *,
+        connect: Optional[Callable[[], Awaitable[Any]]] = None,
+        concurrency: int = 1,
+    ) -> None:
         self._constr_mech = schemamech.ConstraintMech()
         self.connection = connection
+        # An optional coroutine function returning a new connection
+        # to the same database, used to run the catalog queries
+        # concurrently on up to *concurrency* connections.
+        self._connect = connect
+        self._concurrency = concurrency
+
+    async def fetch_catalog(
+        self,
+        *,
+        modules: Optional[Iterable[str]] = None,
+        exclude_modules: Optional[Iterable[str]] = None,
+        concurrent: bool = False,
+    ) -> Dict[str, Any]:
+        """Run the catalog queries and return the results by name.
+
+        If *concurrent* is true, and the mech is able to open more
+        connections, the queries are also run on connections that
+        import the snapshot of the current transaction, which must
+        not have made any changes.
+        """
+        queries = _get_catalog_queries(modules, exclude_modules)
+
+        if not concurrent or self._connect is None or self._concurrency < 2:
+            catalog: Dict[str, Any] = {}
+            for name, (fetch, kwargs) in queries.items():
+                catalog[name] = await fetch(self.connection, **kwargs)
+            return catalog
+
+        snapshot_id = await self.connection.fetchval(
+            'SELECT pg_export_snapshot()')
+
+        catalog: Dict[str, Any] = {}
+        pending = collections.deque(queries.items())
+        done = asyncio.Event()
+
+        async def run(con: Any) -> None:
+            while pending:
+                name, (fetch, kwargs) = pending.popleft()
+                catalog[name] = await fetch(con, **kwargs)
+                if len(catalog) == len(queries):
+                    done.set()
+
+        async def run_in_snapshot() -> None:
+            try:
+                con = await self._connect()
+            except Exception:
+                # The extra connections are only an optimization, and
+                # the connection limit might have been reached.
+                return
+
+            try:
+                if not pending:
+                    return
+                async with con.transaction(isolation='repeatable_read',
+                                           readonly=True):
+                    await con.execute(
+                        f'SET TRANSACTION SNAPSHOT '
+                        f'{common.quote_literal(snapshot_id)};')
+                    await run(con)
+            finally:
+                await con.close()
+
+        tasks = [asyncio.ensure_future(run(self.connection))]
+        for _ in range(self._concurrency - 1):
+            tasks.append(asyncio.ensure_future(run_in_snapshot()))
+
+        done_waiter = asyncio.ensure_future(done.wait())
+        waiting = set(tasks)
+        waiting.add(done_waiter)
+        try:
+            while not done.is_set():
+                finished, waiting = await asyncio.wait(
+                    waiting, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    if task is not done_waiter and task.exception():
+                        raise task.exception()
+        finally:
+            # The connections that are still being opened are not
+            # needed anymore, and a failed query makes the other
+            # queries pointless.
+            done_waiter.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return catalog
 
     async def _readschema(self, *, schema=None, modules=None,
-                          exclude_modules=None):
+                          exclude_modules=None, concurrent=False):
         if schema is None:
             schema = so.Schema()
 
+        catalog = await self.fetch_catalog(
+            modules=modules, exclude_modules=exclude_modules,
+            concurrent=concurrent)
+
+        # Every object is read separately, which is a lot cheaper to
+        # do in a mutable schema.
+        schema = s_schema.SchemaBuilder(schema)
+
         schema = await self.read_roles(
-            schema)
+            schema, catalog)
         schema = await self.read_modules(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog,
+            only_modules=modules, exclude_modules=exclude_modules)
         schema, scalar_exprmap = await self.read_scalars(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog,
+            only_modules=modules, exclude_modules=exclude_modules)
         schema = await self.read_annotations(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog)
         schema, obj_exprmap = await self.read_objtypes(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog)
         schema = await self.read_casts(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog)
         schema, link_exprmap = await self.read_links(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog)
         schema, prop_exprmap = await self.read_link_properties(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog)
         schema = await self.read_operators(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog)
         schema = await self.read_functions(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog)
         schema, constr_exprmap = await self.read_constraints(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog)
         schema = await self.read_indexes(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog,
+            only_modules=modules, exclude_modules=exclude_modules)
         schema = await self.read_annotation_values(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog)
         schema, view_exprmap = await self.read_views(
-            schema, only_modules=modules, exclude_modules=exclude_modules)
+            schema, catalog)
 
         schema = await self.order_scalars(schema, scalar_exprmap)
         schema = await self.order_operators(schema)
@@ -106,7 +259,7 @@ class IntrospectionMech:
         schema = await self.order_constraints(schema, constr_exprmap)
         schema = await self.order_views(schema, view_exprmap)
 
-        return schema
+        return schema.finish()
 
     async def readschema(self, *, schema=None, modules=None,
                          exclude_modules=None):
@@ -120,10 +273,11 @@ class IntrospectionMech:
             async with self.connection.transaction(
                     isolation='repeatable_read'):
                 return await self._readschema(schema=schema, modules=modules,
-                                              exclude_modules=exclude_modules)
+                                              exclude_modules=exclude_modules,
+                                              concurrent=True)
 
-    async def read_roles(self, schema):
-        roles = await datasources.schema.roles.fetch(self.connection)
+    async def read_roles(self, schema, catalog):
+        roles = catalog['roles']
         basemap = {}
 
         for row in roles:
@@ -151,21 +305,17 @@ class IntrospectionMech:
 
         return schema
 
-    async def read_modules(self, schema, only_modules, exclude_modules):
-        schemas = await introspection.schemas.fetch(
-            self.connection, schema_pattern='edgedb_%')
+    async def read_modules(self, schema, catalog, only_modules,
+                           exclude_modules):
         schemas = {
             s['name']
-            for s in schemas if not s['name'].startswith('edgedb_aux_')
+            for s in catalog['pg_schemas']
+            if not s['name'].startswith('edgedb_aux_')
         }
 
-        modules = await datasources.schema.modules.fetch(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-
         modules = [
             {'id': m['id'], 'name': m['name'], 'builtin': m['builtin']}
-            for m in modules
+            for m in catalog['modules']
         ]
 
         recorded_schemas = set()
@@ -196,17 +346,13 @@ class IntrospectionMech:
 
         return schema
 
-    async def read_scalars(self, schema, only_modules, exclude_modules):
-        seqs = await introspection.sequences.fetch(
-            self.connection,
-            schema_pattern='edgedb%', sequence_pattern='%_sequence')
-        seqs = {(s['schema'], s['name']): s for s in seqs}
+    async def read_scalars(self, schema, catalog, only_modules,
+                           exclude_modules):
+        seqs = {(s['schema'], s['name']): s for s in catalog['pg_sequences']}
 
         seen_seqs = set()
 
-        scalar_list = await datasources.schema.scalars.fetch(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
+        scalar_list = catalog['scalars']
 
         basemap = {}
         exprmap = collections.defaultdict(dict)
@@ -315,15 +461,9 @@ class IntrospectionMech:
         else:
             return schema, []
 
-    async def read_operators(self, schema, only_modules, exclude_modules):
-        ds = datasources.schema
-        func_list = await ds.operators.fetch(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-        param_list = await ds.functions.fetch_params(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-        param_map = {p['name']: p for p in param_list}
+    async def read_operators(self, schema, catalog):
+        func_list = catalog['operators']
+        param_map = {p['name']: p for p in catalog['params']}
 
         for row in func_list:
             name = sn.Name(row['name'])
@@ -362,11 +502,8 @@ class IntrospectionMech:
     async def order_operators(self, schema):
         return schema
 
-    async def read_casts(self, schema, only_modules, exclude_modules):
-        ds = datasources.schema
-        cast_list = await ds.casts.fetch(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
+    async def read_casts(self, schema, catalog):
+        cast_list = catalog['casts']
 
         for row in cast_list:
             name = sn.Name(row['name'])
@@ -391,15 +528,9 @@ class IntrospectionMech:
 
         return schema
 
-    async def read_functions(self, schema, only_modules, exclude_modules):
-        ds = datasources.schema.functions
-        func_list = await ds.fetch(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-        param_list = await ds.fetch_params(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-        param_map = {p['name']: p for p in param_list}
+    async def read_functions(self, schema, catalog):
+        func_list = catalog['functions']
+        param_map = {p['name']: p for p in catalog['params']}
 
         for row in func_list:
             name = sn.Name(row['name'])
@@ -437,16 +568,11 @@ class IntrospectionMech:
 
         return schema
 
-    async def read_constraints(self, schema, only_modules, exclude_modules):
-        ds = datasources.schema
-        constraints_list = await ds.constraints.fetch(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-        constraints_list = {sn.Name(r['name']): r for r in constraints_list}
-        param_list = await ds.functions.fetch_params(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-        param_map = {p['name']: p for p in param_list}
+    async def read_constraints(self, schema, catalog):
+        constraints_list = {
+            sn.Name(r['name']): r for r in catalog['constraints']
+        }
+        param_map = {p['name']: p for p in catalog['params']}
 
         basemap = {}
         exprmap = collections.defaultdict(dict)
@@ -584,27 +710,19 @@ class IntrospectionMech:
         for idx_data in indexes:
             yield dbops.Index.from_introspection(table_name, idx_data)
 
-    async def read_indexes(self, schema, only_modules, exclude_modules):
-        pg_index_data = await introspection.tables.fetch_indexes(
-            self.connection,
-            schema_pattern='edgedb%', index_pattern='%_index')
-
+    async def read_indexes(self, schema, catalog, only_modules,
+                           exclude_modules):
         pg_indexes = set()
-        for row in pg_index_data:
+        for row in catalog['pg_indexes']:
             table_name = tuple(row['table_name'])
             for pg_index in self.interpret_indexes(table_name, row['indexes']):
                 pg_indexes.add(
                     (table_name, pg_index.get_metadata('schemaname'))
                 )
 
-        ds = datasources.schema.indexes
-        indexes = await ds.fetch(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-
         basemap = {}
 
-        for index_data in indexes:
+        for index_data in catalog['indexes']:
             subj = schema.get(index_data['subject_name'])
             subj_table_name = common.get_backend_name(
                 schema, subj, catenate=False)
@@ -648,16 +766,8 @@ class IntrospectionMech:
 
         return schema
 
-    async def read_links(self, schema, only_modules, exclude_modules):
-        link_tables = await introspection.tables.fetch_tables(
-            self.connection,
-            schema_pattern='edgedb%', table_pattern='%_link')
-        link_tables = {(t['schema'], t['name']): t for t in link_tables}
-
-        links_list = await datasources.schema.links.fetch(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-        links_list = {sn.Name(r['name']): r for r in links_list}
+    async def read_links(self, schema, catalog):
+        links_list = {sn.Name(r['name']): r for r in catalog['links']}
 
         basemap = {}
         exprmap = collections.defaultdict(dict)
@@ -731,12 +841,10 @@ class IntrospectionMech:
 
         return schema
 
-    async def read_link_properties(
-            self, schema, only_modules, exclude_modules):
-        link_props = await datasources.schema.links.fetch_properties(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-        link_props = {sn.Name(r['name']): r for r in link_props}
+    async def read_link_properties(self, schema, catalog):
+        link_props = {
+            sn.Name(r['name']): r for r in catalog['link_properties']
+        }
         basemap = {}
         exprmap = collections.defaultdict(dict)
 
@@ -807,12 +915,8 @@ class IntrospectionMech:
 
         return schema
 
-    async def read_annotations(self, schema, only_modules, exclude_modules):
-        annotations = await datasources.schema.annos.fetch(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-
-        for r in annotations:
+    async def read_annotations(self, schema, catalog):
+        for r in catalog['annotations']:
             name = sn.Name(r['name'])
             schema, _ = s_anno.Annotation.create_in_schema(
                 schema,
@@ -825,15 +929,10 @@ class IntrospectionMech:
 
         return schema
 
-    async def read_annotation_values(
-            self, schema, only_modules, exclude_modules):
-        annotations = await datasources.schema.annos.fetch_values(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-
+    async def read_annotation_values(self, schema, catalog):
         basemap = {}
 
-        for r in annotations:
+        for r in catalog['annotation_values']:
             name = sn.Name(r['name'])
             subject = schema.get(r['subject_name'])
             anno = schema.get(r['annotation_name'])
@@ -863,11 +962,10 @@ class IntrospectionMech:
 
         return schema
 
-    async def read_objtypes(self, schema, only_modules, exclude_modules):
-        objtype_list = await datasources.schema.objtypes.fetch(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-        objtype_list = {sn.Name(row['name']): row for row in objtype_list}
+    async def read_objtypes(self, schema, catalog):
+        objtype_list = {
+            sn.Name(row['name']): row for row in catalog['objtypes']
+        }
 
         basemap = {}
         exprmap = {}
@@ -931,14 +1029,10 @@ class IntrospectionMech:
 
         return schema
 
-    async def read_views(self, schema, only_modules, exclude_modules):
-        tuple_views = await datasources.schema.types.fetch_tuple_views(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-
+    async def read_views(self, schema, catalog):
         exprmap = collections.defaultdict(dict)
 
-        for r in tuple_views:
+        for r in catalog['tuple_views']:
             eltypes = self.unpack_typeref(r['element_types'], schema)
 
             schema, tview = s_types.TupleExprAlias.create_in_schema(
@@ -954,11 +1048,7 @@ class IntrospectionMech:
 
             exprmap[tview]['expr'] = r['expr']
 
-        array_views = await datasources.schema.types.fetch_array_views(
-            self.connection, modules=only_modules,
-            exclude_modules=exclude_modules)
-
-        for r in array_views:
+        for r in catalog['array_views']:
             eltype = self.unpack_typeref(r['element_type'], schema)
 
             schema, tview = s_types.ArrayExprAlias.create_in_schema(
@@ -1943,6 +1943,92 @@ class SysGetTransactionIsolation(dbops.Function):
             text=self.text)
 
 
+class AnnotateExplainPlanFunction(dbops.Function):
+    """Annotate the nodes of an EXPLAIN plan with EdgeQL paths.
+
+    *paths* maps the aliases of range variables and the names of CTEs
+    of the explained query to the EdgeQL paths they represent.
+    """
+    text = r'''
+    DECLARE
+        path jsonb;
+        plans jsonb;
+    BEGIN
+        path := paths -> COALESCE(node ->> 'Alias', node ->> 'CTE Name');
+        IF path IS NOT NULL THEN
+            node := node || jsonb_build_object('EdgeQL Path', path);
+        END IF;
+
+        IF node ? 'Plans' THEN
+            SELECT
+                jsonb_agg(
+                    edgedb._annotate_explain_plan(subplan, paths)
+                    ORDER BY num
+                )
+            INTO
+                plans
+            FROM
+                jsonb_array_elements(node -> 'Plans')
+                    WITH ORDINALITY AS p(subplan, num);
+
+            node := node || jsonb_build_object('Plans', plans);
+        END IF;
+
+        RETURN node;
+    END;
+    '''
+
+    def __init__(self) -> None:
+        super().__init__(
+            name=('edgedb', '_annotate_explain_plan'),
+            args=[('node', ('jsonb',)), ('paths', ('jsonb',))],
+            returns=('jsonb',),
+            volatility='immutable',
+            language='plpgsql',
+            text=self.text)
+
+
+class ExplainFunction(dbops.Function):
+    """Run EXPLAIN on a query and annotate the plan with EdgeQL paths."""
+    text = r'''
+    DECLARE
+        plan json;
+        result jsonb;
+    BEGIN
+        EXECUTE
+            'EXPLAIN (FORMAT JSON, ANALYZE ' || do_analyze::text
+            || ', BUFFERS ' || do_analyze::text || ') ' || query
+        INTO
+            plan;
+
+        result := (plan -> 0)::jsonb;
+
+        RETURN
+            result
+            || jsonb_build_object(
+                'Plan',
+                edgedb._annotate_explain_plan(result -> 'Plan', paths),
+                'Query Text',
+                query
+            );
+    END;
+    '''
+
+    def __init__(self) -> None:
+        super().__init__(
+            name=('edgedb', '_explain'),
+            args=[
+                ('query', ('text',)),
+                ('do_analyze', ('bool',)),
+                ('paths', ('jsonb',)),
+            ],
+            returns=('jsonb',),
+            # EXPLAIN ANALYZE runs the query.
+            volatility='volatile',
+            language='plpgsql',
+            text=self.text)
+
+
 def _field_to_column(field):
     ftype = field.type
     coltype = None
@@ -2174,6 +2260,8 @@ async def bootstrap(conn):
         dbops.CreateCompositeType(SysConfigValueType()),
         dbops.CreateFunction(SysConfigFunction()),
         dbops.CreateFunction(SysGetTransactionIsolation()),
+        dbops.CreateFunction(AnnotateExplainPlanFunction()),
+        dbops.CreateFunction(ExplainFunction()),
     ])
 
     # Register "any" pseudo-type.
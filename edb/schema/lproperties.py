@@ -103,6 +103,13 @@ class Property(pointers.Pointer, s_abc.Property,
                 similarity /= target_coef
         return similarity
 
+    @classmethod
+    def get_delta_signature_fields(cls) -> Tuple[str, ...]:
+        # compare() discounts the differences in the target
+        # of std::source link properties.
+        return tuple(
+            f for f in super().get_delta_signature_fields() if f != 'target')
+
     def is_property(self, schema):
         return True
 
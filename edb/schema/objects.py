@@ -24,7 +24,6 @@ from typing_extensions import Final
 import collections
 import collections.abc
 import enum
-import itertools
 import sys
 import types
 import uuid
@@ -92,6 +91,10 @@ ObjectCollection_T = TypeVar("ObjectCollection_T", bound="ObjectCollection")
 Pair = Tuple[Optional["Object"], Optional["Object"]]
 HashCriterion = Union[Type[Object_T], Tuple[str, Any]]
 
+# Objects that are at least this similar are considered to be
+# versions of the same object when diffing schemas.
+DELTA_SIMILARITY_THRESHOLD: Final = 0.6
+
 
 def default_field_merge(
     target: InheritingObjectBase,
@@ -148,10 +151,18 @@ class ComparisonContextWrapper:
 class ComparisonContext:
     stacks: Dict[Type[Object], List[Pair]]
     ptrs: List[Type[Object]]
+    similarity: Dict[
+        Tuple[uuid.UUID, uuid.UUID, s_schema.Schema, s_schema.Schema],
+        float,
+    ]
 
     def __init__(self) -> None:
         self.stacks = collections.defaultdict(list)
         self.ptrs = []
+        # (our id, their id, our schema, their schema) -> similarity;
+        # schemas are immutable, so the results of Object.compare()
+        # can be reused for the lifetime of the context.
+        self.similarity = {}
 
     def push(self, pair: Pair) -> None:
         obj = pair[1] if pair[0] is None else pair[0]
@@ -917,6 +928,12 @@ class Object(s_abc.Object, s_abc.ObjectContainer, metaclass=ObjectMeta):
         context = context or ComparisonContext()
         cls = type(self)
 
+        key = (self.id, other.id, our_schema, their_schema)
+        try:
+            return context.similarity[key]
+        except KeyError:
+            pass
+
         with context(self, other):
             similarity = 1.0
 
@@ -940,6 +957,7 @@ class Object(s_abc.Object, s_abc.ObjectContainer, metaclass=ObjectMeta):
                 # XXX to be fixed in a follow-up PR
                 similarity *= fcoef  # type: ignore
 
+        context.similarity[key] = similarity
         return similarity
 
     def is_blocking_ref(
@@ -1287,6 +1305,73 @@ class Object(s_abc.Object, s_abc.ObjectContainer, metaclass=ObjectMeta):
                             new_name=new_name,
                             metaclass=type(obj))
 
+    @classmethod
+    def get_delta_signature_fields(cls) -> Tuple[str, ...]:
+        """Return the fields renamed objects must agree on to be matched.
+
+        Objects with different names can only be similar enough for
+        delta_sets() to match them if they have equal values of every
+        field whose comparison coefficient, combined with the one of
+        the name, is below DELTA_SIMILARITY_THRESHOLD.  Only the fields
+        whose values are compared for equality are returned.
+
+        Subclasses that override compare() to discount a difference
+        in some field must exclude it.
+        """
+        try:
+            return _delta_signature_fields[cls]
+        except KeyError:
+            pass
+
+        name_coef = cls.get_field('name').compcoef
+        assert name_coef is not None
+
+        signature = []
+        for field_name, field in cls.get_fields(sorted=True).items():
+            if (field_name == 'name' or field.compcoef is None
+                    or name_coef * field.compcoef > DELTA_SIMILARITY_THRESHOLD
+                    or _get_value_key_kind(field) is None):
+                continue
+            signature.append(field_name)
+
+        result = _delta_signature_fields[cls] = tuple(signature)
+        return result
+
+    def get_delta_signature(
+        self,
+        schema: s_schema.Schema,
+    ) -> Optional[Tuple[Any, ...]]:
+        """Return the values of the delta signature fields of the object.
+
+        Returns None if the signature cannot be computed, in which case
+        the object has to be compared with all objects of its class.
+        """
+        cls = type(self)
+        signature = []
+        for field_name in cls.get_delta_signature_fields():
+            field = cls.get_field(field_name)
+            value = self.get_field_value(schema, field_name)
+            kind = _get_value_key_kind(field)
+            if kind is _ValueKeyKind.OBJECT:
+                if value is not None:
+                    value = (type(value), value.get_name(schema))
+            elif kind is _ValueKeyKind.COLLECTION:
+                if value is None:
+                    value = frozenset()
+                else:
+                    value = frozenset(
+                        value.names(schema, allow_unresolved=True))
+            elif kind is _ValueKeyKind.EXPRESSION:
+                value = value.text if value else None
+            signature.append(value)
+
+        result = tuple(signature)
+        try:
+            hash(result)
+        except TypeError:
+            return None
+        return result
+
     @classmethod
     def delta_sets(
         cls,
@@ -1340,33 +1425,50 @@ class Object(s_abc.Object, s_abc.ObjectContainer, metaclass=ObjectMeta):
             o for o in new
             if newkeys[o.id] not in unchanged)
 
-        comparison: List[Tuple[float, Object, Object]] = []
-        for x, y in itertools.product(new, old):
-            comp = x.compare(y, our_schema=new_schema,
-                             their_schema=old_schema)  # type: ignore
-            comparison.append((comp, x, y))
-
         used_x: Set[Object] = set()
         used_y: Set[Object] = set()
         altered = ordered.OrderedSet[sd.ObjectCommand]()
 
+        # Share the similarities computed while matching with
+        # the comparisons done by the nested deltas.
+        if context is None:
+            context = ComparisonContext()
+
         def _key(item: Tuple[float, Object, Object]) -> Tuple[float, str]:
             return item[0], item[1].get_name(new_schema)
 
-        comparison = sorted(comparison, key=_key, reverse=True)
-
-        for s, x, y in comparison:
-            if x not in used_x and y not in used_y:
-                if s != 1.0:
-                    if s > 0.6:
-                        altered.add(x.delta(y, x, context=context,
-                                            old_schema=old_schema,
-                                            new_schema=new_schema))
+        def _match(pairs: Iterable[Tuple[Object, Object]]) -> None:
+            comparison: List[Tuple[float, Object, Object]] = []
+            for x, y in pairs:
+                comp = x.compare(y, our_schema=new_schema,
+                                 their_schema=old_schema,  # type: ignore
+                                 context=context)
+                comparison.append((comp, x, y))
+
+            comparison.sort(key=_key, reverse=True)
+
+            for s, x, y in comparison:
+                if x not in used_x and y not in used_y:
+                    if s != 1.0:
+                        if s > DELTA_SIMILARITY_THRESHOLD:
+                            altered.add(x.delta(y, x, context=context,
+                                                old_schema=old_schema,
+                                                new_schema=new_schema))
+                            used_x.add(x)
+                            used_y.add(y)
+                    else:
                         used_x.add(x)
                         used_y.add(y)
-                else:
-                    used_x.add(x)
-                    used_y.add(y)
+
+        # Objects that kept their name or id are matched first, and
+        # renames are then looked for among the rest, so that
+        # the expensive comparisons are only done for a few pairs
+        # of candidates instead of all of them.
+        _match(_get_identity_pairs(
+            old, new, old_schema=old_schema, new_schema=new_schema))
+        _match(_get_similarity_pairs(
+            old - used_y, new - used_x,
+            old_schema=old_schema, new_schema=new_schema))
 
         deleted = old - used_y
         created = new - used_x
@@ -1455,6 +1557,117 @@ class Object(s_abc.Object, s_abc.ObjectContainer, metaclass=ObjectMeta):
         return f'<{type(self).__name__} {self.id} at 0x{id(self):#x}>'
 
 
+class _ValueKeyKind(enum.Enum):
+    VALUE = enum.auto()
+    OBJECT = enum.auto()
+    COLLECTION = enum.auto()
+    EXPRESSION = enum.auto()
+
+
+_delta_signature_fields: Dict[Type[Object], Tuple[str, ...]] = {}
+
+
+def _get_value_key_kind(field: Field[Any]) -> Optional[_ValueKeyKind]:
+    # Return how to key the values of the field so that the keys
+    # are equal if and only if compare_field_value() returns 1.0,
+    # or None if the similarity of the values is not all-or-nothing.
+    from . import expr as s_expr
+
+    comparator = getattr(field.type, 'compare_values', None)
+    if not callable(comparator):
+        return _ValueKeyKind.VALUE
+
+    func = getattr(comparator, '__func__', None)
+    if func is Object.compare_values.__func__:  # type: ignore
+        return _ValueKeyKind.OBJECT
+    elif func is ObjectCollection.compare_values.__func__:  # type: ignore
+        return _ValueKeyKind.COLLECTION
+    elif func is s_expr.Expression.compare_values.__func__:
+        return _ValueKeyKind.EXPRESSION
+    else:
+        return None
+
+
+def _get_identity_pairs(
+    old: Iterable[Object],
+    new: Iterable[Object],
+    *,
+    old_schema: s_schema.Schema,
+    new_schema: s_schema.Schema,
+) -> List[Tuple[Object, Object]]:
+    """Return the pairs of objects of *new* and *old* with the same
+    name or id."""
+    by_name: Dict[str, Object] = {}
+    by_id: Dict[uuid.UUID, Object] = {}
+    old_idx: Dict[Object, int] = {}
+    for i, y in enumerate(old):
+        by_name[y.get_name(old_schema)] = y
+        by_id[y.id] = y
+        old_idx[y] = i
+
+    pairs = []
+    for x in new:
+        candidates = {by_name.get(x.get_name(new_schema)), by_id.get(x.id)}
+        candidates.discard(None)
+        for y in sorted(candidates, key=old_idx.__getitem__):
+            if _are_comparable(x, y):
+                pairs.append((x, y))
+
+    return pairs
+
+
+def _get_similarity_pairs(
+    old: Iterable[Object],
+    new: Iterable[Object],
+    *,
+    old_schema: s_schema.Schema,
+    new_schema: s_schema.Schema,
+) -> List[Tuple[Object, Object]]:
+    """Return the pairs of objects of *new* and *old* that can be
+    similar enough to be a renamed object.
+
+    The candidates are bucketed by class and delta signature, so that
+    the pairs that differ in name as well as in a field weighing
+    enough to push the similarity below the threshold are not
+    compared at all.
+    """
+    # type -> signature -> objects, in the order of *old*
+    buckets: Dict[
+        Type[Object], Dict[Optional[Tuple[Any, ...]], List[Object]]
+    ] = collections.defaultdict(lambda: collections.defaultdict(list))
+    by_type: Dict[Type[Object], List[Object]] = collections.defaultdict(list)
+    old_idx: Dict[Object, int] = {}
+
+    for i, y in enumerate(old):
+        old_idx[y] = i
+        buckets[type(y)][y.get_delta_signature(old_schema)].append(y)
+        by_type[type(y)].append(y)
+
+    pairs = []
+    for x in new:
+        x_type = type(x)
+        candidates: List[Object] = []
+        for y_type, ys in by_type.items():
+            if y_type is x_type:
+                signature = x.get_delta_signature(new_schema)
+                if signature is None:
+                    candidates.extend(ys)
+                else:
+                    candidates.extend(buckets[y_type].get(signature, ()))
+                    candidates.extend(buckets[y_type].get(None, ()))
+            elif issubclass(x_type, y_type) or issubclass(y_type, x_type):
+                candidates.extend(ys)
+
+        candidates.sort(key=old_idx.__getitem__)
+        pairs.extend((x, y) for y in candidates)
+
+    return pairs
+
+
+def _are_comparable(x: Object, y: Object) -> bool:
+    return isinstance(x, type(y)) or isinstance(y, type(x))
+
+
 class ObjectFragment(Object):
     """A part of another object that cannot exist independently."""
 
@@ -23,6 +23,7 @@ from typing import *  # NoQA
 
 import functools
 import itertools
+import uuid
 
 import immutables as immu
 
@@ -293,15 +294,7 @@ class Schema(s_abc.Schema):
                     except KeyError:
                         ids = None
                     else:
-                        if isinstance(ref, so.ObjectCollection):
-                            ids = frozenset(ref.ids(self))
-                        elif isinstance(ref, s_expr.Expression):
-                            if ref.refs:
-                                ids = frozenset(ref.refs.ids(self))
-                            else:
-                                ids = frozenset()
-                        else:
-                            ids = frozenset((ref.id,))
+                        ids = _get_ref_ids(self, ref)
 
                 if not orig_data:
                     orig_ids = None
@@ -311,15 +304,7 @@ class Schema(s_abc.Schema):
                     except KeyError:
                         orig_ids = None
                     else:
-                        if isinstance(ref, so.ObjectCollection):
-                            orig_ids = frozenset(ref.ids(self))
-                        elif isinstance(ref, s_expr.Expression):
-                            if ref.refs:
-                                orig_ids = frozenset(ref.refs.ids(self))
-                            else:
-                                orig_ids = frozenset()
-                        else:
-                            orig_ids = frozenset((ref.id,))
+                        orig_ids = _get_ref_ids(self, ref)
 
                 if not ids and not orig_ids:
                     continue
@@ -696,6 +681,365 @@ class Schema(s_abc.Schema):
             f'<{type(self).__name__} gen:{self._generation} at {id(self):#x}>')
 
 
+class SchemaBuilder(Schema):
+    """A mutable schema for building large schemas in bulk.
+
+    Every change of a persistent Schema copies the indexes it touches,
+    which dominates the time it takes to load a schema with many
+    objects one object at a time.  The builder keeps the objects,
+    their fields and the references between them in plain dicts,
+    which are changed in place, and are frozen into a Schema once
+    by finish().
+
+    The builder supports the same API as Schema, and the methods
+    that would return a new schema return the builder itself, so it
+    can be passed to the code that populates a Schema.  The lookups
+    that Schema caches are not cached by the builder, but the caches
+    that other modules keep per schema (e.g. of the implicit casts)
+    are not invalidated by the changes, so the builder should only
+    be used to create and update the schema objects.
+    """
+
+    def __init__(self, schema: Optional[Schema] = None) -> None:
+        if schema is None:
+            schema = Schema()
+
+        # The values of the indexes inherited from the base schema are
+        # immutable and are only replaced by dicts when changed.
+        self._id_to_data = dict(schema._id_to_data.items())
+        self._id_to_type = dict(schema._id_to_type.items())
+        self._shortname_to_id = dict(schema._shortname_to_id.items())
+        self._name_to_id = dict(schema._name_to_id.items())
+        self._globalname_to_id = dict(schema._globalname_to_id.items())
+        self._refs_to = dict(schema._refs_to.items())
+        self._generation = schema._generation
+
+    def finish(self) -> Schema:
+        """Return a Schema with the contents of the builder."""
+        new = Schema.__new__(Schema)
+        new._id_to_data = immu.Map(
+            (obj_id, immu.Map(data) if type(data) is dict else data)
+            for obj_id, data in self._id_to_data.items()
+        )
+        new._id_to_type = immu.Map(self._id_to_type)
+        new._shortname_to_id = immu.Map(self._shortname_to_id)
+        new._name_to_id = immu.Map(self._name_to_id)
+        new._globalname_to_id = immu.Map(self._globalname_to_id)
+        new._refs_to = immu.Map(
+            (
+                ref_id,
+                immu.Map(
+                    (key, immu.Map(ids)) for key, ids in refs.items()
+                ) if type(refs) is dict else refs
+            )
+            for ref_id, refs in self._refs_to.items()
+        )
+        new._generation = self._generation + 1
+        return new
+
+    def _get_mutable_data(self, obj_id: uuid.UUID) -> Dict[str, Any]:
+        data = self._id_to_data[obj_id]
+        if type(data) is not dict:
+            data = self._id_to_data[obj_id] = dict(data.items())
+        return data
+
+    def _get_mutable_refs(
+        self,
+        ref_id: uuid.UUID,
+    ) -> Dict[Tuple[type, str], dict]:
+        refs = self._refs_to.get(ref_id)
+        if refs is None:
+            refs = self._refs_to[ref_id] = {}
+        elif type(refs) is not dict:
+            refs = self._refs_to[ref_id] = {
+                key: dict(ids.items()) for key, ids in refs.items()
+            }
+        return refs
+
+    def _index_obj_name(
+        self,
+        obj_id: uuid.UUID,
+        scls: so.Object,
+        old_name: Optional[str],
+        new_name: Optional[str],
+    ) -> None:
+        name_to_id = self._name_to_id
+        shortname_to_id = self._shortname_to_id
+        globalname_to_id = self._globalname_to_id
+        stype = type(scls)
+        is_global = issubclass(stype, so.UnqualifiedObject)
+
+        has_sn_cache = issubclass(stype, (s_func.Function, s_oper.Operator))
+
+        if old_name is not None:
+            if is_global:
+                del globalname_to_id[(stype, old_name)]
+            else:
+                del name_to_id[old_name]
+            if has_sn_cache:
+                old_shortname = sn.shortname_from_fullname(old_name)
+                sn_key = (stype, old_shortname)
+
+                new_ids = shortname_to_id[sn_key] - {obj_id}
+                if new_ids:
+                    shortname_to_id[sn_key] = new_ids
+                else:
+                    del shortname_to_id[sn_key]
+
+        if new_name is not None:
+            if is_global:
+                key = (stype, new_name)
+                if key in globalname_to_id:
+                    raise errors.SchemaError(
+                        f'{stype.__name__} {new_name!r} '
+                        f'is already present in the schema')
+                globalname_to_id[key] = obj_id
+            else:
+                if new_name in name_to_id:
+                    raise errors.SchemaError(
+                        f'name {new_name!r} is already in the schema')
+                name_to_id[new_name] = obj_id
+
+            if has_sn_cache:
+                new_shortname = sn.shortname_from_fullname(new_name)
+                sn_key = (stype, new_shortname)
+                ids = shortname_to_id.get(sn_key, frozenset())
+                shortname_to_id[sn_key] = ids | {obj_id}
+
+    def _index_refs(
+        self,
+        scls: so.Object,
+        orig_data: Optional[Mapping[str, Any]],
+        new_data: Optional[Mapping[str, Any]],
+    ) -> None:
+        scls_type = type(scls)
+        objfields = scls_type.get_object_fields()
+        if not objfields:
+            return
+
+        # Unlike Schema._update_refs_to(), only look at the fields
+        # that are present in the data, as most changes are of a
+        # single field.
+        fields = scls_type._fields
+        field_names = set()
+        if orig_data:
+            field_names.update(orig_data)
+        if new_data:
+            field_names.update(new_data)
+
+        for field_name in field_names:
+            if fields[field_name] not in objfields:
+                continue
+
+            if new_data and field_name in new_data:
+                ids = _get_ref_ids(self, new_data[field_name])
+            else:
+                ids = None
+
+            if orig_data and field_name in orig_data:
+                orig_ids = _get_ref_ids(self, orig_data[field_name])
+            else:
+                orig_ids = None
+
+            if not ids and not orig_ids:
+                continue
+
+            key = (scls_type, field_name)
+
+            if ids and orig_ids:
+                new_ids = ids - orig_ids
+                old_ids = orig_ids - ids
+            else:
+                new_ids = ids
+                old_ids = orig_ids
+
+            if new_ids:
+                for ref_id in new_ids:
+                    refs = self._get_mutable_refs(ref_id)
+                    try:
+                        refs[key][scls.id] = None
+                    except KeyError:
+                        refs[key] = {scls.id: None}
+
+            if old_ids:
+                for ref_id in old_ids:
+                    refs = self._get_mutable_refs(ref_id)
+                    field_refs = refs[key]
+                    del field_refs[scls.id]
+                    if not field_refs:
+                        del refs[key]
+
+    def _update_obj(
+        self,
+        obj_id: uuid.UUID,
+        updates: Mapping[str, Any],
+    ) -> SchemaBuilder:
+        if not updates:
+            return self
+
+        data = self._get_mutable_data(obj_id)
+        scls = self._id_to_type[obj_id]
+
+        orig_data = {}
+        new_data = {}
+        for field, value in updates.items():
+            if field == 'name':
+                self._index_obj_name(obj_id, scls, data.get('name'), value)
+
+            if field in data:
+                orig_data[field] = data[field]
+
+            if value is None:
+                data.pop(field, None)
+            else:
+                data[field] = value
+                new_data[field] = value
+
+        self._index_refs(scls, orig_data, new_data)
+        return self
+
+    def _set_obj_field(
+        self,
+        obj_id: uuid.UUID,
+        field: str,
+        value: Any,
+    ) -> SchemaBuilder:
+        try:
+            data = self._get_mutable_data(obj_id)
+        except KeyError:
+            err = (f'cannot set {field!r} value: item {str(obj_id)!r} '
+                   f'is not present in the schema {self!r}')
+            raise errors.SchemaError(err) from None
+
+        scls = self._id_to_type[obj_id]
+        if field == 'name':
+            self._index_obj_name(obj_id, scls, data.get('name'), value)
+
+        if field in data:
+            orig_field_data = {field: data[field]}
+        else:
+            orig_field_data = {}
+
+        data[field] = value
+        self._index_refs(scls, orig_field_data, {field: value})
+        return self
+
+    def _unset_obj_field(
+        self,
+        obj_id: uuid.UUID,
+        field: str,
+    ) -> SchemaBuilder:
+        try:
+            data = self._get_mutable_data(obj_id)
+        except KeyError:
+            return self
+
+        if field not in data:
+            return self
+
+        scls = self._id_to_type[obj_id]
+        if field == 'name':
+            self._index_obj_name(obj_id, scls, data['name'], None)
+
+        value = data.pop(field)
+        self._index_refs(scls, {field: value}, None)
+        return self
+
+    def _add(
+        self,
+        id: uuid.UUID,
+        scls: so.Object,
+        data: Mapping[str, Any],
+    ) -> SchemaBuilder:
+        name = data['name']
+
+        if name in self._name_to_id:
+            raise errors.SchemaError(
+                f'{type(scls).__name__} {name!r} is already present '
+                f'in the schema {self!r}')
+
+        if (not isinstance(scls, so.UnqualifiedObject)
+                and not self.has_module(name.module)):
+            raise errors.UnknownModuleError(
+                f'module {name.module!r} is not in this schema')
+
+        self._index_obj_name(id, scls, None, name)
+        data = dict(data)
+        self._id_to_data[id] = data
+        self._id_to_type[id] = scls
+        self._index_refs(scls, None, data)
+        return self
+
+    def _delete(self, obj: so.Object) -> SchemaBuilder:
+        data = self._id_to_data.get(obj.id)
+        if data is None:
+            raise errors.InvalidReferenceError(
+                f'cannot delete {obj!r}: not in this schema')
+
+        scls = self._id_to_type[obj.id]
+        self._index_obj_name(obj.id, scls, data['name'], None)
+        self._index_refs(obj, data, None)
+        del self._id_to_data[obj.id]
+        del self._id_to_type[obj.id]
+        return self
+
+    def get_functions(
+        self,
+        name: str,
+        default: Any = so.NoDefault,
+        *,
+        module_aliases: Optional[Mapping[Optional[str], str]] = None,
+    ) -> Any:
+        funcs = self._get(name,
+                          getter=_get_functions.__wrapped__,
+                          module_aliases=module_aliases,
+                          default=default)
+
+        if funcs is not so.NoDefault:
+            return funcs
+
+        raise errors.InvalidReferenceError(
+            f'function {name!r} does not exist')
+
+    def get_operators(
+        self,
+        name: str,
+        default: Any = so.NoDefault,
+        *,
+        module_aliases: Optional[Mapping[Optional[str], str]] = None,
+    ) -> Any:
+        funcs = self._get(name,
+                          getter=_get_operators.__wrapped__,
+                          module_aliases=module_aliases,
+                          default=default)
+
+        if funcs is not so.NoDefault:
+            return funcs
+
+        raise errors.InvalidReferenceError(
+            f'operator {name!r} does not exist')
+
+    def _get_casts(
+        self,
+        stype: s_types.Type,
+        **kwargs: Any,
+    ) -> FrozenSet[s_casts.Cast]:
+        return Schema._get_casts.__wrapped__(self, stype, **kwargs)
+
+    def get_referrers(
+        self,
+        scls: so.Object,
+        **kwargs: Any,
+    ) -> FrozenSet[so.Object]:
+        return Schema.get_referrers.__wrapped__(self, scls, **kwargs)
+
+    def get_referrers_ex(
+        self,
+        scls: so.Object,
+    ) -> Dict[Tuple[so.ObjectMeta, str], Set[so.Object]]:
+        return Schema.get_referrers_ex.__wrapped__(self, scls)
+
+
 class SchemaIterator:
     def __init__(
         self,
@@ -753,6 +1097,18 @@ class SchemaIterator:
                 yield obj
 
 
+def _get_ref_ids(schema: Schema, ref: Any) -> FrozenSet[uuid.UUID]:
+    if isinstance(ref, so.ObjectCollection):
+        return frozenset(ref.ids(schema))
+    elif isinstance(ref, s_expr.Expression):
+        if ref.refs:
+            return frozenset(ref.refs.ids(schema))
+        else:
+            return frozenset()
+    else:
+        return frozenset((ref.id,))
+
+
 @functools.lru_cache()
 def _get_functions(schema, name):
     objids = schema._shortname_to_id.get((s_func.Function, name))
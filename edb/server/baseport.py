@@ -22,7 +22,9 @@ from __future__ import annotations
 import collections.abc
 import socket
 
+from edb.common import debug
 from edb.common import devmode
+from edb.server import defines
 from edb.server import procpool
 
 
@@ -43,6 +45,10 @@ class Port:
         self._devmode = devmode.is_in_dev_mode()
 
         self._compiler_manager = None
+        self._compiler_pool = None
+        # The backend connection slots reserved for the compiler
+        # workers in the server's pool.
+        self._reserved_pgcons = 0
         self._serving = False
 
     def in_dev_mode(self):
@@ -54,12 +60,31 @@ class Port:
     def get_server(self):
         return self._server
 
+    def get_pgaddr(self):
+        return self._pg_addr
+
     def get_compiler_worker_cls(self):
         raise NotImplementedError
 
     def get_compiler_worker_name(self):
         raise NotImplementedError
 
+    def get_compiler_pool_size(self):
+        # Ports that share a fixed set of compiler workers among
+        # all of their clients should return the size of that set.
+        return None
+
+    def get_compiler_pool_max_held(self, pool_size):
+        # The workers that clients can hold on to (for the duration of
+        # a transaction); the others stay available to every client.
+        unpinned = max(
+            int(pool_size * defines.COMPILER_POOL_UNPINNED_SHARE), 1)
+        return max(pool_size - unpinned, 1)
+
+    @property
+    def compiler_pool(self):
+        return self._compiler_pool
+
     async def new_compiler(self, dbname, dbver):
         compiler_worker = await self._compiler_manager.spawn_worker()
         try:
@@ -74,14 +99,62 @@ class Port:
             raise RuntimeError('already serving')
         self._serving = True
 
-        self._compiler_manager = await procpool.create_manager(
-            runstate_dir=self._internal_runstate_dir,
-            worker_args=(self._pg_addr,),
-            worker_cls=self.get_compiler_worker_cls(),
-            name=self.get_compiler_worker_name(),
-        )
+        if self.get_compiler_worker_cls() is None:
+            # The port does not compile queries.
+            return
+
+        use_forkserver = not debug.flags.disable_forkserver
+
+        # The processes of a multi-process server share the internal
+        # runstate directory (and the schema snapshots in it), but each
+        # of them runs its own compiler workers, so the sockets of their
+        # pools must not clash.
+        name = self.get_compiler_worker_name()
+        server = self.get_server()
+        if server.get_worker_count() > 1:
+            name = f'{name}-{server.get_worker_id()}'
+
+        pool_size = self.get_compiler_pool_size()
+        if pool_size:
+            # Every worker of the pool might introspect a schema at
+            # the same time, so the extra connections it opens for
+            # that are reserved in the server's backend connection
+            # pool to count against the max_backend_connections limit.
+            pgcon_pool = server.get_pgcon_pool()
+            wanted = pool_size * (defines.INTROSPECTION_CONCURRENCY - 1)
+            reserved = pgcon_pool.reserve(wanted)
+            pgcon_pool.unreserve(reserved % pool_size)
+            self._reserved_pgcons = reserved - reserved % pool_size
+            concurrency = 1 + self._reserved_pgcons // pool_size
+
+            self._compiler_pool = await procpool.create_pool(
+                runstate_dir=self._internal_runstate_dir,
+                worker_args=(self._pg_addr, self._internal_runstate_dir,
+                             concurrency),
+                worker_cls=self.get_compiler_worker_cls(),
+                name=name,
+                pool_size=pool_size,
+                acquire_timeout=defines.COMPILER_POOL_ACQUIRE_TIMEOUT,
+                max_held=self.get_compiler_pool_max_held(pool_size),
+                use_forkserver=use_forkserver,
+            )
+        else:
+            self._compiler_manager = await procpool.create_manager(
+                runstate_dir=self._internal_runstate_dir,
+                worker_args=(self._pg_addr, self._internal_runstate_dir),
+                worker_cls=self.get_compiler_worker_cls(),
+                name=name,
+                use_forkserver=use_forkserver,
+            )
 
     async def stop(self):
+        if self._compiler_pool is not None:
+            await self._compiler_pool.stop()
+            self._compiler_pool = None
+        if self._reserved_pgcons:
+            self.get_server().get_pgcon_pool().unreserve(
+                self._reserved_pgcons)
+            self._reserved_pgcons = 0
         if self._compiler_manager is not None:
             await self._compiler_manager.stop()
             self._compiler_manager = None
@@ -17,6 +17,9 @@
 #
 
 
+from libc.stdint cimport uint64_t
+
+
 cdef class StatementsCache:
 
     cdef:
@@ -29,3 +32,23 @@ cdef class StatementsCache:
 
     cdef needs_cleanup(self)
     cdef cleanup_one(self)
+
+
+cdef class QueryCache:
+
+    cdef:
+        object _dict
+        int _maxsize
+        object _dict_move_to_end
+        object _dict_get
+        object _dbver
+
+        Py_ssize_t _size_bytes
+        uint64_t _hits
+        uint64_t _misses
+        uint64_t _evictions
+
+    cdef bint _use_dbver(self, dbver) except -1
+
+    cpdef get(self, key, dbver)
+    cpdef put(self, key, dbver, value, Py_ssize_t size)
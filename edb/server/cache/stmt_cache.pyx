@@ -90,3 +90,85 @@ cdef class StatementsCache:
 
     def __iter__(self):
         return iter(self._dict)
+
+
+cdef class QueryCache:
+
+    # An LRU cache of queries compiled for a single database.
+    #
+    # Every entry is compiled for a specific version of the database
+    # schema (dbver).  As soon as a newer version is seen, all entries
+    # compiled for the superseded one are dropped at once; entries
+    # for an older version than the current one are never stored.
+    #
+    # The cache keeps hit/miss/eviction counters and the approximate
+    # size in bytes of the cached entries as reported by the caller.
+
+    def __init__(self, *, maxsize):
+        if maxsize <= 0:
+            raise ValueError(
+                f'maxsize is expected to be greater than 0, got {maxsize}')
+
+        self._dict = collections.OrderedDict()
+        self._dict_move_to_end = self._dict.move_to_end
+        self._dict_get = self._dict.get
+        self._maxsize = maxsize
+        self._dbver = None
+
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    cdef bint _use_dbver(self, dbver) except -1:
+        # Returns False if *dbver* has been superseded.
+        if self._dbver is None or dbver > self._dbver:
+            self._evictions += len(self._dict)
+            self._dict.clear()
+            self._size_bytes = 0
+            self._dbver = dbver
+            return True
+        return dbver == self._dbver
+
+    cpdef get(self, key, dbver):
+        if not self._use_dbver(dbver):
+            self._misses += 1
+            return None
+
+        entry = self._dict_get(key, _LRU_MARKER)
+        if entry is _LRU_MARKER:
+            self._misses += 1
+            return None
+
+        self._dict_move_to_end(key)  # last=True
+        self._hits += 1
+        return entry[0]
+
+    cpdef put(self, key, dbver, value, Py_ssize_t size):
+        if not self._use_dbver(dbver):
+            return
+
+        existing = self._dict.pop(key, None)
+        if existing is not None:
+            self._size_bytes -= existing[1]
+
+        self._dict[key] = (value, size)
+        self._size_bytes += size
+
+        while len(self._dict) > self._maxsize:
+            _, (_, evicted_size) = self._dict.popitem(last=False)
+            self._size_bytes -= evicted_size
+            self._evictions += 1
+
+    def get_stats(self):
+        return {
+            'entries': len(self._dict),
+            'maxsize': self._maxsize,
+            'size_bytes': self._size_bytes,
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+        }
+
+    def __len__(self):
+        return len(self._dict)
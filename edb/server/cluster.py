@@ -138,6 +138,14 @@ class Cluster:
     def get_data_dir(self):
         return self._data_dir
 
+    def is_managed(self):
+        return True
+
+    async def connect_backend(self, *, database):
+        """Connect to a database of the Postgres cluster directly."""
+        return await self._pg_cluster.connect(
+            user=self._pg_superuser, database=database)
+
     async def async_connect(self, **kwargs):
         connect_args = self.get_connect_args().copy()
         connect_args.update(kwargs)
@@ -300,6 +308,10 @@ class RunningCluster(Cluster):
     def get_status(self):
         return 'running'
 
+    async def connect_backend(self, *, database):
+        raise ClusterError(
+            'cannot connect to the backend of an unmanaged cluster')
+
     def init(self, **settings):
         pass
 
@@ -22,9 +22,15 @@ from typing import *  # NoQA
 
 import collections
 import dataclasses
+import functools
 import gc
 import hashlib
+import os
+import os.path
 import pickle
+import shutil
+import tempfile
+import time
 import uuid
 
 import asyncpg
@@ -33,6 +39,7 @@ import immutables
 from edb import errors
 
 from edb.server import defines
+from edb.server import procpool
 from edb.pgsql import compiler as pg_compiler
 from edb.pgsql import intromech
 
@@ -42,17 +49,22 @@ from edb.common import uuidgen
 
 from edb.edgeql import ast as qlast
 from edb.edgeql import compiler as ql_compiler
+from edb.edgeql import normalization
+from edb.edgeql import parser as ql_parser
 from edb.edgeql import qltypes
 
+from edb.ir import ast as irast
 from edb.ir import staeval as ireval
 
 from edb.schema import database as s_db
 from edb.schema import ddl as s_ddl
 from edb.schema import delta as s_delta
+from edb.schema import functions as s_func
 from edb.schema import links as s_links
 from edb.schema import lproperties as s_props
 from edb.schema import migrations as s_migrations
 from edb.schema import modules as s_mod
+from edb.schema import name as sn
 from edb.schema import objects as s_obj
 from edb.schema import objtypes as s_objtypes
 from edb.schema import schema as s_schema
@@ -91,6 +103,9 @@ class CompileContext:
     json_parameters: bool = False
     implicit_limit: int = 0
     schema_object_ids: Optional[Mapping[str, uuid.UUID]] = None
+    # The literal index and negation flag of the parameters standing
+    # for the literals extracted from the query text, by name.
+    literal_params: Optional[Mapping[str, Tuple[int, bool]]] = None
 
 
 EMPTY_MAP = immutables.Map()
@@ -186,18 +201,35 @@ async def load_std_schema(backend_conn) -> s_schema.Schema:
             'could not load std schema pickle') from e
 
 
+def _reads_query_stats(ir: irast.Statement) -> bool:
+    for obj in ir.schema_refs:
+        if isinstance(obj, s_func.Function):
+            name = sn.shortname_from_fullname(obj.get_name(ir.schema))
+            if name == 'sys::get_query_stats':
+                return True
+    return False
+
+
 class BaseCompiler:
 
     _connect_args: dict
-    _dbname: Optional[str]
-    _cached_db: Optional[CompilerDatabaseState]
+    _dbs: Dict[str, CompilerDatabaseState]
 
-    def __init__(self, connect_args: dict):
+    def __init__(self, connect_args: dict,
+                 schema_snapshot_dir: Optional[str]=None,
+                 introspection_concurrency: int=1):
         self._connect_args = connect_args
-        self._dbname = None
-        self._cached_db = None
+        # The number of backend connections schema introspection may
+        # use; the extra ones are accounted for by the server.
+        self._introspection_concurrency = introspection_concurrency
+        self._dbs = {}
         self._std_schema = None
         self._config_spec = None
+        # Directory shared by all compiler workers of the server where
+        # introspected schemas are published as pickled snapshots keyed
+        # by database name and version, so that a schema change is
+        # introspected once and not by every worker.
+        self._schema_snapshot_dir = schema_snapshot_dir
 
     def _hash_sql(self, sql: bytes, **kwargs: bytes):
         h = hashlib.sha1(sql)
@@ -211,9 +243,9 @@ class BaseCompiler:
             dbver=dbver,
             schema=schema)
 
-    async def new_connection(self):
+    async def new_connection(self, dbname: str):
         con_args = self._connect_args.copy()
-        con_args['database'] = self._dbname
+        con_args['database'] = dbname
         try:
             return await asyncpg.connect(**con_args)
         except asyncpg.InvalidCatalogNameError as ex:
@@ -221,54 +253,185 @@ class BaseCompiler:
         except Exception as ex:
             raise errors.InternalServerError(str(ex)) from ex
 
+    async def _load_std_schema(self, connection: asyncpg.Connection) -> None:
+        if self._std_schema is None:
+            self._std_schema = await load_std_schema(connection)
+
+        if self._config_spec is None:
+            self._config_spec = config.load_spec_from_schema(
+                self._std_schema)
+            config.set_settings(self._config_spec)
+
     async def introspect(
-            self, connection: asyncpg.Connection) -> s_schema.Schema:
+        self,
+        connection: asyncpg.Connection,
+        dbname: Optional[str] = None,
+    ) -> s_schema.Schema:
 
-        im = intromech.IntrospectionMech(connection)
+        if dbname is not None and self._introspection_concurrency > 1:
+            im = intromech.IntrospectionMech(
+                connection,
+                connect=functools.partial(self.new_connection, dbname),
+                concurrency=self._introspection_concurrency)
+        else:
+            im = intromech.IntrospectionMech(connection)
         schema = await im.readschema(
             schema=self._std_schema,
             exclude_modules=s_schema.STD_MODULES)
 
         return schema
 
-    async def _get_database(self, dbver: int) -> CompilerDatabaseState:
-        if self._cached_db is not None and self._cached_db.dbver == dbver:
-            return self._cached_db
+    async def _get_schema_version(
+            self, connection: asyncpg.Connection) -> str:
+        # dbver is only meaningful to the running server, so schema
+        # snapshots are keyed on the state of the catalog instead: every
+        # schema change inserts, updates or deletes rows of the
+        # edgedb.object tables, which changes their system columns.
+        return await connection.fetchval('''
+            SELECT
+                md5(string_agg(
+                    tableoid::text || ctid::text || xmin::text, ','
+                    ORDER BY tableoid, ctid::text
+                ))
+            FROM
+                edgedb.object
+        ''')
+
+    def _get_schema_snapshot_prefix(self, dbname: str) -> str:
+        assert self._schema_snapshot_dir is not None
+        return os.path.join(
+            self._schema_snapshot_dir,
+            f'schema-{dbname.encode().hex()}-')
+
+    def _get_schema_snapshot_path(self, dbname: str, version: str) -> str:
+        # The std schema is part of the snapshot, so snapshots taken
+        # by another version of the server are never used.
+        return (
+            f'{self._get_schema_snapshot_prefix(dbname)}'
+            f'{defines.EDGEDB_CATALOG_VERSION}-{version}.pickle'
+        )
 
-        self._cached_db = None
+    def _load_schema_snapshot(
+            self, dbname: str, version: str) -> Optional[s_schema.Schema]:
+        if self._schema_snapshot_dir is None:
+            return None
 
-        con = await self.new_connection()
+        path = self._get_schema_snapshot_path(dbname, version)
         try:
-            if self._std_schema is None:
-                self._std_schema = await load_std_schema(con)
+            with open(path, 'rb') as f:
+                schema = pickle.load(f)
+        except Exception:
+            # Not published yet, or corrupt.
+            return None
 
-            if self._config_spec is None:
-                self._config_spec = config.load_spec_from_schema(
-                    self._std_schema)
-                config.set_settings(self._config_spec)
+        if not isinstance(schema, s_schema.Schema):
+            return None
 
-            schema = await self.introspect(con)
-            db = self._wrap_schema(dbver, schema)
-            self._cached_db = db
+        return schema
+
+    def _save_schema_snapshot(
+        self,
+        dbname: str,
+        version: str,
+        schema: s_schema.Schema,
+    ) -> None:
+        if self._schema_snapshot_dir is None:
+            return
+
+        path = self._get_schema_snapshot_path(dbname, version)
+        f = tempfile.NamedTemporaryFile(
+            dir=self._schema_snapshot_dir, prefix='.schema-', delete=False)
+        try:
+            with f:
+                pickle.dump(schema, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # Atomically publish the snapshot.
+            os.replace(f.name, path)
+        except Exception:
+            os.unlink(f.name)
+            return
+
+        # Remove the snapshots of the other versions of this database.
+        basename = os.path.basename(
+            self._get_schema_snapshot_prefix(dbname))
+        for entry in os.listdir(self._schema_snapshot_dir):
+            if (entry.startswith(basename) and
+                    entry != os.path.basename(path)):
+                try:
+                    os.unlink(os.path.join(self._schema_snapshot_dir, entry))
+                except OSError:
+                    pass
+
+    async def _get_database(
+            self, dbname: str, dbver: int) -> CompilerDatabaseState:
+        # A compiler worker can be shared by connections to
+        # different databases, so the schemas are cached per database.
+        db = self._dbs.get(dbname)
+        if db is not None and db.dbver == dbver:
             return db
+
+        self._dbs.pop(dbname, None)
+
+        con = await self.new_connection(dbname)
+        try:
+            await self._load_std_schema(con)
+
+            # Introspection is the cold path: another worker (or this
+            # server before a restart) might have already published
+            # the schema in its current version.
+            version = None
+            schema = None
+            if self._schema_snapshot_dir is not None:
+                version = await self._get_schema_version(con)
+                schema = self._load_schema_snapshot(dbname, version)
+
+            if schema is None:
+                schema = await self.introspect(con, dbname)
+                # Only publish the schema if it has not been changed
+                # while being introspected.
+                if (version is not None and
+                        version == await self._get_schema_version(con)):
+                    self._save_schema_snapshot(dbname, version, schema)
         finally:
             await con.close()
 
+        db = self._wrap_schema(dbver, schema)
+        self._dbs[dbname] = db
+        return db
+
     # API
 
-    async def connect(self, dbname: str, dbver: int) -> CompilerDatabaseState:
-        self._dbname = dbname
-        self._cached_db = None
-        await self._get_database(dbver)
+    async def warm_up(self) -> None:
+        # Called once in the forkserver process: whatever is loaded
+        # here is shared by all forked workers.
+        ql_parser.preload()
+
+        con = await self.new_connection(defines.EDGEDB_SUPERUSER_DB)
+        try:
+            await self._load_std_schema(con)
+        finally:
+            await con.close()
+
+    async def connect(self, dbname: str, dbver: int) -> None:
+        # Preload the schema of the database.
+        self._dbs.pop(dbname, None)
+        await self._get_database(dbname, dbver)
 
 
 class Compiler(BaseCompiler):
 
-    def __init__(self, connect_args: dict):
-        super().__init__(connect_args)
+    def __init__(self, connect_args: dict,
+                 schema_snapshot_dir: Optional[str]=None,
+                 introspection_concurrency: int=1):
+        super().__init__(connect_args, schema_snapshot_dir,
+                         introspection_concurrency)
 
         self._current_db_state = None
         self._bootstrap_mode = False
+        self._parse_cache = normalization.ParseCache(
+            maxsize=defines._MAX_PARSE_CACHE)
+        # dbname -> (dbver, units in the store at the last count,
+        #            units saved by this worker since)
+        self._compiled_units_counts: Dict[str, Tuple[int, int, int]] = {}
 
     def _in_testmode(self, ctx: CompileContext):
         current_tx = ctx.state.current_tx()
@@ -311,6 +474,11 @@ class Compiler(BaseCompiler):
         current_tx = ctx.state.current_tx()
         session_config = current_tx.get_session_config()
 
+        explain: Optional[qlast.ExplainStmt] = None
+        if isinstance(ql, qlast.ExplainStmt):
+            explain = ql
+            ql = ql.query
+
         native_out_format = (
             ctx.output_format is pg_compiler.OutputFormat.NATIVE
         )
@@ -328,10 +496,26 @@ class Compiler(BaseCompiler):
             session_config,
             allow_unrecognized=True)
 
+        shape_strategy_name = config.lookup(
+            config.get_settings(),
+            '__internal_shape_strategy',
+            session_config,
+            allow_unrecognized=True)
+        try:
+            shape_strategy = pg_compiler.ShapeStrategy(
+                shape_strategy_name or 'auto')
+        except ValueError:
+            raise errors.ConfigurationError(
+                f'invalid value for __internal_shape_strategy: '
+                f'{shape_strategy_name!r}; expected one of '
+                f"'auto', 'subquery' or 'join'"
+            ) from None
+
         # the capability to execute transaction or session control
         # commands indicates that session mode is available
         session_mode = ctx.state.capability & (enums.Capability.TRANSACTION |
                                                enums.Capability.SESSION)
+        started_at = time.monotonic()
         ir = ql_compiler.compile_ast_to_ir(
             ql,
             schema=current_tx.get_schema(),
@@ -340,10 +524,19 @@ class Compiler(BaseCompiler):
             implicit_id_in_shapes=implicit_fields,
             disable_constant_folding=disable_constant_folding,
             json_parameters=ctx.json_parameters,
+            literal_parameters=frozenset(ctx.literal_params or ()),
             implicit_limit=ctx.implicit_limit,
             session_mode=session_mode)
+        ir_done_at = time.monotonic()
 
-        if ir.cardinality is qltypes.Cardinality.ONE:
+        if explain is not None:
+            if ir.params:
+                raise errors.QueryError(
+                    'EXPLAIN does not support query parameters',
+                    context=explain.context)
+            # The plan is a single JSON document.
+            result_cardinality = enums.ResultCardinality.ONE
+        elif ir.cardinality is qltypes.Cardinality.ONE:
             result_cardinality = enums.ResultCardinality.ONE
         else:
             result_cardinality = enums.ResultCardinality.MANY
@@ -352,16 +545,45 @@ class Compiler(BaseCompiler):
                     f'the query has cardinality {result_cardinality} '
                     f'which does not match the expected cardinality ONE')
 
-        sql_text, argmap = pg_compiler.compile_ir_to_sql(
-            ir,
-            pretty=debug.flags.edgeql_compile,
-            expected_cardinality_one=ctx.expected_cardinality_one,
-            output_format=ctx.output_format)
+        if explain is not None:
+            sql_text = pg_compiler.compile_ir_to_explain_sql(
+                ir,
+                analyze=explain.analyze,
+                pretty=debug.flags.edgeql_compile,
+                expected_cardinality_one=ctx.expected_cardinality_one,
+                output_format=ctx.output_format,
+                shape_strategy=shape_strategy)
+            argmap = {}
+        else:
+            sql_text, argmap = pg_compiler.compile_ir_to_sql(
+                ir,
+                pretty=debug.flags.edgeql_compile,
+                expected_cardinality_one=ctx.expected_cardinality_one,
+                output_format=ctx.output_format,
+                shape_strategy=shape_strategy)
+        sql_done_at = time.monotonic()
+
+        literal_args = None
+        if ctx.literal_params is not None:
+            # The literals used by the query are passed after its
+            # arguments, in the order of their parameters.
+            literal_argmap = {
+                name: argmap.pop(name)
+                for name in ctx.literal_params if name in argmap
+            }
+            literal_args = tuple(
+                ctx.literal_params[name]
+                for name in sorted(literal_argmap, key=literal_argmap.get)
+            )
 
         sql_bytes = sql_text.encode(defines.EDGEDB_ENCODING)
+        reads_query_stats = _reads_query_stats(ir)
 
         if single_stmt_mode:
-            if native_out_format:
+            if native_out_format and explain is not None:
+                out_type_data, out_type_id = sertypes.TypeSerializer.describe(
+                    ir.schema, ir.schema.get('std::json'), {}, {})
+            elif native_out_format:
                 out_type_data, out_type_id = sertypes.TypeSerializer.describe(
                     ir.schema, ir.stype,
                     ir.view_shapes, ir.view_shapes_metadata)
@@ -433,6 +655,13 @@ class Compiler(BaseCompiler):
                 in_array_backend_tids=in_array_backend_tids,
                 out_type_id=out_type_id.bytes,
                 out_type_data=out_type_data,
+                timings={
+                    'ir': ir_done_at - started_at,
+                    'sql': sql_done_at - ir_done_at,
+                    'describe': time.monotonic() - sql_done_at,
+                },
+                reads_query_stats=reads_query_stats,
+                literal_args=literal_args,
             )
 
         else:
@@ -440,7 +669,8 @@ class Compiler(BaseCompiler):
                 raise errors.QueryError(
                     'EdgeQL script queries cannot accept parameters')
 
-            return dbstate.SimpleQuery(sql=(sql_bytes,))
+            return dbstate.SimpleQuery(
+                sql=(sql_bytes,), reads_query_stats=reads_query_stats)
 
     def _compile_and_apply_migration_command(
             self, ctx: CompileContext, cmd) -> dbstate.BaseQuery:
@@ -887,15 +1117,91 @@ class Compiler(BaseCompiler):
                  ctx: CompileContext,
                  eql: bytes) -> List[dbstate.QueryUnit]:
 
+        eql = eql.decode()
+
+        units = None
+        started_at = time.monotonic()
+        norm = None
+        parametrized = None
+        # The SQL compiled in bootstrap mode is embedded into the
+        # definitions of the standard library, so it has to have the
+        # literals inline.
+        if (ctx.stmt_mode is enums.CompileStatementMode.SINGLE and
+                not self._bootstrap_mode):
+            norm = self._parse_cache.normalize(eql)
+        if norm is not None:
+            parametrized = self._parse_cache.parse_block_with_params(eql)
+        parse_time = time.monotonic() - started_at
+
+        if parametrized is not None:
+            # Compile the query with its literals replaced by
+            # parameters, so that the result can be shared by all
+            # queries that only differ in the values of literals.
+            try:
+                units = self._compile_ql_block(
+                    dataclasses.replace(
+                        ctx, literal_params=parametrized.params),
+                    parametrized.statements)
+            except errors.EdgeDBError:
+                # Either the query is invalid or some literal cannot
+                # be a parameter; compile the query as is.
+                pass
+            else:
+                for unit in units:
+                    unit.inline_literals = parametrized.inline_literals
+
+        if units is None:
+            started_at = time.monotonic()
+            statements, from_template = self._parse_cache.parse_block(eql)
+            parse_time += time.monotonic() - started_at
+
+            try:
+                units = self._compile_ql_block(ctx, statements)
+            except errors.EdgeDBError:
+                if not from_template:
+                    raise
+
+                # Statements copied from a cached parse tree carry
+                # source contexts of the template; compile the regular
+                # parse of the query to report the error against its
+                # actual text.
+                units = self._compile_ql_block(
+                    ctx, edgeql.parse_block(eql))
+
+            if norm is not None:
+                # The units only apply to the queries with the same
+                # values of all literals.
+                inline_literals = tuple(
+                    (idx, literal.value)
+                    for idx, literal in enumerate(norm.literals))
+                for unit in units:
+                    unit.literal_args = ()
+                    unit.inline_literals = inline_literals
+
+        fingerprint = self._parse_cache.get_fingerprint(eql)
+        for unit in units:
+            unit.fingerprint = fingerprint
+
+        if len(units) == 1:
+            unit = units[0]
+            unit.compile_timings = {
+                'parse': parse_time,
+                **(unit.compile_timings or {}),
+            }
+
+        return units
+
+    def _compile_ql_block(
+            self,
+            ctx: CompileContext,
+            statements: List[qlast.Base]) -> List[dbstate.QueryUnit]:
+
         # When True it means that we're compiling for "connection.fetchall()".
         # That means that the returned QueryUnit has to have the in/out codec
         # information, correctly inferred "singleton_result" field etc.
         single_stmt_mode = ctx.stmt_mode is enums.CompileStatementMode.SINGLE
         default_cardinality = enums.ResultCardinality.NOT_APPLICABLE
 
-        eql = eql.decode()
-
-        statements = edgeql.parse_block(eql)
         statements_len = len(statements)
 
         if ctx.stmt_mode is enums.CompileStatementMode.SKIP_FIRST:
@@ -946,15 +1252,21 @@ class Compiler(BaseCompiler):
                     unit.in_type_id = comp.in_type_id
                     unit.in_array_backend_tids = comp.in_array_backend_tids
 
+                    unit.compile_timings = comp.timings
+                    unit.reads_query_stats = comp.reads_query_stats
+                    unit.literal_args = comp.literal_args
+
                     unit.cacheable = True
 
                     unit.cardinality = comp.cardinality
                 else:
                     unit.sql += comp.sql
+                    unit.reads_query_stats |= comp.reads_query_stats
 
             elif isinstance(comp, dbstate.SimpleQuery):
                 assert not single_stmt_mode
                 unit.sql += comp.sql
+                unit.reads_query_stats |= comp.reads_query_stats
 
             elif isinstance(comp, dbstate.DDLQuery):
                 unit.sql += comp.sql
@@ -1049,13 +1361,15 @@ class Compiler(BaseCompiler):
         return units
 
     async def _ctx_new_con_state(
-        self, *, dbver: int, json_mode: bool, expect_one: bool,
+        self, *, dbname: Optional[str], dbver: int, json_mode: bool,
+        expect_one: bool,
         modaliases,
         session_config: Optional[immutables.Map],
         stmt_mode: Optional[enums.CompileStatementMode],
         capability: enums.Capability,
         implicit_limit: int=0,
         json_parameters: bool=False,
+        json_elements: bool=False,
         schema: Optional[s_schema.Schema] = None,
         schema_object_ids: Optional[Mapping[str, uuid.UUID]] = None,
     ) -> CompileContext:
@@ -1069,7 +1383,7 @@ class Compiler(BaseCompiler):
         assert isinstance(session_config, immutables.Map)
 
         if schema is None:
-            db = await self._get_database(dbver)
+            db = await self._get_database(dbname, dbver)
             schema = db.schema
 
         self._current_db_state = dbstate.CompilerConnectionState(
@@ -1081,7 +1395,9 @@ class Compiler(BaseCompiler):
 
         state = self._current_db_state
 
-        if json_mode:
+        if json_mode and json_elements:
+            of = pg_compiler.OutputFormat.JSON_ELEMENTS
+        elif json_mode:
             of = pg_compiler.OutputFormat.JSON
         else:
             of = pg_compiler.OutputFormat.NATIVE
@@ -1166,8 +1482,134 @@ class Compiler(BaseCompiler):
             'expected a ROLLBACK or ROLLBACK TO SAVEPOINT command'
         )  # pragma: no cover
 
+    def _use_compiled_units_store(self, ctx: CompileContext) -> bool:
+        return (
+            self._schema_snapshot_dir is not None
+            and ctx.stmt_mode is enums.CompileStatementMode.SINGLE
+            and not debug.flags.disable_qcache
+            and not debug.flags.edgeql_compile
+        )
+
+    def _get_compiled_units_dir(self, dbname: str, dbver: int) -> str:
+        assert self._schema_snapshot_dir is not None
+        return os.path.join(
+            self._schema_snapshot_dir,
+            f'units-{dbname.encode().hex()}-{dbver}')
+
+    def _get_compiled_unit_key(self, ctx: CompileContext, eql: bytes) -> str:
+        # Some literals might be compiled inline (see
+        # QueryUnit.inline_literals), so the units are keyed by the
+        # exact query text along with everything in the compilation
+        # context that affects the result.
+        state = ctx.state
+        tx = state.current_tx()
+        params = (
+            sorted(tx.get_modaliases().items(), key=repr),
+            sorted(tx.get_session_config().items(), key=lambda i: i[0]),
+            state.capability.value,
+            ctx.output_format.name,
+            ctx.expected_cardinality_one,
+            ctx.implicit_limit,
+            ctx.json_parameters,
+        )
+        h = hashlib.sha1(eql)
+        h.update(pickle.dumps(params, protocol=pickle.HIGHEST_PROTOCOL))
+        return h.hexdigest()
+
+    def _load_compiled_unit(
+            self, dbname: str, dbver: int,
+            key: str) -> Optional[dbstate.QueryUnit]:
+        path = os.path.join(
+            self._get_compiled_units_dir(dbname, dbver), f'{key}.pickle')
+        try:
+            with open(path, 'rb') as f:
+                unit = pickle.load(f)
+        except Exception:
+            # Not compiled yet, or the database version is stale.
+            return None
+
+        if not isinstance(unit, dbstate.QueryUnit) or unit.dbver != dbver:
+            return None
+        return unit
+
+    def _save_compiled_unit(
+            self, dbname: str, dbver: int, key: str,
+            unit: dbstate.QueryUnit) -> None:
+        units_dir = self._get_compiled_units_dir(dbname, dbver)
+        try:
+            os.mkdir(units_dir)
+        except FileExistsError:
+            pass
+        except OSError:
+            return
+        else:
+            self._remove_stale_compiled_units(dbname, dbver)
+
+        try:
+            if not self._reserve_compiled_unit_slot(dbname, dbver, units_dir):
+                return
+            f = tempfile.NamedTemporaryFile(
+                dir=units_dir, prefix='.unit-', delete=False)
+        except OSError:
+            # The directory has been removed by a worker that
+            # has seen a newer version of the database.
+            return
+
+        try:
+            with f:
+                pickle.dump(unit, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # Atomically publish the compiled unit.
+            os.replace(f.name, os.path.join(units_dir, f'{key}.pickle'))
+        except Exception:
+            try:
+                os.unlink(f.name)
+            except OSError:
+                pass
+
+    def _reserve_compiled_unit_slot(
+            self, dbname: str, dbver: int, units_dir: str) -> bool:
+        # Listing a directory of thousands of units on every save is
+        # costly, so the units are counted in memory and the directory
+        # is only listed again once this worker has saved another
+        # _SHARED_QUERIES_CACHE_RECOUNT of them (the other workers save
+        # into the same directory).  Units are never removed one by one,
+        # so a full directory stays full.
+        counted = self._compiled_units_counts.get(dbname)
+        if counted is not None and counted[0] == dbver:
+            _, count, saved = counted
+        else:
+            count = None
+            saved = 0
+
+        if count is None or saved >= defines._SHARED_QUERIES_CACHE_RECOUNT:
+            count = len(os.listdir(units_dir))
+            saved = 0
+
+        if count + saved >= defines._MAX_SHARED_QUERIES_CACHE:
+            self._compiled_units_counts[dbname] = (dbver, count, saved)
+            return False
+
+        self._compiled_units_counts[dbname] = (dbver, count, saved + 1)
+        return True
+
+    def _remove_stale_compiled_units(self, dbname: str, dbver: int) -> None:
+        assert self._schema_snapshot_dir is not None
+        prefix = f'units-{dbname.encode().hex()}-'
+        for entry in os.listdir(self._schema_snapshot_dir):
+            if not entry.startswith(prefix):
+                continue
+            try:
+                entry_dbver = int(entry[len(prefix):])
+            except ValueError:
+                continue
+            if entry_dbver < dbver:
+                shutil.rmtree(
+                    os.path.join(self._schema_snapshot_dir, entry),
+                    ignore_errors=True)
+
     async def compile_eql(
             self,
+            dbname: str,
             dbver: int,
             eql: bytes,
             sess_modaliases: Optional[immutables.Map],
@@ -1177,9 +1619,11 @@ class Compiler(BaseCompiler):
             implicit_limit: int,
             stmt_mode: enums.CompileStatementMode,
             capability: enums.Capability,
-            json_parameters: bool=False) -> List[dbstate.QueryUnit]:
+            json_parameters: bool=False,
+            json_elements: bool=False) -> List[dbstate.QueryUnit]:
 
         ctx = await self._ctx_new_con_state(
+            dbname=dbname,
             dbver=dbver,
             json_mode=json_mode,
             expect_one=expect_one,
@@ -1188,9 +1632,28 @@ class Compiler(BaseCompiler):
             session_config=sess_config,
             stmt_mode=enums.CompileStatementMode(stmt_mode),
             capability=capability,
-            json_parameters=json_parameters)
+            json_parameters=json_parameters,
+            json_elements=json_elements)
+
+        key = None
+        if self._use_compiled_units_store(ctx):
+            # Another worker might have already compiled this query
+            # for the same database version.
+            key = self._get_compiled_unit_key(ctx, eql)
+            unit = self._load_compiled_unit(dbname, dbver, key)
+            if unit is not None:
+                # The unit wasn't compiled by this call.
+                unit.compile_timings = None
+                return [unit]
 
-        return self._compile(ctx=ctx, eql=eql)
+        units = self._compile(ctx=ctx, eql=eql)
+
+        if key is not None and len(units) == 1:
+            unit = units[0]
+            if unit.cacheable and unit.sql_hash and unit.tx_id is None:
+                self._save_compiled_unit(dbname, dbver, key, unit)
+
+        return units
 
     async def compile_eql_in_tx(
             self,
@@ -1211,8 +1674,9 @@ class Compiler(BaseCompiler):
 
         return self._compile(ctx=ctx, eql=eql)
 
-    async def interpret_backend_error(self, dbver, fields):
-        db = await self._get_database(dbver)
+    @procpool.reentrant
+    async def interpret_backend_error(self, dbname, dbver, fields):
+        db = await self._get_database(dbname, dbver)
         return errormech.interpret_backend_error(db.schema, fields)
 
     async def interpret_backend_error_in_tx(self, txid, fields):
@@ -1231,9 +1695,10 @@ class Compiler(BaseCompiler):
 
     async def _introspect_schema_in_snapshot(
         self,
+        dbname: str,
         tx_snapshot_id: str
     ) -> s_schema.Schema:
-        con = await self.new_connection()
+        con = await self.new_connection(dbname)
         try:
             async with con.transaction(isolation='serializable',
                                        readonly=True):
@@ -1244,11 +1709,14 @@ class Compiler(BaseCompiler):
         finally:
             await con.close()
 
+    @procpool.reentrant
     async def describe_database_dump(
         self,
+        dbname: str,
         tx_snapshot_id: str
     ) -> DumpDescriptor:
-        schema = await self._introspect_schema_in_snapshot(tx_snapshot_id)
+        schema = await self._introspect_schema_in_snapshot(
+            dbname, tx_snapshot_id)
 
         schema_ddl = s_ddl.ddl_text_from_schema(schema)
 
@@ -1405,6 +1873,7 @@ class Compiler(BaseCompiler):
 
     async def describe_database_restore(
         self,
+        dbname: str,
         tx_snapshot_id: str,
         schema_ddl: bytes,
         schema_ids: List[Tuple[str, str, bytes]],
@@ -1415,8 +1884,10 @@ class Compiler(BaseCompiler):
             for name, qltype, objid in schema_ids
         }
 
-        schema = await self._introspect_schema_in_snapshot(tx_snapshot_id)
+        schema = await self._introspect_schema_in_snapshot(
+            dbname, tx_snapshot_id)
         ctx = await self._ctx_new_con_state(
+            dbname=dbname,
             dbver=-1,
             json_mode=False,
             expect_one=False,
@@ -1513,6 +1984,207 @@ class Compiler(BaseCompiler):
             tables=tables,
         )
 
+    @procpool.reentrant
+    async def describe_bulk_insert(
+        self,
+        dbname: str,
+        dbver: int,
+        sess_modaliases: Optional[immutables.Map],
+        type_name: str,
+        field_names: List[str],
+    ) -> BulkInsertDescriptor:
+        db = await self._get_database(dbname, dbver)
+        schema = db.schema
+
+        if sess_modaliases is None:
+            sess_modaliases = DEFAULT_MODULE_ALIASES_MAP
+
+        objtype = schema.get(
+            type_name, None, module_aliases=sess_modaliases,
+            type=s_objtypes.ObjectType)
+        if objtype is None:
+            raise errors.InvalidReferenceError(
+                f'object type {type_name!r} does not exist')
+
+        type_dn = objtype.get_displayname(schema)
+        if (objtype.get_is_abstract(schema)
+                or objtype.is_union_type(schema)
+                or objtype.is_view(schema)):
+            raise errors.QueryError(
+                f'cannot bulk insert into {type_dn}: it is not a '
+                f'concrete object type')
+
+        table_name = pg_common.get_backend_name(
+            schema, objtype, catenate=True)
+        uuid_t = schema.get('std::uuid')
+
+        fields = []
+        subtypes = {}
+        cols = ['id', '__type__']
+        link_stmts = []
+        checks = []
+
+        for name in field_names:
+            if name in subtypes:
+                raise errors.QueryError(
+                    f'duplicate field {name!r} in bulk insert')
+
+            ptr = objtype.getptr(schema, name)
+            if ptr is None:
+                raise errors.InvalidReferenceError(
+                    f'{type_dn} has no link or property {name!r}')
+
+            ptr_dn = ptr.get_displayname(schema)
+            if ptr.is_pure_computable(schema):
+                raise errors.QueryError(
+                    f'cannot bulk insert into computable {ptr_dn!r}')
+            if name in ('id', '__type__'):
+                raise errors.QueryError(
+                    f'cannot assign to {ptr_dn!r}: it is set by the server')
+
+            target = ptr.get_target(schema)
+            is_link = isinstance(ptr, s_links.Link)
+            if is_link:
+                if target.is_union_type(schema):
+                    raise errors.UnsupportedFeatureError(
+                        f'cannot bulk insert into {ptr_dn!r}: links '
+                        f'to union types are not supported')
+                elem_t = uuid_t
+            elif target.is_collection():
+                raise errors.UnsupportedFeatureError(
+                    f'cannot bulk insert into {ptr_dn!r}: collection '
+                    f'properties are not supported')
+            else:
+                elem_t = target
+
+            multi = not ptr.singular(schema)
+            if multi:
+                subtypes[name] = s_types.Array.from_subtypes(
+                    schema, [elem_t])
+            else:
+                subtypes[name] = elem_t
+
+            inline = False
+            stor_info = pg_types.get_pointer_storage_info(
+                ptr, schema=schema, source=objtype)
+            if stor_info.table_type == 'ObjectType':
+                inline = True
+                col = pg_common.quote_ident(stor_info.column_name)
+                cols.append(col)
+                if is_link:
+                    checks.append(self._bulk_insert_link_check(
+                        schema, ptr,
+                        f'''
+                            SELECT s.{col} FROM {table_name} AS s
+                            WHERE s.id IN (SELECT id FROM _edgecon_bulk_ids)
+                                AND s.{col} IS NOT NULL
+                        '''))
+
+            link_table = -1
+            link_stor_info = pg_types.get_pointer_storage_info(
+                ptr, schema=schema, source=objtype, link_bias=True)
+            if link_stor_info is not None:
+                for lprop in ptr.get_pointers(schema).objects(schema):
+                    if lprop.is_endpoint_pointer(schema):
+                        continue
+                    if (lprop.get_required(schema)
+                            or lprop.get_default(schema) is not None):
+                        raise errors.UnsupportedFeatureError(
+                            f'cannot bulk insert into {ptr_dn!r}: link '
+                            f'properties are not supported')
+
+                ptr_table_name = pg_common.get_backend_name(
+                    schema, ptr, catenate=True)
+                link_table = len(link_stmts)
+                link_stmts.append((
+                    f'COPY {ptr_table_name} (source, target, ptr_item_id) '
+                    f'FROM STDIN WITH BINARY'
+                ).encode())
+                if is_link and not inline:
+                    checks.append(self._bulk_insert_link_check(
+                        schema, ptr,
+                        f'''
+                            SELECT l.target FROM {ptr_table_name} AS l
+                            WHERE l.source IN (
+                                SELECT id FROM _edgecon_bulk_ids)
+                        '''))
+
+            required_msg = None
+            if ptr.get_required(schema):
+                required_msg = (
+                    f'missing value for required {ptr_dn!r} in bulk insert')
+
+            fields.append(BulkInsertField(
+                inline=inline,
+                multi=multi,
+                link_table=link_table,
+                ptr_item_id=ptr.id.bytes,
+                required_msg=required_msg,
+            ))
+
+        # Defaults are evaluated by the EdgeQL compiler, so fields that
+        # have one, just like the required ones, have to be provided.
+        for ptr in objtype.get_pointers(schema).objects(schema):
+            name = ptr.get_shortname(schema).name
+            if (name in subtypes or name in ('id', '__type__')
+                    or ptr.is_pure_computable(schema)):
+                continue
+            ptr_dn = ptr.get_displayname(schema)
+            if ptr.get_required(schema):
+                raise errors.MissingRequiredError(
+                    f'missing value for required {ptr_dn!r} in bulk insert')
+            if ptr.get_default(schema) is not None:
+                raise errors.QueryError(
+                    f'{ptr_dn!r} has a default and must be provided '
+                    f'explicitly in bulk insert')
+
+        in_tuple = s_types.Tuple.from_subtypes(
+            schema, subtypes, {'named': True})
+        type_data, type_id = sertypes.TypeSerializer.describe(
+            schema,
+            in_tuple,
+            view_shapes={},
+            view_shapes_metadata={},
+            follow_links=False,
+        )
+
+        return BulkInsertDescriptor(
+            type_desc_id=type_id,
+            type_desc=type_data,
+            object_type_id=objtype.id.bytes,
+            object_copy_stmt=(
+                f'COPY {table_name} ({", ".join(cols)}) '
+                f'FROM STDIN WITH BINARY'
+            ).encode(),
+            link_copy_stmts=link_stmts,
+            fields=fields,
+            checks=checks,
+        )
+
+    def _bulk_insert_link_check(
+        self,
+        schema: s_schema.Schema,
+        ptr: s_links.Link,
+        targets_query: str,
+    ) -> Tuple[bytes, str]:
+        # Returns a query selecting a target of the bulk inserted
+        # link that is not an object of the link target type (which
+        # includes the objects of its subtypes, see the inheritance
+        # of the backend tables), along with the error message.
+        target_table = pg_common.get_backend_name(
+            schema, ptr.get_target(schema), catenate=True)
+        sql = f'''
+            SELECT q.target FROM ({targets_query}) AS q(target)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {target_table} AS t WHERE t.id = q.target
+            )
+            LIMIT 1
+        '''
+        target_dn = ptr.get_target(schema).get_displayname(schema)
+        return sql.encode(), (
+            f'invalid target for link {ptr.get_displayname(schema)!r}: '
+            f'not an existing {target_dn!r} object')
+
 
 class DumpDescriptor(NamedTuple):
 
@@ -1542,3 +2214,29 @@ class RestoreBlockDescriptor(NamedTuple):
 
     schema_object_id: uuid.UUID
     sql_copy_stmt: bytes
+
+
+class BulkInsertDescriptor(NamedTuple):
+
+    type_desc_id: uuid.UUID
+    type_desc: bytes
+    object_type_id: bytes
+    object_copy_stmt: bytes
+    link_copy_stmts: Sequence[bytes]
+    fields: Sequence[BulkInsertField]
+    # (query, error message) pairs; the queries select a row if the
+    # inserted data is invalid.
+    checks: Sequence[Tuple[bytes, str]]
+
+
+class BulkInsertField(NamedTuple):
+
+    # Stored in a column of the object table.
+    inline: bool
+    multi: bool
+    # Index of the link table COPY statement, or -1.
+    link_table: int
+    ptr_item_id: bytes
+    # The error message for a row with no value for the field, if
+    # the field is required.
+    required_msg: Optional[str]
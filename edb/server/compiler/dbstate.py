@@ -21,6 +21,8 @@ from __future__ import annotations
 
 import dataclasses
 import enum
+import math
+import struct
 import time
 from typing import *  # NoQA
 
@@ -28,6 +30,8 @@ import immutables
 
 from edb import errors
 
+from edb.edgeql import ast as qlast
+from edb.edgeql import normalization
 from edb.schema import schema as s_schema
 from edb.server import config
 
@@ -70,12 +74,24 @@ class Query(BaseQuery):
     # Set only when a query is compiled with "json_parameters=True"
     in_type_args: Optional[Tuple[str, ...]] = None
 
+    # Time spent in the compilation stages, by stage name.
+    timings: Optional[Mapping[str, float]] = None
+
+    # True if the query calls sys::get_query_stats().
+    reads_query_stats: bool = False
+
+    # See QueryUnit.literal_args.
+    literal_args: Optional[Tuple[Tuple[int, bool], ...]] = None
+
 
 @dataclasses.dataclass(frozen=True)
 class SimpleQuery(BaseQuery):
 
     sql: Tuple[bytes, ...]
 
+    # True if the query calls sys::get_query_stats().
+    reads_query_stats: bool = False
+
 
 @dataclasses.dataclass(frozen=True)
 class SessionStateQuery(BaseQuery):
@@ -179,6 +195,79 @@ class QueryUnit:
         dataclasses.field(default_factory=list))
     modaliases: Optional[immutables.Map] = None
 
+    # The fingerprint of the normalized EdgeQL source of the unit,
+    # which the query statistics are keyed by.
+    fingerprint: bytes = b''
+    # Time spent by the compiler in the compilation stages, by stage
+    # name; see edb.server.querystats.  Not set for units loaded from
+    # a cache.
+    compile_timings: Optional[Mapping[str, float]] = None
+    # True if the statistics should be published into the session
+    # before running this unit; see sys::get_query_stats().
+    reads_query_stats: bool = False
+
+    # Set only for units compiled in the single statement mode from
+    # a source that can be normalized (see edb.edgeql.normalization),
+    # which apply to all queries with the same normalized text that
+    # have the literals in inline_literals: the index and the negation
+    # flag of every literal compiled as a parameter, in the order of
+    # the parameters, which follow the parameters of the query.
+    literal_args: Optional[Tuple[Tuple[int, bool], ...]] = None
+    # The indexes and values of the literals compiled inline.
+    inline_literals: Tuple[Tuple[int, str], ...] = ()
+    # The encoded literal arguments of a specific query; see
+    # bind_literals().
+    literal_args_data: bytes = b''
+
+    def matches_literals(
+        self,
+        literals: Sequence[qlast.BaseConstant],
+    ) -> bool:
+        return all(literals[idx].value == value
+                   for idx, value in self.inline_literals)
+
+    def bind_literals(
+        self,
+        literals: Sequence[qlast.BaseConstant],
+    ) -> QueryUnit:
+        """Return the unit to execute with the given literal values."""
+        if not self.literal_args:
+            return self
+
+        data = []
+        for idx, negated in self.literal_args:
+            value = normalization.get_literal_value(
+                literals[idx], negated=negated)
+            encoded = _encode_literal(value)
+            data.append(_int32_packer(len(encoded)))
+            data.append(encoded)
+
+        return dataclasses.replace(self, literal_args_data=b''.join(data))
+
+
+_int32_packer = struct.Struct('!l').pack
+_int64_packer = struct.Struct('!q').pack
+_float64_packer = struct.Struct('!d').pack
+
+
+def _encode_literal(value: Any) -> bytes:
+    # Postgres binary format of the types in normalization._PARAM_TYPES.
+    if isinstance(value, int):
+        try:
+            return _int64_packer(value)
+        except struct.error:
+            raise errors.NumericOutOfRangeError(
+                'std::int64 out of range') from None
+    elif isinstance(value, float):
+        if math.isinf(value):
+            raise errors.NumericOutOfRangeError(
+                'std::float64 out of range')
+        return _float64_packer(value)
+    elif isinstance(value, str):
+        return value.encode('utf-8')
+    else:
+        return value
+
 
 #############################
 
@@ -236,6 +236,10 @@ def value_from_json(setting, value: str):
     return value_from_json_value(setting, json.loads(value))
 
 
+def value_to_json(setting: spec.Setting, value: Any) -> str:
+    return json.dumps(value_to_json_value(setting, value))
+
+
 def to_json(spec: spec.Spec, storage: Mapping) -> str:
     dct = {}
     for name, value in storage.items():
@@ -25,6 +25,8 @@ cdef class DatabaseIndex:
 
         object _sys_config
         object _sys_config_ver
+        object _versions
+        object _shared_sys_config_ver
         object _sys_queries
         object _instance_data
 
@@ -35,11 +37,15 @@ cdef class Database:
         str _name
         object _dbver
         object _eql_to_compiled
+        object _sources
         DatabaseIndex _index
 
     cdef _signal_ddl(self)
+    cdef _get_dbver(self)
     cdef _invalidate_caches(self)
-    cdef _cache_compiled_query(self, key, query_unit)
+    cdef _cache_compiled_query(self, key, query_unit, bytes eql)
+    cdef _normalize(self, bytes eql)
+    cdef _get_eql_key(self, bytes eql, query_unit)
     cdef _new_view(self, user, query_cache)
 
 
@@ -54,6 +60,7 @@ cdef class DatabaseConnectionView:
         object _modaliases
 
         object _eql_to_compiled
+        object _schema_seq
 
         object _txid
         object _in_tx_config
@@ -63,6 +70,7 @@ cdef class DatabaseConnectionView:
         bint _tx_error
 
     cdef _invalidate_local_cache(self)
+    cdef _bump_schema_seq(self)
     cdef _reset_tx_state(self)
 
     cdef rollback_tx_to_savepoint(self, spid, modaliases, config)
@@ -77,6 +85,8 @@ cdef class DatabaseConnectionView:
                               query_unit)
     cdef lookup_compiled_query(self, bytes eql, bint json_mode,
                                bint expect_one, int implicit_limit)
+    cdef _lookup_compiled_query(self, key)
+    cdef bind_literals(self, bytes eql, query_unit)
 
     cdef tx_error(self)
 
@@ -27,6 +27,7 @@ import immutables
 
 from edb import errors
 from edb.common import lru
+from edb.edgeql import normalization
 from edb.server import defines, config
 from edb.server.compiler import dbstate
 from edb.pgsql import dbops
@@ -37,34 +38,78 @@ __all__ = ('DatabaseIndex', 'DatabaseConnectionView')
 
 cdef class Database:
 
-    # Global LRU cache of compiled anonymous queries
-    _eql_to_compiled: typing.Mapping[bytes, dbstate.QueryUnit]
+    # Global LRU cache of compiled anonymous queries, along with
+    # the source text of each
+    _eql_to_compiled: typing.Mapping[tuple, tuple]
 
     def __init__(self, DatabaseIndex index, str name):
         self._name = name
-        self._dbver = time.monotonic_ns()
+
+        versions = index._versions
+        if versions is not None:
+            self._dbver = versions.get_dbver(name)
+            if not self._dbver:
+                self._dbver = versions.new_dbver(name)
+        else:
+            self._dbver = time.monotonic_ns()
 
         self._index = index
 
         self._eql_to_compiled = lru.LRUMapping(
             maxsize=defines._MAX_QUERIES_CACHE)
+        self._sources = normalization.SourceCache(
+            maxsize=defines._MAX_QUERIES_CACHE)
 
     cdef _signal_ddl(self):
-        self._dbver = time.monotonic_ns()  # Advance the version
+        versions = self._index._versions
+        if versions is not None:
+            # Advance the version shared with the other server processes.
+            self._dbver = versions.new_dbver(self._name)
+        else:
+            self._dbver = time.monotonic_ns()  # Advance the version
         self._invalidate_caches()
 
+    cdef _get_dbver(self):
+        versions = self._index._versions
+        if versions is not None:
+            # The schema could have been changed by another server
+            # process.
+            dbver = versions.get_dbver(self._name)
+            if dbver != self._dbver:
+                self._dbver = dbver
+                self._invalidate_caches()
+        return self._dbver
+
     cdef _invalidate_caches(self):
         self._eql_to_compiled.clear()
 
-    cdef _cache_compiled_query(self, key, compiled: dbstate.QueryUnit):
+    cdef _cache_compiled_query(self, key, compiled: dbstate.QueryUnit,
+                               bytes eql):
         assert compiled.cacheable
 
         existing = self._eql_to_compiled.get(key)
-        if existing is not None and existing.dbver > compiled.dbver:
+        if existing is not None and existing[0].dbver > compiled.dbver:
             # We already have a cached query for a more recent DB version.
             return
 
-        self._eql_to_compiled[key] = compiled
+        self._eql_to_compiled[key] = (compiled, eql)
+
+    cdef _normalize(self, bytes eql):
+        try:
+            source = eql.decode()
+        except UnicodeDecodeError:
+            return None
+        return self._sources.normalize(source)
+
+    cdef _get_eql_key(self, bytes eql, query_unit):
+        # Units compiled with the literals of the query replaced by
+        # parameters apply to all queries with the same normalized
+        # text; see DatabaseConnectionView.bind_literals().
+        if query_unit.literal_args is not None:
+            norm = self._normalize(eql)
+            if norm is not None:
+                return norm.key
+        return eql
 
     cdef _new_view(self, user, query_cache):
         return DatabaseConnectionView(self, user=user, query_cache=query_cache)
@@ -72,7 +117,7 @@ cdef class Database:
 
 cdef class DatabaseConnectionView:
 
-    _eql_to_compiled: typing.Mapping[bytes, dbstate.QueryUnit]
+    _eql_to_compiled: typing.Mapping[tuple, dbstate.QueryUnit]
 
     def __init__(self, db: Database, *, user, query_cache):
         self._db = db
@@ -91,12 +136,23 @@ cdef class DatabaseConnectionView:
         self._eql_to_compiled = lru.LRUMapping(
             maxsize=defines._MAX_QUERIES_CACHE)
 
+        # Changes whenever the schema seen by this connection changes
+        # without dbver being bumped, i.e. when a DDL command is run
+        # in a transaction, or when such a transaction, or a savepoint
+        # in it, is rolled back.
+        self._schema_seq = 0
+
         self._reset_tx_state()
 
     cdef _invalidate_local_cache(self):
         self._eql_to_compiled.clear()
 
+    cdef _bump_schema_seq(self):
+        if self._in_tx_with_ddl:
+            self._schema_seq += 1
+
     cdef _reset_tx_state(self):
+        self._bump_schema_seq()
         self._txid = None
         self._in_tx = False
         self._in_tx_config = None
@@ -106,6 +162,7 @@ cdef class DatabaseConnectionView:
         self._invalidate_local_cache()
 
     cdef rollback_tx_to_savepoint(self, spid, modaliases, config):
+        self._bump_schema_seq()
         self._tx_error = False
         # See also CompilerConnectionState.rollback_to_savepoint().
         self._txid = spid
@@ -149,7 +206,11 @@ cdef class DatabaseConnectionView:
 
     property dbver:
         def __get__(self):
-            return self._db._dbver
+            return self._db._get_dbver()
+
+    property schema_seq:
+        def __get__(self):
+            return self._schema_seq
 
     property dbname:
         def __get__(self):
@@ -166,33 +227,54 @@ cdef class DatabaseConnectionView:
 
         assert query_unit.cacheable
 
-        key = (eql, json_mode, expect_one, implicit_limit,
-               self._modaliases, self._config)
+        key = (self._db._get_eql_key(eql, query_unit), json_mode,
+               expect_one, implicit_limit, self._modaliases, self._config)
 
         if self._in_tx_with_ddl:
             self._eql_to_compiled[key] = query_unit
         else:
-            self._db._cache_compiled_query(key, query_unit)
+            self._db._cache_compiled_query(key, query_unit, eql)
 
     cdef lookup_compiled_query(self, bytes eql, bint json_mode,
                                bint expect_one, int implicit_limit):
+        # Returns the unit bound to the literals of *eql*, if any.
         if (self._tx_error or
                 not self._query_cache_enabled or
                 self._in_tx_with_ddl):
             return None
 
-        key = (eql, json_mode, expect_one, implicit_limit,
-               self._modaliases, self._config)
+        norm = self._db._normalize(eql)
+        if norm is None:
+            return self._lookup_compiled_query(
+                (eql, json_mode, expect_one, implicit_limit,
+                 self._modaliases, self._config))
+
+        query_unit = self._lookup_compiled_query(
+            (norm.key, json_mode, expect_one, implicit_limit,
+             self._modaliases, self._config))
+        if (query_unit is None or
+                not query_unit.matches_literals(norm.literals)):
+            return None
+        return query_unit.bind_literals(norm.literals)
 
+    cdef _lookup_compiled_query(self, key):
         if self._in_tx_with_ddl or self._in_tx_with_set:
             query_unit = self._eql_to_compiled.get(key)
         else:
-            query_unit = self._db._eql_to_compiled.get(key)
-            if query_unit is not None and query_unit.dbver != self.dbver:
+            entry = self._db._eql_to_compiled.get(key)
+            if entry is None or entry[0].dbver != self.dbver:
                 query_unit = None
+            else:
+                query_unit = entry[0]
 
         return query_unit
 
+    cdef bind_literals(self, bytes eql, query_unit):
+        # Binds a unit compiled from *eql* to its literals.
+        if not query_unit.literal_args:
+            return query_unit
+        return query_unit.bind_literals(self._db._normalize(eql).literals)
+
     cdef tx_error(self):
         if self._in_tx:
             self._tx_error = True
@@ -223,6 +305,10 @@ cdef class DatabaseConnectionView:
             # Need to invalidate the cache in case there were
             # SET ALIAS or CONFIGURE or DDL commands.
             self._invalidate_local_cache()
+            self._bump_schema_seq()
+
+        if self._in_tx and query_unit.has_ddl:
+            self._schema_seq += 1
 
         if not self._in_tx and query_unit.has_ddl:
             self._db._signal_ddl()
@@ -268,12 +354,12 @@ cdef class DatabaseConnectionView:
 cdef class DatabaseIndex:
 
     @classmethod
-    async def init(cls, server) -> DatabaseIndex:
-        state = cls(server)
+    async def init(cls, server, versions=None) -> DatabaseIndex:
+        state = cls(server, versions)
         await state.reload_config()
         return state
 
-    def __init__(self, server):
+    def __init__(self, server, versions=None):
         self._dbs = {}
 
         self._server = server
@@ -282,6 +368,13 @@ cdef class DatabaseIndex:
         self._sys_config = None
         self._sys_config_ver = time.monotonic_ns()
 
+        # sharedmem.VersionTable of a multi-process server.
+        self._versions = versions
+        if versions is not None:
+            self._shared_sys_config_ver = versions.get_sys_config_ver()
+        else:
+            self._shared_sys_config_ver = 0
+
     async def get_sys_query(self, conn, key: str) -> bytes:
         if self._sys_queries is None:
             result = await conn.simple_query(
@@ -320,7 +413,30 @@ cdef class DatabaseIndex:
 
     def get_dbver(self, dbname):
         db = self._get_db(dbname)
-        return (<Database>db)._dbver
+        return (<Database>db)._get_dbver()
+
+    def get_hot_queries(self, int limit):
+        # Returns the keys of the most recently used queries of every
+        # database along with their source texts, the most recent first.
+        queries = {}
+        for dbname, db in self._dbs.items():
+            cache = (<Database>db)._eql_to_compiled
+            # Looking the entries up from the least recently used
+            # one keeps the order of the cache intact.
+            keys = list(cache)
+            entries = [(key, cache[key][1])
+                       for key in keys[max(len(keys) - limit, 0):]]
+            if entries:
+                queries[dbname] = entries[::-1]
+        return queries
+
+    def cache_compiled_query(self, dbname, key, query_unit, eql):
+        cdef Database db = self._get_db(dbname)
+        # The query might not compile the same way as it did when
+        # the key was saved.
+        key = (db._get_eql_key(eql, query_unit),) + tuple(key[1:])
+        if key not in db._eql_to_compiled:
+            db._cache_compiled_query(key, query_unit, eql)
 
     def _get_db(self, dbname):
         try:
@@ -348,38 +464,101 @@ cdef class DatabaseIndex:
             )
             op_value = op.coerce_value(op_value, allow_missing=allow_missing)
 
+        if op.opcode not in (config.OpCode.CONFIG_ADD,
+                             config.OpCode.CONFIG_REM,
+                             config.OpCode.CONFIG_SET,
+                             config.OpCode.CONFIG_RESET):
+            raise errors.UnsupportedFeatureError(
+                f'unsupported config operation: {op.opcode}')
+
+        if op.opcode is config.OpCode.CONFIG_ADD:
+            self._server._check_system_config_add(
+                op.setting_name, op_value)
+
         # _save_system_overrides *must* happen before
         # the callbacks below, because certain config changes
         # may cause the backend connection to drop.
         self._sys_config = op.apply(config.get_settings(), self._sys_config)
         await self._save_system_overrides(conn)
 
-        if op.opcode is config.OpCode.CONFIG_ADD:
-            await self._server._on_system_config_add(op.setting_name, op_value)
-        elif op.opcode is config.OpCode.CONFIG_REM:
-            await self._server._on_system_config_rem(op.setting_name, op_value)
-        elif op.opcode is config.OpCode.CONFIG_SET:
-            await self._server._on_system_config_set(op.setting_name, op_value)
-        elif op.opcode is config.OpCode.CONFIG_RESET:
-            await self._server._on_system_config_reset(op.setting_name)
-        else:
-            raise errors.UnsupportedFeatureError(
-                f'unsupported config operation: {op.opcode}')
+        if self._versions is not None:
+            # Let the other server processes know that they have
+            # to reload the config.
+            self._shared_sys_config_ver = (
+                self._versions.new_sys_config_ver())
 
+        await self._on_system_config_op(op.opcode, op.setting_name, op_value)
         self._sys_config_ver = time.monotonic_ns()
+        await self._after_system_config_op(
+            op.opcode, op.setting_name, op_value)
 
-        if op.opcode is config.OpCode.CONFIG_ADD:
-            await self._server._after_system_config_add(
-                op.setting_name, op_value)
-        elif op.opcode is config.OpCode.CONFIG_REM:
-            await self._server._after_system_config_rem(
-                op.setting_name, op_value)
-        elif op.opcode is config.OpCode.CONFIG_SET:
-            await self._server._after_system_config_set(
-                op.setting_name, op_value)
-        elif op.opcode is config.OpCode.CONFIG_RESET:
-            await self._server._after_system_config_reset(
-                op.setting_name)
+    async def sync_sys_config(self):
+        # Apply the system config changes made by the other processes
+        # of a multi-process server.
+        if self._versions is None:
+            return
+
+        ver = self._versions.get_sys_config_ver()
+        if ver == self._shared_sys_config_ver:
+            return
+        self._shared_sys_config_ver = ver
+
+        old_config = self._sys_config
+        await self.reload_config()
+        changes = self._diff_sys_config(old_config, self._sys_config)
+
+        for opcode, setting_name, value in changes:
+            await self._on_system_config_op(opcode, setting_name, value)
+        self._sys_config_ver = time.monotonic_ns()
+        for opcode, setting_name, value in changes:
+            await self._after_system_config_op(opcode, setting_name, value)
+
+    def _diff_sys_config(self, old_config, new_config):
+        settings = config.get_settings()
+        changes = []
+
+        for setting_name in set(old_config) | set(new_config):
+            setting = settings[setting_name]
+            old_value = old_config.get(setting_name, setting.default)
+            new_value = new_config.get(setting_name, setting.default)
+            if old_value == new_value:
+                continue
+
+            if setting.set_of:
+                for value in old_value - new_value:
+                    changes.append(
+                        (config.OpCode.CONFIG_REM, setting_name, value))
+                for value in new_value - old_value:
+                    changes.append(
+                        (config.OpCode.CONFIG_ADD, setting_name, value))
+            elif setting_name in new_config:
+                changes.append(
+                    (config.OpCode.CONFIG_SET, setting_name, new_value))
+            else:
+                changes.append(
+                    (config.OpCode.CONFIG_RESET, setting_name, None))
+
+        return changes
+
+    async def _on_system_config_op(self, opcode, setting_name, value):
+        if opcode is config.OpCode.CONFIG_ADD:
+            await self._server._on_system_config_add(setting_name, value)
+        elif opcode is config.OpCode.CONFIG_REM:
+            await self._server._on_system_config_rem(setting_name, value)
+        elif opcode is config.OpCode.CONFIG_SET:
+            await self._server._on_system_config_set(setting_name, value)
+        elif opcode is config.OpCode.CONFIG_RESET:
+            await self._server._on_system_config_reset(setting_name)
+
+    async def _after_system_config_op(self, opcode, setting_name, value):
+        if opcode is config.OpCode.CONFIG_ADD:
+            await self._server._after_system_config_add(setting_name, value)
+        elif opcode is config.OpCode.CONFIG_REM:
+            await self._server._after_system_config_rem(setting_name, value)
+        elif opcode is config.OpCode.CONFIG_SET:
+            await self._server._after_system_config_set(setting_name, value)
+        elif opcode is config.OpCode.CONFIG_RESET:
+            await self._server._after_system_config_reset(setting_name)
 
     def new_view(self, dbname: str, *, user: str, query_cache: bool):
         db = self._get_db(dbname)
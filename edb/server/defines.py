@@ -27,7 +27,7 @@ EDGEDB_ENCODING = 'utf-8'
 EDGEDB_VISIBLE_METADATA_PREFIX = r'EdgeDB metadata follows, do not modify.\n'
 
 # Increment this whenever the database layout or stdlib changes.
-EDGEDB_CATALOG_VERSION = 2020_01_11_00_00
+EDGEDB_CATALOG_VERSION = 2020_01_18_00_00
 
 # Resource limit on open FDs for the server process.
 # By default, at least on macOS, the max number of open FDs
@@ -37,6 +37,13 @@ EDGEDB_MIN_RLIMIT_NOFILE = 2048
 
 
 _MAX_QUERIES_CACHE = 1000
+_MAX_PARSE_CACHE = 1000
+# The maximum number of compiled queries per database version
+# kept in the store shared by the compiler workers.
+_MAX_SHARED_QUERIES_CACHE = 10000
+# How many compiled queries a compiler worker saves into the shared
+# store before it counts the stored queries again.
+_SHARED_QUERIES_CACHE_RECOUNT = 500
 
 _QUERY_ROLLING_AVG_LEN = 10
 _QUERIES_ROLLING_AVG_LEN = 300
@@ -44,5 +51,50 @@ _QUERIES_ROLLING_AVG_LEN = 300
 DEFAULT_MODULE_ALIAS = 'default'
 
 
+# The management port compiles queries in a pool of worker processes
+# shared by all of its connections; the pool is sized after the number
+# of CPUs, but never goes below this number.
+COMPILER_POOL_MIN_SIZE = 2
+# Workers stay pinned to the connections with open transactions; if
+# all of them are, other connections get an error after this many
+# seconds instead of waiting forever.
+COMPILER_POOL_ACQUIRE_TIMEOUT = 30.0
+# The share of the workers that open transactions can never pin, so
+# that connections idling in transactions do not starve the others.
+COMPILER_POOL_UNPINNED_SHARE = 0.25
+
+
 HTTP_PORT_QUERY_CACHE_SIZE = 500
 HTTP_PORT_MAX_CONCURRENCY = 250
+
+
+# Number of slots of the version table shared by the server processes
+# in the multi-process mode (see --workers); database versions are
+# hashed into the slots.
+SHARED_VERSION_SLOTS = 4096
+
+# How often (in seconds) server processes check for system config
+# changes made by the other processes in the multi-process mode.
+SYSTEM_CONFIG_SYNC_INTERVAL = 1.0
+
+# The most recently used queries of every database are periodically
+# saved into the runstate directory and compiled again on startup,
+# so that the query caches are warm after a restart.  Like the sockets,
+# the file is named after the port, since servers listening on
+# different ports can share the runstate directory; every process of
+# a multi-process server saves and preloads its own queries.
+QUERY_CACHE_SNAPSHOT_FILE = '.s.EDGEDB.qcache.{port}.{worker}'
+QUERY_CACHE_SNAPSHOT_SIZE = 250
+QUERY_CACHE_SNAPSHOT_INTERVAL = 60.0
+
+# The maximum number of distinct queries (per server process) that
+# have their statistics tracked; see edb.server.querystats.
+QUERY_STATS_MAX_QUERIES = 1000
+
+# The maximum number of backend connections the catalog queries of
+# schema introspection are spread across; the connections share the
+# snapshot of the introspection transaction.  The extra connections
+# of the compiler workers are reserved in the server's backend
+# connection pool, so fewer of them are used when the pool is small
+# (see baseport.Port.start()).
+INTROSPECTION_CONCURRENCY = 4
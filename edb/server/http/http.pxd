@@ -35,6 +35,7 @@ cdef class HttpResponse:
         bint close_connection
         bytes content_type
         bytes body
+        bint chunked
 
 
 cdef class HttpProtocol:
@@ -44,6 +45,7 @@ cdef class HttpProtocol:
         object parser
         object transport
         object unprocessed
+        object _write_waiter
         bint in_response
 
         HttpRequest current_request
@@ -52,6 +54,9 @@ cdef class HttpProtocol:
                 bytes content_type, bytes body, bint close_connection)
 
     cdef write(self, HttpRequest request, HttpResponse response)
+    cdef write_chunked_head(self, HttpRequest request,
+                            HttpResponse response)
+    cdef write_chunk(self, bytes data)
 
     cdef unhandled_exception(self, ex)
     cdef resume(self)
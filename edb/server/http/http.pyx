@@ -40,6 +40,7 @@ cdef class HttpResponse:
         self.content_type = b'text/plain'
         self.body = b''
         self.close_connection = False
+        self.chunked = False
 
 
 cdef class HttpProtocol:
@@ -52,6 +53,7 @@ cdef class HttpProtocol:
         self.current_request = HttpRequest()
         self.in_response = False
         self.unprocessed = None
+        self._write_waiter = None
 
     def connection_made(self, transport):
         self.transport = transport
@@ -60,6 +62,19 @@ cdef class HttpProtocol:
         self.transport = None
         self.unprocessed = None
 
+        if self._write_waiter and not self._write_waiter.done():
+            self._write_waiter.set_exception(ConnectionAbortedError())
+
+    def pause_writing(self):
+        if self._write_waiter and not self._write_waiter.done():
+            return
+        self._write_waiter = self.loop.create_future()
+
+    def resume_writing(self):
+        if not self._write_waiter or self._write_waiter.done():
+            return
+        self._write_waiter.set_result(True)
+
     def data_received(self, data):
         try:
             self.parser.feed_data(data)
@@ -149,6 +164,42 @@ cdef class HttpProtocol:
             response.body,
             response.close_connection)
 
+    cdef write_chunked_head(self, HttpRequest request,
+                            HttpResponse response):
+        # Start a response with the body sent in chunks with
+        # write_chunk(); the response is completed by _handle_request().
+        # Only supported by HTTP/1.1 clients, see request.version.
+        assert type(response.status) is HTTPStatus
+        assert request.version == b'1.1'
+        if self.transport is None:
+            raise ConnectionAbortedError
+        data = [
+            b'HTTP/', request.version, b' ',
+            f'{response.status.value} {response.status.phrase}'.encode(),
+            b'\r\n',
+            b'Content-Type: ', response.content_type, b'\r\n',
+            b'Transfer-Encoding: chunked\r\n',
+        ]
+        if response.close_connection:
+            data.append(b'Connection: close\r\n')
+        data.append(b'\r\n')
+        self.transport.write(b''.join(data))
+        response.chunked = True
+
+    cdef write_chunk(self, bytes data):
+        if self.transport is None:
+            # The client has disconnected in the middle of
+            # the response.
+            raise ConnectionAbortedError
+        if data:
+            self.transport.writelines(
+                (b'%x\r\n' % len(data), data, b'\r\n'))
+
+    async def drain(self):
+        # Wait until the transport is ready to accept more data.
+        if self._write_waiter is not None and not self._write_waiter.done():
+            await self._write_waiter
+
     async def _handle_request(self, HttpRequest request):
         cdef:
             HttpResponse response = HttpResponse()
@@ -158,11 +209,27 @@ cdef class HttpProtocol:
 
         try:
             await self.handle_request(request, response)
+        except ConnectionAbortedError:
+            return
         except Exception as ex:
+            if response.chunked:
+                # The response has been started already.
+                if debug.flags.server:
+                    markup.dump(ex)
+                if self.transport is not None:
+                    self.transport.abort()
+                    self.transport = None
+                return
             self.unhandled_exception(ex)
             return
 
-        self.write(request, response)
+        if response.chunked:
+            if self.transport is None:
+                return
+            # The terminating zero-length chunk.
+            self.transport.write(b'0\r\n\r\n')
+        else:
+            self.write(request, response)
         self.in_response = False
 
         if response.close_connection or not request.should_keep_alive:
@@ -35,6 +35,7 @@ class BaseHttpPort(baseport.Port):
                  user: str,
                  concurrency: int,
                  protocol: str,
+                 query_cache_size: int=defines.HTTP_PORT_QUERY_CACHE_SIZE,
                  **kwargs):
 
         super().__init__(**kwargs)
@@ -45,6 +46,9 @@ class BaseHttpPort(baseport.Port):
             raise RuntimeError(
                 f'concurrency must be greater than 0 and '
                 f'less than {defines.HTTP_PORT_MAX_CONCURRENCY}')
+        if query_cache_size <= 0:
+            raise RuntimeError(
+                'query_cache_size must be greater than 0')
 
         self._compilers = asyncio.LifoQueue()
         self._pgcons = asyncio.LifoQueue()
@@ -59,8 +63,7 @@ class BaseHttpPort(baseport.Port):
         self.concurrency = concurrency
 
         self._servers = []
-        self._query_cache = cache.StatementsCache(
-            maxsize=defines.HTTP_PORT_QUERY_CACHE_SIZE)
+        self._query_cache = cache.QueryCache(maxsize=query_cache_size)
 
     @property
     def compilers(self):
@@ -77,6 +80,9 @@ class BaseHttpPort(baseport.Port):
     def get_dbver(self):
         return self._dbindex.get_dbver(self.database)
 
+    def get_query_cache_stats(self):
+        return self._query_cache.get_stats()
+
     def get_compiler_worker_cls(self):
         raise NotImplementedError
 
@@ -111,7 +117,8 @@ class BaseHttpPort(baseport.Port):
         nethost = await self._fix_localhost(self._nethost, self._netport)
         srv = await self._loop.create_server(
             self.build_protocol,
-            host=nethost, port=self._netport)
+            host=nethost, port=self._netport,
+            reuse_port=self.get_server().get_worker_count() > 1 or None)
 
         self._servers.append(srv)
 
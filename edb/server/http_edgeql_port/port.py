@@ -19,7 +19,11 @@
 
 from __future__ import annotations
 
+from typing import *  # NoQA
+
+from edb.edgeql import normalization
 from edb.server import compiler
+from edb.server import defines
 from edb.server import http
 
 from . import protocol
@@ -27,6 +31,19 @@ from . import protocol
 
 class HttpEdgeQLPort(http.BaseHttpPort):
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sources = normalization.SourceCache(
+            maxsize=defines._MAX_QUERIES_CACHE)
+
+    def normalize(
+        self, query: bytes
+    ) -> Optional[normalization.NormalizedSource]:
+        try:
+            return self._sources.normalize(query.decode('utf-8'))
+        except UnicodeDecodeError:
+            return None
+
     def build_protocol(self):
         return protocol.Protocol(self._loop, self, self._query_cache)
 
@@ -103,8 +103,29 @@ cdef class Protocol(http.HttpProtocol):
 
         response.status = http.HTTPStatus.OK
         response.content_type = b'application/json'
+
+        # The elements of the result are sent as soon as they are
+        # fetched from the backend: the response is started when the
+        # first batch arrives, so errors that occur before that (most
+        # of them) are reported with a regular response.
+        chunks = []
+
+        async def on_rows(rows):
+            if response.chunked or request.version == b'1.1':
+                if not response.chunked:
+                    self.write_chunked_head(request, response)
+                    self.write_chunk(b'{"data":[' + b','.join(rows))
+                else:
+                    self.write_chunk(b',' + b','.join(rows))
+                await self.drain()
+            else:
+                # Chunked transfer encoding requires HTTP/1.1.
+                chunks.extend(rows)
+
         try:
-            result = await self.execute(query.encode(), variables)
+            await self.execute(query.encode(), variables, on_rows)
+        except ConnectionAbortedError:
+            raise
         except Exception as ex:
             if debug.flags.server:
                 markup.dump(ex)
@@ -120,15 +141,25 @@ cdef class Protocol(http.HttpProtocol):
                 'code': ex_type.get_code(),
             }
 
-            response.body = json.dumps({'error': err_dct}).encode()
+            if response.chunked:
+                # Some of the data has been sent already; terminate
+                # the document with the error.
+                self.write_chunk(
+                    b'],"error":' + json.dumps(err_dct).encode() + b'}')
+            else:
+                response.body = json.dumps({'error': err_dct}).encode()
         else:
-            response.body = b'{"data":' + result + b'}'
+            if response.chunked:
+                self.write_chunk(b']}')
+            else:
+                response.body = b'{"data":[' + b','.join(chunks) + b']}'
 
     async def compile(self, dbver, bytes query):
         comp = await self.server.compilers.get()
         try:
             units = await comp.call(
                 'compile_eql',
+                self.server.database,
                 dbver,
                 query,
                 None,  # modaliases
@@ -139,26 +170,41 @@ cdef class Protocol(http.HttpProtocol):
                 compiler.CompileStatementMode.SINGLE,
                 compiler.Capability.QUERY,
                 True,  # json parameters
+                True,  # json elements, see execute()
             )
             return units[0]
         finally:
             self.server.compilers.put_nowait(comp)
 
-    async def execute(self, bytes query, variables):
+    async def execute(self, bytes query, variables, on_rows):
         dbver = self.server.get_dbver()
-        cache_key = (query, dbver)
         use_prep_stmt = False
 
-        query_unit: compiler.QueryUnit = self.query_cache.get(
-            cache_key, None)
+        # Queries that only differ in the values of their literals
+        # share a compiled unit, see edb.edgeql.normalization.
+        norm = self.server.normalize(query)
+        if norm is not None:
+            key = norm.key
+        else:
+            key = query
+
+        query_unit: compiler.QueryUnit = self.query_cache.get(key, dbver)
+        if (query_unit is not None and norm is not None and
+                not query_unit.matches_literals(norm.literals)):
+            query_unit = None
 
         if query_unit is None:
             query_unit = await self.compile(dbver, query)
-            self.query_cache[cache_key] = query_unit
+            self.query_cache.put(
+                key, dbver, query_unit,
+                len(key) + sum(len(sql) for sql in query_unit.sql))
         else:
             # This is at least the second time this query is used.
             use_prep_stmt = True
 
+        if norm is not None:
+            query_unit = query_unit.bind_literals(norm.literals)
+
         args = []
         if query_unit.in_type_args:
             for name in query_unit.in_type_args:
@@ -168,16 +214,16 @@ cdef class Protocol(http.HttpProtocol):
                 else:
                     args.append(variables[name])
 
+        # Queries are compiled to return every element of the result
+        # as a separate JSON row, which are passed to *on_rows* as they
+        # are fetched, so that the result is never held in memory as
+        # a whole.
         pgcon = await self.server.pgcons.get()
         try:
-            data = await pgcon.parse_execute_json(
+            await pgcon.parse_execute_json_stream(
                 query_unit.sql[0], query_unit.sql_hash, query_unit.dbver,
-                use_prep_stmt, args)
+                use_prep_stmt, args, on_rows,
+                query_unit.literal_args or (),
+                query_unit.literal_args_data)
         finally:
             self.server.pgcons.put_nowait(pgcon)
-
-        if data is None:
-            raise errors.InternalServerError(
-                f'no data received for a JSON query {query_unit.sql[0]!r}')
-
-        return data
@@ -61,12 +61,13 @@ class Compiler(compiler.BaseCompiler):
 
     async def compile_graphql(
             self,
+            dbname: str,
             dbver: int,
             gql: str,
             operation_name: str=None,
             variables: Optional[Mapping[str, object]]=None):
 
-        db = await self._get_database(dbver)
+        db = await self._get_database(dbname, dbver)
 
         op = graphql.translate(
             db.gqlcore,
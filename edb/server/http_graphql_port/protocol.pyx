@@ -143,6 +143,13 @@ cdef class Protocol(http.HttpProtocol):
                 err_dct['locations'] = [{'line': ex.line, 'column': ex.col}]
 
             response.body = json.dumps({'errors': [err_dct]}).encode()
+        elif request.version == b'1.1':
+            # A GraphQL operation is a single JSON object; send it
+            # as is instead of copying it into the response body.
+            self.write_chunked_head(request, response)
+            self.write_chunk(b'{"data":')
+            self.write_chunk(result)
+            self.write_chunk(b'}')
         else:
             response.body = b'{"data":' + result + b'}'
 
@@ -151,6 +158,7 @@ cdef class Protocol(http.HttpProtocol):
         try:
             return await compiler.call(
                 'compile_graphql',
+                self.server.database,
                 dbver,
                 query,
                 operation_name,
@@ -160,16 +168,17 @@ cdef class Protocol(http.HttpProtocol):
 
     async def execute(self, query, operation_name, variables):
         dbver = self.server.get_dbver()
-        cache_key = (query, operation_name, dbver)
+        cache_key = (query, operation_name)
         use_prep_stmt = False
 
         op: compiler.CompiledOperation = self.query_cache.get(
-            cache_key, None)
+            cache_key, dbver)
 
         if op is None:
             op = await self.compile(
                 dbver, query, operation_name, variables)
-            self.query_cache[cache_key] = op
+            self.query_cache.put(
+                cache_key, dbver, op, len(query) + len(op.sql))
         else:
             if op.cache_deps_vars:
                 op = await self.compile(
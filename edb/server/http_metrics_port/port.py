@@ -0,0 +1,101 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import annotations
+
+from edb.common import taskgroup
+from edb.server import baseport
+
+from . import protocol
+
+
+class HttpMetricsPort(baseport.Port):
+    """A port serving the query statistics to Prometheus.
+
+    The statistics are those of the server process; the per-query
+    statistics are limited to the queries run against the database
+    the port is attached to.  The port neither compiles nor runs
+    queries, so the user and concurrency settings are ignored.
+
+    The processes of a multi-process server cannot share the port,
+    as every one of them would only report its own statistics to a
+    random scraper: process N listens on the port number plus N
+    instead and labels its samples with ``worker="N"``.
+    """
+
+    def __init__(self, nethost: str, netport: int,
+                 database: str,
+                 protocol: str,
+                 user: str = None,
+                 concurrency: int = None,
+                 query_cache_size: int = None,
+                 **kwargs):
+
+        super().__init__(**kwargs)
+
+        if protocol != self.get_proto_name():
+            raise RuntimeError(f'unknown protocol {protocol!r}')
+
+        self._nethost = nethost
+        self._netport = netport
+
+        self.database = database
+
+        self._servers = []
+
+    @classmethod
+    def get_proto_name(cls):
+        return 'metrics+http'
+
+    def get_compiler_worker_cls(self):
+        return None
+
+    def build_protocol(self):
+        return protocol.Protocol(self._loop, self)
+
+    def get_worker_id(self):
+        server = self.get_server()
+        if server.get_worker_count() > 1:
+            return server.get_worker_id()
+        else:
+            return None
+
+    async def start(self):
+        await super().start()
+
+        netport = self._netport
+        worker_id = self.get_worker_id()
+        if worker_id is not None:
+            netport += worker_id
+
+        nethost = await self._fix_localhost(self._nethost, netport)
+        srv = await self._loop.create_server(
+            self.build_protocol,
+            host=nethost, port=netport)
+
+        self._servers.append(srv)
+
+    async def stop(self):
+        try:
+            async with taskgroup.TaskGroup() as g:
+                for srv in self._servers:
+                    srv.close()
+                    g.create_task(srv.wait_closed())
+                self._servers.clear()
+        finally:
+            await super().stop()
@@ -0,0 +1,52 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from edb.server.http import http
+from edb.server.http cimport http
+
+
+cdef class Protocol(http.HttpProtocol):
+
+    def __init__(self, loop, server):
+        http.HttpProtocol.__init__(self, loop)
+        self.server = server
+
+    async def handle_request(self, http.HttpRequest request,
+                             http.HttpResponse response):
+        url_path = request.url.path.strip(b'/')
+
+        if url_path not in (b'', b'metrics'):
+            response.body = f'Unknown path: /{url_path.decode()!r}'.encode()
+            response.status = http.HTTPStatus.NOT_FOUND
+            response.close_connection = True
+            return
+
+        if request.method != b'GET':
+            response.body = b'only GET requests are supported'
+            response.status = http.HTTPStatus.METHOD_NOT_ALLOWED
+            response.close_connection = True
+            return
+
+        server = self.server.get_server()
+        stats = server.get_query_stats()
+        response.status = http.HTTPStatus.OK
+        response.content_type = b'text/plain; version=0.0.4'
+        response.body = stats.render_prometheus(
+            self.server.database,
+            worker_id=self.server.get_worker_id(),
+            query_caches=server.get_query_cache_stats()).encode()
@@ -34,6 +34,7 @@ import signal
 import socket
 import sys
 import tempfile
+import traceback
 import typing
 
 import uvloop
@@ -175,7 +176,8 @@ def _init_parsers():
 
 
 def _run_server(cluster, args: ServerConfig,
-                runstate_dir, internal_runstate_dir):
+                runstate_dir, internal_runstate_dir, *,
+                worker_id: int=0, versions=None, ready_fd=None):
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     # Import here to make sure that most of imports happen
@@ -193,7 +195,10 @@ def _run_server(cluster, args: ServerConfig,
         nethost=args.bind_address,
         netport=args.port,
         auto_shutdown=args.auto_shutdown,
-        echo_runtime_info=args.echo_runtime_info,
+        echo_runtime_info=args.echo_runtime_info and worker_id == 0,
+        workers=args.workers,
+        worker_id=worker_id,
+        versions=versions,
     )
 
     loop.run_until_complete(ss.init())
@@ -206,8 +211,14 @@ def _run_server(cluster, args: ServerConfig,
 
     loop.add_signal_handler(signal.SIGTERM, terminate_server, ss, loop)
 
-    # Notify systemd that we've started up.
-    _sd_notify('READY=1')
+    if ready_fd is not None:
+        # A worker process; the parent process reports the readiness
+        # once all of the workers have started.
+        os.write(ready_fd, b'1')
+        os.close(ready_fd)
+    else:
+        # Notify systemd that we've started up.
+        _sd_notify('READY=1')
 
     try:
         loop.run_forever()
@@ -216,7 +227,97 @@ def _run_server(cluster, args: ServerConfig,
             logger.info('Shutting down.')
             loop.run_until_complete(ss.stop())
         finally:
-            _sd_notify('STOPPING=1')
+            if ready_fd is None:
+                _sd_notify('STOPPING=1')
+
+
+def _fork_worker(cluster, args: ServerConfig,
+                 runstate_dir, internal_runstate_dir, *,
+                 worker_id: int, versions, ready_fd: int) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # In the child: never return into the parent's code.
+    status = 0
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        setproctitle.setproctitle(
+            f'{setproctitle.getproctitle()} [worker {worker_id}]')
+        _run_server(
+            cluster, args, runstate_dir, internal_runstate_dir,
+            worker_id=worker_id, versions=versions, ready_fd=ready_fd)
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+def _run_workers(cluster, args: ServerConfig,
+                 runstate_dir, internal_runstate_dir):
+    # Fork the server processes: each of them runs a complete server
+    # listening on the same ports, while this process only supervises
+    # them.  The processes share the versions of the database schemas
+    # and of the system config to keep their caches coherent.
+    from . import sharedmem
+
+    versions = sharedmem.VersionTable()
+    ready_r, ready_w = os.pipe()
+
+    pids = set()
+
+    def terminate_workers(*_):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, terminate_workers)
+    signal.signal(signal.SIGINT, terminate_workers)
+
+    try:
+        for worker_id in range(args.workers):
+            pids.add(_fork_worker(
+                cluster, args, runstate_dir, internal_runstate_dir,
+                worker_id=worker_id, versions=versions, ready_fd=ready_w))
+        os.close(ready_w)
+
+        ready = 0
+        while ready < args.workers:
+            data = os.read(ready_r, args.workers - ready)
+            if not data:
+                # All workers have exited or closed the pipe.
+                break
+            ready += len(data)
+        os.close(ready_r)
+
+        if ready == args.workers:
+            # Notify systemd that we've started up.
+            _sd_notify('READY=1')
+
+        failed = False
+        while pids:
+            pid, status = os.wait()
+            pids.discard(pid)
+            if status and not failed:
+                # A worker has failed; shut down the others.
+                logger.error('server worker process %d has exited with '
+                             'status %d; shutting down', pid, status)
+                failed = True
+                terminate_workers()
+    finally:
+        terminate_workers()
+        _sd_notify('STOPPING=1')
+
+    if failed:
+        abort('server worker processes have failed')
 
 
 def run_server(args: ServerConfig):
@@ -301,7 +402,12 @@ def run_server(args: ServerConfig):
                         ),
                     )
 
-                _run_server(cluster, args, runstate_dir, internal_runstate_dir)
+                if args.workers > 1:
+                    _run_workers(
+                        cluster, args, runstate_dir, internal_runstate_dir)
+                else:
+                    _run_server(
+                        cluster, args, runstate_dir, internal_runstate_dir)
 
     except BaseException:
         if pg_cluster_init_by_us and not _server_initialized:
@@ -398,6 +504,7 @@ class ServerConfig(typing.NamedTuple):
     echo_runtime_info: bool
     temp_dir: bool
     auto_shutdown: bool
+    workers: int
 
 
 def bump_rlimit_nofile() -> None:
@@ -483,6 +590,10 @@ _server_options = [
         '--auto-shutdown', type=bool, default=False, is_flag=True,
         help='shutdown the server after the last management ' +
              'connection is closed'),
+    click.option(
+        '--workers', type=click.IntRange(min=1), default=1,
+        help='number of server processes accepting connections; the '
+             'processes share the listening ports'),
 ]
 
 
@@ -527,6 +638,12 @@ def server_main(*, insecure=False, **kwargs):
         elif kwargs['postgres_dsn']:
             abort('The -D and --postgres-dsn options are mutually exclusive.')
 
+    if kwargs['workers'] > 1:
+        if kwargs['auto_shutdown']:
+            abort('--workers is incompatible with --auto-shutdown')
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            abort('--workers is not supported on this platform')
+
     kwargs['insecure'] = insecure
 
     if kwargs['background']:
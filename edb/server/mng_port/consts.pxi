@@ -22,6 +22,10 @@ DEF PROTO_VER_MINOR = 7
 
 
 DEF DUMP_BLOCK_SIZE = 1024 * 1024 * 10
+DEF DUMP_MAX_JOBS = 32
+
+DEF DUMP_OPT_JOBS = 0xFF10
+DEF DUMP_OPT_COMPRESSION = 0xFF11
 
 DEF DUMP_HEADER_BLOCK_TYPE = 101
 DEF DUMP_HEADER_BLOCK_TYPE_INFO = b'I'
@@ -30,6 +34,7 @@ DEF DUMP_HEADER_BLOCK_TYPE_DATA = b'D'
 DEF DUMP_HEADER_SERVER_TIME = 102
 DEF DUMP_HEADER_SERVER_VER = 103
 DEF DUMP_HEADER_BLOCKS_INFO = 104
+DEF DUMP_HEADER_COMPRESSION = 105
 
 DEF DUMP_HEADER_BLOCK_ID = 110
 DEF DUMP_HEADER_BLOCK_NUM = 111
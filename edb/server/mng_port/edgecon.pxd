@@ -77,6 +77,11 @@ cdef class EdgeConnection:
         object _main_task
 
         object _last_anon_compiled
+        # The backend connection the anonymous statement was last
+        # parsed on, and its anon_stmt_seq right after that.
+        object _last_anon_pgcon
+        uint64_t _last_anon_seq
+        dict _prepared_stmts
         WriteBuffer _write_buf
 
         bint debug
@@ -85,6 +90,10 @@ cdef class EdgeConnection:
         object server
         bint authed
 
+        object query_stats
+        # Time spent in drain() since the last reset, in seconds.
+        double _drain_time
+
     cdef parse_json_mode(self, bytes mode)
     cdef parse_cardinality(self, bytes card)
     cdef char render_cardinality(self, query_unit) except -1
@@ -98,7 +107,9 @@ cdef class EdgeConnection:
 
     cdef pgcon_last_sync_status(self)
 
-    cdef WriteBuffer recode_bind_args(self, bytes bind_args, dict array_tids)
+    cdef WriteBuffer recode_bind_args(self, bytes bind_args, query_unit)
+    cdef encode_bulk_insert_rows(self, desc, list rows, WriteBuffer obj_buf,
+                                 list link_bufs, WriteBuffer ids_buf)
 
     cdef WriteBuffer make_describe_msg(self, query_unit)
     cdef WriteBuffer make_command_complete_msg(self, query_unit)
@@ -110,5 +121,10 @@ cdef class EdgeConnection:
     cdef write_log(self, EdgeSeverity severity, uint32_t code, str message)
 
     cdef get_backend(self)
+    cdef release_pgcon(self)
+    cdef remember_anon_stmt(self)
+    cdef bint anon_stmt_parsed(self)
+    cdef _get_prepared_stmt_version(self)
 
     cdef uint64_t _parse_implicit_limit(self, bytes v) except <uint64_t>-1
+    cdef int _parse_dump_jobs(self, bytes v) except -1
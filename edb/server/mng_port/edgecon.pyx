@@ -21,8 +21,10 @@ import collections
 import hashlib
 import json
 import logging
+import lzma
 import time
 import traceback
+import zlib
 
 cimport cython
 cimport cpython
@@ -59,10 +61,11 @@ from edb.server.pgcon cimport pgcon
 from edb.server.pgcon import errors as pgerror
 
 from edb.schema import objects as s_obj
+from edb.pgsql import common as pg_common
 
 from edb import errors
 from edb.errors import base as base_errors
-from edb.common import debug, taskgroup
+from edb.common import debug, taskgroup, uuidgen
 
 from edgedb import scram
 
@@ -84,6 +87,61 @@ cdef object logger = logging.getLogger('edb.server')
 
 DEF QUERY_OPT_IMPLICIT_LIMIT = 0xFF01
 
+# codec name -> (compress, decompress)
+cdef dict DUMP_COMPRESSION_CODECS = {
+    b'zlib': (zlib.compress, zlib.decompress),
+    b'lzma': (lzma.compress, lzma.decompress),
+}
+
+cdef str RESTORE_DEFERRED_INDEXES_QUERY = '''
+    SELECT
+        'DROP INDEX ' || i.indexrelid::regclass::text,
+        pg_get_indexdef(i.indexrelid) || ';' || coalesce(
+            'COMMENT ON INDEX ' || i.indexrelid::regclass::text
+            || ' IS ' || quote_literal(
+                obj_description(i.indexrelid, 'pg_class')),
+            '')
+    FROM
+        pg_index i
+    WHERE
+        i.indrelid = ANY(ARRAY[{tables}]::regclass[])
+        AND NOT EXISTS (
+            SELECT FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+
+    UNION ALL
+
+    SELECT
+        'ALTER TABLE ' || c.conrelid::regclass::text
+        || ' DROP CONSTRAINT ' || quote_ident(c.conname),
+        'ALTER TABLE ' || c.conrelid::regclass::text
+        || ' ADD CONSTRAINT ' || quote_ident(c.conname)
+        || ' ' || pg_get_constraintdef(c.oid) || ';' || coalesce(
+            'COMMENT ON CONSTRAINT ' || quote_ident(c.conname)
+            || ' ON ' || c.conrelid::regclass::text
+            || ' IS ' || quote_literal(
+                obj_description(c.oid, 'pg_constraint')),
+            '')
+    FROM
+        pg_constraint c
+    WHERE
+        c.conrelid = ANY(ARRAY[{tables}]::regclass[])
+        AND c.contype IN ('u', 'x')
+        AND NOT EXISTS (
+            SELECT FROM pg_constraint f
+            WHERE f.contype = 'f' AND f.conindid = c.conindid)
+'''
+
+
+cdef bytes BULK_INSERT_IDS_QUERY = b'''
+    CREATE TEMPORARY TABLE _edgecon_bulk_ids (
+        id uuid NOT NULL
+    ) ON COMMIT DROP;
+'''
+
+cdef bytes BULK_INSERT_IDS_COPY = (
+    b'COPY _edgecon_bulk_ids (id) FROM STDIN WITH BINARY')
+
+
 @cython.final
 cdef class EdgeConnection:
 
@@ -108,6 +166,11 @@ cdef class EdgeConnection:
         self._write_waiter = None
 
         self._last_anon_compiled = None
+        self._last_anon_pgcon = None
+        self._last_anon_seq = 0
+        # stmt_name -> (query_unit, dbver, eql, json_mode,
+        #               expect_one, implicit_limit)
+        self._prepared_stmts = {}
 
         self._write_buf = None
 
@@ -118,6 +181,9 @@ cdef class EdgeConnection:
         self.server = server
         self.authed = False
 
+        self.query_stats = server.get_server().get_query_stats()
+        self._drain_time = 0
+
     cdef get_backend(self):
         if self._con_status is EDGECON_BAD:
             # `self.sync()` is called from `recover_from_error`;
@@ -134,6 +200,45 @@ cdef class EdgeConnection:
 
         raise RuntimeError('requesting backend before it is initialized')
 
+    async def lease_pgcon(self):
+        # Lease a backend connection from the server-wide pool and
+        # make sure its session state matches this connection's.
+        return await self.get_backend().acquire_pgcon(
+            self.dbview.modaliases, self.dbview.get_session_config())
+
+    cdef remember_anon_stmt(self):
+        pgcon = self.get_backend().pgcon
+        self._last_anon_pgcon = pgcon
+        self._last_anon_seq = pgcon.anon_stmt_seq
+
+    cdef bint anon_stmt_parsed(self):
+        # Whether the statement remembered by remember_anon_stmt() is
+        # still the anonymous statement of the leased backend
+        # connection.  Outside of transactions the backend connection
+        # is released between the Parse and Execute messages, but
+        # usually the same one is leased again and nothing has been
+        # parsed on it in between.
+        pgcon = self.get_backend().pgcon
+        return (
+            pgcon is self._last_anon_pgcon and
+            pgcon.anon_stmt_seq == self._last_anon_seq
+        )
+
+    cdef release_pgcon(self):
+        backend = self._backend
+        if (backend is None or not backend.has_pgcon() or
+                self.dbview.in_tx()):
+            return
+
+        pgcon = backend.pgcon
+        if pgcon.is_connected() and not pgcon.is_idle():
+            # The backend connection has pending results, e.g. an
+            # "Execute" message has not been followed by a "Sync" yet.
+            return
+
+        backend.release_pgcon(
+            self.dbview.modaliases, self.dbview.get_session_config())
+
     def debug_print(self, *args):
         print(
             '::EDGEPROTO::',
@@ -152,6 +257,15 @@ cdef class EdgeConnection:
         else:
             self._write_buf = buf
 
+    async def drain(self):
+        # Send the buffered messages and wait until the transport
+        # is ready to accept more data.
+        started_at = time.monotonic()
+        self.flush()
+        if self._write_waiter is not None and not self._write_waiter.done():
+            await self._write_waiter
+        self._drain_time += time.monotonic() - started_at
+
     cdef abort(self):
         self._con_status = EDGECON_BAD
         if self._transport is not None:
@@ -266,7 +380,7 @@ cdef class EdgeConnection:
         buf.write_buffer(msg_buf)
 
         if self.port.in_dev_mode():
-            pgaddr = dict(self.get_backend().pgcon.get_pgaddr())
+            pgaddr = dict(self.port.get_pgaddr())
             if pgaddr.get('password'):
                 pgaddr['password'] = '********'
             msg_buf = WriteBuffer.new_message(b'S')
@@ -327,13 +441,16 @@ cdef class EdgeConnection:
         return params
 
     async def _get_role_record(self, user):
-        conn = self.get_backend().pgcon
-        server = self.port.get_server()
-        role_query = await server.get_sys_query(conn, 'role')
-        json_data = await conn.parse_execute_json(
-            role_query, b'__sys_role',
-            dbver=0, use_prep_stmt=True, args=(user,),
-        )
+        conn = await self.lease_pgcon()
+        try:
+            server = self.port.get_server()
+            role_query = await server.get_sys_query(conn, 'role')
+            json_data = await conn.parse_execute_json(
+                role_query, b'__sys_role',
+                dbver=0, use_prep_stmt=True, args=(user,),
+            )
+        finally:
+            self.release_pgcon()
 
         if json_data is not None:
             return json.loads(json_data.decode('utf-8'))
@@ -502,8 +619,12 @@ cdef class EdgeConnection:
             # received user name and the cluster mock auth nonce.
             # The same approach is taken by Postgres.
             server = self.port.get_server()
-            nonce = await server.get_instance_data(
-                self.get_backend().pgcon, 'mock_auth_nonce')
+            conn = await self.lease_pgcon()
+            try:
+                nonce = await server.get_instance_data(
+                    conn, 'mock_auth_nonce')
+            finally:
+                self.release_pgcon()
             salt = hashlib.sha256(nonce.encode() + user.encode()).digest()
 
             verifier = scram.SCRAMVerifier(
@@ -570,7 +691,8 @@ cdef class EdgeConnection:
             self.dbview.raise_in_tx_error()
 
         if self.dbview.in_tx():
-            return await self.get_backend().compiler.call(
+            started_at = time.monotonic()
+            units = await self.get_backend().call_compiler(
                 'compile_eql_in_tx',
                 self.dbview.txid,
                 eql,
@@ -579,9 +701,23 @@ cdef class EdgeConnection:
                 implicit_limit,
                 stmt_mode,
             )
-        else:
-            return await self.get_backend().compiler.call(
+            self._record_compile_stats(eql, units, {
+                'compile': time.monotonic() - started_at,
+            })
+            return units
+
+        # If the script starts a transaction, the worker that compiled
+        # it keeps the transaction state and has to stay pinned to this
+        # connection until the transaction is over.
+        backend = self.get_backend()
+        started_at = time.monotonic()
+        await backend.pin_compiler()
+        pinned_at = time.monotonic()
+        units = None
+        try:
+            units = await backend.call_compiler(
                 'compile_eql',
+                self.dbview.dbname,
                 self.dbview.dbver,
                 eql,
                 self.dbview.modaliases,
@@ -592,11 +728,38 @@ cdef class EdgeConnection:
                 stmt_mode,
                 CAP_ALL,
             )
+        finally:
+            if units is None or not any(
+                    unit.tx_id is not None for unit in units):
+                backend.unpin_compiler()
+
+        self._record_compile_stats(eql, units, {
+            'compile_queue': pinned_at - started_at,
+            'compile': time.monotonic() - pinned_at,
+        })
+        return units
+
+    def _record_compile_stats(self, bytes eql, list units, dict timings):
+        # The compiler breaks down the time it spent on a query
+        # into the compilation stages.
+        query_unit = units[0]
+        if query_unit.compile_timings:
+            timings.update(query_unit.compile_timings)
+        self.query_stats.record(
+            self.dbview.dbname, query_unit, eql, timings)
+
+    async def _publish_query_stats(self):
+        # Make the statistics available to sys::get_query_stats()
+        # in the current backend session.  This destroys the unnamed
+        # prepared statement, so the query has to be parsed again.
+        await self.get_backend().pgcon.simple_query(
+            self.query_stats.get_publish_sql(self.dbview.dbname),
+            ignore_data=True)
 
     async def _compile_rollback(self, bytes eql):
         assert self.dbview.in_tx_error()
         try:
-            return await self.get_backend().compiler.call(
+            return await self.get_backend().call_compiler(
                 'try_compile_rollback', self.dbview.dbver, eql)
         except Exception:
             self.dbview.raise_in_tx_error()
@@ -654,10 +817,13 @@ cdef class EdgeConnection:
 
         for query_unit in units:
             self.dbview.start(query_unit)
+            started_at = time.monotonic()
             try:
                 if query_unit.system_config:
                     await self._execute_system_config(query_unit)
                 else:
+                    if query_unit.reads_query_stats:
+                        await self._publish_query_stats()
                     await self.get_backend().pgcon.simple_query(
                         b';'.join(query_unit.sql), ignore_data=True)
                     if query_unit.config_ops:
@@ -678,6 +844,10 @@ cdef class EdgeConnection:
                 raise
             else:
                 self.dbview.on_success(query_unit)
+                self.query_stats.record(
+                    self.dbview.dbname, query_unit, None,
+                    {'execute': time.monotonic() - started_at},
+                    call=True)
                 if query_unit.new_types and self.dbview.in_tx():
                     await self._update_type_ids(query_unit)
 
@@ -693,12 +863,15 @@ cdef class EdgeConnection:
         bint json_mode,
         bint expect_one,
         uint64_t implicit_limit,
+        bytes stmt_name=b'',
     ):
         if self.debug:
-            self.debug_print('PARSE', eql)
+            self.debug_print('PARSE', stmt_name, eql)
 
+        started_at = time.monotonic()
         query_unit = self.dbview.lookup_compiled_query(
             eql, json_mode, expect_one, implicit_limit)
+        lookup_time = time.monotonic() - started_at
         cached = True
         if query_unit is None:
             # Cache miss; need to compile this query.
@@ -730,19 +903,31 @@ cdef class EdgeConnection:
             if not (query_unit.tx_rollback or query_unit.tx_savepoint_rollback):
                 self.dbview.raise_in_tx_error()
 
-        await self.get_backend().pgcon.parse_execute(
-            1,           # =parse
-            0,           # =execute
-            query_unit,  # =query
-            self,        # =edgecon
-            None,        # =bind_data
-            0,           # =send_sync
-            0,           # =use_prep_stmt
-        )
-
-        if not cached and query_unit.cacheable:
-            self.dbview.cache_compiled_query(
-                eql, json_mode, expect_one, implicit_limit, query_unit)
+        self.query_stats.record(
+            self.dbview.dbname, query_unit, eql,
+            {'cache_lookup': lookup_time}, cache_hit=cached)
+
+        if not stmt_name:
+            await self.get_backend().pgcon.parse_execute(
+                1,           # =parse
+                0,           # =execute
+                query_unit,  # =query
+                self,        # =edgecon
+                None,        # =bind_data
+                0,           # =send_sync
+                0,           # =use_prep_stmt
+            )
+            # The anonymous statement only exists on the backend
+            # connection currently leased by this connection.
+            self.remember_anon_stmt()
+        # Named statements are prepared on a backend connection when
+        # they are first executed on it; see _execute_prepared().
+
+        if not cached:
+            if query_unit.cacheable:
+                self.dbview.cache_compiled_query(
+                    eql, json_mode, expect_one, implicit_limit, query_unit)
+            query_unit = self.dbview.bind_literals(eql, query_unit)
 
         return query_unit
 
@@ -834,8 +1019,6 @@ cdef class EdgeConnection:
             dict headers
             uint64_t implicit_limit = 0
 
-        self._last_anon_compiled = None
-
         headers = self.parse_headers()
         if headers:
             for k, v in headers.items():
@@ -852,16 +1035,17 @@ cdef class EdgeConnection:
         )
 
         stmt_name = self.buffer.read_len_prefixed_bytes()
-        if stmt_name:
-            raise errors.UnsupportedFeatureError(
-                'prepared statements are not yet supported')
+        if not stmt_name:
+            self._last_anon_compiled = None
+        else:
+            self._prepared_stmts.pop(stmt_name, None)
 
         eql = self.buffer.read_len_prefixed_bytes()
         if not eql:
             raise errors.BinaryProtocolError('empty query')
 
         query_unit = await self._parse(
-            eql, json_mode, expect_one, implicit_limit)
+            eql, json_mode, expect_one, implicit_limit, stmt_name)
 
         buf = WriteBuffer.new_message(b'1')  # ParseComplete
         buf.write_int16(0)  # no headers
@@ -870,10 +1054,51 @@ cdef class EdgeConnection:
         buf.write_bytes(query_unit.out_type_id)
         buf.end_message()
 
-        self._last_anon_compiled = query_unit
+        if stmt_name:
+            self._prepared_stmts[stmt_name] = (
+                query_unit, self._get_prepared_stmt_version(),
+                eql, json_mode, expect_one, implicit_limit)
+        else:
+            self._last_anon_compiled = query_unit
 
         self.write(buf)
 
+    cdef _get_prepared_stmt_version(self):
+        # The version of the schema a statement is compiled against:
+        # dbver only changes once DDL is committed, the schema_seq of
+        # the connection covers DDL run in the current transaction
+        # and its rollback.
+        return (self.dbview.dbver, self.dbview.schema_seq)
+
+    async def _lookup_prepared_stmt(self, bytes stmt_name):
+        try:
+            (query_unit, version, eql, json_mode,
+                expect_one, implicit_limit) = self._prepared_stmts[stmt_name]
+        except KeyError:
+            raise errors.TypeSpecNotFoundError(
+                f'prepared statement {stmt_name.decode()!r} '
+                f'does not exist') from None
+
+        if version == self._get_prepared_stmt_version():
+            return query_unit
+
+        # The schema has changed since the statement was prepared;
+        # recompile it, which is cheap if another connection has
+        # already done so.
+        new_unit = await self._parse(
+            eql, json_mode, expect_one, implicit_limit, stmt_name)
+        if (new_unit.in_type_id != query_unit.in_type_id or
+                new_unit.out_type_id != query_unit.out_type_id):
+            del self._prepared_stmts[stmt_name]
+            raise errors.TypeSpecNotFoundError(
+                f'the types of prepared statement {stmt_name.decode()!r} '
+                f'have changed; it must be prepared again')
+
+        self._prepared_stmts[stmt_name] = (
+            new_unit, self._get_prepared_stmt_version(),
+            eql, json_mode, expect_one, implicit_limit)
+        return new_unit
+
     #############
 
     cdef WriteBuffer make_describe_msg(self, query_unit):
@@ -918,8 +1143,9 @@ cdef class EdgeConnection:
             stmt_name = self.buffer.read_len_prefixed_bytes()
 
             if stmt_name:
-                raise errors.UnsupportedFeatureError(
-                    'prepared statements are not yet supported')
+                query_unit = await self._lookup_prepared_stmt(stmt_name)
+                msg = self.make_describe_msg(query_unit)
+                self.write(msg)
             else:
                 if self._last_anon_compiled is None:
                     raise errors.TypeSpecNotFoundError(
@@ -975,8 +1201,7 @@ cdef class EdgeConnection:
             self.write(self.make_command_complete_msg(query_unit))
             return
 
-        bound_args_buf = self.recode_bind_args(
-            bind_args, query_unit.in_array_backend_tids)
+        bound_args_buf = self.recode_bind_args(bind_args, query_unit)
 
         process_sync = False
         if self.buffer.take_message_type(b'S'):
@@ -984,12 +1209,20 @@ cdef class EdgeConnection:
             # send it right away.
             process_sync = True
 
+        # The time spent waiting for the client to accept the result
+        # rows is accounted as forwarding, not execution.
+        self._drain_time = 0
+        started_at = time.monotonic()
+
         try:
             self.dbview.start(query_unit)
             try:
                 if query_unit.system_config:
                     await self._execute_system_config(query_unit)
                 else:
+                    if query_unit.reads_query_stats:
+                        await self._publish_query_stats()
+                        parse = True
                     await self.get_backend().pgcon.parse_execute(
                         parse,              # =parse
                         1,                  # =execute
@@ -999,6 +1232,9 @@ cdef class EdgeConnection:
                         process_sync,       # =send_sync
                         use_prep_stmt,      # =use_prep_stmt
                     )
+                    if (parse and not use_prep_stmt and
+                            query_unit is self._last_anon_compiled):
+                        self.remember_anon_stmt()
                     if query_unit.config_ops:
                         await self.dbview.apply_config_ops(
                             self.get_backend().pgcon,
@@ -1028,6 +1264,7 @@ cdef class EdgeConnection:
             else:
                 self.dbview.on_success(query_unit)
 
+            executed_at = time.monotonic()
             self.write(self.make_command_complete_msg(query_unit))
 
             if process_sync:
@@ -1041,6 +1278,15 @@ cdef class EdgeConnection:
             if process_sync:
                 self.buffer.finish_message()
 
+            finished_at = time.monotonic()
+            self.query_stats.record(
+                self.dbview.dbname, query_unit, None,
+                {
+                    'execute': executed_at - started_at - self._drain_time,
+                    'forward': finished_at - executed_at + self._drain_time,
+                },
+                call=True)
+
             if query_unit.new_types and self.dbview.in_tx():
                 await self._update_type_ids(query_unit)
 
@@ -1068,7 +1314,7 @@ cdef class EdgeConnection:
                     if backend_tid is not None:
                         typemap[tid.decode()] = int(backend_tid.decode())
             if typemap:
-                return await self.get_backend().compiler.call(
+                return await self.get_backend().call_compiler(
                     'update_type_ids',
                     self.dbview.txid,
                     typemap)
@@ -1088,16 +1334,32 @@ cdef class EdgeConnection:
             self.debug_print('EXECUTE')
 
         if stmt_name:
-            raise errors.UnsupportedFeatureError(
-                'prepared statements are not yet supported')
-        else:
-            if self._last_anon_compiled is None:
-                raise errors.BinaryProtocolError(
-                    'no prepared anonymous statement found')
+            await self._execute_prepared(stmt_name, bind_args)
+            return
 
-            query_unit = self._last_anon_compiled
+        if self._last_anon_compiled is None:
+            raise errors.BinaryProtocolError(
+                'no prepared anonymous statement found')
+
+        query_unit = self._last_anon_compiled
 
-        await self._execute(query_unit, bind_args, False, False)
+        # If the backend connection has changed since the "Parse"
+        # message, or the statement has been replaced on it, the
+        # statement has to be parsed again.
+        parse = not self.anon_stmt_parsed()
+
+        await self._execute(query_unit, bind_args, parse, False)
+
+    async def _execute_prepared(self, bytes stmt_name, bytes bind_args):
+        query_unit = await self._lookup_prepared_stmt(stmt_name)
+
+        # Single-statement queries map onto named prepared statements
+        # of the backend connection (keyed by the SQL hash and tracked
+        # by its prep_stmts cache), so after the first execution on a
+        # backend connection only Bind/Execute are sent.  Other queries
+        # are parsed anew every time.
+        await self._execute(
+            query_unit, bind_args, True, bool(query_unit.sql_hash))
 
     async def optimistic_execute(self):
         cdef:
@@ -1133,9 +1395,15 @@ cdef class EdgeConnection:
         if not query:
             raise errors.BinaryProtocolError('empty query')
 
+        started_at = time.monotonic()
         query_unit = self.dbview.lookup_compiled_query(
             query, json_mode, expect_one, implicit_limit)
-        if query_unit is None:
+        if query_unit is not None:
+            self.query_stats.record(
+                self.dbview.dbname, query_unit, query,
+                {'cache_lookup': time.monotonic() - started_at},
+                cache_hit=True)
+        else:
             if self.debug:
                 self.debug_print('OPTIMISTIC EXECUTE /REPARSE', query)
 
@@ -1168,16 +1436,122 @@ cdef class EdgeConnection:
         await self._execute(
             query_unit, bind_args, True, bool(query_unit.sql_hash))
 
+    async def batch_execute(self):
+        cdef:
+            int32_t nargs
+            int32_t i
+            list bind_data
+            bint process_sync
+            WriteBuffer msg
+
+        self.reject_headers()
+        stmt_name = self.buffer.read_len_prefixed_bytes()
+        nargs = self.buffer.read_int32()
+        if nargs < 0:
+            raise errors.BinaryProtocolError(
+                f'invalid number of argument sets: {nargs}')
+        bind_args = []
+        for i in range(nargs):
+            bind_args.append(self.buffer.read_len_prefixed_bytes())
+        self.buffer.finish_message()
+
+        if self.debug:
+            self.debug_print('BATCH EXECUTE', nargs)
+
+        if stmt_name:
+            query_unit = await self._lookup_prepared_stmt(stmt_name)
+            parse = True
+            use_prep_stmt = bool(query_unit.sql_hash)
+        else:
+            if self._last_anon_compiled is None:
+                raise errors.BinaryProtocolError(
+                    'no prepared anonymous statement found')
+            query_unit = self._last_anon_compiled
+            parse = not self.anon_stmt_parsed()
+            use_prep_stmt = False
+
+        # Queries that change the state of the session or of the
+        # transaction are not cacheable; none of them can be batched.
+        if not query_unit.cacheable or len(query_unit.sql) != 1:
+            raise errors.BinaryProtocolError(
+                'only single-statement queries that do not change the '
+                'session or transaction state can be executed in a batch')
+
+        if self.dbview.in_tx_error():
+            self.dbview.raise_in_tx_error()
+
+        bind_data = []
+        for args in bind_args:
+            bind_data.append(self.recode_bind_args(args, query_unit))
+
+        process_sync = False
+        if self.buffer.take_message_type(b'S'):
+            # A "Sync" message follows this "BatchExecute" message;
+            # send it right away.
+            process_sync = True
+
+        started_at = time.monotonic()
+
+        try:
+            self.dbview.start(query_unit)
+            try:
+                if query_unit.reads_query_stats:
+                    await self._publish_query_stats()
+                    parse = True
+                rows = await self.get_backend().pgcon.parse_execute_batch(
+                    parse,              # =parse
+                    query_unit,         # =query
+                    self,               # =edgecon
+                    bind_data,          # =bind_data
+                    process_sync,       # =send_sync
+                    use_prep_stmt,      # =use_prep_stmt
+                )
+                if (parse and not use_prep_stmt and
+                        query_unit is self._last_anon_compiled):
+                    self.remember_anon_stmt()
+            except ConnectionAbortedError:
+                raise
+            except Exception:
+                # The backend connection is always synced after
+                # a failed batch; see PGProto.parse_execute_batch().
+                self.dbview.on_error(query_unit)
+                raise
+            else:
+                self.dbview.on_success(query_unit)
+                self.query_stats.record(
+                    self.dbview.dbname, query_unit, None,
+                    {'execute': time.monotonic() - started_at},
+                    call=True)
+
+            msg = WriteBuffer.new_message(b'C')
+            msg.write_int16(0)  # no headers
+            msg.write_len_prefixed_bytes(
+                b'%b %d' % (query_unit.status, rows))
+            self.write(msg.end_message())
+
+            if process_sync:
+                self.write(self.pgcon_last_sync_status())
+                self.flush()
+        except Exception:
+            if process_sync:
+                self.buffer.put_message()
+            raise
+        else:
+            if process_sync:
+                self.buffer.finish_message()
+
     async def sync(self):
         self.buffer.consume_message()
 
-        await self.get_backend().pgcon.sync()
+        backend = self.get_backend()
+        if backend.has_pgcon():
+            await backend.pgcon.sync()
         self.write(self.pgcon_last_sync_status())
 
-        if self.debug:
+        if self.debug and backend.has_pgcon():
             self.debug_print(
                 'SYNC',
-                (<pgcon.PGProto>(self.get_backend().pgcon)).xact_status,
+                (<pgcon.PGProto>(backend.pgcon)).xact_status,
             )
 
         self.flush()
@@ -1228,19 +1602,27 @@ cdef class EdgeConnection:
 
                 try:
                     if mtype == b'P':
+                        await self.lease_pgcon()
                         await self.parse()
 
                     elif mtype == b'D':
                         await self.describe()
 
                     elif mtype == b'E':
+                        await self.lease_pgcon()
                         await self.execute()
 
                     elif mtype == b'O':
+                        await self.lease_pgcon()
                         await self.optimistic_execute()
 
+                    elif mtype == b'B':
+                        await self.lease_pgcon()
+                        await self.batch_execute()
+
                     elif mtype == b'Q':
                         flush_sync_on_error = True
+                        await self.lease_pgcon()
                         await self.simple_query()
 
                     elif mtype == b'S':
@@ -1260,6 +1642,12 @@ cdef class EdgeConnection:
                         flush_on_error = True
                         await self.restore()
 
+                    elif mtype == b'I':
+                        # Same as with the restore protocol.
+                        flush_on_error = True
+                        await self.lease_pgcon()
+                        await self.bulk_insert()
+
                     else:
                         self.fallthrough(False)
 
@@ -1302,6 +1690,15 @@ cdef class EdgeConnection:
                 else:
                     self.buffer.finish_message()
 
+                finally:
+                    if (self._backend is not None and
+                            not self.dbview.in_tx()):
+                        # Return the compiler worker and the backend
+                        # connection to the shared pools as soon as
+                        # the transaction is over.
+                        self._backend.unpin_compiler()
+                        self.release_pgcon()
+
         except asyncio.CancelledError:
             # Happens when the connection is aborted, the backend is
             # being closed and propagates CancelledError to all
@@ -1423,13 +1820,14 @@ cdef class EdgeConnection:
 
     async def _interpret_backend_error(self, exc):
         if self.dbview.in_tx():
-            return await self.get_backend().compiler.call(
+            return await self.get_backend().call_compiler(
                 'interpret_backend_error_in_tx',
                 self.dbview.txid,
                 exc.fields)
         else:
-            return await self.get_backend().compiler.call(
+            return await self.get_backend().call_compiler(
                 'interpret_backend_error',
+                self.dbview.dbname,
                 self.dbview.dbver,
                 exc.fields)
 
@@ -1456,8 +1854,14 @@ cdef class EdgeConnection:
             pgcon.PGTransactionStatus xact_status
             WriteBuffer buf
 
-        xact_status = <pgcon.PGTransactionStatus>(
-            (<pgcon.PGProto>self.get_backend().pgcon).xact_status)
+        backend = self.get_backend()
+        if backend.has_pgcon():
+            xact_status = <pgcon.PGTransactionStatus>(
+                (<pgcon.PGProto>backend.pgcon).xact_status)
+        else:
+            # No backend connection is leased, which only happens
+            # outside of transactions.
+            xact_status = pgcon.PQTRANS_IDLE
 
         buf = WriteBuffer.new_message(b'Z')
         buf.write_int16(0)  # no headers
@@ -1493,7 +1897,7 @@ cdef class EdgeConnection:
             raise errors.BinaryProtocolError(
                 f'unexpected message type {chr(mtype)!r}')
 
-    cdef WriteBuffer recode_bind_args(self, bytes bind_args, dict array_tids):
+    cdef WriteBuffer recode_bind_args(self, bytes bind_args, query_unit):
         cdef:
             FRBuffer in_buf
             WriteBuffer out_buf = WriteBuffer.new()
@@ -1502,6 +1906,8 @@ cdef class EdgeConnection:
             ssize_t i
             const char *data
             object array_tid
+            dict array_tids = query_unit.in_array_backend_tids
+            bytes literal_args_data = query_unit.literal_args_data
 
         assert cpython.PyBytes_CheckExact(bind_args)
         frb_init(
@@ -1515,7 +1921,13 @@ cdef class EdgeConnection:
         # number of elements in the tuple
         argsnum = hton.unpack_int32(frb_read(&in_buf, 4))
 
-        out_buf.write_int16(<int16_t>argsnum)
+        # The literals of the query compiled as parameters, if any,
+        # follow the arguments.
+        if literal_args_data:
+            out_buf.write_int16(
+                <int16_t>(argsnum + len(query_unit.literal_args)))
+        else:
+            out_buf.write_int16(<int16_t>argsnum)
 
         if array_tids:
             # we have array parameters, ensure all of them
@@ -1537,6 +1949,9 @@ cdef class EdgeConnection:
             in_len = frb_get_len(&in_buf)
             out_buf.write_cstr(frb_read_all(&in_buf), in_len)
 
+        if literal_args_data:
+            out_buf.write_bytes(literal_args_data)
+
         # All columns are in binary format
         out_buf.write_int32(0x00010001)
         return out_buf
@@ -1600,11 +2015,38 @@ cdef class EdgeConnection:
             True
         )
 
+    cdef int _parse_dump_jobs(self, v: bytes) except -1:
+        try:
+            jobs = int(v.decode())
+        except ValueError:
+            raise errors.BinaryProtocolError(
+                f'invalid number of dump jobs: {v!r}') from None
+        if jobs < 1:
+            raise errors.BinaryProtocolError(
+                f'number of dump jobs must be positive, got {jobs}')
+        return min(jobs, DUMP_MAX_JOBS)
+
     async def dump(self):
         cdef:
             WriteBuffer msg_buf
+            dict headers
+            int jobs = 1
+            bytes codec = None
 
-        self.reject_headers()
+        headers = self.parse_headers()
+        if headers:
+            for k, v in headers.items():
+                if k == DUMP_OPT_JOBS:
+                    jobs = self._parse_dump_jobs(v)
+                elif k == DUMP_OPT_COMPRESSION:
+                    if v not in DUMP_COMPRESSION_CODECS:
+                        raise errors.BinaryProtocolError(
+                            f'unsupported dump compression: {v!r}')
+                    codec = v
+                else:
+                    raise errors.BinaryProtocolError(
+                        f'unexpected message header: {k}'
+                    )
         self.buffer.finish_message()
 
         if self.dbview.txid:
@@ -1614,6 +2056,7 @@ cdef class EdgeConnection:
 
         dbname = self.dbview.dbname
         pgcon = await self.port.new_pgcon(dbname)
+        workers = [pgcon]
 
         # To avoid having races, we want to:
         #
@@ -1622,8 +2065,8 @@ cdef class EdgeConnection:
         #   2. in the compiler process we connect to that transaction
         #      and re-introspect the schema in it.
         #
-        #   3. all dump worker pg connection would work on the same
-        #      connection.
+        #   3. all dump worker pg connections join the same
+        #      transaction snapshot.
         #
         # This guarantees that every pg connection and the compiler work
         # with the same DB state.
@@ -1642,20 +2085,25 @@ cdef class EdgeConnection:
             tx_snapshot_id = tx_snapshot_id[0][0].decode()
 
             schema_ddl, schema_ids, blocks = \
-                await self.get_backend().compiler.call(
+                await self.get_backend().call_compiler(
                     'describe_database_dump',
+                    dbname,
                     tx_snapshot_id,
                 )
 
             msg_buf = WriteBuffer.new_message(b'@')
 
-            msg_buf.write_int16(3)  # number of headers
+            # number of headers
+            msg_buf.write_int16(3 if codec is None else 4)
             msg_buf.write_int16(DUMP_HEADER_BLOCK_TYPE)
             msg_buf.write_len_prefixed_bytes(DUMP_HEADER_BLOCK_TYPE_INFO)
             msg_buf.write_int16(DUMP_HEADER_SERVER_VER)
             msg_buf.write_len_prefixed_utf8(str(buildmeta.get_version()))
             msg_buf.write_int16(DUMP_HEADER_SERVER_TIME)
             msg_buf.write_len_prefixed_utf8(str(int(time.time())))
+            if codec is not None:
+                msg_buf.write_int16(DUMP_HEADER_COMPRESSION)
+                msg_buf.write_len_prefixed_bytes(codec)
 
             msg_buf.write_int16(PROTO_VER_MAJOR)
             msg_buf.write_int16(PROTO_VER_MINOR)
@@ -1682,48 +2130,60 @@ cdef class EdgeConnection:
             self._transport.write(msg_buf.end_message())
             self.flush()
 
+            # Every block is dumped in its entirety by a single worker,
+            # so the fragments of a block are always sent in order,
+            # although fragments of different blocks may interleave.
+            # The restore side re-associates them by DUMP_HEADER_BLOCK_ID.
+            jobs = max(min(jobs, len(blocks)), 1)
+            for _ in range(jobs - 1):
+                worker_pgcon = await self.port.new_pgcon(dbname)
+                workers.append(worker_pgcon)
+                await self._init_dump_pgcon(
+                    worker_pgcon, tx_snapshot_id, True)
+
             blocks_queue = collections.deque(blocks)
-            output_queue = asyncio.Queue(maxsize=2)
+            output_queue = asyncio.Queue(maxsize=2 * jobs)
 
             async with taskgroup.TaskGroup() as g:
-                g.create_task(pgcon.dump(
-                    blocks_queue,
-                    output_queue,
-                    DUMP_BLOCK_SIZE,
-                ))
+                for worker_pgcon in workers:
+                    g.create_task(worker_pgcon.dump(
+                        blocks_queue,
+                        output_queue,
+                        DUMP_BLOCK_SIZE,
+                    ))
+
+                if codec is None:
+                    compress = None
+                    max_pending = 1
+                else:
+                    compress = DUMP_COMPRESSION_CODECS[codec][0]
+                    # Compress up to `jobs` fragments in threads at once
+                    # while still sending them in the order received.
+                    max_pending = jobs
 
+                pending = collections.deque()
                 nstops = 0
                 while True:
                     out = await output_queue.get()
                     if out is None:
                         nstops += 1
-                        if nstops == 1:
-                            # we only have one worker right now
+                        if nstops == len(workers):
                             break
                     else:
                         block, block_num, data = out
+                        if compress is not None:
+                            data = self.loop.run_in_executor(
+                                None, compress, data)
+                        pending.append((block, block_num, data))
+                        if len(pending) >= max_pending:
+                            await self._write_dump_block(*pending.popleft())
 
-                        msg_buf = WriteBuffer.new_message(b'=')
-                        msg_buf.write_int16(4)  # number of headers
-
-                        msg_buf.write_int16(DUMP_HEADER_BLOCK_TYPE)
-                        msg_buf.write_len_prefixed_bytes(
-                            DUMP_HEADER_BLOCK_TYPE_DATA)
-                        msg_buf.write_int16(DUMP_HEADER_BLOCK_ID)
-                        msg_buf.write_len_prefixed_bytes(
-                            block.schema_object_id.bytes)
-                        msg_buf.write_int16(DUMP_HEADER_BLOCK_NUM)
-                        msg_buf.write_len_prefixed_bytes(
-                            str(block_num).encode())
-                        msg_buf.write_int16(DUMP_HEADER_BLOCK_DATA)
-                        msg_buf.write_len_prefixed_buffer(data)
-
-                        self._transport.write(msg_buf.end_message())
-                        if self._write_waiter:
-                            await self._write_waiter
+                while pending:
+                    await self._write_dump_block(*pending.popleft())
 
         finally:
-            pgcon.terminate()
+            for worker_pgcon in workers:
+                worker_pgcon.terminate()
 
         msg_buf = WriteBuffer.new_message(b'C')
         msg_buf.write_int16(0)  # no headers
@@ -1731,10 +2191,33 @@ cdef class EdgeConnection:
         self.write(msg_buf.end_message())
         self.flush()
 
+    async def _write_dump_block(self, block, block_num, data):
+        cdef:
+            WriteBuffer msg_buf
+
+        msg_buf = WriteBuffer.new_message(b'=')
+        msg_buf.write_int16(4)  # number of headers
+
+        msg_buf.write_int16(DUMP_HEADER_BLOCK_TYPE)
+        msg_buf.write_len_prefixed_bytes(DUMP_HEADER_BLOCK_TYPE_DATA)
+        msg_buf.write_int16(DUMP_HEADER_BLOCK_ID)
+        msg_buf.write_len_prefixed_bytes(block.schema_object_id.bytes)
+        msg_buf.write_int16(DUMP_HEADER_BLOCK_NUM)
+        msg_buf.write_len_prefixed_bytes(str(block_num).encode())
+        msg_buf.write_int16(DUMP_HEADER_BLOCK_DATA)
+        if isinstance(data, WriteBuffer):
+            msg_buf.write_len_prefixed_buffer(data)
+        else:
+            # A compressed fragment.
+            msg_buf.write_len_prefixed_bytes(await data)
+
+        self._transport.write(msg_buf.end_message())
+        if self._write_waiter:
+            await self._write_waiter
+
     async def restore(self):
         cdef:
             WriteBuffer msg_buf
-            char mtype
 
         if self.dbview.txid:
             raise errors.ProtocolError(
@@ -1742,15 +2225,26 @@ cdef class EdgeConnection:
             )
 
         self.reject_headers()
-        self.buffer.read_int16()  # discard -j level
+        jobs = self.buffer.read_int16()  # -j level
+        if jobs < 1:
+            raise errors.BinaryProtocolError(
+                f'number of restore jobs must be positive, got {jobs}')
+        jobs = min(jobs, DUMP_MAX_JOBS)
 
         # Now parse the embedded dump header message:
 
-        # Ignore headers
+        decompress = None
         headers_num = self.buffer.read_int16()
         for _ in range(headers_num):
-            self.buffer.read_int16()
-            self.buffer.read_len_prefixed_bytes()
+            header = self.buffer.read_int16()
+            value = self.buffer.read_len_prefixed_bytes()
+            if header == DUMP_HEADER_COMPRESSION:
+                try:
+                    decompress = DUMP_COMPRESSION_CODECS[value][1]
+                except KeyError:
+                    raise errors.ProtocolError(
+                        f'unsupported dump compression: {value!r}'
+                    ) from None
 
         proto_major = self.buffer.read_int16()
         proto_minor = self.buffer.read_int16()
@@ -1783,6 +2277,8 @@ cdef class EdgeConnection:
         self.buffer.finish_message()
         dbname = self.dbview.dbname
         pgcon = await self.port.new_pgcon(dbname)
+        workers = [pgcon]
+        schema_committed = False
 
         try:
             await pgcon.simple_query(
@@ -1796,8 +2292,9 @@ cdef class EdgeConnection:
             tx_snapshot_id = tx_snapshot_id[0][0].decode()
 
             schema_sql_units, restore_blocks, tables = \
-                await self.get_backend().compiler.call(
+                await self.get_backend().call_compiler(
                     'describe_database_restore',
+                    dbname,
                     tx_snapshot_id,
                     schema_ddl,
                     schema_ids,
@@ -1833,15 +2330,136 @@ cdef class EdgeConnection:
                     f'ALTER TABLE {table} ENABLE TRIGGER ALL;'
                 )
 
+            # Indexes are built after all data is loaded rather than
+            # maintained for every restored row.
+            post_data = await self._defer_restore_indexes(pgcon, tables)
+
             await pgcon.simple_query(
                 disable_trigger_q.encode(),
                 True
             )
 
+            jobs = max(min(jobs, len(restore_blocks)), 1)
+            if jobs > 1:
+                # Other backend connections can only load the data
+                # once they can see the restored schema, so the restore
+                # is not atomic in this mode.
+                await pgcon.simple_query(b'COMMIT;', True)
+                schema_committed = True
+                for _ in range(jobs - 1):
+                    workers.append(await self.port.new_pgcon(dbname))
+
             # Send "RestoreReadyMessage"
             msg = WriteBuffer.new_message(b'+')
             msg.write_int16(0)  # no headers
-            msg.write_int16(1)  # -j1
+            msg.write_int16(jobs)
+            self.write(msg.end_message())
+            self.flush()
+
+            input_queue = asyncio.Queue(maxsize=2 * jobs)
+            async with taskgroup.TaskGroup() as g:
+                for worker_pgcon in workers:
+                    g.create_task(
+                        self._restore_blocks(
+                            worker_pgcon, input_queue, decompress))
+
+                await self._read_restore_blocks(restore_blocks, input_queue)
+
+                for _ in workers:
+                    await input_queue.put(None)
+
+            if jobs > 1:
+                post_data_queue = collections.deque(post_data)
+                async with taskgroup.TaskGroup() as g:
+                    for worker_pgcon in workers:
+                        g.create_task(
+                            self._restore_post_data(
+                                worker_pgcon, post_data_queue))
+
+                await pgcon.simple_query(enable_trigger_q.encode(), True)
+            else:
+                for stmt in post_data:
+                    await pgcon.simple_query(stmt, True)
+
+                await pgcon.simple_query(
+                    enable_trigger_q.encode() + b'COMMIT;',
+                    True
+                )
+
+        except BaseException:
+            if schema_committed:
+                # The restored schema, and possibly some of the data,
+                # has already been committed: bring back the triggers,
+                # indexes and constraints, so that the database is at
+                # least consistent.
+                for worker_pgcon in workers:
+                    worker_pgcon.terminate()
+                await self._recover_failed_restore(
+                    dbname, enable_trigger_q, post_data)
+            raise
+
+        finally:
+            for worker_pgcon in workers:
+                worker_pgcon.terminate()
+
+        msg = WriteBuffer.new_message(b'C')
+        msg.write_int16(0)  # no headers
+        msg.write_len_prefixed_bytes(b'RESTORE')
+        self.write(msg.end_message())
+        self.flush()
+
+    async def bulk_insert(self):
+        cdef:
+            int16_t nfields
+            int32_t nrows
+            WriteBuffer msg
+            WriteBuffer obj_buf
+            WriteBuffer ids_buf
+            WriteBuffer link_buf
+            char mtype
+
+        if self.dbview.in_tx():
+            raise errors.ProtocolError(
+                'BULK INSERT must not be executed while in transaction'
+            )
+
+        self.reject_headers()
+        type_name = self.buffer.read_len_prefixed_utf8()
+        nfields = self.buffer.read_int16()
+        field_names = []
+        for _ in range(nfields):
+            field_names.append(self.buffer.read_len_prefixed_utf8())
+        self.buffer.finish_message()
+
+        if self.debug:
+            self.debug_print('BULK INSERT', type_name, field_names)
+
+        desc = await self.get_backend().call_compiler(
+            'describe_bulk_insert',
+            self.dbview.dbname,
+            self.dbview.dbver,
+            self.dbview.modaliases,
+            type_name,
+            field_names,
+        )
+
+        pgcon = self.get_backend().pgcon
+        total = 0
+
+        await pgcon.simple_query(b'START TRANSACTION;', True)
+        try:
+            if desc.checks:
+                # The ids of the inserted objects, for the checks.
+                await pgcon.simple_query(BULK_INSERT_IDS_QUERY, True)
+
+            # Describe the input data to the client.
+            msg = WriteBuffer.new_message(b'T')
+            msg.write_int16(0)  # no headers
+            msg.write_byte(b'n')
+            msg.write_bytes(desc.type_desc_id.bytes)
+            msg.write_len_prefixed_bytes(desc.type_desc)
+            msg.write_bytes(ZERO_UUID)
+            msg.write_len_prefixed_bytes(b'')
             self.write(msg.end_message())
             self.flush()
 
@@ -1851,32 +2469,34 @@ cdef class EdgeConnection:
                 mtype = self.buffer.get_message_type()
 
                 if mtype == b'=':
-                    block_type = None
-                    block_id = None
-                    block_num = None
-                    block_data = None
-
-                    num_headers = self.buffer.read_int16()
-                    for _ in range(num_headers):
-                        header = self.buffer.read_int16()
-                        if header == DUMP_HEADER_BLOCK_TYPE:
-                            block_type = self.buffer.read_len_prefixed_bytes()
-                        elif header == DUMP_HEADER_BLOCK_ID:
-                            block_id = self.buffer.read_len_prefixed_bytes()
-                            block_id = pg_UUID(block_id)
-                        elif header == DUMP_HEADER_BLOCK_NUM:
-                            block_num = self.buffer.read_len_prefixed_bytes()
-                        elif header == DUMP_HEADER_BLOCK_DATA:
-                            block_data = self.buffer.read_len_prefixed_bytes()
-
+                    self.reject_headers()
+                    nrows = self.buffer.read_int32()
+                    rows = []
+                    for _ in range(nrows):
+                        rows.append(self.buffer.read_len_prefixed_bytes())
                     self.buffer.finish_message()
 
-                    if (block_type is None or block_id is None
-                            or block_num is None or block_data is None):
-                        raise errors.ProtocolError('incomplete data block')
-
-                    await pgcon.restore(
-                        restore_blocks[block_id], block_data)
+                    if not rows:
+                        continue
+
+                    # Every data block is loaded with its own set of
+                    # COPY commands, so that the rows don't have to be
+                    # accumulated in memory.
+                    obj_buf = WriteBuffer.new()
+                    ids_buf = WriteBuffer.new()
+                    link_bufs = [WriteBuffer.new()
+                                 for _ in desc.link_copy_stmts]
+                    self.encode_bulk_insert_rows(
+                        desc, rows, obj_buf, link_bufs, ids_buf)
+
+                    total += await pgcon.copy_in(
+                        desc.object_copy_stmt, obj_buf)
+                    for stmt, link_buf in zip(desc.link_copy_stmts,
+                                              link_bufs):
+                        if link_buf.len():
+                            await pgcon.copy_in(stmt, link_buf)
+                    if desc.checks:
+                        await pgcon.copy_in(BULK_INSERT_IDS_COPY, ids_buf)
 
                 elif mtype == b'.':
                     self.buffer.finish_message()
@@ -1885,16 +2505,255 @@ cdef class EdgeConnection:
                 else:
                     self.fallthrough(False)
 
-            await pgcon.simple_query(
-                enable_trigger_q.encode() + b'COMMIT;',
-                True
-            )
+            # Constraints stored in the backend are enforced by COPY;
+            # the link targets are validated for all of the inserted
+            # objects at once.
+            for check_sql, check_msg in desc.checks:
+                if await pgcon.simple_query(check_sql, False):
+                    raise errors.IntegrityError(check_msg)
 
-        finally:
-            pgcon.terminate()
+            await pgcon.simple_query(b'COMMIT;', True)
+        except Exception:
+            try:
+                await pgcon.simple_query(b'ROLLBACK;', True)
+            except Exception:
+                # The backend connection is not idle and will be
+                # discarded when released.
+                pass
+            raise
 
         msg = WriteBuffer.new_message(b'C')
         msg.write_int16(0)  # no headers
-        msg.write_len_prefixed_bytes(b'RESTORE')
+        msg.write_len_prefixed_bytes(b'INSERT %d' % total)
         self.write(msg.end_message())
-        self.flush()
+
+    cdef encode_bulk_insert_rows(self, desc, list rows, WriteBuffer obj_buf,
+                                 list link_bufs, WriteBuffer ids_buf):
+        # Encode the rows sent by the client, tuples of the type
+        # described by desc.type_desc, as the binary COPY tuples of
+        # the object table, of the link tables and of the table of
+        # the inserted object ids.
+        cdef:
+            FRBuffer in_buf
+            FRBuffer arr_buf
+            int16_t ncols = 2
+            int32_t nfields = <int32_t>len(desc.fields)
+            int32_t in_len
+            int32_t elem_len
+            int32_t nelems
+            int32_t i
+            int32_t j
+            const char *data
+            const char *elem
+            WriteBuffer link_buf
+
+        for field in desc.fields:
+            if field.inline:
+                ncols += 1
+
+        type_id = desc.object_type_id
+
+        for row in rows:
+            frb_init(
+                &in_buf,
+                cpython.PyBytes_AS_STRING(row),
+                cpython.Py_SIZE(row))
+
+            if hton.unpack_int32(frb_read(&in_buf, 4)) != nfields:
+                raise errors.BinaryProtocolError(
+                    'unexpected number of fields in a bulk insert row')
+
+            obj_id = uuidgen.uuid1mc().bytes
+
+            obj_buf.write_int16(ncols)
+            obj_buf.write_int32(16)
+            obj_buf.write_bytes(obj_id)
+            obj_buf.write_int32(16)
+            obj_buf.write_bytes(type_id)
+
+            ids_buf.write_int16(1)
+            ids_buf.write_int32(16)
+            ids_buf.write_bytes(obj_id)
+
+            for i in range(nfields):
+                field = desc.fields[i]
+
+                frb_read(&in_buf, 4)  # reserved
+                in_len = hton.unpack_int32(frb_read(&in_buf, 4))
+                data = NULL
+                if in_len > 0:
+                    data = frb_read(&in_buf, in_len)
+
+                if in_len < 0 and field.required_msg is not None:
+                    raise errors.MissingRequiredError(field.required_msg)
+
+                if field.inline:
+                    obj_buf.write_int32(in_len)
+                    if in_len > 0:
+                        obj_buf.write_cstr(data, in_len)
+
+                if field.link_table < 0 or in_len < 0:
+                    continue
+
+                link_buf = link_bufs[field.link_table]
+
+                if not field.multi:
+                    link_buf.write_int16(3)
+                    link_buf.write_int32(16)
+                    link_buf.write_bytes(obj_id)
+                    link_buf.write_int32(in_len)
+                    if in_len > 0:
+                        link_buf.write_cstr(data, in_len)
+                    link_buf.write_int32(16)
+                    link_buf.write_bytes(field.ptr_item_id)
+                    continue
+
+                # A set of values is sent as an array; every element
+                # is a row of the link table.
+                if in_len == 0:
+                    raise errors.BinaryProtocolError(
+                        'invalid array value in a bulk insert row')
+                frb_init(&arr_buf, data, in_len)
+                if hton.unpack_int32(frb_read(&arr_buf, 4)) == 0:
+                    nelems = 0
+                else:
+                    frb_read(&arr_buf, 8)  # reserved
+                    nelems = hton.unpack_int32(frb_read(&arr_buf, 4))
+                    frb_read(&arr_buf, 4)  # lower bound
+                # An empty set is no value for the field.
+                if nelems == 0 and field.required_msg is not None:
+                    raise errors.MissingRequiredError(field.required_msg)
+                for j in range(nelems):
+                    elem_len = hton.unpack_int32(frb_read(&arr_buf, 4))
+                    if elem_len < 0:
+                        raise errors.BinaryProtocolError(
+                            'unexpected NULL element in a bulk insert row')
+                    elem = frb_read(&arr_buf, elem_len)
+
+                    link_buf.write_int16(3)
+                    link_buf.write_int32(16)
+                    link_buf.write_bytes(obj_id)
+                    link_buf.write_int32(elem_len)
+                    link_buf.write_cstr(elem, elem_len)
+                    link_buf.write_int32(16)
+                    link_buf.write_bytes(field.ptr_item_id)
+
+            if frb_get_len(&in_buf):
+                raise errors.BinaryProtocolError(
+                    'unexpected trailing data in a bulk insert row')
+
+    async def _read_restore_blocks(self, restore_blocks, input_queue):
+        cdef:
+            char mtype
+
+        while True:
+            if not self.buffer.take_message():
+                await self.wait_for_message()
+            mtype = self.buffer.get_message_type()
+
+            if mtype == b'=':
+                block_type = None
+                block_id = None
+                block_num = None
+                block_data = None
+
+                num_headers = self.buffer.read_int16()
+                for _ in range(num_headers):
+                    header = self.buffer.read_int16()
+                    if header == DUMP_HEADER_BLOCK_TYPE:
+                        block_type = self.buffer.read_len_prefixed_bytes()
+                    elif header == DUMP_HEADER_BLOCK_ID:
+                        block_id = self.buffer.read_len_prefixed_bytes()
+                        block_id = pg_UUID(block_id)
+                    elif header == DUMP_HEADER_BLOCK_NUM:
+                        block_num = self.buffer.read_len_prefixed_bytes()
+                    elif header == DUMP_HEADER_BLOCK_DATA:
+                        block_data = self.buffer.read_len_prefixed_bytes()
+
+                self.buffer.finish_message()
+
+                if (block_type is None or block_id is None
+                        or block_num is None or block_data is None):
+                    raise errors.ProtocolError('incomplete data block')
+
+                await input_queue.put(
+                    (restore_blocks[block_id], block_data))
+
+            elif mtype == b'.':
+                self.buffer.finish_message()
+                break
+
+            else:
+                self.fallthrough(False)
+
+    async def _restore_blocks(self, pgcon, input_queue, decompress):
+        # Every fragment of a data block is a self-contained COPY,
+        # so fragments can be loaded by any worker in any order.
+        while True:
+            block = await input_queue.get()
+            if block is None:
+                return
+            sql, data = block
+            if decompress is not None:
+                data = await self.loop.run_in_executor(
+                    None, decompress, data)
+            await pgcon.restore(sql, data)
+
+    async def _restore_post_data(self, pgcon, post_data_queue):
+        while True:
+            try:
+                stmt = post_data_queue.popleft()
+            except IndexError:
+                return
+            await pgcon.simple_query(stmt, True)
+
+    async def _recover_failed_restore(self, dbname, enable_trigger_q,
+                                      post_data):
+        try:
+            pgcon = await self.port.new_pgcon(dbname)
+        except Exception:
+            logger.exception(
+                'could not recover the database %s after a failed restore',
+                dbname)
+            return
+
+        try:
+            await pgcon.simple_query(enable_trigger_q.encode(), True)
+            for stmt in post_data:
+                try:
+                    await pgcon.simple_query(stmt, True)
+                except Exception:
+                    # Some of the indexes might have been built
+                    # before the restore failed.
+                    logger.debug(
+                        'could not re-create an index after a failed '
+                        'restore: %s', stmt, exc_info=True)
+        except Exception:
+            logger.exception(
+                'could not recover the database %s after a failed restore',
+                dbname)
+        finally:
+            pgcon.terminate()
+
+    async def _defer_restore_indexes(self, pgcon, tables):
+        # Drop the indexes of the restored tables (including those
+        # backing unique and exclusion constraints) and return the
+        # statements re-creating them along with their comments.
+        # Indexes referenced by foreign keys are left alone.
+        if not tables:
+            return []
+
+        tables_arr = ', '.join(pg_common.quote_literal(t) for t in tables)
+        rows = await pgcon.simple_query(
+            RESTORE_DEFERRED_INDEXES_QUERY.format(
+                tables=tables_arr).encode(),
+            False
+        )
+        if not rows:
+            return []
+
+        await pgcon.simple_query(
+            b';'.join(drop for drop, _ in rows),
+            True
+        )
+        return [create for _, create in rows]
@@ -27,9 +27,16 @@ import os.path
 import stat
 import weakref
 
+import immutables
+
+from edb import errors
 from edb.common import taskgroup
+from edb.pgsql import common as pg_common
 from edb.server import baseport
 from edb.server import compiler
+from edb.server import config
+from edb.server import defines
+from edb.server import procpool
 
 from . import edgecon
 
@@ -37,23 +44,152 @@ from . import edgecon
 logger = logging.getLogger('edb.server')
 
 
+DEFAULT_SESSION_STATE = (
+    immutables.Map({None: defines.DEFAULT_MODULE_ALIAS}),
+    immutables.Map(),
+)
+
+
 class Backend:
 
-    def __init__(self, pgcon, compiler):
-        self._pgcon = pgcon
-        self._compiler = compiler
+    def __init__(self, pgcon_pool, compiler_pool, dbname):
+        self._pgcon_pool = pgcon_pool
+        self._compiler_pool = compiler_pool
+        self._dbname = dbname
+        # A backend connection is leased from the server-wide pool
+        # only for the duration of a query or of a transaction.
+        self._pgcon = None
+        # A compiler worker is pinned to the connection only while
+        # it holds the connection's transaction state.
+        self._pinned_compiler = None
+        # Set when the pinned worker has exited: the transaction
+        # state is lost and the transaction can only be rolled back.
+        self._pinned_compiler_lost = False
 
     @property
     def pgcon(self):
+        if self._pgcon is None:
+            raise RuntimeError('no backend connection is leased')
         return self._pgcon
 
+    def has_pgcon(self):
+        return self._pgcon is not None
+
+    async def acquire_pgcon(self, modaliases, session_config):
+        if self._pgcon is not None:
+            return self._pgcon
+
+        pgcon = await self._pgcon_pool.acquire(self._dbname)
+        try:
+            state = pgcon.get_session_state() or DEFAULT_SESSION_STATE
+            if state != (modaliases, session_config):
+                await pgcon.simple_query(
+                    self._restore_session_state_sql(
+                        modaliases, session_config),
+                    ignore_data=True)
+                pgcon.set_session_state((modaliases, session_config))
+        except BaseException:
+            self._pgcon_pool.release(self._dbname, pgcon, discard=True)
+            raise
+
+        self._pgcon = pgcon
+        return pgcon
+
+    def release_pgcon(self, modaliases, session_config):
+        if self._pgcon is None:
+            return
+        pgcon = self._pgcon
+        self._pgcon = None
+        pgcon.set_session_state((modaliases, session_config))
+        self._pgcon_pool.release(self._dbname, pgcon)
+
+    def _restore_session_state_sql(self, modaliases, session_config):
+        values = []
+        for alias, module in modaliases.items():
+            values.append(
+                f"({pg_common.quote_literal(alias or '')}, "
+                f"{pg_common.quote_literal(module)}, 'A')")
+
+        settings = config.get_settings()
+        for name, value in session_config.items():
+            jsval = config.value_to_json(settings[name], value)
+            values.append(
+                f"({pg_common.quote_literal(name)}, "
+                f"{pg_common.quote_literal(jsval)}, 'C')")
+
+        sql = 'DELETE FROM _edgecon_state;'
+        if values:
+            sql += (
+                f'INSERT INTO _edgecon_state(name, value, type) '
+                f'VALUES {", ".join(values)};'
+            )
+        return sql.encode()
+
     @property
-    def compiler(self):
-        return self._compiler
+    def compiler_pool(self):
+        return self._compiler_pool
+
+    def _raise_compiler_lost(self) -> NoReturn:
+        raise errors.TransactionError(
+            'the compiler process holding the state of the current '
+            'transaction has exited; the transaction has to be '
+            'rolled back')
+
+    def _raise_compiler_timeout(self) -> NoReturn:
+        raise errors.QueryTimeoutError(
+            f'could not get a compiler process in '
+            f'{defines.COMPILER_POOL_ACQUIRE_TIMEOUT} seconds: all '
+            f'{self._compiler_pool.pool_size} of them are busy')
+
+    async def call_compiler(self, method_name, *args):
+        if self._pinned_compiler_lost and (
+                method_name != 'try_compile_rollback'):
+            self._raise_compiler_lost()
+
+        if self._pinned_compiler is not None:
+            try:
+                return await self._compiler_pool.call_on(
+                    self._pinned_compiler, method_name, *args)
+            except procpool.WorkerLostError:
+                # The pool replaces the worker when it is released.
+                self.unpin_compiler()
+                self._pinned_compiler_lost = True
+                self._raise_compiler_lost()
+
+        try:
+            return await self._compiler_pool.call(method_name, *args)
+        except procpool.PoolTimeoutError:
+            self._raise_compiler_timeout()
+
+    def _raise_compiler_pin_timeout(self) -> NoReturn:
+        raise errors.QueryTimeoutError(
+            f'could not get a compiler process for the transaction in '
+            f'{defines.COMPILER_POOL_ACQUIRE_TIMEOUT} seconds: all '
+            f'{self._compiler_pool.max_held} of them that transactions '
+            f'can use are held by open transactions')
+
+    async def pin_compiler(self):
+        if self._pinned_compiler is None:
+            try:
+                self._pinned_compiler = await self._compiler_pool.acquire(
+                    hold=True)
+            except procpool.PoolTimeoutError:
+                self._raise_compiler_pin_timeout()
+
+    def unpin_compiler(self):
+        # Called when the transaction is over.
+        self._pinned_compiler_lost = False
+        if self._pinned_compiler is not None:
+            worker = self._pinned_compiler
+            self._pinned_compiler = None
+            self._compiler_pool.release(worker)
 
     async def close(self):
-        self._pgcon.terminate()
-        await self._compiler.close()
+        if self._pgcon is not None:
+            pgcon = self._pgcon
+            self._pgcon = None
+            self._pgcon_pool.release(self._dbname, pgcon, discard=True)
+        self.unpin_compiler()
 
 
 class ManagementPort(baseport.Port):
@@ -86,20 +222,16 @@ class ManagementPort(baseport.Port):
     def get_compiler_worker_name(self):
         return 'compiler-mng'
 
-    async def new_backend(self, *, dbname: str, dbver: int):
-        try:
-            async with taskgroup.TaskGroup() as g:
-                new_pgcon_task = g.create_task(self.new_pgcon(dbname))
-                compiler_task = g.create_task(self.new_compiler(dbname, dbver))
-        except taskgroup.MultiError as ex:
-            # Errors like "database ??? does not exist" should
-            # not be obfuscated by a MultiError.
-            raise ex.__errors__[0]
+    def get_compiler_pool_size(self):
+        # The CPUs are shared by the processes of a multi-process
+        # server.
+        cpus = (os.cpu_count() or 1) // self.get_server().get_worker_count()
+        return max(cpus, defines.COMPILER_POOL_MIN_SIZE)
 
+    async def new_backend(self, *, dbname: str, dbver: int):
+        server = self.get_server()
         backend = Backend(
-            new_pgcon_task.result(),
-            compiler_task.result())
-
+            server.get_pgcon_pool(), self._compiler_pool, dbname)
         self._backends.add(backend)
         return backend
 
@@ -124,35 +256,14 @@ class ManagementPort(baseport.Port):
         await super().start()
 
         nethost = await self._fix_localhost(self._nethost, self._netport)
+        server = self.get_server()
 
+        # The processes of a multi-process server all listen on the
+        # port; the kernel balances the connections among them.
         tcp_srv = await self._loop.create_server(
             lambda: edgecon.EdgeConnection(self),
-            host=nethost, port=self._netport)
-
-        try:
-            unix_sock_path = os.path.join(
-                self._runstate_dir, f'.s.EDGEDB.{self._netport}')
-            unix_srv = await self._loop.create_unix_server(
-                lambda: edgecon.EdgeConnection(self),
-                unix_sock_path)
-        except Exception:
-            tcp_srv.close()
-            await tcp_srv.wait_closed()
-            raise
-
-        try:
-            admin_unix_sock_path = os.path.join(
-                self._runstate_dir, f'.s.EDGEDB.admin.{self._netport}')
-            admin_unix_srv = await self._loop.create_unix_server(
-                lambda: edgecon.EdgeConnection(self, external_auth=True),
-                admin_unix_sock_path)
-            os.chmod(admin_unix_sock_path, stat.S_IRUSR | stat.S_IWUSR)
-        except Exception:
-            tcp_srv.close()
-            await tcp_srv.wait_closed()
-            unix_srv.close()
-            await unix_srv.wait_closed()
-            raise
+            host=nethost, port=self._netport,
+            reuse_port=server.get_worker_count() > 1 or None)
 
         self._servers.append(tcp_srv)
         if len(nethost) > 1:
@@ -160,9 +271,30 @@ class ManagementPort(baseport.Port):
         else:
             host_str = next(iter(nethost))
         logger.info('Serving on %s:%s', host_str, self._netport)
+
+        if not server.is_primary_worker():
+            # UNIX sockets cannot be shared; they are served by
+            # the first process.
+            self._accepting = True
+            return
+
+        # The servers started so far are closed by stop() if any
+        # of the following fails.
+        unix_sock_path = os.path.join(
+            self._runstate_dir, f'.s.EDGEDB.{self._netport}')
+        unix_srv = await self._loop.create_unix_server(
+            lambda: edgecon.EdgeConnection(self),
+            unix_sock_path)
         self._servers.append(unix_srv)
         logger.info('Serving on %s', unix_sock_path)
+
+        admin_unix_sock_path = os.path.join(
+            self._runstate_dir, f'.s.EDGEDB.admin.{self._netport}')
+        admin_unix_srv = await self._loop.create_unix_server(
+            lambda: edgecon.EdgeConnection(self, external_auth=True),
+            admin_unix_sock_path)
         self._servers.append(admin_unix_srv)
+        os.chmod(admin_unix_sock_path, stat.S_IRUSR | stat.S_IWUSR)
         logger.info('Serving admin on %s', admin_unix_sock_path)
 
         self._accepting = True
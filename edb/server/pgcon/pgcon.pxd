@@ -71,6 +71,7 @@ cdef class PGProto:
         object connected_fut
 
         bint waiting_for_sync
+        bint unsynced
         PGTransactionStatus xact_status
 
         readonly int32_t backend_pid
@@ -78,12 +79,20 @@ cdef class PGProto:
 
         stmt_cache.StatementsCache prep_stmts
         list last_parse_prep_stmts
+        readonly uint64_t anon_stmt_seq
 
         bint debug
 
         object pgaddr
 
+        object session_state
+
     cdef write(self, buf)
+    cdef WriteBuffer make_execute_message(self, int32_t limit)
+    cdef write_json_query(self, WriteBuffer buf, sql, sql_hash, dbver,
+                          use_prep_stmt, args, int32_t limit,
+                          int16_t nliterals, bytes literal_args_data)
+    cdef bytes read_json_row(self, sql)
 
     cdef parse_error_message(self)
     cdef parse_sync_message(self)
@@ -92,6 +101,7 @@ cdef class PGProto:
     cdef fallthrough(self)
 
     cdef before_prepare(self, stmt_name, dbver, WriteBuffer outbuf)
+    cdef forget_anon_stmt(self)
 
     cdef make_clean_stmt_message(self, bytes stmt_name)
     cdef make_auth_password_md5_message(self, bytes salt)
@@ -58,6 +58,9 @@ from . import errors as pgerror
 
 
 DEF DATA_BUFFER_SIZE = 100_000
+# Number of rows fetched from a portal by one "Execute" message when
+# the results are streamed to the client.
+DEF EXECUTE_FETCH_SIZE = 1000
 DEF PREP_STMTS_CACHE = 100
 
 DEF COPY_SIGNATURE = b"PGCOPY\n\377\r\n\0"
@@ -150,16 +153,24 @@ cdef class PGProto:
         self.connected = False
 
         self.waiting_for_sync = False
+        self.unsynced = False
         self.xact_status = PQTRANS_UNKNOWN
 
         self.backend_pid = -1
         self.backend_secret = -1
 
         self.last_parse_prep_stmts = []
+        # Changes whenever the anonymous statement (or the statements
+        # of a multi-statement query parsed in its place) is replaced
+        # or destroyed, so that clients can tell whether a statement
+        # they parsed earlier is still around.
+        self.anon_stmt_seq = 0
         self.debug = debug.flags.server_proto
 
         self.pgaddr = addr
 
+        self.session_state = None
+
     def debug_print(self, *args):
         print(
             '::PGPROTO::',
@@ -178,6 +189,23 @@ cdef class PGProto:
     def is_connected(self):
         return bool(self.connected and self.transport is not None)
 
+    def is_idle(self):
+        # A connection is idle when it can be safely handed over
+        # to another client: no pending responses, no open transaction.
+        return bool(
+            self.connected and
+            self.transport is not None and
+            not self.waiting_for_sync and
+            not self.unsynced and
+            self.xact_status == PQTRANS_IDLE
+        )
+
+    def get_session_state(self):
+        return self.session_state
+
+    def set_session_state(self, state):
+        self.session_state = state
+
     def abort(self):
         if not self.transport:
             return
@@ -251,22 +279,24 @@ cdef class PGProto:
 
         return parse, store_stmt
 
-    async def parse_execute_json(self, sql, sql_hash, dbver,
-                                 use_prep_stmt, args):
+    cdef forget_anon_stmt(self):
+        self.anon_stmt_seq += 1
+
+    cdef write_json_query(self, WriteBuffer buf, sql, sql_hash, dbver,
+                          use_prep_stmt, args, int32_t limit,
+                          int16_t nliterals, bytes literal_args_data):
+        # Write the messages that execute a JSON query into *buf*;
+        # returns the statement name and whether the statement has
+        # to be stored in the prepared statements cache once parsed.
+        # *literal_args_data* holds the *nliterals* encoded arguments
+        # for the literals extracted from the query, which follow
+        # the query arguments.
         cdef:
             WriteBuffer parse_buf
             WriteBuffer bind_buf
-            WriteBuffer execute_buf
-            WriteBuffer buf
-            char *str
-            ssize_t size
             bint parse = 1
             bint store_stmt = 0
 
-        self.before_command()
-
-        buf = WriteBuffer.new()
-
         if use_prep_stmt:
             stmt_name = sql_hash
             parse, store_stmt = self.before_prepare(
@@ -275,6 +305,8 @@ cdef class PGProto:
             stmt_name = b''
 
         if parse:
+            if stmt_name == b'':
+                self.forget_anon_stmt()
             parse_buf = WriteBuffer.new_message(b'P')
             parse_buf.write_bytestring(stmt_name)  # statement name
             parse_buf.write_bytestring(sql)
@@ -288,22 +320,47 @@ cdef class PGProto:
         bind_buf.write_bytestring(stmt_name)  # statement name
         bind_buf.write_int32(0x00010001)  # binary for all parameters
         # number of parameters
-        bind_buf.write_int16(<int16_t><uint16_t>(len(args)))
+        bind_buf.write_int16(<int16_t><uint16_t>(len(args) + nliterals))
 
         for arg in args:
             jarg = json.dumps(arg)
             pgproto.jsonb_encode(DEFAULT_CODEC_CONTEXT, bind_buf, jarg)
 
+        if nliterals:
+            bind_buf.write_bytes(literal_args_data)
+
         bind_buf.write_int32(0x00010001)  # binary for the output
         bind_buf.end_message()
         buf.write_buffer(bind_buf)
 
-        execute_buf = WriteBuffer.new_message(b'E')
-        execute_buf.write_bytestring(b'')  # portal name
-        execute_buf.write_int32(0)  # return all rows
-        execute_buf.end_message()
-        buf.write_buffer(execute_buf)
+        buf.write_buffer(self.make_execute_message(limit))
+
+        return stmt_name, store_stmt
+
+    cdef bytes read_json_row(self, sql):
+        ncol = self.buffer.read_int16()
+        if ncol != 1:
+            raise RuntimeError(
+                f'received more than column in DataRow '
+                f'for a JSON query {sql!r}')
+
+        coll = self.buffer.read_int32()
+        if coll == -1:
+            raise RuntimeError(
+                f'received NULL for a JSON query {sql!r}')
 
+        return self.buffer.read_bytes(coll)
+
+    async def parse_execute_json(self, sql, sql_hash, dbver,
+                                 use_prep_stmt, args):
+        cdef:
+            WriteBuffer buf
+
+        self.before_command()
+
+        buf = WriteBuffer.new()
+        stmt_name, store_stmt = self.write_json_query(
+            buf, sql, sql_hash, dbver, use_prep_stmt, args, 0, 0, b'')
         buf.write_bytes(SYNC_MESSAGE)
 
         self.write(buf)
@@ -325,23 +382,13 @@ cdef class PGProto:
                         self.buffer.discard_message()
                         continue
 
-                    ncol = self.buffer.read_int16()
-                    if ncol != 1:
-                        error = RuntimeError(
-                            f'received more than column in DataRow '
-                            f'for a JSON query {sql!r}')
-                        self.buffer.discard_message()
-                        continue
-
-                    coll = self.buffer.read_int32()
-                    if coll == -1:
-                        error = RuntimeError(
-                            f'received NULL for a JSON query {sql!r}')
+                    try:
+                        data = self.read_json_row(sql)
+                    except RuntimeError as ex:
+                        error = ex
                         self.buffer.discard_message()
                         continue
 
-                    data = self.buffer.read_bytes(coll)
-
                 elif mtype == b'E':
                     # ErrorResponse
                     fields = self.parse_error_message()
@@ -376,6 +423,88 @@ cdef class PGProto:
 
         return data
 
+    async def parse_execute_json_stream(self, sql, sql_hash, dbver,
+                                        use_prep_stmt, args, on_rows,
+                                        literal_args=(),
+                                        bytes literal_args_data=b''):
+        # Execute a query compiled to return one JSON element per row,
+        # passing the rows to the *on_rows* coroutine function in
+        # batches.  The next batch is only fetched from the backend
+        # after *on_rows* has returned, so it can apply backpressure.
+        cdef:
+            WriteBuffer buf
+
+        self.before_command()
+
+        buf = WriteBuffer.new()
+        stmt_name, store_stmt = self.write_json_query(
+            buf, sql, sql_hash, dbver, use_prep_stmt, args,
+            EXECUTE_FETCH_SIZE, <int16_t>len(literal_args),
+            literal_args_data)
+        # The portal has to outlive the batches, so "Sync" is only
+        # sent once the query is complete.
+        buf.write_bytes(FLUSH_MESSAGE)
+        self.write(buf)
+        self.unsynced = True
+
+        rows = []
+        try:
+            while True:
+                if not self.buffer.take_message():
+                    await self.wait_for_message()
+                mtype = self.buffer.get_message_type()
+
+                try:
+                    if mtype == b'D':
+                        # DataRow
+                        rows.append(self.read_json_row(sql))
+
+                    elif mtype == b's':
+                        # PortalSuspended
+                        self.buffer.discard_message()
+                        await on_rows(rows)
+                        rows = []
+
+                        buf = WriteBuffer.new()
+                        buf.write_buffer(self.make_execute_message(
+                            EXECUTE_FETCH_SIZE))
+                        buf.write_bytes(FLUSH_MESSAGE)
+                        self.write(buf)
+
+                    elif mtype == b'C' or mtype == b'I':
+                        # CommandComplete
+                        # EmptyQueryResponse
+                        self.buffer.discard_message()
+                        if rows:
+                            await on_rows(rows)
+                        return
+
+                    elif mtype == b'E':
+                        # ErrorResponse
+                        fields = self.parse_error_message()
+                        raise pgerror.BackendError(fields=fields)
+
+                    elif mtype == b'1':
+                        # ParseComplete
+                        self.buffer.discard_message()
+                        if store_stmt:
+                            self.prep_stmts[stmt_name] = dbver
+
+                    elif mtype == b'n' or mtype == b'2':
+                        # NoData
+                        # BindComplete
+                        self.buffer.discard_message()
+
+                    else:
+                        self.fallthrough()
+
+                finally:
+                    self.buffer.finish_message()
+        finally:
+            self.write(SYNC_MESSAGE)
+            self.waiting_for_sync = True
+            await self.wait_for_sync()
+
     async def parse_execute(self,
                             bint parse,
                             bint execute,
@@ -392,6 +521,8 @@ cdef class PGProto:
             bint store_stmt = 0
 
             bint has_result = query.cardinality is not CARD_NA
+            bint stream = 0
+            bint sync_deferred = 0
 
             uint64_t msgs_num = <uint64_t>(len(query.sql))
             uint64_t msgs_parsed = 0
@@ -414,6 +545,9 @@ cdef class PGProto:
             stmt_name = b''
 
         if parse:
+            if len(self.last_parse_prep_stmts) or stmt_name == b'':
+                self.forget_anon_stmt()
+
             if len(self.last_parse_prep_stmts):
                 for stmt_name_to_clean in self.last_parse_prep_stmts:
                     packet.write_buffer(
@@ -454,10 +588,7 @@ cdef class PGProto:
                     buf.write_buffer(bind_data)
                     packet.write_buffer(buf.end_message())
 
-                    buf = WriteBuffer.new_message(b'E')
-                    buf.write_bytestring(b'')  # portal name
-                    buf.write_int32(0)  # limit: 0 - return all rows
-                    packet.write_buffer(buf.end_message())
+                    packet.write_buffer(self.make_execute_message(0))
 
             else:
                 buf = WriteBuffer.new_message(b'B')
@@ -466,16 +597,23 @@ cdef class PGProto:
                 buf.write_buffer(bind_data)
                 packet.write_buffer(buf.end_message())
 
-                buf = WriteBuffer.new_message(b'E')
-                buf.write_bytestring(b'')  # portal name
-                buf.write_int32(0)  # limit: 0 - return all rows
-                packet.write_buffer(buf.end_message())
+                # Fetch the rows of a query in batches, so that the
+                # rows are only read from the backend as fast as the
+                # client accepts them; see the PortalSuspended handling
+                # below.
+                stream = has_result
+                packet.write_buffer(self.make_execute_message(
+                    EXECUTE_FETCH_SIZE if stream else 0))
 
-        if send_sync:
+        if send_sync and not stream:
             packet.write_bytes(SYNC_MESSAGE)
             self.waiting_for_sync = True
         else:
+            # A "Sync" would close the portal of a streamed query, so
+            # it is only sent once the query is complete.
+            sync_deferred = send_sync
             packet.write_bytes(FLUSH_MESSAGE)
+            self.unsynced = True
         self.write(packet)
 
         try:
@@ -533,7 +671,23 @@ cdef class PGProto:
                     elif mtype == b's' and execute:  ## result
                         # PortalSuspended
                         self.buffer.discard_message()
-                        return
+                        if not stream:
+                            return
+
+                        # Hand the fetched rows over to the client and
+                        # only fetch more once its transport has
+                        # drained, which bounds the amount of data
+                        # buffered for the query.
+                        if buf is not None:
+                            edgecon.write(buf)
+                            buf = None
+                        await edgecon.drain()
+
+                        packet = WriteBuffer.new()
+                        packet.write_buffer(self.make_execute_message(
+                            EXECUTE_FETCH_SIZE))
+                        packet.write_bytes(FLUSH_MESSAGE)
+                        self.write(packet)
 
                     elif mtype == b'2' and execute:
                         # BindComplete
@@ -554,9 +708,180 @@ cdef class PGProto:
                 finally:
                     self.buffer.finish_message()
         finally:
+            if sync_deferred:
+                self.write(SYNC_MESSAGE)
+                self.waiting_for_sync = True
             if send_sync:
                 await self.wait_for_sync()
 
+    async def parse_execute_batch(self,
+                                  bint parse,
+                                  object query,
+                                  edgecon.EdgeConnection edgecon,
+                                  list bind_data,
+                                  bint send_sync,
+                                  bint use_prep_stmt):
+        # Execute a single-statement query once for every set of
+        # arguments in *bind_data*.  All Bind/Execute pairs are sent
+        # in one go and there is at most one Sync, so the executions
+        # share a transaction; returns the total number of rows
+        # processed by the executions.
+        cdef:
+            WriteBuffer packet
+            WriteBuffer buf
+            WriteBuffer args
+            bytes stmt_name
+            bint store_stmt = 0
+
+            bint has_result = query.cardinality is not CARD_NA
+
+            uint64_t msgs_num = <uint64_t>(len(bind_data))
+            uint64_t msgs_executed = 0
+            uint64_t rows = 0
+            bint parsed
+            bint wait_sync = send_sync
+
+        self.before_command()
+
+        if len(query.sql) != 1:
+            raise errors.InternalServerError(
+                'cannot execute a batch of a multi-statement query')
+
+        packet = WriteBuffer.new()
+
+        if use_prep_stmt:
+            stmt_name = query.sql_hash
+            parse, store_stmt = self.before_prepare(
+                stmt_name, query.dbver, packet)
+        else:
+            stmt_name = b''
+
+        if parse:
+            if len(self.last_parse_prep_stmts) or stmt_name == b'':
+                self.forget_anon_stmt()
+
+            if len(self.last_parse_prep_stmts):
+                for stmt_name_to_clean in self.last_parse_prep_stmts:
+                    packet.write_buffer(
+                        self.make_clean_stmt_message(stmt_name_to_clean))
+                self.last_parse_prep_stmts.clear()
+
+            buf = WriteBuffer.new_message(b'P')
+            buf.write_bytestring(stmt_name)
+            buf.write_bytestring(query.sql[0])
+            buf.write_int16(0)
+            packet.write_buffer(buf.end_message())
+        parsed = not parse
+
+        for args in bind_data:
+            buf = WriteBuffer.new_message(b'B')
+            buf.write_bytestring(b'')  # portal name
+            buf.write_bytestring(stmt_name)  # statement name
+            buf.write_buffer(args)
+            packet.write_buffer(buf.end_message())
+
+            packet.write_buffer(self.make_execute_message(0))
+
+            if packet.len() >= DATA_BUFFER_SIZE:
+                self.write(packet)
+                packet = WriteBuffer.new()
+
+        if send_sync:
+            packet.write_bytes(SYNC_MESSAGE)
+            self.waiting_for_sync = True
+        else:
+            packet.write_bytes(FLUSH_MESSAGE)
+            self.unsynced = True
+        self.write(packet)
+
+        try:
+            buf = None
+            while msgs_executed < msgs_num or not parsed:
+                if not self.buffer.take_message():
+                    await self.wait_for_message()
+                mtype = self.buffer.get_message_type()
+
+                try:
+                    if mtype == b'D':
+                        # DataRow
+                        if not has_result:
+                            raise errors.InternalServerError(
+                                f'query that was inferred to have '
+                                f'no data returned received a DATA package; '
+                                f'query: {query.sql}')
+
+                        if buf is None:
+                            buf = WriteBuffer.new()
+
+                        self.buffer.redirect_messages(buf, b'D', 0)
+                        if buf.len() >= DATA_BUFFER_SIZE:
+                            edgecon.write(buf)
+                            buf = None
+
+                    elif mtype == b'C':  ## result
+                        # CommandComplete; the tag ends with the
+                        # number of processed rows, e.g. "INSERT 0 1".
+                        tag = self.buffer.read_null_str()
+                        try:
+                            rows += int(tag.rpartition(b' ')[2])
+                        except ValueError:
+                            pass
+                        msgs_executed += 1
+
+                    elif mtype == b'1':
+                        # ParseComplete
+                        self.buffer.discard_message()
+                        if store_stmt:
+                            self.prep_stmts[stmt_name] = query.dbver
+                        parsed = True
+
+                    elif mtype == b'E':  ## result
+                        # ErrorResponse
+                        er = self.parse_error_message()
+                        raise pgerror.BackendError(fields=er)
+
+                    elif mtype == b'n' or mtype == b'2' or mtype == b'3':
+                        # NoData, BindComplete, CloseComplete
+                        self.buffer.discard_message()
+
+                    elif mtype == b'I':  ## result
+                        # EmptyQueryResponse
+                        self.buffer.discard_message()
+                        msgs_executed += 1
+
+                    else:
+                        self.fallthrough()
+
+                finally:
+                    self.buffer.finish_message()
+
+            if buf is not None:
+                edgecon.write(buf)
+
+            return rows
+        except ConnectionAbortedError:
+            raise
+        except Exception:
+            if not send_sync:
+                # After an error the backend skips the rest of the
+                # batch until a "Sync", so consume its responses up to
+                # ReadyForQuery: the connection is then ready for the
+                # next command and its transaction status is known.
+                self.write(SYNC_MESSAGE)
+                self.waiting_for_sync = True
+                wait_sync = True
+            raise
+        finally:
+            if wait_sync:
+                await self.wait_for_sync()
+
+    cdef WriteBuffer make_execute_message(self, int32_t limit):
+        cdef WriteBuffer buf
+        buf = WriteBuffer.new_message(b'E')
+        buf.write_bytestring(b'')  # portal name
+        buf.write_int32(limit)  # limit: 0 - return all rows
+        return buf.end_message()
+
     async def simple_query(self, bytes sql, bint ignore_data):
         cdef:
             WriteBuffer packet
@@ -564,6 +889,8 @@ cdef class PGProto:
 
         self.before_command()
 
+        # A simple query destroys the anonymous statement.
+        self.forget_anon_stmt()
         buf = WriteBuffer.new_message(b'Q')
         buf.write_bytestring(sql)
         self.write(buf.end_message())
@@ -631,6 +958,7 @@ cdef class PGProto:
             WriteBuffer qbuf
             WriteBuffer out
 
+        self.forget_anon_stmt()
         qbuf = WriteBuffer.new_message(b'Q')
         qbuf.write_bytestring(block.sql_copy_stmt)
         qbuf.end_message()
@@ -726,7 +1054,7 @@ cdef class PGProto:
             char* cbuf
             ssize_t clen
 
-
+        self.forget_anon_stmt()
         qbuf = WriteBuffer.new_message(b'Q')
         qbuf.write_bytestring(sql)
         qbuf.end_message()
@@ -796,6 +1124,80 @@ cdef class PGProto:
         if er:
             raise pgerror.BackendError(fields=er)
 
+    async def copy_in(self, bytes sql, WriteBuffer data):
+        # Load *data*, a sequence of binary COPY tuples, with the
+        # "COPY ... FROM STDIN WITH BINARY" command *sql*; returns
+        # the number of loaded rows.
+        cdef:
+            WriteBuffer buf
+            WriteBuffer qbuf
+
+        self.before_command()
+
+        self.forget_anon_stmt()
+        qbuf = WriteBuffer.new_message(b'Q')
+        qbuf.write_bytestring(sql)
+        self.write(qbuf.end_message())
+        self.waiting_for_sync = True
+
+        er = None
+        while True:
+            if not self.buffer.take_message():
+                await self.wait_for_message()
+            mtype = self.buffer.get_message_type()
+
+            if mtype == b'G':
+                # CopyInResponse
+                self.buffer.discard_message()
+                break
+
+            elif mtype == b'E':
+                er = self.parse_error_message()
+
+            elif mtype == b'Z':
+                self.parse_sync_message()
+                break
+
+            else:
+                self.fallthrough()
+
+        if er:
+            raise pgerror.BackendError(fields=er)
+
+        buf = WriteBuffer.new_message(b'd')
+        buf.write_bytes(COPY_SIGNATURE)
+        buf.write_int32(0)  # flags
+        buf.write_int32(0)  # header extension length
+        buf.write_buffer(data)
+        buf.write_int16(-1)  # trailer
+        self.write(buf.end_message())
+        self.write(COPY_DONE_MESSAGE)
+
+        rows = 0
+        while True:
+            if not self.buffer.take_message():
+                await self.wait_for_message()
+            mtype = self.buffer.get_message_type()
+
+            if mtype == b'C':
+                # CommandComplete
+                rows = int(self.buffer.read_null_str().rpartition(b' ')[2])
+                self.buffer.finish_message()
+
+            elif mtype == b'E':
+                er = self.parse_error_message()
+
+            elif mtype == b'Z':
+                self.parse_sync_message()
+                break
+
+            else:
+                self.fallthrough()
+
+        if er:
+            raise pgerror.BackendError(fields=er)
+        return rows
+
     async def connect(self):
         cdef:
             WriteBuffer outbuf
@@ -955,6 +1357,7 @@ cdef class PGProto:
         if not self.waiting_for_sync:
             raise RuntimeError('unexpected sync')
         self.waiting_for_sync = False
+        self.unsynced = False
 
         assert self.buffer.get_message_type() == b'Z'
 
@@ -1042,5 +1445,7 @@ cdef class PGProto:
 
 cdef bytes SYNC_MESSAGE = bytes(WriteBuffer.new_message(b'S').end_message())
 cdef bytes FLUSH_MESSAGE = bytes(WriteBuffer.new_message(b'H').end_message())
+cdef bytes COPY_DONE_MESSAGE = bytes(
+    WriteBuffer.new_message(b'c').end_message())
 
 cdef EdegDBCodecContext DEFAULT_CODEC_CONTEXT = EdegDBCodecContext()
@@ -0,0 +1,180 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from __future__ import annotations
+from typing import *  # NoQA
+
+import asyncio
+import collections
+
+
+class Pool:
+    """A server-wide pool of backend connections.
+
+    Clients lease a connection only for the duration of a query or
+    of an explicit transaction, so idle clients don't hold any backend
+    connections.  The total number of connections opened by the pool
+    never exceeds *max_capacity*; when the limit is reached, idle
+    connections to other databases are closed to make room, and if
+    there are none, acquire() waits for a connection to be released.
+    """
+
+    def __init__(self, *, connect: Callable[[str], Awaitable[Any]],
+                 max_capacity: int):
+        if max_capacity <= 0:
+            raise ValueError(
+                f'max_capacity is expected to be greater than 0, '
+                f'got {max_capacity}')
+
+        self._connect = connect
+        self._max_capacity = max_capacity
+        self._cur_capacity = 0
+        # The slots taken out of the pool for connections that are
+        # opened elsewhere but count against the same limit.
+        self._reserved = 0
+
+        # dbname -> deque of idle connections
+        self._idle: Dict[str, Deque[Any]] = {}
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+        self._closed = False
+
+    @property
+    def max_capacity(self):
+        return self._max_capacity
+
+    @property
+    def current_capacity(self):
+        return self._cur_capacity
+
+    @property
+    def reserved_capacity(self):
+        return self._reserved
+
+    def reserve(self, count: int) -> int:
+        """Take up to *count* slots out of the pool.
+
+        The reserved slots are for backend connections that are not
+        opened by the pool, e.g. by the compiler workers, and must
+        count against the limit of the pool.  At most half of the
+        total capacity can be reserved, so that clients are never
+        starved.  Returns the number of slots actually reserved.
+        """
+        total = self._max_capacity + self._reserved
+        count = max(min(count, total // 2 - self._reserved), 0)
+        self._reserved += count
+        self._max_capacity -= count
+        return count
+
+    def unreserve(self, count: int) -> None:
+        if count > self._reserved:
+            raise ValueError(
+                f'cannot unreserve {count} slots: only '
+                f'{self._reserved} are reserved')
+
+        self._reserved -= count
+        self._max_capacity += count
+        for _ in range(count):
+            self._wakeup_next_waiter()
+
+    def count_idle(self):
+        return sum(len(cons) for cons in self._idle.values())
+
+    def _pop_idle(self, dbname):
+        cons = self._idle.get(dbname)
+        while cons:
+            con = cons.pop()
+            if con.is_connected():
+                return con
+            self._cur_capacity -= 1
+        return None
+
+    def _pop_idle_any(self):
+        for dbname in list(self._idle):
+            con = self._pop_idle(dbname)
+            if con is not None:
+                return con
+        return None
+
+    def _wakeup_next_waiter(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def acquire(self, dbname: str):
+        while True:
+            if self._closed:
+                raise RuntimeError('the connection pool is closed')
+
+            con = self._pop_idle(dbname)
+            if con is not None:
+                return con
+
+            if self._cur_capacity < self._max_capacity:
+                self._cur_capacity += 1
+                try:
+                    return await self._connect(dbname)
+                except BaseException:
+                    self._cur_capacity -= 1
+                    self._wakeup_next_waiter()
+                    raise
+
+            # The pool is full: close an idle connection to some other
+            # database to make room for a new one.
+            victim = self._pop_idle_any()
+            if victim is not None:
+                victim.terminate()
+                self._cur_capacity -= 1
+                continue
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    # We were woken up but are not going to use
+                    # the slot; pass it on.
+                    self._wakeup_next_waiter()
+                raise
+
+    def release(self, dbname: str, con, *, discard: bool=False):
+        if discard or self._closed or not con.is_idle():
+            con.terminate()
+            self._cur_capacity -= 1
+        else:
+            self._idle.setdefault(dbname, collections.deque()).append(con)
+
+        self._wakeup_next_waiter()
+
+    def close(self):
+        self._closed = True
+        for cons in self._idle.values():
+            for con in cons:
+                con.terminate()
+                self._cur_capacity -= 1
+        self._idle.clear()
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(
+                    RuntimeError('the connection pool is closed'))
@@ -19,7 +19,13 @@
 
 from __future__ import annotations
 
-__all__ = 'create_manager',
+__all__ = (
+    'create_manager', 'create_pool',
+    'PoolTimeoutError', 'WorkerLostError',
+    'reentrant',
+)
 
 
-from .pool import create_manager
+from .pool import create_manager, create_pool
+from .pool import PoolTimeoutError, WorkerLostError
+from .pool import reentrant
@@ -18,8 +18,10 @@
 
 
 from __future__ import annotations
+from typing import *  # NoQA
 
 import asyncio
+import collections
 import os
 import struct
 
@@ -27,6 +29,19 @@ import struct
 _len_unpacker = struct.Struct('!I').unpack
 _len_packer = struct.Struct('!I').pack
 
+# Every message is prefixed with its length and the ID of the request
+# it belongs to; replies carry the ID of the request, so requests can
+# be pipelined and replied to in any order.
+_header = struct.Struct('!IQ')
+_HEADER_LEN = _header.size
+
+# Control protocol of the forkserver: it sends READY once it has
+# warmed up and replies to each FORK request with the forked pid.
+FORKSERVER_READY = b'R'
+FORKSERVER_FORK = b'F'
+pid_packer = _len_packer
+pid_unpacker = _len_unpacker
+
 
 class PoolClosedError(Exception):
     pass
@@ -36,34 +51,80 @@ class BaseFramedProtocol(asyncio.Protocol):
 
     def __init__(self, *, loop, con_waiter=None):
         self._loop = loop
-        self._buffer = b''
+        # Received chunks are kept as they are and only copied when
+        # a message spans several of them.
+        self._chunks = collections.deque()
+        self._chunks_len = 0
+        self._chunk_pos = 0
         self._transport = None
         self._con_waiter = con_waiter
         self._curmsg_len = -1
+        self._curmsg_id = 0
         self._closed = False
 
-    def process_message(self, msg):
+    def process_message(self, req_id, msg):
         raise NotImplementedError
 
-    def data_received(self, data):
-        # TODO: rewrite to avoid buffer copies.
-        self._buffer += data
-        while self._buffer:
+    def _write_message(self, req_id, payload):
+        self._transport.writelines(
+            (_header.pack(len(payload), req_id), payload))
+
+    def _read(self, nbytes):
+        if not nbytes:
+            return b''
+
+        self._chunks_len -= nbytes
+
+        chunk = self._chunks[0]
+        end = self._chunk_pos + nbytes
+        if end <= len(chunk):
+            data = chunk[self._chunk_pos:end]
+            if end == len(chunk):
+                self._chunks.popleft()
+                self._chunk_pos = 0
+            else:
+                self._chunk_pos = end
+            return data
+
+        parts = []
+        while nbytes:
+            chunk = self._chunks[0]
+            avail = len(chunk) - self._chunk_pos
+            if avail <= nbytes:
+                parts.append(chunk[self._chunk_pos:])
+                self._chunks.popleft()
+                self._chunk_pos = 0
+                nbytes -= avail
+            else:
+                end = self._chunk_pos + nbytes
+                parts.append(chunk[self._chunk_pos:end])
+                self._chunk_pos = end
+                nbytes = 0
+        return b''.join(parts)
+
+    def _feed(self, data):
+        self._chunks.append(memoryview(data))
+        self._chunks_len += len(data)
+
+    def _process_messages(self):
+        while True:
             if self._curmsg_len == -1:
-                if len(self._buffer) >= 4:
-                    self._curmsg_len = _len_unpacker(self._buffer[:4])[0]
-                    self._buffer = self._buffer[4:]
-                else:
+                if self._chunks_len < _HEADER_LEN:
                     return
+                self._curmsg_len, self._curmsg_id = _header.unpack(
+                    self._read(_HEADER_LEN))
 
-            if self._curmsg_len > 0 and len(self._buffer) >= self._curmsg_len:
-                msg = self._buffer[:self._curmsg_len]
-                self._buffer = self._buffer[self._curmsg_len:]
-                self._curmsg_len = -1
-                self.process_message(msg)
-            else:
+            if self._chunks_len < self._curmsg_len:
                 return
 
+            msg = self._read(self._curmsg_len)
+            self._curmsg_len = -1
+            self.process_message(self._curmsg_id, msg)
+
+    def data_received(self, data):
+        self._feed(data)
+        self._process_messages()
+
     def connection_made(self, tr):
         self._transport = tr
         if self._con_waiter is not None:
@@ -86,42 +147,45 @@ class HubProtocol(BaseFramedProtocol):
 
     def __init__(self, *, loop, on_pid):
         super().__init__(loop=loop)
-        self._msg_waiter = None
+        self._msg_waiters = {}
+        self._next_req_id = 0
         self._on_pid = on_pid
         self._pid = None
 
     def send(self, waiter, payload: bytes):
-        if self._msg_waiter is not None and not self._msg_waiter.done():
-            raise RuntimeError('FramedProtocol: another send() is in progress')
-        self._msg_waiter = waiter
-        self._transport.writelines((_len_packer(len(payload)), payload))
+        self._next_req_id += 1
+        req_id = self._next_req_id
+        self._msg_waiters[req_id] = waiter
+        self._write_message(req_id, payload)
 
-    def process_message(self, msg):
-        if self._msg_waiter is not None and not self._msg_waiter.done():
-            self._msg_waiter.set_result(msg)
-            self._msg_waiter = None
+    def process_message(self, req_id, msg):
+        # The waiter is missing if the request was cancelled.
+        waiter = self._msg_waiters.pop(req_id, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(msg)
 
     def data_received(self, data):
+        self._feed(data)
         if self._pid is None:
-            pid_data = data[:4]
-            data = data[4:]
-            self._pid = _len_unpacker(pid_data)[0]
+            if self._chunks_len < 4:
+                return
+            self._pid = _len_unpacker(self._read(4))[0]
             self._on_pid(self, self._transport, self._pid)
-            if data:
-                super().data_received(data)
-        else:
-            super().data_received(data)
+        self._process_messages()
 
     def connection_lost(self, exc):
         super().connection_lost(exc)
 
-        if self._msg_waiter is not None:
+        waiters = list(self._msg_waiters.values())
+        self._msg_waiters.clear()
+        for waiter in waiters:
+            if waiter.done():
+                continue
             if exc is not None:
-                self._msg_waiter.set_exception(exc)
+                waiter.set_exception(exc)
             else:
-                self._msg_waiter.set_exception(ConnectionError(
+                waiter.set_exception(ConnectionError(
                     'lost connection to the worker during a call'))
-            self._msg_waiter = None
 
 
 class WorkerProtocol(BaseFramedProtocol):
@@ -131,11 +195,11 @@ class WorkerProtocol(BaseFramedProtocol):
         self._con = con
         super().__init__(loop=loop, con_waiter=con_waiter)
 
-    def reply(self, payload: bytes):
-        self._transport.writelines((_len_packer(len(payload)), payload))
+    def reply(self, req_id, payload: bytes):
+        self._write_message(req_id, payload)
 
-    def process_message(self, msg):
-        self._con._on_message(msg)
+    def process_message(self, req_id, msg):
+        self._con._on_message(req_id, msg)
 
     def connection_made(self, tr):
         super().connection_made(tr)
@@ -157,6 +221,7 @@ class HubConnection:
         return self._protocol._closed
 
     async def request(self, data: bytes) -> bytes:
+        # Any number of requests can be in flight at the same time.
         waiter = self._loop.create_future()
         self._protocol.send(waiter, data)
         return await waiter
@@ -177,18 +242,18 @@ class WorkerConnection:
     def is_closed(self):
         return self._protocol._closed
 
-    def _on_message(self, msg: bytes):
-        self._msgs.put_nowait(msg)
+    def _on_message(self, req_id, msg: bytes):
+        self._msgs.put_nowait((req_id, msg))
 
     def _on_connection_lost(self, exc):
         self._con_lost_fut.set_exception(
             PoolClosedError('connection to the pool is closed'))
         self._con_lost_fut._log_traceback = False
 
-    async def reply(self, data):
-        self._protocol.reply(data)
+    async def reply(self, req_id, data):
+        self._protocol.reply(req_id, data)
 
-    async def next_request(self) -> bytes:
+    async def next_request(self) -> Tuple[int, bytes]:
         getter = self._loop.create_task(self._msgs.get())
         await asyncio.wait(
             [getter, self._con_lost_fut],
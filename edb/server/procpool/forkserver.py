@@ -0,0 +1,116 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Template process forking warmed-up workers.
+
+The forkserver imports the worker class, instantiates it and lets it
+preload whatever state is expensive to build (see the optional
+``warm_up()`` coroutine method of the worker class).  It then waits
+for fork requests on the control socket: every request forks a new
+worker that shares the preloaded state with the template copy-on-write
+and connects to the pool socket just like a regular worker would.
+
+See amsg.FORKSERVER_* for the control protocol.
+"""
+
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import os
+import pickle
+import signal
+import socket
+import sys
+import traceback
+
+from . import amsg
+from . import worker as procworker
+
+
+def _fork_worker(ctl, cls, cls_args, sockname, instance):
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # In the child: never return into the forkserver loop.
+    status = 0
+    try:
+        ctl.close()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        procworker.run_worker(cls, cls_args, sockname, instance)
+    except amsg.PoolClosedError:
+        pass
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+def serve(cls, cls_args, sockname, control_fd):
+    ctl = socket.socket(fileno=control_fd)
+
+    instance = cls(*cls_args)
+    warm_up = getattr(instance, 'warm_up', None)
+    if warm_up is not None:
+        try:
+            asyncio.run(warm_up())
+        except Exception:
+            # Workers will load their state lazily.
+            print('forkserver: could not warm up the worker instance',
+                  file=sys.stderr)
+            traceback.print_exc()
+
+    # Forked workers are reaped automatically.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    ctl.sendall(amsg.FORKSERVER_READY)
+
+    while True:
+        req = ctl.recv(1)
+        if not req:
+            # The manager has closed the control socket.
+            break
+        if req != amsg.FORKSERVER_FORK:
+            raise RuntimeError(f'forkserver: unexpected request {req!r}')
+
+        pid = _fork_worker(ctl, cls, cls_args, sockname, instance)
+        ctl.sendall(amsg.pid_packer(pid))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cls-name')
+    parser.add_argument('--cls-args')
+    parser.add_argument('--sockname')
+    parser.add_argument('--control-fd', type=int)
+    args = parser.parse_args()
+
+    cls = procworker.load_class(args.cls_name)
+    cls_args = pickle.loads(base64.b64decode(args.cls_args))
+
+    serve(cls, cls_args, args.sockname, args.control_fd)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,12 +18,16 @@
 
 
 from __future__ import annotations
+from typing import *  # NoQA
 
 import asyncio
 import base64
 import collections
+import os
 import os.path
 import pickle
+import signal
+import socket
 import subprocess
 import sys
 import time
@@ -39,6 +43,7 @@ BUFFER_POOL_SIZE = 4
 PROCESS_INITIAL_RESPONSE_TIMEOUT = 60.0
 KILL_TIMEOUT = 10.0
 WORKER_MOD = __name__.rpartition('.')[0] + '.worker'
+FORKSERVER_MOD = __name__.rpartition('.')[0] + '.forkserver'
 
 
 # Inherit sys.path so that import system can find worker class
@@ -47,6 +52,133 @@ _ENV = os.environ.copy()
 _ENV['PYTHONPATH'] = ':'.join(sys.path)
 
 
+def _get_env():
+    if debug.flags.server:
+        return {'EDGEDB_DEBUG_SERVER': '1', **_ENV}
+    return _ENV
+
+
+class PoolTimeoutError(Exception):
+    """No worker of a Pool became available in time."""
+
+
+class WorkerLostError(Exception):
+    """A worker acquired from a Pool has exited.
+
+    Any state the client kept in the worker is gone.
+    """
+
+
+def reentrant(meth):
+    """Mark a worker method as safe to run concurrently with others.
+
+    Pipelined requests for such methods are handled by the worker as
+    soon as they arrive and are replied to when done, possibly out of
+    order; see worker.worker().
+    """
+    meth._procpool_reentrant = True
+    return meth
+
+
+class ForkedProcess:
+    """A handle for a worker forked by the forkserver.
+
+    Forked workers are children of the forkserver, not of this
+    process, so they cannot be waited for directly.
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+
+    def kill(self):
+        os.kill(self.pid, signal.SIGKILL)
+
+    def terminate(self):
+        os.kill(self.pid, signal.SIGTERM)
+
+    async def wait(self):
+        while True:
+            try:
+                os.kill(self.pid, 0)
+            except ProcessLookupError:
+                return
+            await asyncio.sleep(0.05)
+
+
+class ForkServer:
+
+    def __init__(self, command_args):
+        self._command_args = command_args
+        self._proc = None
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        ours, theirs = socket.socketpair()
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                *self._command_args,
+                '--control-fd', str(theirs.fileno()),
+                env=_get_env(),
+                stdin=subprocess.DEVNULL,
+                pass_fds=(theirs.fileno(),))
+        except Exception:
+            ours.close()
+            raise
+        finally:
+            theirs.close()
+
+        self._reader, self._writer = await asyncio.open_unix_connection(
+            sock=ours)
+
+        try:
+            # Warming up can take a while: the std schema has to be
+            # fetched from Postgres and unpickled.
+            ready = await asyncio.wait_for(
+                self._reader.readexactly(1),
+                PROCESS_INITIAL_RESPONSE_TIMEOUT)
+            if ready != amsg.FORKSERVER_READY:
+                raise RuntimeError(
+                    f'unexpected response from the forkserver: {ready!r}')
+        except Exception:
+            await self.stop()
+            raise
+
+    async def fork(self):
+        async with self._lock:
+            if self._proc.returncode is not None:
+                # The forkserver has died; start a new one.
+                await self.stop()
+                await self.start()
+
+            self._writer.write(amsg.FORKSERVER_FORK)
+            try:
+                data = await self._reader.readexactly(4)
+            except asyncio.IncompleteReadError:
+                raise RuntimeError('the forkserver has exited') from None
+
+        return ForkedProcess(amsg.pid_unpacker(data)[0])
+
+    async def stop(self):
+        if self._writer is not None:
+            # The forkserver exits when the control socket is closed.
+            self._writer.close()
+            self._writer = None
+            self._reader = None
+
+        if self._proc is not None:
+            proc = self._proc
+            self._proc = None
+            try:
+                await asyncio.wait_for(proc.wait(), KILL_TIMEOUT)
+            except asyncio.TimeoutError:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+
+
 class Worker:
 
     def __init__(self, manager, server, command_args):
@@ -78,14 +210,13 @@ class Worker:
             self._manager._sup.create_task(self._kill_proc(self._proc))
             self._proc = None
 
-        env = _ENV
-        if debug.flags.server:
-            env = {'EDGEDB_DEBUG_SERVER': '1', **_ENV}
-
-        self._proc = await asyncio.create_subprocess_exec(
-            *self._command_args,
-            env=env,
-            stdin=subprocess.DEVNULL)
+        if self._manager._forkserver is not None:
+            self._proc = await self._manager._forkserver.fork()
+        else:
+            self._proc = await asyncio.create_subprocess_exec(
+                *self._command_args,
+                env=_get_env(),
+                stdin=subprocess.DEVNULL)
         try:
             self._con = await asyncio.wait_for(
                 self._server.get_by_pid(self._proc.pid),
@@ -100,6 +231,9 @@ class Worker:
     def get_pid(self):
         return self._proc.pid
 
+    def is_alive(self) -> bool:
+        return self._con is not None and not self._con.is_closed()
+
     async def call(self, method_name, *args):
         assert not self._closed
 
@@ -140,7 +274,8 @@ class Worker:
 class Manager:
 
     def __init__(self, *, worker_cls, worker_args,
-                 loop, name, runstate_dir, pool_size=BUFFER_POOL_SIZE):
+                 loop, name, runstate_dir, pool_size=BUFFER_POOL_SIZE,
+                 use_forkserver=False):
 
         self._worker_cls = worker_cls
         self._worker_args = worker_args
@@ -166,9 +301,7 @@ class Manager:
 
         self._sup = None
 
-        self._worker_command_args = [
-            sys.executable, '-m', WORKER_MOD,
-
+        worker_args = [
             '--cls-name',
             f'{self._worker_cls.__module__}.{self._worker_cls.__name__}',
 
@@ -176,6 +309,16 @@ class Manager:
             '--sockname', self._poolsock_name
         ]
 
+        self._worker_command_args = [
+            sys.executable, '-m', WORKER_MOD, *worker_args]
+
+        self._forkserver = None
+        if use_forkserver:
+            # Workers are forked from a template process which has
+            # already imported and warmed up the worker class.
+            self._forkserver = ForkServer(
+                [sys.executable, '-m', FORKSERVER_MOD, *worker_args])
+
     def iter_workers(self):
         return iter(frozenset(self._workers))
 
@@ -209,6 +352,14 @@ class Manager:
         self._sup = await supervisor.Supervisor.create()
 
         await self._server.start()
+
+        if self._forkserver is not None:
+            try:
+                await self._forkserver.start()
+            except Exception:
+                await self._server.stop()
+                raise
+
         self._running = True
 
         if self._pool_size:
@@ -235,11 +386,148 @@ class Manager:
 
         self._workers_pool.clear()
         self._workers.clear()
+
+        if self._forkserver is not None:
+            await self._forkserver.stop()
+
+        self._running = False
+
+
+class Pool:
+    """A fixed-size set of workers shared by many clients.
+
+    Workers are handed out with acquire() and must be returned with
+    release().  A client can hold on to a worker for as long as it
+    needs to keep state in it (e.g. for the duration of a transaction)
+    by acquiring it with hold=True; stateless requests should go
+    through call().  At most *max_held* workers can be held at a time,
+    so that clients holding workers indefinitely cannot starve the
+    stateless requests.
+    """
+
+    def __init__(self, *, manager, pool_size, acquire_timeout=None,
+                 max_held=None):
+        if max_held is None:
+            max_held = pool_size
+        self._manager = manager
+        self._pool_size = pool_size
+        self._acquire_timeout = acquire_timeout
+        self._max_held = max_held
+        self._held_slots = asyncio.Semaphore(max_held)
+        self._held = set()
+        self._idle = asyncio.LifoQueue()
+        self._workers = set()
+        self._running = False
+
+    @property
+    def pool_size(self):
+        return self._pool_size
+
+    @property
+    def max_held(self):
+        return self._max_held
+
+    def iter_workers(self):
+        return iter(frozenset(self._workers))
+
+    async def _spawn_for_pool(self):
+        worker = await self._manager.spawn_worker()
+        self._workers.add(worker)
+        self._idle.put_nowait(worker)
+
+    async def acquire(self, *, hold: bool=False):
+        if not self._running:
+            raise RuntimeError('cannot acquire a worker: not running')
+
+        if not hold:
+            return await self._acquire(self._acquire_timeout)
+
+        started_at = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                self._held_slots.acquire(), self._acquire_timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeoutError(
+                f'all {self._max_held} workers that can be held are '
+                f'in use for over {self._acquire_timeout} '
+                f'seconds') from None
+
+        timeout = self._acquire_timeout
+        if timeout is not None:
+            timeout = max(timeout - (time.monotonic() - started_at), 0)
+        try:
+            worker = await self._acquire(timeout)
+        except BaseException:
+            self._held_slots.release()
+            raise
+
+        self._held.add(worker)
+        return worker
+
+    async def _acquire(self, timeout):
+        try:
+            worker = await asyncio.wait_for(self._idle.get(), timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeoutError(
+                f'no worker became available in '
+                f'{self._acquire_timeout} seconds') from None
+
+        if not worker.is_alive():
+            # The process has exited while idle and holds no client
+            # state, so it can simply be restarted.
+            try:
+                await worker._spawn()
+            except BaseException:
+                self._idle.put_nowait(worker)
+                raise
+
+        return worker
+
+    def release(self, worker):
+        if worker in self._held:
+            self._held.discard(worker)
+            self._held_slots.release()
+        if worker in self._workers:
+            self._idle.put_nowait(worker)
+
+    async def call_on(self, worker, method_name, *args):
+        # An acquired worker may keep state for its client, so unlike
+        # Worker.call() this never restarts it behind the client's back.
+        if not worker.is_alive():
+            raise WorkerLostError(
+                f'worker process {worker.get_pid()} has exited')
+        try:
+            return await worker.call(method_name, *args)
+        except Exception as ex:
+            if not worker.is_alive():
+                raise WorkerLostError(
+                    f'worker process {worker.get_pid()} has exited '
+                    f'during a call') from ex
+            raise
+
+    async def call(self, method_name, *args):
+        worker = await self.acquire()
+        try:
+            return await self.call_on(worker, method_name, *args)
+        finally:
+            self.release(worker)
+
+    async def start(self):
+        self._running = True
+        async with taskgroup.TaskGroup(name='pool-start') as g:
+            for _ in range(self._pool_size):
+                g.create_task(self._spawn_for_pool())
+
+    async def stop(self):
         self._running = False
+        self._workers.clear()
+        await self._manager.stop()
 
 
 async def create_manager(*, runstate_dir: str, name: str,
-                         worker_cls: type, worker_args: tuple) -> Manager:
+                         worker_cls: type, worker_args: tuple,
+                         pool_size: int=BUFFER_POOL_SIZE,
+                         use_forkserver: bool=False) -> Manager:
 
     loop = asyncio.get_running_loop()
     pool = Manager(
@@ -247,7 +535,37 @@ async def create_manager(*, runstate_dir: str, name: str,
         runstate_dir=runstate_dir,
         worker_cls=worker_cls,
         worker_args=worker_args,
-        name=name)
+        name=name,
+        pool_size=pool_size,
+        use_forkserver=use_forkserver)
 
     await pool.start()
     return pool
+
+
+async def create_pool(*, runstate_dir: str, name: str,
+                      worker_cls: type, worker_args: tuple,
+                      pool_size: int,
+                      acquire_timeout: Optional[float]=None,
+                      max_held: Optional[int]=None,
+                      use_forkserver: bool=False) -> Pool:
+
+    manager = await create_manager(
+        runstate_dir=runstate_dir,
+        worker_cls=worker_cls,
+        worker_args=worker_args,
+        name=name,
+        pool_size=0,
+        use_forkserver=use_forkserver)
+
+    pool = Pool(
+        manager=manager,
+        pool_size=pool_size,
+        acquire_timeout=acquire_timeout,
+        max_held=max_held)
+    try:
+        await pool.start()
+    except Exception:
+        await manager.stop()
+        raise
+    return pool
@@ -44,54 +44,84 @@ def load_class(cls_name):
     return cls
 
 
-async def worker(cls, cls_args, sockname):
+async def call_method(meth, args):
+    try:
+        res = await meth(*args)
+        return (0, res)
+    except Exception as ex:
+        prepare_exception(ex)
+        if debug.flags.server:
+            markup.dump(ex)
+        return (
+            1,
+            ex,
+            traceback.format_exc()
+        )
+
+
+async def handle_request(con, worker, req_id, req, lock):
+    try:
+        methname, args = pickle.loads(req)
+        meth = getattr(worker, methname)
+    except Exception as ex:
+        prepare_exception(ex)
+        if debug.flags.server:
+            markup.dump(ex)
+        data = (
+            1,
+            ex,
+            traceback.format_exc()
+        )
+    else:
+        if getattr(meth, '_procpool_reentrant', False):
+            data = await call_method(meth, args)
+        else:
+            async with lock:
+                data = await call_method(meth, args)
+
+    try:
+        pickled = pickle.dumps(data)
+    except Exception as ex:
+        ex_tb = traceback.format_exc()
+        ex_str = f'{ex}:\n\n{ex_tb}'
+        pickled = pickle.dumps((2, ex_str))
+
+    await con.reply(req_id, pickled)
+
+
+async def worker(cls, cls_args, sockname, instance=None):
     loop = asyncio.get_running_loop()
     loop.add_signal_handler(signal.SIGTERM, on_terminate_worker)
 
     con = await amsg.worker_connect(sockname)
     try:
-        worker = cls(*cls_args)
+        if instance is not None:
+            # Forked from a forkserver with a pre-built instance.
+            worker = instance
+        else:
+            worker = cls(*cls_args)
+
+        # Requests can be pipelined: each one is handled in its own
+        # task and replied to as soon as it is done.  Only the requests
+        # for @reentrant methods run concurrently though; the others
+        # are handled strictly one at a time, in the order they arrive:
+        # worker methods are not re-entrant by default (the compiler
+        # keeps the state of the current connection between awaits),
+        # and a request whose caller has been cancelled must run to
+        # completion before the next caller's request starts.
+        lock = asyncio.Lock()
+        tasks = set()
 
         while True:
             try:
-                req = await con.next_request()
+                req_id, req = await con.next_request()
             except amsg.PoolClosedError:
                 os._exit(0)
 
-            try:
-                methname, args = pickle.loads(req)
-                meth = getattr(worker, methname)
-            except Exception as ex:
-                prepare_exception(ex)
-                if debug.flags.server:
-                    markup.dump(ex)
-                data = (
-                    1,
-                    ex,
-                    traceback.format_exc()
-                )
-            else:
-                try:
-                    res = await meth(*args)
-                    data = (0, res)
-                except Exception as ex:
-                    prepare_exception(ex)
-                    if debug.flags.server:
-                        markup.dump(ex)
-                    data = (
-                        1,
-                        ex,
-                        traceback.format_exc()
-                    )
-
-            try:
-                pickled = pickle.dumps(data)
-            except Exception as ex:
-                ex_tb = traceback.format_exc()
-                ex_str = f'{ex}:\n\n{ex_tb}'
-                pickled = pickle.dumps((2, ex_str))
-
-            await con.reply(pickled)
+            task = loop.create_task(
+                handle_request(con, worker, req_id, req, lock))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
     finally:
         con.abort()
 
@@ -101,10 +131,10 @@ def on_terminate_worker():
     os._exit(-1)
 
 
-def run_worker(cls, cls_args, sockname):
+def run_worker(cls, cls_args, sockname, instance=None):
     asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     with devmode.CoverageConfig.enable_coverage_if_requested():
-        asyncio.run(worker(cls, cls_args, sockname))
+        asyncio.run(worker(cls, cls_args, sockname, instance))
 
 
 def prepare_exception(ex):
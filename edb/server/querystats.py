@@ -0,0 +1,426 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Latency statistics of the query pipeline stages.
+
+Every server process keeps latency histograms of the stages a query
+goes through, both server-wide and per query.  Queries are identified
+by the fingerprint of their normalized text (see
+edb.edgeql.normalization), so queries that only differ in the values
+of their literals share the statistics.
+
+The stages are:
+
+* ``cache_lookup``: looking up the compiled query cache;
+* ``compile_queue``: waiting for a compiler worker;
+* ``compile``: the round trip to the compiler worker; the time spent
+  by the worker is further broken down into ``parse``, ``ir``,
+  ``sql`` and ``describe``;
+* ``execute``: running the query in Postgres, including copying the
+  result rows into the client buffer;
+* ``forward``: waiting for the client to accept the result data.
+"""
+
+from __future__ import annotations
+from typing import *  # NoQA
+
+import bisect
+import collections
+import json
+
+from edb.common import lru
+from edb.pgsql import common as pg_common
+
+from edb.server import defines
+
+
+STAGES = (
+    'cache_lookup',
+    'compile_queue',
+    'compile',
+    'parse',
+    'ir',
+    'sql',
+    'describe',
+    'execute',
+    'forward',
+)
+
+# Upper bounds of the histogram buckets, in seconds.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0,
+)
+
+# The name of the session setting the statistics are published in
+# for sys::get_query_stats().
+SESSION_SETTING = 'edgedb.query_stats'
+
+# Queries are truncated to this many characters in the statistics.
+_MAX_QUERY_TEXT_LEN = 4096
+
+
+class Histogram:
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self) -> None:
+        # The last slot counts the values above the last bound.
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def iter_cumulative(self) -> Iterator[Tuple[float, int]]:
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            total += count
+            yield bound, total
+
+    def as_json(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': [
+                {'le': bound, 'count': count}
+                for bound, count in self.iter_cumulative()
+            ],
+        }
+
+
+class RollingAverage:
+
+    __slots__ = ('_values', '_sum')
+
+    def __init__(self, maxlen: int) -> None:
+        self._values: Deque[float] = collections.deque(maxlen=maxlen)
+        self._sum = 0.0
+
+    def add(self, value: float) -> None:
+        values = self._values
+        if len(values) == values.maxlen:
+            self._sum -= values[0]
+        values.append(value)
+        self._sum += value
+
+    @property
+    def value(self) -> float:
+        if not self._values:
+            return 0.0
+        return self._sum / len(self._values)
+
+
+class StageStats:
+
+    def __init__(self, rolling_avg_len: int) -> None:
+        self.stages: Dict[str, Histogram] = {}
+        self.calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Of the execution time of the most recent calls.
+        self.rolling_avg = RollingAverage(rolling_avg_len)
+
+    def observe(self, timings: Mapping[str, float]) -> None:
+        stages = self.stages
+        for stage, value in timings.items():
+            try:
+                hist = stages[stage]
+            except KeyError:
+                hist = stages[stage] = Histogram()
+            hist.observe(value)
+
+    def observe_call(self, timings: Mapping[str, float]) -> None:
+        self.calls += 1
+        self.rolling_avg.add(
+            timings.get('execute', 0.0) + timings.get('forward', 0.0))
+
+
+class QueryStats(StageStats):
+
+    def __init__(self, dbname: str, fingerprint: bytes, query: str) -> None:
+        super().__init__(defines._QUERY_ROLLING_AVG_LEN)
+        self.dbname = dbname
+        self.fingerprint = fingerprint
+        self.query = query
+
+    def as_json(self) -> Dict[str, Any]:
+        return {
+            'fingerprint': self.fingerprint.hex(),
+            'query': self.query,
+            'calls': self.calls,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'avg_time': self.rolling_avg.value,
+            'stages': {
+                stage: hist.as_json()
+                for stage, hist in self.stages.items()
+            },
+        }
+
+
+class QueryStatsRegistry:
+    """Statistics of the queries run by a server process."""
+
+    def __init__(self, *,
+                 maxsize: int = defines.QUERY_STATS_MAX_QUERIES) -> None:
+        self._totals = StageStats(defines._QUERIES_ROLLING_AVG_LEN)
+        # (dbname, fingerprint) -> QueryStats; the statistics of the
+        # least recently used queries are discarded.
+        self._queries = lru.LRUMapping(maxsize=maxsize)
+
+    def record(
+        self,
+        dbname: str,
+        query_unit,
+        query: Optional[bytes],
+        timings: Mapping[str, float],
+        *,
+        cache_hit: Optional[bool] = None,
+        call: bool = False,
+    ) -> None:
+        """Record the stage timings of a query.
+
+        The per-query statistics are only created if the text of
+        the query is passed.
+        """
+        totals = self._totals
+        totals.observe(timings)
+        if call:
+            totals.observe_call(timings)
+        if cache_hit is not None:
+            if cache_hit:
+                totals.cache_hits += 1
+            else:
+                totals.cache_misses += 1
+
+        fingerprint = query_unit.fingerprint
+        if not fingerprint:
+            return
+
+        key = (dbname, fingerprint)
+        try:
+            stats = self._queries[key]
+        except KeyError:
+            if query is None:
+                return
+            stats = QueryStats(
+                dbname, fingerprint,
+                query[:_MAX_QUERY_TEXT_LEN].decode('utf-8', 'replace'))
+            self._queries[key] = stats
+
+        stats.observe(timings)
+        if call:
+            stats.observe_call(timings)
+        if cache_hit is not None:
+            if cache_hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+
+    def iter_queries(self, dbname: str) -> Iterator[QueryStats]:
+        for (stats_dbname, _), stats in list(self._queries._dict.items()):
+            if stats_dbname == dbname:
+                yield stats
+
+    def get_publish_sql(self, dbname: str) -> bytes:
+        """Return SQL that publishes the statistics into the session.
+
+        The statistics of the queries run against *dbname* are stored
+        as a JSON array in a session setting read by the
+        sys::get_query_stats() function.
+        """
+        data = json.dumps([s.as_json() for s in self.iter_queries(dbname)])
+        return (
+            f'SELECT set_config('
+            f'{pg_common.quote_literal(SESSION_SETTING)}, '
+            f'{pg_common.quote_literal(data)}, false);'
+        ).encode()
+
+    def render_prometheus(
+        self,
+        dbname: str,
+        *,
+        worker_id: Optional[int] = None,
+        query_caches: Iterable[
+            Tuple[str, int, Mapping[str, int]]] = (),
+    ) -> str:
+        """Render the statistics in the Prometheus text format.
+
+        The per-query statistics are limited to the queries run
+        against *dbname*.  If *worker_id* is given, every sample is
+        labeled with it, so that the statistics of the processes of
+        a multi-process server can be told apart.  *query_caches*
+        are the (protocol, port, stats) of the compiled query caches
+        of the HTTP ports, as returned by QueryCache.get_stats().
+        """
+        totals = self._totals
+        out: List[str] = []
+
+        common: List[str] = []
+        if worker_id is not None:
+            common.append(f'worker="{worker_id}"')
+
+        def labels(*pairs: str) -> str:
+            all_pairs = common + list(pairs)
+            if not all_pairs:
+                return ''
+            return '{' + ','.join(all_pairs) + '}'
+
+        _add_metric(
+            out, 'edgedb_query_stage_duration_seconds', 'histogram',
+            'Time spent in the stages of the query pipeline.')
+        for stage in STAGES:
+            hist = totals.stages.get(stage)
+            if hist is None:
+                continue
+            stage_label = f'stage="{stage}"'
+            for bound, count in hist.iter_cumulative():
+                le_label = f'le="{bound}"'
+                out.append(
+                    f'edgedb_query_stage_duration_seconds_bucket'
+                    f'{labels(stage_label, le_label)} {count}')
+            out.append(
+                f'edgedb_query_stage_duration_seconds_bucket'
+                f'{labels(stage_label, _INF_LABEL)} {hist.count}')
+            out.append(
+                f'edgedb_query_stage_duration_seconds_sum'
+                f'{labels(stage_label)} {hist.sum!r}')
+            out.append(
+                f'edgedb_query_stage_duration_seconds_count'
+                f'{labels(stage_label)} {hist.count}')
+
+        _add_metric(
+            out, 'edgedb_query_calls_total', 'counter',
+            'Number of executed queries.')
+        out.append(f'edgedb_query_calls_total{labels()} {totals.calls}')
+
+        _add_metric(
+            out, 'edgedb_query_cache_hits_total', 'counter',
+            'Number of compiled query cache hits.')
+        out.append(
+            f'edgedb_query_cache_hits_total{labels()} {totals.cache_hits}')
+
+        _add_metric(
+            out, 'edgedb_query_cache_misses_total', 'counter',
+            'Number of compiled query cache misses.')
+        out.append(
+            f'edgedb_query_cache_misses_total{labels()} '
+            f'{totals.cache_misses}')
+
+        _add_metric(
+            out, 'edgedb_query_avg_duration_seconds', 'gauge',
+            f'Average execution time of the last '
+            f'{defines._QUERIES_ROLLING_AVG_LEN} queries.')
+        out.append(
+            f'edgedb_query_avg_duration_seconds{labels()} '
+            f'{totals.rolling_avg.value!r}')
+
+        queries = list(self.iter_queries(dbname))
+        db_label = f'database="{_escape_label(dbname)}"'
+
+        _add_metric(
+            out, 'edgedb_query_fingerprint_calls_total', 'counter',
+            'Number of executions of a query.')
+        for stats in queries:
+            fp_label = f'fingerprint="{stats.fingerprint.hex()}"'
+            out.append(
+                f'edgedb_query_fingerprint_calls_total'
+                f'{labels(db_label, fp_label)} {stats.calls}')
+
+        _add_metric(
+            out, 'edgedb_query_fingerprint_cache_misses_total', 'counter',
+            'Number of compiled query cache misses of a query.')
+        for stats in queries:
+            fp_label = f'fingerprint="{stats.fingerprint.hex()}"'
+            out.append(
+                f'edgedb_query_fingerprint_cache_misses_total'
+                f'{labels(db_label, fp_label)} {stats.cache_misses}')
+
+        _add_metric(
+            out, 'edgedb_query_fingerprint_stage_seconds_total', 'counter',
+            'Time spent in the stages of the query pipeline by a query.')
+        for stats in queries:
+            fp_label = f'fingerprint="{stats.fingerprint.hex()}"'
+            for stage in STAGES:
+                hist = stats.stages.get(stage)
+                if hist is not None:
+                    stage_label = f'stage="{stage}"'
+                    out.append(
+                        f'edgedb_query_fingerprint_stage_seconds_total'
+                        f'{labels(db_label, fp_label, stage_label)}'
+                        f' {hist.sum!r}')
+
+        _add_metric(
+            out, 'edgedb_query_fingerprint_avg_duration_seconds', 'gauge',
+            f'Average execution time of the last '
+            f'{defines._QUERY_ROLLING_AVG_LEN} calls of a query.')
+        for stats in queries:
+            fp_label = f'fingerprint="{stats.fingerprint.hex()}"'
+            out.append(
+                f'edgedb_query_fingerprint_avg_duration_seconds'
+                f'{labels(db_label, fp_label)} '
+                f'{stats.rolling_avg.value!r}')
+
+        query_caches = list(query_caches)
+        for key, name, kind, doc in _QUERY_CACHE_METRICS:
+            _add_metric(out, name, kind, doc)
+            for proto, port, cache_stats in query_caches:
+                proto_label = f'protocol="{_escape_label(proto)}"'
+                port_label = f'port="{port}"'
+                out.append(
+                    f'{name}{labels(proto_label, port_label)} '
+                    f'{cache_stats[key]}')
+
+        out.append('')
+        return '\n'.join(out)
+
+
+def _add_metric(out: List[str], name: str, kind: str, doc: str) -> None:
+    out.append(f'# HELP {name} {doc}')
+    out.append(f'# TYPE {name} {kind}')
+
+
+_INF_LABEL = 'le="+Inf"'
+
+# (QueryCache.get_stats() key, metric name, metric type, help)
+_QUERY_CACHE_METRICS = (
+    ('hits', 'edgedb_http_query_cache_hits_total', 'counter',
+     'Number of compiled query cache hits of an HTTP port.'),
+    ('misses', 'edgedb_http_query_cache_misses_total', 'counter',
+     'Number of compiled query cache misses of an HTTP port.'),
+    ('evictions', 'edgedb_http_query_cache_evictions_total', 'counter',
+     'Number of queries evicted from the compiled query cache '
+     'of an HTTP port.'),
+    ('entries', 'edgedb_http_query_cache_entries', 'gauge',
+     'Number of queries in the compiled query cache of an HTTP port.'),
+    ('size_bytes', 'edgedb_http_query_cache_size_bytes', 'gauge',
+     'Approximate size of the compiled query cache of an HTTP port.'),
+)
+
+
+def _escape_label(value: str) -> str:
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
@@ -20,8 +20,12 @@
 from __future__ import annotations
 from typing import *  # NoQA
 
+import asyncio
 import json
 import logging
+import os
+import pickle
+import tempfile
 
 from edb import errors
 
@@ -31,10 +35,14 @@ from edb.edgeql import parser as ql_parser
 
 from edb.server import config
 from edb.server import defines
+from edb.server import http
 from edb.server import http_edgeql_port
 from edb.server import http_graphql_port
+from edb.server import http_metrics_port
 from edb.server import mng_port
 from edb.server import pgcon
+from edb.server import querystats
+from edb.server.compiler import enums
 
 from . import baseport
 from . import dbview
@@ -42,6 +50,52 @@ from . import dbview
 
 logger = logging.getLogger('edb.server')
 
+# The snapshot is only unpickled if it was saved by a server with
+# the same catalog version.
+_QUERY_CACHE_SNAPSHOT_HEADER = (
+    f'EDGEDB QCACHE {defines.EDGEDB_CATALOG_VERSION}\n'.encode())
+
+
+def load_query_cache_snapshot(path: str) -> Dict[str, list]:
+    try:
+        with open(path, 'rb') as f:
+            if f.readline() != _QUERY_CACHE_SNAPSHOT_HEADER:
+                # Saved by a different version of the server.
+                return {}
+            queries = pickle.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception:
+        logger.warning('could not load the query cache snapshot %s',
+                       path, exc_info=True)
+        return {}
+
+    if not isinstance(queries, dict):
+        logger.warning('could not load the query cache snapshot %s', path)
+        return {}
+
+    return queries
+
+
+def save_query_cache_snapshot(path: str, queries: Dict[str, list]) -> None:
+    f = tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(path), prefix='.qcache-', delete=False)
+    try:
+        with f:
+            f.write(_QUERY_CACHE_SNAPSHOT_HEADER)
+            pickle.dump(queries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+
+def _format_ports(ports: range) -> str:
+    if len(ports) == 1:
+        return f'port {ports.start}'
+    else:
+        return f'ports {ports.start}-{ports[-1]}'
+
 
 class Server:
 
@@ -53,7 +107,10 @@ class Server:
                  max_backend_connections,
                  nethost, netport,
                  auto_shutdown: bool=False,
-                 echo_runtime_info: bool = False):
+                 echo_runtime_info: bool = False,
+                 workers: int = 1,
+                 worker_id: int = 0,
+                 versions=None):
 
         self._loop = loop
 
@@ -69,6 +126,25 @@ class Server:
         self._internal_runstate_dir = internal_runstate_dir
         self._max_backend_connections = max_backend_connections
 
+        # In the multi-process mode every process runs a Server
+        # accepting connections on the same ports; the processes
+        # share the backend connections limit and the versions of
+        # the database schemas and of the system config (see
+        # sharedmem.VersionTable).
+        self._workers = workers
+        self._worker_id = worker_id
+        self._versions = versions
+        self._sys_config_sync_task = None
+
+        self._qcache_preload_task = None
+        self._qcache_snapshot_task = None
+
+        self._pgcon_pool = pgcon.Pool(
+            connect=self.new_pgcon,
+            max_capacity=max(max_backend_connections // workers, 1))
+
+        self._query_stats = querystats.QueryStatsRegistry()
+
         self._mgmt_port = None
         self._mgmt_host_addr = nethost
         self._mgmt_port_no = netport
@@ -84,7 +160,7 @@ class Server:
         self._echo_runtime_info = echo_runtime_info
 
     async def init(self):
-        self._dbindex = await dbview.DatabaseIndex.init(self)
+        self._dbindex = await dbview.DatabaseIndex.init(self, self._versions)
         self._populate_sys_auth()
 
         cfg = self._dbindex.get_sys_config()
@@ -113,6 +189,96 @@ class Server:
     async def new_pgcon(self, dbname):
         return await pgcon.connect(self._get_pgaddr(), dbname)
 
+    def get_pgcon_pool(self):
+        return self._pgcon_pool
+
+    def get_query_stats(self):
+        return self._query_stats
+
+    def get_worker_count(self):
+        return self._workers
+
+    def get_query_cache_stats(self):
+        # (protocol, port number, stats) of the HTTP ports caching
+        # compiled queries.
+        return [
+            (portconf.protocol, portconf.port, port.get_query_cache_stats())
+            for portconf, port in self._sys_conf_ports.items()
+            if isinstance(port, http.BaseHttpPort)
+        ]
+
+    def get_worker_id(self):
+        return self._worker_id
+
+    def is_primary_worker(self):
+        return self._worker_id == 0
+
+    async def _sync_sys_config_loop(self):
+        while True:
+            await asyncio.sleep(defines.SYSTEM_CONFIG_SYNC_INTERVAL)
+            try:
+                await self._dbindex.sync_sys_config()
+            except Exception:
+                logger.exception(
+                    'could not apply system config changes made by '
+                    'another server process')
+
+    def _get_query_cache_snapshot_path(self):
+        return os.path.join(
+            self._runstate_dir,
+            defines.QUERY_CACHE_SNAPSHOT_FILE.format(
+                port=self._mgmt_port_no, worker=self._worker_id))
+
+    def _save_query_cache_snapshot(self):
+        save_query_cache_snapshot(
+            self._get_query_cache_snapshot_path(),
+            self._dbindex.get_hot_queries(
+                defines.QUERY_CACHE_SNAPSHOT_SIZE))
+
+    async def _query_cache_snapshot_loop(self):
+        while True:
+            await asyncio.sleep(defines.QUERY_CACHE_SNAPSHOT_INTERVAL)
+            try:
+                self._save_query_cache_snapshot()
+            except Exception:
+                logger.exception('could not save the query cache snapshot')
+
+    async def _preload_query_cache(self, queries):
+        # The queries are compiled one at a time, so that the compiler
+        # workers remain available to the clients.  The dbver the
+        # queries were compiled against doesn't survive a restart,
+        # so every query is validated by compiling it against the
+        # current schema; queries that no longer compile are dropped.
+        # The processes of a multi-process server preload their own
+        # queries, and the compiler workers of all of them share the
+        # compiled units (see Compiler.compile_eql()), so a query
+        # that is hot in several processes is mostly loaded by all but
+        # the first of them rather than compiled again.
+        compiler_pool = self._mgmt_port.compiler_pool
+        for dbname, entries in queries.items():
+            for key, eql in entries:
+                _, json_mode, expect_one, implicit_limit, aliases, conf = key
+                try:
+                    units = await compiler_pool.call(
+                        'compile_eql',
+                        dbname,
+                        self._dbindex.get_dbver(dbname),
+                        eql,
+                        aliases,
+                        conf,
+                        json_mode,
+                        expect_one,
+                        implicit_limit,
+                        enums.CompileStatementMode.SINGLE.value,
+                        enums.Capability.ALL,
+                    )
+                except Exception:
+                    continue
+
+                if len(units) == 1 and units[0].cacheable:
+                    self._dbindex.cache_compiled_query(
+                        dbname, key, units[0], eql)
+
     async def new_compiler(self, dbname, dbver):
         compiler_worker = await self._compiler_manager.spawn_worker()
         try:
@@ -161,6 +327,51 @@ class Server:
             self._mgmt_port_no = netport
             self._mgmt_port = new_mgmt_port
 
+    def _get_port_numbers(self, portconf: config.ConfigType) -> range:
+        if portconf.protocol == 'metrics+http' and self._workers > 1:
+            # Every process serves its own statistics, on the port
+            # number plus the process number; see HttpMetricsPort.
+            return range(portconf.port, portconf.port + self._workers)
+        else:
+            return range(portconf.port, portconf.port + 1)
+
+    def _check_port_numbers(self, portconf: config.ConfigType):
+        # The ports of a multi-process server are checked by all of
+        # its processes, so that a port colliding with another one in
+        # some of them only is rejected by all.
+        ports = self._get_port_numbers(portconf)
+        if ports[-1] > 65535:
+            raise errors.ConfigurationError(
+                f'cannot use port {portconf.port} for {portconf.protocol}: '
+                f'the {len(ports)} server processes would listen on the '
+                f'ports up to {ports[-1]}')
+
+        used = [(range(self._mgmt_port_no, self._mgmt_port_no + 1),
+                 'the server')]
+        for other in self._sys_conf_ports:
+            if other != portconf:
+                used.append((self._get_port_numbers(other),
+                             f'the {other.protocol} port'))
+
+        for other_ports, name in used:
+            if len(ports) == 1 and len(other_ports) == 1:
+                # Ports listening on different addresses can share
+                # the port number; otherwise binding fails.
+                continue
+            if (ports.start < other_ports.stop and
+                    other_ports.start < ports.stop):
+                raise errors.ConfigurationError(
+                    f'cannot use port {portconf.port} for '
+                    f'{portconf.protocol}: the server would listen on '
+                    f'{_format_ports(ports)}, which overlaps with '
+                    f'{_format_ports(other_ports)} used by {name}')
+
+    def _check_system_config_add(self, setting_name, value):
+        # CONFIGURE SYSTEM INSERT ConfigObject; before the change
+        # is saved.
+        if setting_name == 'ports':
+            self._check_port_numbers(value)
+
     async def _start_portconf(self, portconf: config.ConfigType, *,
                               suppress_errors=False):
         if portconf in self._sys_conf_ports:
@@ -168,10 +379,24 @@ class Server:
                          portconf)
             return
 
+        try:
+            # The number of processes might have changed since the
+            # port was configured.
+            self._check_port_numbers(portconf)
+        except errors.ConfigurationError:
+            if suppress_errors:
+                logging.error(
+                    'failed to start port for config: %r', portconf,
+                    exc_info=True)
+                return
+            raise
+
         if portconf.protocol == 'graphql+http':
             port_cls = http_graphql_port.HttpGraphQLPort
         elif portconf.protocol == 'edgeql+http':
             port_cls = http_edgeql_port.HttpEdgeQLPort
+        elif portconf.protocol == 'metrics+http':
+            port_cls = http_metrics_port.HttpMetricsPort
         else:
             raise errors.InvalidReferenceError(
                 f'unknown protocol {portconf.protocol!r}')
@@ -183,7 +408,8 @@ class Server:
             database=portconf.database,
             user=portconf.user,
             protocol=portconf.protocol,
-            concurrency=portconf.concurrency)
+            concurrency=portconf.concurrency,
+            query_cache_size=portconf.query_cache_size)
 
         try:
             await port.start()
@@ -288,6 +514,19 @@ class Server:
 
         self._serving = True
 
+        if self._versions is not None:
+            self._sys_config_sync_task = self._loop.create_task(
+                self._sync_sys_config_loop())
+
+        queries = load_query_cache_snapshot(
+            self._get_query_cache_snapshot_path())
+        if queries:
+            self._qcache_preload_task = self._loop.create_task(
+                self._preload_query_cache(queries))
+
+        self._qcache_snapshot_task = self._loop.create_task(
+            self._query_cache_snapshot_loop())
+
         if self._echo_runtime_info:
             ri = {
                 "port": self._mgmt_port_no,
@@ -298,6 +537,22 @@ class Server:
     async def stop(self):
         self._serving = False
 
+        if self._sys_config_sync_task is not None:
+            self._sys_config_sync_task.cancel()
+            self._sys_config_sync_task = None
+
+        if self._qcache_preload_task is not None:
+            self._qcache_preload_task.cancel()
+            self._qcache_preload_task = None
+
+        if self._qcache_snapshot_task is not None:
+            self._qcache_snapshot_task.cancel()
+            self._qcache_snapshot_task = None
+            try:
+                self._save_query_cache_snapshot()
+            except Exception:
+                logger.exception('could not save the query cache snapshot')
+
         async with taskgroup.TaskGroup() as g:
             for port in self._ports:
                 g.create_task(port.stop())
@@ -308,7 +563,13 @@ class Server:
             g.create_task(self._mgmt_port.stop())
             self._mgmt_port = None
 
+        self._pgcon_pool.close()
+
     async def get_auth_method(self, user, database, conn):
+        # Make sure the auth config changes made by other server
+        # processes are taken into account.
+        await self._dbindex.sync_sys_config()
+
         authlist = self._sys_auth
 
         if not authlist:
@@ -0,0 +1,77 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from __future__ import annotations
+from typing import *  # NoQA
+
+import mmap
+import time
+import zlib
+
+from edb.server import defines
+
+
+class VersionTable:
+    """Version counters shared by the processes of a server.
+
+    The table lives in an anonymous shared memory mapping, so it has
+    to be created before the server processes are forked.  Versions
+    are values of the system-wide monotonic clock: a process stores
+    a new version when it changes a database schema or the system
+    config, and the other processes notice the change the next time
+    they read the version.
+
+    Database versions are hashed into a fixed number of slots; two
+    databases sharing a slot only cause spurious cache invalidations.
+    """
+
+    def __init__(
+        self,
+        nslots: int = defines.SHARED_VERSION_SLOTS,
+    ) -> None:
+        if nslots < 2:
+            raise ValueError(
+                f'nslots is expected to be greater than 1, got {nslots}')
+
+        self._nslots = nslots
+        self._mem = mmap.mmap(-1, nslots * 8)
+        # Aligned 8-byte stores and loads are not torn.
+        self._slots = memoryview(self._mem).cast('q')
+
+    def _get_db_slot(self, dbname: str) -> int:
+        # Slot 0 holds the system config version.
+        return 1 + zlib.crc32(dbname.encode()) % (self._nslots - 1)
+
+    def get_dbver(self, dbname: str) -> int:
+        """Return the current version of *dbname*, or 0 if it has none."""
+        return self._slots[self._get_db_slot(dbname)]
+
+    def new_dbver(self, dbname: str) -> int:
+        """Advance the version of *dbname* and return it."""
+        ver = time.monotonic_ns()
+        self._slots[self._get_db_slot(dbname)] = ver
+        return ver
+
+    def get_sys_config_ver(self) -> int:
+        return self._slots[0]
+
+    def new_sys_config_ver(self) -> int:
+        ver = time.monotonic_ns()
+        self._slots[0] = ver
+        return ver
@@ -131,11 +131,12 @@ class EdgeQLTestCase(BaseHttpTest, server.QueryTestCase):
                 f'{self.http_addr}/?{urllib.parse.urlencode(req_data)}')
             resp_data = json.loads(response.read())
 
-        if 'data' in resp_data:
+        # An error can follow a part of the data if it occurred
+        # while the result was being streamed.
+        err = resp_data.get('error')
+        if err is None:
             return resp_data['data']
 
-        err = resp_data['error']
-
         ex_msg = err['message'].strip()
         ex_code = err['code']
 
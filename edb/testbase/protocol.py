@@ -0,0 +1,399 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2019-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+"""A minimal client of the binary protocol.
+
+The client libraries don't send some of the messages of the binary
+protocol, such as BatchExecute, BulkInsert, or Prepare with a named
+statement; this client lets the tests exercise them directly.  Only
+SCRAM authentication is supported.
+"""
+
+from __future__ import annotations
+from typing import *  # NoQA
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import struct
+
+from edb import errors
+
+
+PROTO_VER = (0, 7)
+
+CARD_ONE = b'o'
+CARD_MANY = b'm'
+
+FORMAT_BINARY = b'b'
+FORMAT_JSON = b'j'
+
+TX_IDLE = b'I'
+TX_IN_TX = b'T'
+TX_FAILED = b'E'
+
+
+Message = Tuple[bytes, bytes]
+
+
+class _Reader:
+
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._pos = 0
+
+    def read(self, n: int) -> bytes:
+        data = self._data[self._pos:self._pos + n]
+        if len(data) != n:
+            raise AssertionError('unexpected end of message')
+        self._pos += n
+        return data
+
+    def read_int16(self) -> int:
+        return struct.unpack('!h', self.read(2))[0]
+
+    def read_int32(self) -> int:
+        return struct.unpack('!i', self.read(4))[0]
+
+    def read_len_prefixed(self) -> bytes:
+        return self.read(self.read_int32())
+
+    def read_headers(self) -> Dict[int, bytes]:
+        headers = {}
+        for _ in range(self.read_int16()):
+            key = struct.unpack('!H', self.read(2))[0]
+            headers[key] = self.read_len_prefixed()
+        return headers
+
+
+def _len_prefixed(data: bytes) -> bytes:
+    return struct.pack('!i', len(data)) + data
+
+
+def _message(mtype: bytes, *parts: bytes) -> bytes:
+    payload = b''.join(parts)
+    return mtype + struct.pack('!i', len(payload) + 4) + payload
+
+
+_NO_HEADERS = struct.pack('!h', 0)
+
+
+# Client messages.
+
+def prepare(query: str, *, name: bytes = b'',
+            io_format: bytes = FORMAT_BINARY,
+            cardinality: bytes = CARD_MANY) -> bytes:
+    return _message(
+        b'P', _NO_HEADERS, io_format, cardinality,
+        _len_prefixed(name), _len_prefixed(query.encode()))
+
+
+def describe(name: bytes = b'') -> bytes:
+    return _message(b'D', _NO_HEADERS, b'T', _len_prefixed(name))
+
+
+def execute(args: bytes = b'', *, name: bytes = b'') -> bytes:
+    return _message(
+        b'E', _NO_HEADERS, _len_prefixed(name),
+        _len_prefixed(args or encode_args()))
+
+
+def batch_execute(args: Sequence[bytes], *, name: bytes = b'') -> bytes:
+    return _message(
+        b'B', _NO_HEADERS, _len_prefixed(name),
+        struct.pack('!i', len(args)),
+        *(_len_prefixed(a) for a in args))
+
+
+def execute_script(script: str) -> bytes:
+    return _message(b'Q', _NO_HEADERS, _len_prefixed(script.encode()))
+
+
+def bulk_insert(type_name: str, fields: Sequence[str]) -> bytes:
+    return _message(
+        b'I', _NO_HEADERS, _len_prefixed(type_name.encode()),
+        struct.pack('!h', len(fields)),
+        *(_len_prefixed(f.encode()) for f in fields))
+
+
+def bulk_insert_data(objects: Sequence[bytes]) -> bytes:
+    return _message(
+        b'=', _NO_HEADERS, struct.pack('!i', len(objects)),
+        *(_len_prefixed(o) for o in objects))
+
+
+def bulk_insert_eof() -> bytes:
+    return _message(b'.')
+
+
+def sync() -> bytes:
+    return _message(b'S')
+
+
+# Encoding of the argument data.  Every element is given already
+# encoded in its binary format, or None for an empty set.
+
+def encode_args(*elements: Optional[bytes]) -> bytes:
+    parts = [struct.pack('!i', len(elements))]
+    for element in elements:
+        if element is None:
+            parts.append(struct.pack('!i', -1))
+        else:
+            parts.append(_len_prefixed(element))
+    return b''.join(parts)
+
+
+def encode_object(*elements: Optional[bytes]) -> bytes:
+    # Named tuples (and the objects of BulkInsertData) are encoded
+    # as tuples with a reserved field in front of every element.
+    parts = [struct.pack('!i', len(elements))]
+    for element in elements:
+        parts.append(struct.pack('!i', 0))
+        if element is None:
+            parts.append(struct.pack('!i', -1))
+        else:
+            parts.append(_len_prefixed(element))
+    return b''.join(parts)
+
+
+def encode_int64(value: int) -> bytes:
+    return struct.pack('!q', value)
+
+
+def encode_str(value: str) -> bytes:
+    return value.encode()
+
+
+def encode_array(elements: Sequence[bytes]) -> bytes:
+    # No flags; the element type is set by the server.
+    if not elements:
+        return struct.pack('!iii', 0, 0, 0)
+    parts = [struct.pack('!iiiii', 1, 0, 0, len(elements), 1)]
+    for element in elements:
+        parts.append(_len_prefixed(element))
+    return b''.join(parts)
+
+
+def decode_int64(data: bytes) -> int:
+    return struct.unpack('!q', data)[0]
+
+
+# Server messages.
+
+def parse_data(data: bytes) -> List[bytes]:
+    buf = _Reader(data)
+    return [buf.read_len_prefixed() for _ in range(buf.read_int16())]
+
+
+def parse_command_complete(data: bytes) -> bytes:
+    buf = _Reader(data)
+    buf.read_headers()
+    return buf.read_len_prefixed()
+
+
+def parse_prepare_complete(data: bytes) -> Tuple[bytes, bytes, bytes]:
+    buf = _Reader(data)
+    buf.read_headers()
+    return buf.read(1), buf.read(16), buf.read(16)
+
+
+def parse_error(data: bytes) -> errors.EdgeDBError:
+    buf = _Reader(data)
+    buf.read(1)  # severity
+    code = struct.unpack('!I', buf.read(4))[0]
+    message = buf.read_len_prefixed().decode()
+    try:
+        error_cls = errors.EdgeDBError.get_error_class_from_code(code)
+    except KeyError:
+        error_cls = errors.InternalServerError
+    return error_cls(message)
+
+
+class Connection:
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter) -> None:
+        self._reader = reader
+        self._writer = writer
+        self.tx_state = TX_IDLE
+
+    @classmethod
+    async def connect(cls, *, host: str, port: int, user: str,
+                      password: str, database: str,
+                      **kwargs: Any) -> Connection:
+        reader, writer = await asyncio.open_connection(host, port)
+        con = cls(reader, writer)
+        try:
+            await con._handshake(user, password, database)
+        except BaseException:
+            writer.close()
+            raise
+        return con
+
+    async def _handshake(self, user: str, password: str,
+                         database: str) -> None:
+        params = {'user': user, 'database': database}
+        self.send(_message(
+            b'V', struct.pack('!hhh', *PROTO_VER, len(params)),
+            *(_len_prefixed(k.encode()) + _len_prefixed(v.encode())
+              for k, v in params.items()),
+            struct.pack('!h', 0)))
+
+        scram = None
+        while True:
+            mtype, data = await self.recv()
+            if mtype == b'E':
+                raise parse_error(data)
+            elif mtype == b'Z':
+                await self._on_ready(data)
+                return
+            elif mtype != b'R':
+                continue
+
+            buf = _Reader(data)
+            status = buf.read_int32()
+            if status == 10:
+                # AuthenticationSASL
+                scram = _SCRAMClient(user, password)
+                self.send(_message(
+                    b'p', _len_prefixed(b'SCRAM-SHA-256'),
+                    _len_prefixed(scram.client_first())))
+            elif status == 11:
+                # AuthenticationSASLContinue
+                assert scram is not None
+                self.send(_message(
+                    b'r', _len_prefixed(
+                        scram.client_final(buf.read_len_prefixed()))))
+            elif status == 12:
+                # AuthenticationSASLFinal
+                assert scram is not None
+                scram.verify_server_final(buf.read_len_prefixed())
+
+    async def _on_ready(self, data: bytes) -> None:
+        buf = _Reader(data)
+        buf.read_headers()
+        self.tx_state = buf.read(1)
+
+    def send(self, *messages: bytes) -> None:
+        self._writer.write(b''.join(messages))
+
+    async def recv(self) -> Message:
+        while True:
+            header = await self._reader.readexactly(5)
+            mtype = header[:1]
+            length = struct.unpack('!i', header[1:])[0]
+            data = await self._reader.readexactly(length - 4)
+            # Skip the asynchronous messages.
+            if mtype not in (b'L', b'S'):
+                return mtype, data
+
+    async def recv_until_ready(self) -> List[Message]:
+        """Receive the messages up to ReadyForCommand."""
+        messages = []
+        while True:
+            mtype, data = await self.recv()
+            if mtype == b'Z':
+                await self._on_ready(data)
+                return messages
+            messages.append((mtype, data))
+
+    async def sync(self, *messages: bytes) -> List[Message]:
+        """Send *messages* followed by Sync and return the responses.
+
+        If the server has responded with an ErrorResponse, the
+        corresponding error is raised once the server is ready for
+        the next command.
+        """
+        self.send(*messages, sync())
+        responses = await self.recv_until_ready()
+        for mtype, data in responses:
+            if mtype == b'E':
+                raise parse_error(data)
+        return responses
+
+    async def execute_script(self, script: str) -> None:
+        await self.sync(execute_script(script))
+
+    async def close(self) -> None:
+        self.send(_message(b'X'))
+        self._writer.close()
+
+
+def get_data(responses: Sequence[Message]) -> List[bytes]:
+    """Return the data elements of the Data messages of *responses*."""
+    data = []
+    for mtype, payload in responses:
+        if mtype == b'D':
+            data.extend(parse_data(payload))
+    return data
+
+
+def get_status(responses: Sequence[Message]) -> bytes:
+    """Return the status of the last CommandComplete in *responses*."""
+    for mtype, payload in reversed(responses):
+        if mtype == b'C':
+            return parse_command_complete(payload)
+    raise AssertionError('no CommandComplete message received')
+
+
+class _SCRAMClient:
+
+    def __init__(self, user: str, password: str) -> None:
+        self._password = password.encode()
+        self._nonce = base64.b64encode(os.urandom(18)).decode()
+        self._client_first_bare = f'n={user},r={self._nonce}'.encode()
+        self._server_signature = b''
+
+    def client_first(self) -> bytes:
+        return b'n,,' + self._client_first_bare
+
+    def client_final(self, server_first: bytes) -> bytes:
+        attrs = dict(
+            attr.split(b'=', 1) for attr in server_first.split(b','))
+        nonce = attrs[b'r']
+        if not nonce.startswith(self._nonce.encode()):
+            raise AssertionError('invalid SCRAM server nonce')
+        salted_password = hashlib.pbkdf2_hmac(
+            'sha256', self._password,
+            base64.b64decode(attrs[b's']), int(attrs[b'i']))
+
+        client_final = b'c=biws,r=' + nonce
+        auth_message = b','.join(
+            (self._client_first_bare, server_first, client_final))
+
+        client_key = _hmac(salted_password, b'Client Key')
+        client_signature = _hmac(
+            hashlib.sha256(client_key).digest(), auth_message)
+        proof = bytes(a ^ b for a, b in zip(client_key, client_signature))
+
+        server_key = _hmac(salted_password, b'Server Key')
+        self._server_signature = _hmac(server_key, auth_message)
+
+        return client_final + b',p=' + base64.b64encode(proof)
+
+    def verify_server_final(self, server_final: bytes) -> None:
+        _, _, signature = server_final.partition(b'v=')
+        if base64.b64decode(signature) != self._server_signature:
+            raise AssertionError('invalid SCRAM server signature')
+
+
+def _hmac(key: bytes, msg: bytes) -> bytes:
+    return hmac.new(key, msg, hashlib.sha256).digest()
@@ -0,0 +1,175 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""An entry point to the benchmark suites.
+
+See README.md in this package for more details.
+"""
+
+from __future__ import annotations
+from typing import *  # NoQA
+
+import asyncio
+import pathlib
+import sys
+
+import click
+
+from edb.tools.edb import edbcommands
+
+from . import macro
+from . import micro
+from . import runner
+
+
+SUITES = {
+    'micro': micro.make_suite,
+    'macro': macro.make_suite,
+}
+
+
+@edbcommands.command()
+@click.option(
+    '--suite', 'suites',
+    type=click.Choice(list(SUITES) + ['all']),
+    default='micro',
+    show_default=True,
+    help='Benchmark suite to run',
+)
+@click.option(
+    '-k', '--include', 'patterns',
+    multiple=True,
+    help='Only run benchmarks whose names match this glob pattern',
+)
+@click.option(
+    '--min-time',
+    type=float,
+    default=0.2,
+    show_default=True,
+    help='Minimum duration of a single sample in seconds',
+)
+@click.option(
+    '--repeat',
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help='Number of samples to take of every benchmark',
+)
+@click.option(
+    '-o', '--output',
+    type=click.Path(dir_okay=False, writable=True),
+    help='Write the results as JSON into this file',
+)
+@click.option(
+    '--compare',
+    type=click.Path(exists=True, dir_okay=False),
+    help='Compare the results with a JSON file produced by --output',
+)
+@click.option(
+    '--threshold',
+    type=float,
+    default=0.1,
+    show_default=True,
+    help=(
+        'Relative slowdown of the median time above which a benchmark'
+        ' is reported as a regression when using --compare.'
+        ' 0.1 is 10%.'
+    ),
+)
+@click.option(
+    '--schemas-dir',
+    type=click.Path(exists=True, file_okay=False),
+    default=str(pathlib.Path(__file__).parent.parent.parent.parent.resolve() /
+                'tests' / 'schemas'),
+    help='Directory with the test schemas used by the benchmarks',
+)
+def bench(
+    *,
+    suites: str,
+    patterns: Tuple[str, ...],
+    min_time: float,
+    repeat: int,
+    output: Optional[str],
+    compare: Optional[str],
+    threshold: float,
+    schemas_dir: str,
+) -> None:
+    """Run the query pipeline benchmarks."""
+    baseline = None
+    if compare:
+        baseline = runner.load_results(compare)
+
+    if suites == 'all':
+        names = list(SUITES)
+    else:
+        names = [suites]
+
+    def report(name: str, result: Optional[runner.Result]) -> None:
+        if result is None:
+            click.echo(f'{name:<48} skipped')
+        else:
+            click.echo(
+                f'{name:<48} {runner.format_time(result.median):>10}'
+                f' +- {runner.format_time(result.stdev)}')
+
+    results: Dict[str, runner.Result] = {}
+    for name in names:
+        suite = SUITES[name](pathlib.Path(schemas_dir))
+        results.update(asyncio.run(runner.run_suite(
+            suite,
+            patterns=patterns,
+            min_time=min_time,
+            repeat=repeat,
+            report=report,
+        )))
+
+    if output:
+        runner.dump_results(results, output)
+
+    if baseline is not None:
+        regressions = _print_comparison(
+            runner.compare(baseline, results), threshold)
+        if regressions:
+            sys.exit(1)
+
+
+def _print_comparison(
+        comparisons: List[runner.Comparison], threshold: float) -> int:
+    regressions = 0
+
+    click.echo()
+    for cmp in comparisons:
+        if cmp.is_regression(threshold):
+            regressions += 1
+            verdict = click.style('slower', fg='red')
+        elif cmp.is_improvement(threshold):
+            verdict = click.style('faster', fg='green')
+        else:
+            verdict = 'same'
+
+        click.echo(
+            f'{cmp.name:<48} {runner.format_time(cmp.baseline):>10}'
+            f' -> {runner.format_time(cmp.current):>10}'
+            f' {cmp.ratio:6.2f}x {verdict}')
+
+    if regressions:
+        click.secho(
+            f'{regressions} benchmark(s) regressed by more than '
+            f'{threshold:.0%}', fg='red')
+
+    return regressions
@@ -0,0 +1,260 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""End-to-end benchmarks against a running EdgeDB server.
+
+The suite uses the test cluster (see EDGEDB_TEST_CLUSTER_ADDR and
+EDGEDB_TEST_DATA_DIR) and creates a database for every schema used
+by the queries of the micro suite, dropping them when done.
+"""
+
+from __future__ import annotations
+from typing import *  # NoQA
+
+import contextlib
+import http.client
+import itertools
+import json
+import pathlib
+
+import edgedb
+
+from edb.pgsql import intromech
+from edb.schema import schema as s_schema
+from edb.server import cluster as edgedb_cluster
+from edb.server import defines as edgedb_defines
+from edb.server.compiler import compiler
+from edb.testbase import server as tb_server
+
+from . import micro
+from . import runner
+
+
+DBNAME_PREFIX = 'bench_'
+
+GRAPHQL_QUERY = r'''
+    query {
+        test__User(order: {name: {dir: ASC}}) {
+            name
+            deck {
+                name
+                element
+                cost
+            }
+        }
+    }
+'''
+
+
+class Context:
+
+    def __init__(self, cluster) -> None:
+        self.cluster = cluster
+        self.dbnames: Dict[str, str] = {}
+        self.connections: Dict[str, Any] = {}
+        self.backend_connections: Dict[str, Any] = {}
+        self.std_schema = None
+        self.http_ports: Dict[str, int] = {}
+
+    def get_connect_args(self, dbname: str) -> Dict[str, Any]:
+        return tb_server.ClusterTestCase.get_connect_args(
+            cluster=self.cluster, database=dbname)
+
+
+def get_setup_script(schemas_dir: pathlib.Path, schema: str) -> str:
+    source = (schemas_dir / f'{schema}.esdl').read_text()
+    setup = (schemas_dir / f'{schema}_setup.edgeql').read_text()
+    return (
+        f'CREATE MIGRATION bench TO {{ module test {{ {source} }} }};\n'
+        f'COMMIT MIGRATION bench;\n'
+        f'{setup}'
+    )
+
+
+async def _drop_database(admin_conn, dbname: str) -> None:
+    try:
+        await admin_conn.execute(f'DROP DATABASE {dbname};')
+    except edgedb.UnknownDatabaseError:
+        pass
+
+
+async def _configure_http_port(ctx: Context, admin_conn, *,
+                               protocol: str, dbname: str) -> int:
+    port = edgedb_cluster.find_available_port()
+    await admin_conn.execute(f'''
+        CONFIGURE SYSTEM INSERT Port {{
+            protocol := "{protocol}",
+            database := "{dbname}",
+            address := "127.0.0.1",
+            port := {port},
+            user := "edgedb",
+            concurrency := 4,
+        }};
+    ''')
+    ctx.http_ports[protocol] = port
+    return port
+
+
+def make_suite(schemas_dir: pathlib.Path) -> runner.Suite:
+
+    @contextlib.asynccontextmanager
+    async def setup():
+        cluster = tb_server._start_cluster(cleanup_atexit=True)
+        ctx = Context(cluster)
+
+        admin_conn = await edgedb.async_connect(
+            **ctx.get_connect_args(edgedb_defines.EDGEDB_SUPERUSER_DB))
+
+        try:
+            schemas = sorted({q.schema for q in micro.QUERIES.values()})
+            for schema in schemas:
+                dbname = f'{DBNAME_PREFIX}{schema}'
+                await _drop_database(admin_conn, dbname)
+                await tb_server._setup_database(
+                    dbname, get_setup_script(schemas_dir, schema),
+                    cluster.get_connect_args())
+                ctx.dbnames[schema] = dbname
+                ctx.connections[schema] = await edgedb.async_connect(
+                    **ctx.get_connect_args(dbname))
+
+                if cluster.is_managed():
+                    backend = await cluster.connect_backend(database=dbname)
+                    ctx.backend_connections[schema] = backend
+                    if ctx.std_schema is None:
+                        ctx.std_schema = await compiler.load_std_schema(
+                            backend)
+
+            for protocol in ('edgeql+http', 'graphql+http'):
+                await _configure_http_port(
+                    ctx, admin_conn,
+                    protocol=protocol, dbname=ctx.dbnames['cards'])
+
+            yield ctx
+
+        finally:
+            for port in ctx.http_ports.values():
+                await admin_conn.execute(
+                    f'CONFIGURE SYSTEM RESET Port FILTER .port = {port};')
+            for backend in ctx.backend_connections.values():
+                await backend.close()
+            for conn in ctx.connections.values():
+                await conn.aclose()
+            for dbname in ctx.dbnames.values():
+                await _drop_database(admin_conn, dbname)
+            await admin_conn.aclose()
+
+    suite = runner.Suite('macro', setup=setup)
+
+    for name, query in micro.QUERIES.items():
+        if not query.mutating:
+            _add_query_benchmarks(suite, name, query)
+
+    for schema in sorted({q.schema for q in micro.QUERIES.values()}):
+        _add_introspection_benchmarks(suite, schema)
+
+    _add_http_benchmarks(suite)
+
+    return suite
+
+
+def _add_query_benchmarks(suite, name, query):
+
+    @suite.benchmark(f'proto.fetchall.{name}')
+    def fetchall(ctx):
+        """Run a cached query over the binary protocol."""
+        conn = ctx.connections[query.schema]
+
+        async def bench():
+            await conn.fetchall(query.text)
+
+        return bench
+
+    @suite.benchmark(f'proto.fetchall_json.{name}')
+    def fetchall_json(ctx):
+        """Run a cached query over the binary protocol, JSON output."""
+        conn = ctx.connections[query.schema]
+
+        async def bench():
+            await conn.fetchall_json(query.text)
+
+        return bench
+
+    @suite.benchmark(f'proto.compile.{name}')
+    def compile_query(ctx):
+        """Run a query that misses the compiled query cache."""
+        conn = ctx.connections[query.schema]
+        counter = itertools.count()
+
+        async def bench():
+            # A unique comment makes for a distinct cache key.
+            await conn.fetchall(f'{query.text} # {next(counter)}')
+
+        return bench
+
+
+def _add_introspection_benchmarks(suite, schema):
+
+    @suite.benchmark(f'introspection.readschema.{schema}')
+    def readschema(ctx):
+        """Introspect the user schema (IntrospectionMech.readschema)."""
+        backend = ctx.backend_connections.get(schema)
+        if backend is None:
+            # The backend of an unmanaged cluster is not reachable.
+            return None
+
+        async def bench():
+            im = intromech.IntrospectionMech(backend)
+            await im.readschema(
+                schema=ctx.std_schema,
+                exclude_modules=s_schema.STD_MODULES)
+
+        return bench
+
+
+def _make_http_bench(port: int, body: Dict[str, Any]):
+    con = http.client.HTTPConnection('127.0.0.1', port)
+    data = json.dumps(body).encode()
+    headers = {'Content-Type': 'application/json'}
+
+    def bench():
+        con.request('POST', '/', body=data, headers=headers)
+        resp = con.getresponse()
+        payload = resp.read()
+        if resp.status != 200:
+            raise RuntimeError(
+                f'HTTP request failed with status {resp.status}: '
+                f'{payload!r}')
+
+    return bench
+
+
+def _add_http_benchmarks(suite):
+
+    @suite.benchmark('http.edgeql.cards_shape')
+    def http_edgeql(ctx):
+        """Run a query through the EdgeQL over HTTP port."""
+        return _make_http_bench(
+            ctx.http_ports['edgeql+http'],
+            {'query': micro.QUERIES['cards_shape'].text})
+
+    @suite.benchmark('http.graphql.cards_users')
+    def http_graphql(ctx):
+        """Run a query through the GraphQL port."""
+        return _make_http_bench(
+            ctx.http_ports['graphql+http'],
+            {'query': GRAPHQL_QUERY})
@@ -0,0 +1,239 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""In-process benchmarks of the compiler stages.
+
+Every stage is timed on its own against the inputs produced by the
+previous stages, which are computed once, outside of the timed loop.
+"""
+
+from __future__ import annotations
+from typing import *  # NoQA
+
+import contextlib
+import pathlib
+
+from edb import edgeql
+from edb.edgeql import compiler as ql_compiler
+from edb.edgeql.parser.grammar import lexer as ql_lexer
+from edb.pgsql import compiler as pg_compiler
+from edb.server.compiler import sertypes
+from edb.testbase import lang as tb_lang
+
+from . import runner
+
+
+class Query(NamedTuple):
+
+    schema: str
+    text: str
+    #: Whether the query modifies data, such queries are only
+    #: compiled, never executed.
+    mutating: bool = False
+
+
+# Queries against the schemas in tests/schemas, which are loaded
+# into the "test" module.
+QUERIES = {
+    'cards_shape': Query(
+        schema='cards',
+        text=r'''
+            WITH MODULE test
+            SELECT User {
+                name,
+                deck: {
+                    name,
+                    element,
+                    cost,
+                    @count
+                } ORDER BY @count DESC THEN .name,
+                friends: {
+                    name,
+                    @nickname
+                },
+            }
+            FILTER .name = 'Alice';
+        ''',
+    ),
+    'cards_aggregate': Query(
+        schema='cards',
+        text=r'''
+            WITH
+                MODULE test,
+                C := (SELECT Card FILTER .element IN {'Fire', 'Water'})
+            SELECT (
+                count := count(C),
+                total := sum(C.cost),
+                names := array_agg(C.name ORDER BY C.name),
+            );
+        ''',
+    ),
+    'issues_filter': Query(
+        schema='issues',
+        text=r'''
+            WITH MODULE test
+            SELECT Issue {
+                name,
+                number,
+                body,
+                owner: {
+                    name
+                },
+                status: {
+                    name
+                },
+                watchers: {
+                    name
+                },
+                time_spent_log: {
+                    spent_time
+                },
+            }
+            FILTER
+                .owner.name = 'Elvis'
+                AND NOT EXISTS .priority
+                AND .status.name IN {'Open', 'Closed'}
+            ORDER BY .number
+            LIMIT 10;
+        ''',
+    ),
+    'issues_insert': Query(
+        schema='issues',
+        text=r'''
+            WITH MODULE test
+            INSERT Issue {
+                name := 'Benchmark issue',
+                body := 'Issue body',
+                number := '1000',
+                owner := (SELECT User FILTER .name = 'Elvis'),
+                status := (SELECT Status FILTER .name = 'Open'),
+                watchers := (SELECT User FILTER .name != 'Elvis'),
+            };
+        ''',
+        mutating=True,
+    ),
+}
+
+
+class Context:
+
+    def __init__(self, schemas_dir: pathlib.Path) -> None:
+        self._schemas_dir = schemas_dir
+        self._schemas: Dict[str, Any] = {}
+
+    def get_schema(self, name: str):
+        try:
+            return self._schemas[name]
+        except KeyError:
+            pass
+
+        source = (self._schemas_dir / f'{name}.esdl').read_text()
+        schema = tb_lang.BaseSchemaTest.load_schema(source, modname='test')
+        self._schemas[name] = schema
+        return schema
+
+    def get_ast(self, query: Query):
+        [ql] = edgeql.parse_block(query.text)
+        return ql
+
+    def get_ir(self, query: Query):
+        return compile_ir(self.get_schema(query.schema),
+                          self.get_ast(query))
+
+
+def compile_ir(schema, ql):
+    return ql_compiler.compile_ast_to_ir(
+        ql,
+        schema=schema,
+        implicit_tid_in_shapes=False,
+        implicit_id_in_shapes=False,
+    )
+
+
+def make_suite(schemas_dir: pathlib.Path) -> runner.Suite:
+
+    @contextlib.asynccontextmanager
+    async def setup():
+        yield Context(schemas_dir)
+
+    suite = runner.Suite('micro', setup=setup)
+
+    for name, query in QUERIES.items():
+        _add_query_benchmarks(suite, name, query)
+
+    return suite
+
+
+def _add_query_benchmarks(suite, name, query):
+
+    @suite.benchmark(f'lex.{name}')
+    def lex(ctx):
+        """Tokenize the query with the EdgeQL lexer."""
+        source = query.text
+        lexer = ql_lexer.EdgeQLLexer()
+
+        def bench():
+            lexer.setinputstr(source)
+            for _ in lexer.lex():
+                pass
+
+        return bench
+
+    @suite.benchmark(f'parse.{name}')
+    def parse(ctx):
+        """Parse the query into an EdgeQL AST."""
+        source = query.text
+
+        def bench():
+            edgeql.parse_block(source)
+
+        return bench
+
+    @suite.benchmark(f'ast_to_ir.{name}')
+    def ast_to_ir(ctx):
+        """Compile the EdgeQL AST into IR (compile_ast_to_ir)."""
+        schema = ctx.get_schema(query.schema)
+        ql = ctx.get_ast(query)
+
+        def bench():
+            compile_ir(schema, ql)
+
+        return bench
+
+    @suite.benchmark(f'ir_to_sql.{name}')
+    def ir_to_sql(ctx):
+        """Compile the IR into SQL (compile_ir_to_sql)."""
+        ir = ctx.get_ir(query)
+
+        def bench():
+            pg_compiler.compile_ir_to_sql(
+                ir, output_format=pg_compiler.OutputFormat.NATIVE)
+
+        return bench
+
+    @suite.benchmark(f'describe.{name}')
+    def describe(ctx):
+        """Describe the result type (TypeSerializer.describe)."""
+        ir = ctx.get_ir(query)
+
+        def bench():
+            sertypes.TypeSerializer.describe(
+                ir.schema, ir.stype,
+                ir.view_shapes, ir.view_shapes_metadata)
+
+        return bench
@@ -0,0 +1,283 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Benchmark registry, timing loop and the results format.
+
+A benchmark is a factory that receives the context object of its suite
+and returns the callable to time (a plain function or a coroutine
+function), or None if the benchmark cannot run in the current
+environment.  The callable is first run in a calibration loop to pick
+the number of loops that takes at least *min_time* seconds, and then
+timed *repeat* times; every sample is the average time of one loop.
+"""
+
+from __future__ import annotations
+from typing import *  # NoQA
+
+import datetime
+import fnmatch
+import gc
+import inspect
+import json
+import platform
+import statistics
+import sys
+import time
+
+from edb.server import buildmeta
+from edb.server import defines
+
+
+RESULTS_VERSION = 1
+
+# Upper bound for the number of loops of a single sample, keeps the
+# calibration of trivially cheap benchmarks from running away.
+_MAX_LOOPS = 1 << 20
+
+
+class Benchmark(NamedTuple):
+
+    name: str
+    factory: Callable[[Any], Optional[Callable[[], Any]]]
+    description: str
+
+
+class Suite:
+
+    def __init__(self, name: str, *,
+                 setup: Callable[[], AsyncContextManager[Any]]) -> None:
+        self.name = name
+        self._setup = setup
+        self._benchmarks: Dict[str, Benchmark] = {}
+
+    def benchmark(self, name: str, *, description: str = ''):
+        full_name = f'{self.name}.{name}'
+        if full_name in self._benchmarks:
+            raise ValueError(f'duplicate benchmark name: {full_name!r}')
+
+        def decorator(factory):
+            self._benchmarks[full_name] = Benchmark(
+                name=full_name,
+                factory=factory,
+                description=description or (factory.__doc__ or '').strip(),
+            )
+            return factory
+
+        return decorator
+
+    def get_benchmarks(
+            self, patterns: Sequence[str] = ()) -> List[Benchmark]:
+        return [
+            bench for name, bench in self._benchmarks.items()
+            if not patterns or any(
+                fnmatch.fnmatchcase(name, p) for p in patterns)
+        ]
+
+    def setup(self) -> AsyncContextManager[Any]:
+        return self._setup()
+
+
+class Result(NamedTuple):
+
+    loops: int
+    samples: List[float]
+
+    @property
+    def min(self) -> float:
+        return min(self.samples)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.samples)
+
+    @property
+    def mean(self) -> float:
+        return statistics.mean(self.samples)
+
+    @property
+    def stdev(self) -> float:
+        if len(self.samples) < 2:
+            return 0.0
+        return statistics.stdev(self.samples)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'loops': self.loops,
+            'samples': self.samples,
+            'min': self.min,
+            'median': self.median,
+            'mean': self.mean,
+            'stdev': self.stdev,
+        }
+
+
+def _make_loop_runner(
+        fn: Callable[[], Any]) -> Callable[[int], Awaitable[float]]:
+    timer = time.perf_counter
+
+    if inspect.iscoroutinefunction(fn):
+        async def run_loops(loops: int) -> float:
+            t0 = timer()
+            for _ in range(loops):
+                await fn()
+            return timer() - t0
+    else:
+        async def run_loops(loops: int) -> float:
+            t0 = timer()
+            for _ in range(loops):
+                fn()
+            return timer() - t0
+
+    return run_loops
+
+
+async def measure(fn: Callable[[], Any], *,
+                  min_time: float, repeat: int) -> Result:
+    run_loops = _make_loop_runner(fn)
+
+    # Calibrate; this also serves as the warm-up run.
+    loops = 1
+    while True:
+        gc.collect()
+        elapsed = await run_loops(loops)
+        if elapsed >= min_time or loops >= _MAX_LOOPS:
+            break
+        if elapsed > 0:
+            estimate = int(loops * min_time * 1.2 / elapsed)
+            loops = max(loops * 2, min(estimate, loops * 100))
+        else:
+            loops *= 100
+        loops = min(loops, _MAX_LOOPS)
+
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        elapsed = await run_loops(loops)
+        samples.append(elapsed / loops)
+
+    return Result(loops=loops, samples=samples)
+
+
+async def run_suite(
+    suite: Suite,
+    *,
+    patterns: Sequence[str] = (),
+    min_time: float,
+    repeat: int,
+    report: Callable[[str, Optional[Result]], None],
+) -> Dict[str, Result]:
+    benchmarks = suite.get_benchmarks(patterns)
+    if not benchmarks:
+        return {}
+
+    results = {}
+    async with suite.setup() as ctx:
+        for bench in benchmarks:
+            fn = bench.factory(ctx)
+            if fn is None:
+                report(bench.name, None)
+                continue
+
+            result = await measure(fn, min_time=min_time, repeat=repeat)
+            results[bench.name] = result
+            report(bench.name, result)
+
+    return results
+
+
+def get_metadata() -> Dict[str, Any]:
+    try:
+        version: Optional[str] = str(buildmeta.get_version())
+    except buildmeta.MetadataError:
+        version = None
+
+    return {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'edgedb': version,
+        'catalog_version': defines.EDGEDB_CATALOG_VERSION,
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def dump_results(results: Mapping[str, Result], path: str) -> None:
+    data = {
+        'version': RESULTS_VERSION,
+        'metadata': get_metadata(),
+        'benchmarks': {
+            name: result.as_dict() for name, result in results.items()
+        },
+    }
+
+    with open(path, 'wt') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load_results(path: str) -> Dict[str, Result]:
+    with open(path, 'rt') as f:
+        data = json.load(f)
+
+    if data.get('version') != RESULTS_VERSION:
+        raise ValueError(
+            f'{path}: unsupported benchmark results version: '
+            f'{data.get("version")!r}')
+
+    return {
+        name: Result(loops=bench['loops'], samples=bench['samples'])
+        for name, bench in data['benchmarks'].items()
+    }
+
+
+class Comparison(NamedTuple):
+
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline
+
+    def is_regression(self, threshold: float) -> bool:
+        return self.ratio > 1 + threshold
+
+    def is_improvement(self, threshold: float) -> bool:
+        return self.ratio < 1 / (1 + threshold)
+
+
+def compare(baseline: Mapping[str, Result],
+            current: Mapping[str, Result]) -> List[Comparison]:
+    """Compare the medians of the benchmarks present in both runs."""
+    return [
+        Comparison(
+            name=name,
+            baseline=baseline[name].median,
+            current=result.median,
+        )
+        for name, result in current.items()
+        if name in baseline
+    ]
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * scale >= 1:
+            return f'{seconds * scale:.2f} {unit}'
+    return f'{seconds * 1e9:.0f} ns'
@@ -55,4 +55,5 @@ from . import gen_types  # noqa
 from . import gen_meta_grammars  # noqa
 from . import inittestdb  # noqa
 from . import test  # noqa
+from .bench import cli as bench_cli  # noqa
 from .profiling import cli  # noqa
@@ -471,6 +471,12 @@ setuptools.setup(
             ["edb/server/http_graphql_port/protocol.pyx"],
             extra_compile_args=EXT_CFLAGS,
             extra_link_args=EXT_LDFLAGS),
+
+        distutils_extension.Extension(
+            "edb.server.http_metrics_port.protocol",
+            ["edb/server/http_metrics_port/protocol.pyx"],
+            extra_compile_args=EXT_CFLAGS,
+            extra_link_args=EXT_LDFLAGS),
     ],
     install_requires=RUNTIME_DEPS,
     extras_require=EXTRA_DEPS,
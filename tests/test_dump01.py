@@ -41,12 +41,37 @@ class TestDump01(tb.QueryTestCase, tb.CLITestCaseMixin):
         await self.ensure_schema_data_integrity()
 
     async def test_dump01_dump_restore(self):
+        await self._dump_restore()
+
+    async def test_dump01_dump_restore_parallel(self):
+        # Blocks are dumped and restored over several backend
+        # connections at once.
+        await self._dump_restore(
+            dump_args=('-j', '4'),
+            restore_args=('-j', '4', '--allow-non-atomic'))
+        # The fragments of the blocks dumped in parallel interleave;
+        # a sequential restore must still tell them apart.
+        await self._dump_restore(dump_args=('-j', '4'))
+
+    async def test_dump01_dump_restore_compression(self):
+        for codec in ('zlib', 'lzma'):
+            with self.subTest(codec=codec):
+                await self._dump_restore(dump_args=('--compression', codec))
+
+        # The compressed blocks are decompressed by every restore job.
+        await self._dump_restore(
+            dump_args=('--compression', 'zlib', '-j', '4'),
+            restore_args=('-j', '4', '--allow-non-atomic'))
+
+    async def _dump_restore(self, *, dump_args=(), restore_args=()):
         with tempfile.NamedTemporaryFile() as f:
-            self.run_cli('dump', '-d', 'dump01', f.name)
+            self.run_cli('dump', *dump_args, '-d', 'dump01', f.name)
 
             await self.con.execute('CREATE DATABASE dump01_restored')
             try:
-                self.run_cli('restore', '-d', 'dump01_restored', f.name)
+                self.run_cli(
+                    'restore', *restore_args,
+                    '-d', 'dump01_restored', f.name)
                 con2 = await self.connect(database='dump01_restored')
             except Exception:
                 await self.con.execute('DROP DATABASE dump01_restored')
@@ -21,6 +21,8 @@ import os
 import random
 import tempfile
 
+import edgedb
+
 from edb.testbase import server as tb
 
 
@@ -113,3 +115,101 @@ class TestDumpBasics(tb.DatabaseTestCase, tb.CLITestCaseMixin):
         finally:
             await con2.aclose()
             await self.con.execute('DROP DATABASE dumpbasics_restored')
+
+
+class TestDumpParallelRestore(tb.DatabaseTestCase, tb.CLITestCaseMixin):
+
+    ISOLATED_METHODS = False
+    SERIALIZED = True
+
+    SETUP = '''
+        CREATE TYPE test::Target {
+            CREATE REQUIRED PROPERTY name -> std::str {
+                CREATE CONSTRAINT std::exclusive;
+            };
+        };
+        CREATE TYPE test::Source {
+            CREATE REQUIRED PROPERTY name -> std::str;
+            CREATE LINK target -> test::Target;
+        };
+
+        INSERT test::Target { name := 't1' };
+        INSERT test::Source {
+            name := 's1',
+            target := (SELECT test::Target FILTER .name = 't1'),
+        };
+    '''
+
+    TEARDOWN = '''
+        DROP TYPE test::Source;
+        DROP TYPE test::Target;
+    '''
+
+    async def test_dump_restore_parallel_failure_01(self):
+        # A parallel restore commits the schema before loading the
+        # data; if it fails, the database must still have its triggers
+        # and constraints in place.
+        with tempfile.NamedTemporaryFile() as f:
+            self.run_cli('dump', '-d', 'dumpparallelrestore', f.name)
+
+            # The dump ends with a data block: corrupt it, so that
+            # the client aborts the restore while sending the data.
+            with open(f.name, 'r+b') as df:
+                df.seek(-1, os.SEEK_END)
+                last = df.read(1)
+                df.seek(-1, os.SEEK_END)
+                df.write(bytes([last[0] ^ 0xFF]))
+
+            await self.con.execute(
+                'CREATE DATABASE dumpparallelrestore_restored')
+            try:
+                # A non-atomic restore has to be requested explicitly.
+                result = self.run_cli(
+                    'restore', '-j', '2',
+                    '-d', 'dumpparallelrestore_restored', f.name)
+                self.assertEqual(result.exit_code, 1)
+                self.assertIn('--allow-non-atomic', result.output)
+
+                result = self.run_cli(
+                    'restore', '-j', '2', '--allow-non-atomic',
+                    '-d', 'dumpparallelrestore_restored', f.name)
+                self.assertEqual(result.exit_code, 1)
+                self.assertIn('does not match the checksum', result.output)
+                self.assertIn('must be dropped and re-created', result.output)
+
+                con2 = await self.connect(
+                    database='dumpparallelrestore_restored')
+            except Exception:
+                await self.con.execute(
+                    'DROP DATABASE dumpparallelrestore_restored')
+                raise
+
+        try:
+            await con2.execute('''
+                INSERT test::Target { name := 't2' };
+            ''')
+
+            with self.assertRaisesRegex(
+                    edgedb.ConstraintViolationError,
+                    'name violates exclusivity constraint'):
+                await con2.execute('''
+                    INSERT test::Target { name := 't2' };
+                ''')
+
+            await con2.execute('''
+                INSERT test::Source {
+                    name := 's2',
+                    target := (SELECT test::Target FILTER .name = 't2'),
+                };
+            ''')
+
+            with self.assertRaisesRegex(
+                    edgedb.ConstraintViolationError,
+                    'deletion of test::Target .* is prohibited by link'):
+                await con2.execute('''
+                    DELETE (SELECT test::Target FILTER .name = 't2');
+                ''')
+        finally:
+            await con2.aclose()
+            await self.con.execute(
+                'DROP DATABASE dumpparallelrestore_restored')
@@ -0,0 +1,113 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import json
+import os.path
+
+import edgedb
+
+from edb.testbase import server as tb
+
+
+class TestEdgeQLExplain(tb.QueryTestCase):
+    SCHEMA = os.path.join(os.path.dirname(__file__), 'schemas',
+                          'issues.esdl')
+
+    SETUP = os.path.join(os.path.dirname(__file__), 'schemas',
+                         'issues_setup.edgeql')
+
+    async def _explain(self, query):
+        res = json.loads(await self.con.fetchall_json(query))
+        self.assertEqual(len(res), 1)
+        return res[0]
+
+    def _iter_plan_nodes(self, node):
+        yield node
+        for subnode in node.get('Plans', ()):
+            yield from self._iter_plan_nodes(subnode)
+
+    def _get_paths(self, plan):
+        return {
+            node['EdgeQL Path']
+            for node in self._iter_plan_nodes(plan['Plan'])
+            if 'EdgeQL Path' in node
+        }
+
+    async def test_edgeql_explain_01(self):
+        plan = await self._explain(r'''
+            EXPLAIN
+            WITH MODULE test
+            SELECT User {
+                name,
+                todo: {
+                    number
+                }
+            };
+        ''')
+
+        self.assertIn('Query Text', plan)
+        self.assertNotIn('Execution Time', plan)
+        self.assertTrue({'User', 'User.todo'} <= self._get_paths(plan))
+
+    async def test_edgeql_explain_02(self):
+        plan = await self._explain(r'''
+            EXPLAIN ANALYZE
+            WITH MODULE test
+            SELECT Issue {
+                number,
+                watchers: {
+                    name
+                }
+            }
+            FILTER .number = '1';
+        ''')
+
+        self.assertIn('Execution Time', plan)
+        self.assertIn('Actual Rows', plan['Plan'])
+        self.assertTrue({'Issue', 'Issue.watchers'} <= self._get_paths(plan))
+
+    async def test_edgeql_explain_03(self):
+        result = await self.con.fetchone(r'''
+            EXPLAIN SELECT test::Issue;
+        ''')
+
+        plan = json.loads(result)
+        self.assertIn('Plan', plan)
+
+    async def test_edgeql_explain_04(self):
+        with self.assertRaisesRegex(
+                edgedb.QueryError,
+                'EXPLAIN does not support query parameters'):
+            await self.con.fetchall(r'''
+                EXPLAIN SELECT test::Issue FILTER .number = <str>$0;
+            ''', '1')
+
+    async def test_edgeql_explain_05(self):
+        # EXPLAIN without ANALYZE does not run the query.
+        await self._explain(r'''
+            EXPLAIN
+            INSERT test::URL { name := 'explain', address := 'a' };
+        ''')
+
+        await self.assert_query_result(
+            r'''
+            SELECT test::URL FILTER .name = 'explain';
+            ''',
+            [],
+        )
@@ -0,0 +1,165 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import unittest
+
+from edb.common.ast import visitor
+from edb.edgeql import ast as qlast
+from edb.edgeql import normalization
+from edb.edgeql import parser as ql_parser
+
+
+class TestEdgeQLNormalization(unittest.TestCase):
+
+    def assert_same_fingerprint(self, q1, q2):
+        n1 = normalization.normalize(q1)
+        n2 = normalization.normalize(q2)
+        self.assertIsNotNone(n1)
+        self.assertIsNotNone(n2)
+        self.assertEqual(n1.fingerprint, n2.fingerprint)
+
+    def assert_cached_parse(self, cache, source, *, from_template=True):
+        statements, templated = cache.parse_block(source)
+        self.assertEqual(templated, from_template)
+        expected = ql_parser.parse_block(source)
+        self.assertEqual(len(statements), len(expected))
+        for stmt, exp in zip(statements, expected):
+            self.assertTrue(
+                visitor.nodes_equal(stmt, exp),
+                f'parse tree mismatch for {source!r}')
+
+    def test_edgeql_normalization_fingerprint_01(self):
+        self.assert_same_fingerprint(
+            'SELECT User FILTER .name = "Alice" LIMIT 10',
+            'select  User\nfilter .name = \'Bob\'  # comment\nlimit 2',
+        )
+
+    def test_edgeql_normalization_fingerprint_02(self):
+        n1 = normalization.normalize('SELECT User.name')
+        n2 = normalization.normalize('SELECT User.`name`')
+        n3 = normalization.normalize('SELECT User.email')
+        self.assertEqual(n1.fingerprint, n2.fingerprint)
+        self.assertNotEqual(n1.fingerprint, n3.fingerprint)
+
+    def test_edgeql_normalization_fingerprint_03(self):
+        # Literals of different types are distinguished by the
+        # parameter types they produce, not by the fingerprint.
+        n = normalization.normalize(
+            "SELECT (1, 2.5, 3n, 4.5n, 'a', r'b', b'c')")
+        self.assertEqual(
+            [type(lit).__name__ for lit in n.literals],
+            ['IntegerConstant', 'FloatConstant', 'BigintConstant',
+             'DecimalConstant', 'StringConstant', 'RawStringConstant',
+             'BytesConstant'])
+
+    def test_edgeql_normalization_not_normalizable(self):
+        self.assertIsNone(normalization.normalize('SELECT "abc'))
+        self.assertIsNone(
+            normalization.normalize('SELECT $__edb_lit_0'))
+
+    def test_edgeql_normalization_cache_01(self):
+        cache = normalization.ParseCache(maxsize=10)
+        self.assert_cached_parse(
+            cache, 'SELECT User { name } FILTER .age > 10 LIMIT 5')
+        self.assert_cached_parse(
+            cache, 'SELECT User { name } FILTER .age > 42 LIMIT 1')
+
+    def test_edgeql_normalization_cache_02(self):
+        cache = normalization.ParseCache(maxsize=10)
+        self.assert_cached_parse(cache, 'SELECT -1 + 2')
+        self.assert_cached_parse(cache, 'SELECT -9223372036854775808 + 2')
+        self.assert_cached_parse(cache, "SELECT 'a' ++ 'b'; SELECT 1")
+
+    def test_edgeql_normalization_cache_03(self):
+        cache = normalization.ParseCache(maxsize=10)
+        self.assert_cached_parse(
+            cache, 'CREATE TYPE test::Foo', from_template=False)
+        # Tuple element indexes cannot be replaced with parameters.
+        self.assert_cached_parse(
+            cache, 'SELECT (1, 2).0', from_template=False)
+
+    def test_edgeql_normalization_cache_fingerprint_01(self):
+        cache = normalization.ParseCache(maxsize=10)
+        self.assertEqual(
+            cache.get_fingerprint('SELECT User FILTER .age > 10'),
+            cache.get_fingerprint('select User filter .age > 42'))
+        self.assertNotEqual(
+            cache.get_fingerprint('SELECT User FILTER .age > 10'),
+            cache.get_fingerprint('SELECT User FILTER .age < 10'))
+        # Sources that don't lex are fingerprinted by their text.
+        self.assertEqual(
+            cache.get_fingerprint('SELECT "'),
+            cache.get_fingerprint('SELECT "'))
+
+    def test_edgeql_normalization_key_01(self):
+        n1 = normalization.normalize('SELECT User FILTER .age > 10')
+        n2 = normalization.normalize('SELECT  User FILTER .age>42  # x')
+        n3 = normalization.normalize('SELECT User FILTER .age > 4.2')
+        self.assertEqual(n1.key, n2.key)
+        # Literals of different types produce parameters of
+        # different types.
+        self.assertNotEqual(n1.key, n3.key)
+
+    def test_edgeql_normalization_params_01(self):
+        cache = normalization.ParseCache(maxsize=10)
+        res = cache.parse_block_with_params(
+            "SELECT (1, -2.5, 'a', r'b', b'c', 3n) LIMIT 4")
+        self.assertEqual(
+            res.params,
+            {
+                '__edb_lit_0': (0, False),
+                '__edb_lit_1': (1, True),
+                '__edb_lit_2': (2, False),
+                '__edb_lit_3': (3, False),
+                '__edb_lit_4': (4, False),
+            })
+        # Big integers and LIMIT clauses are left inline.
+        self.assertEqual(res.inline_literals, ((5, '3n'), (6, '4')))
+
+        param_types = {
+            node.expr.name: node.type.maintype.name
+            for node in visitor.find_children(
+                res.statements[0],
+                lambda n: (isinstance(n, qlast.TypeCast) and
+                           isinstance(n.expr, qlast.Parameter)))
+        }
+        self.assertEqual(
+            param_types,
+            {
+                '__edb_lit_0': 'int64',
+                '__edb_lit_1': 'float64',
+                '__edb_lit_2': 'str',
+                '__edb_lit_3': 'str',
+                '__edb_lit_4': 'bytes',
+            })
+
+    def test_edgeql_normalization_params_02(self):
+        cache = normalization.ParseCache(maxsize=10)
+        self.assertIsNone(cache.parse_block_with_params('SELECT "abc'))
+        self.assertIsNone(cache.parse_block_with_params('SELECT (1, 2).0'))
+
+    def test_edgeql_normalization_literal_value_01(self):
+        n = normalization.normalize(
+            r"SELECT (1, 2.5, 'a\n\x41', r'a\n', b'\x00\'')")
+        self.assertEqual(
+            [normalization.get_literal_value(lit) for lit in n.literals],
+            [1, 2.5, 'a\nA', 'a\\n', b'\x00\''])
+        self.assertEqual(
+            normalization.get_literal_value(n.literals[0], negated=True),
+            -1)
@@ -5489,3 +5489,99 @@ class TestEdgeQLSelect(tb.QueryTestCase):
             ''',
             [True],
         )
+
+    async def test_edgeql_select_shape_strategy_01(self):
+        # Multi links in shapes are compiled either into subqueries
+        # correlated to every object or into grouped joins, the
+        # results must be the same.
+        for strategy in ('subquery', 'join', 'auto'):
+            await self.con.execute(f'''
+                CONFIGURE SESSION SET
+                    __internal_shape_strategy := '{strategy}';
+            ''')
+
+            try:
+                await self.assert_query_result(
+                    r'''
+                    WITH MODULE test
+                    SELECT Issue {
+                        number,
+                        watchers: {name},
+                        related_to: {number},
+                    }
+                    ORDER BY .number;
+                    ''',
+                    [
+                        {
+                            'number': '1',
+                            'watchers': [{'name': 'Yury'}],
+                            'related_to': [],
+                        },
+                        {
+                            'number': '2',
+                            'watchers': [{'name': 'Elvis'}],
+                            'related_to': [],
+                        },
+                        {
+                            'number': '3',
+                            'watchers': [{'name': 'Elvis'}],
+                            'related_to': [{'number': '2'}],
+                        },
+                        {
+                            'number': '4',
+                            'watchers': [],
+                            'related_to': [{'number': '3'}],
+                        },
+                    ],
+                    msg=strategy,
+                )
+
+                await self.assert_query_result(
+                    r'''
+                    WITH MODULE test
+                    SELECT User {
+                        name,
+                        todo: {
+                            number,
+                            @rank,
+                        },
+                    }
+                    ORDER BY .name;
+                    ''',
+                    [
+                        {
+                            'name': 'Elvis',
+                            'todo': [
+                                {'number': '1', '@rank': 42},
+                                {'number': '2', '@rank': 42},
+                            ],
+                        },
+                        {
+                            'name': 'Yury',
+                            'todo': [
+                                {'number': '3', '@rank': 42},
+                                {'number': '4', '@rank': 42},
+                            ],
+                        },
+                    ],
+                    sort={'todo': lambda x: x['number']},
+                    msg=strategy,
+                )
+            finally:
+                await self.con.execute('''
+                    CONFIGURE SESSION RESET __internal_shape_strategy;
+                ''')
+
+    async def test_edgeql_select_shape_strategy_02(self):
+        with self.assertRaisesRegex(
+                edgedb.ConfigurationError,
+                'invalid value for __internal_shape_strategy'):
+            await self.con.execute('''
+                CONFIGURE SESSION SET __internal_shape_strategy := 'hash';
+            ''')
+            try:
+                await self.con.fetchall('SELECT test::User { todo };')
+            finally:
+                await self.con.execute('''
+                    CONFIGURE SESSION RESET __internal_shape_strategy;
+                ''')
@@ -3775,3 +3775,32 @@ aa';
         """
         DESCRIBE TYPE foo::Bar AS DDL VERBOSE;
         """
+
+    def test_edgeql_syntax_explain_01(self):
+        """
+        EXPLAIN SELECT User { name, friends: { name } };
+        """
+
+    def test_edgeql_syntax_explain_02(self):
+        """
+        EXPLAIN ANALYZE WITH MODULE test SELECT User FILTER (.name = 'a');
+        """
+
+    def test_edgeql_syntax_explain_03(self):
+        """
+        EXPLAIN ANALYZE INSERT User { name := 'a' };
+        """
+
+    @tb.must_fail(errors.EdgeQLSyntaxError,
+                  "Unexpected 'EXPLAIN'", line=2, col=17)
+    def test_edgeql_syntax_explain_04(self):
+        """
+        EXPLAIN EXPLAIN SELECT User;
+        """
+
+    @tb.must_fail(errors.EdgeQLSyntaxError,
+                  "Unexpected 'DESCRIBE'", line=2, col=17)
+    def test_edgeql_syntax_explain_05(self):
+        """
+        EXPLAIN DESCRIBE SCHEMA;
+        """
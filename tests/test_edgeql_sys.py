@@ -17,6 +17,8 @@
 #
 
 
+import json
+
 import edgedb
 
 from edb.testbase import server as tb
@@ -57,3 +59,22 @@ class TestEdgeQLSys(tb.QueryTestCase):
                 'select sys::advisory_unlock(<int64>$0)',
                 lock_key),
             [False])
+
+    async def test_edgeql_sys_query_stats_01(self):
+        query = 'SELECT sys::get_version_as_str() ++ "-stats"'
+        for _ in range(3):
+            await self.con.fetchall(query)
+
+        stats = await self.con.fetchall_json('''
+            WITH s := sys::get_query_stats()
+            SELECT s
+            FILTER <str>s['query'] = <str>$query
+        ''', query=query)
+        stats = json.loads(stats)
+
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0]['calls'], 3)
+        self.assertEqual(stats[0]['cache_misses'], 1)
+        self.assertEqual(stats[0]['cache_hits'], 2)
+        self.assertEqual(stats[0]['stages']['execute']['count'], 3)
+        self.assertIn('compile', stats[0]['stages'])
@@ -17,10 +17,14 @@
 #
 
 
+import json
 import os
+import urllib.parse
+import urllib.request
 
 import edgedb
 
+from edb.server import cluster
 from edb.testbase import http as tb
 
 
@@ -222,3 +226,110 @@ class TestHttpEdgeQL(tb.EdgeQLTestCase):
                     bad := sys::sleep(0)
                 };
             """)
+
+    def test_http_edgeql_stream_01(self):
+        # The elements of large results are sent in several chunks.
+        self.assert_edgeql_query_result(
+            r"""SELECT _gen_series(1, 10500);""",
+            list(range(1, 10501)))
+
+        self.assert_edgeql_query_result(
+            r"""SELECT <int64>{};""",
+            [])
+
+        with self.http_con() as con:
+            data, headers, status = self.http_con_request(
+                con, {'query': 'SELECT _gen_series(1, 10500)'})
+
+            self.assertEqual(status, 200)
+            self.assertEqual(headers['transfer-encoding'], 'chunked')
+            self.assertEqual(
+                json.loads(data), {'data': list(range(1, 10501))})
+
+            # The connection is still usable.
+            data, headers, status = self.http_con_request(
+                con, {'query': 'SELECT 42'})
+            self.assertEqual(json.loads(data), {'data': [42]})
+
+    def test_http_edgeql_stream_02(self):
+        # An error in a later batch of rows.
+        with self.assertRaises(edgedb.DivisionByZeroError):
+            self.edgeql_query(
+                r"""SELECT 1 // (_gen_series(1, 10500) - 5000);""")
+
+        self.assert_edgeql_query_result(
+            r"""SELECT 42;""",
+            [42])
+
+    def test_http_edgeql_query_cache_01(self):
+        # A port with a tiny query cache, and a metrics port to
+        # observe it.
+        dbname = self.get_database_name()
+        port = cluster.find_available_port()
+        metrics_port = cluster.find_available_port()
+        self.loop.run_until_complete(self.con.execute(f'''
+            CONFIGURE SYSTEM INSERT Port {{
+                protocol := "edgeql+http",
+                database := "{dbname}",
+                address := "{self.http_host}",
+                port := {port},
+                user := "http",
+                concurrency := 1,
+                query_cache_size := 2,
+            }};
+        '''))
+        self.loop.run_until_complete(self.con.execute(f'''
+            CONFIGURE SYSTEM INSERT Port {{
+                protocol := "metrics+http",
+                database := "{dbname}",
+                address := "{self.http_host}",
+                port := {metrics_port},
+                user := "http",
+                concurrency := 1,
+            }};
+        '''))
+
+        try:
+            query_cache_size = self.loop.run_until_complete(
+                self.con.fetchall(f'''
+                    SELECT cfg::Config.ports.query_cache_size
+                    FILTER cfg::Config.ports.port = {port}
+                '''))
+            self.assertEqual(list(query_cache_size), [2])
+
+            def query(q):
+                with urllib.request.urlopen(
+                    f'http://{self.http_host}:{port}/?'
+                    f'{urllib.parse.urlencode({"query": q})}'
+                ) as resp:
+                    return json.loads(resp.read())
+
+            self.assertEqual(query('SELECT 42'), {'data': [42]})
+            self.assertEqual(query('SELECT 42 + 1'), {'data': [43]})
+            self.assertEqual(query('SELECT 42 + 1'), {'data': [43]})
+            # Evicts the least recently used 'SELECT 42'.
+            self.assertEqual(query('SELECT 42 + 1 + 1'), {'data': [44]})
+            self.assertEqual(query('SELECT 42'), {'data': [42]})
+
+            with urllib.request.urlopen(
+                    f'http://{self.http_host}:{metrics_port}/metrics'
+            ) as resp:
+                metrics = resp.read().decode()
+
+            labels = f'{{protocol="edgeql+http",port="{port}"}}'
+            self.assertIn(
+                f'edgedb_http_query_cache_hits_total{labels} 1', metrics)
+            self.assertIn(
+                f'edgedb_http_query_cache_misses_total{labels} 4', metrics)
+            self.assertIn(
+                f'edgedb_http_query_cache_evictions_total{labels} 2',
+                metrics)
+            self.assertIn(
+                f'edgedb_http_query_cache_entries{labels} 2', metrics)
+        finally:
+            self.loop.run_until_complete(self.con.execute(f'''
+                CONFIGURE SYSTEM RESET Port FILTER .port = {port};
+            '''))
+            self.loop.run_until_complete(self.con.execute(f'''
+                CONFIGURE SYSTEM RESET Port FILTER .port = {metrics_port};
+            '''))
@@ -22,6 +22,7 @@ import re
 from edb import errors
 
 from edb.common import markup
+from edb.common import uuidgen
 from edb.testbase import lang as tb
 
 from edb import edgeql
@@ -32,7 +33,11 @@ from edb.edgeql import qltypes
 from edb.schema import delta as s_delta
 from edb.schema import ddl as s_ddl
 from edb.schema import links as s_links
+from edb.schema import lproperties as s_props
+from edb.schema import modules as s_mod
+from edb.schema import name as sn
 from edb.schema import objtypes as s_objtypes
+from edb.schema import schema as s_schema
 
 from edb.tools import test
 
@@ -584,6 +589,64 @@ _123456789_123456789_123456789 -> str
             'there should be no constraints on alias links or properties',
         )
 
+    def test_schema_builder_01(self):
+        ids = [uuidgen.uuid1mc() for _ in range(4)]
+
+        def populate(schema):
+            schema, _ = s_mod.Module.create_in_schema(
+                schema, id=ids[0], name='default')
+            std_obj = schema.get('std::Object')
+            std_str = schema.get('std::str')
+
+            schema, obj1 = s_objtypes.ObjectType.create_in_schema(
+                schema, id=ids[1], name=sn.Name('default::Object1'))
+            schema = obj1.set_field_value(schema, 'bases', [std_obj])
+            schema = obj1.set_field_value(schema, 'ancestors', [std_obj])
+
+            schema, obj2 = s_objtypes.ObjectType.create_in_schema(
+                schema, id=ids[2], name=sn.Name('default::Object2'))
+            schema = obj2.update(schema, {
+                'bases': [obj1],
+                'ancestors': [obj1, std_obj],
+            })
+
+            schema, name = s_props.Property.create_in_schema(
+                schema, id=ids[3],
+                name=sn.Name('default::std|name@@default|Object1'),
+                source=obj1, target=std_str)
+            schema = obj1.add_pointer(schema, name)
+
+            schema = obj2.set_field_value(
+                schema, 'name', sn.Name('default::Renamed'))
+            schema = obj2.set_field_value(schema, 'bases', [std_obj])
+
+            return schema
+
+        std_schema = tb._load_std_schema()
+        expected = populate(std_schema)
+
+        builder = s_schema.SchemaBuilder(std_schema)
+        self.assertIs(populate(builder), builder)
+        # The objects are accessible while the schema is being built.
+        obj1 = builder.get('default::Object1')
+        self.assertEqual(
+            builder.get_referrers(obj1, scls_type=s_objtypes.ObjectType),
+            frozenset({builder.get('default::Renamed')}))
+
+        schema = builder.finish()
+        self.assertIsInstance(schema, s_schema.Schema)
+        self.assertNotIsInstance(schema, s_schema.SchemaBuilder)
+        self.assertIsNone(schema.get('default::Object2', None))
+
+        for attr in ('_id_to_data', '_id_to_type', '_name_to_id',
+                     '_shortname_to_id', '_globalname_to_id', '_refs_to'):
+            self.assertEqual(
+                getattr(schema, attr), getattr(expected, attr), attr)
+
+        self.assertEqual(
+            schema.get_referrers(schema.get('std::str')),
+            expected.get_referrers(expected.get('std::str')))
+
     def test_schema_object_verbosename(self):
         schema = self.load_schema("""
             abstract inheritable annotation attr;
@@ -849,6 +912,66 @@ _123456789_123456789_123456789 -> str
             )
         )
 
+    def _get_type_deltas(self, diff):
+        deltas = {}
+        for cmd in diff.get_subcommands():
+            if isinstance(cmd, s_objtypes.ObjectTypeCommand):
+                deltas.setdefault(cmd.classname, []).append(cmd)
+        return deltas
+
+    def test_schema_delta_sets_rename_01(self):
+        old = self.load_schema('''
+            type Foo { property a -> str; property b -> int64; };
+            type Bar { property a -> str; property b -> int64; };
+            type Baz { property c -> str };
+        ''')
+        new = self.run_ddl(old, '''
+            ALTER TYPE test::Baz RENAME TO test::Qux;
+            ALTER TYPE test::Bar { CREATE PROPERTY d -> str };
+        ''', 'test')
+
+        deltas = self._get_type_deltas(s_ddl.delta_schemas(old, new))
+
+        # The renamed type is matched with its new name by signature,
+        # and not re-created.
+        self.assertNotIn('test::Qux', deltas)
+        renames = [
+            sub
+            for cmd in deltas['test::Baz']
+            for sub in cmd.get_subcommands(type=s_delta.RenameObject)
+        ]
+        self.assertEqual(len(renames), 1)
+        self.assertEqual(renames[0].new_name, 'test::Qux')
+
+        [bar_delta] = deltas['test::Bar']
+        self.assertIsInstance(bar_delta, s_objtypes.AlterObjectType)
+        self.assertNotIn('test::Foo', deltas)
+
+    def test_schema_delta_sets_rename_02(self):
+        old = self.load_schema('''
+            type Foo { property a -> str; property b -> int64; };
+        ''')
+        new = self.load_schema('''
+            type Foo {
+                property a -> str; property b -> int64; property c -> str;
+            };
+            type Foo2 { property a -> str; property b -> int64; };
+        ''')
+
+        deltas = self._get_type_deltas(s_ddl.delta_schemas(old, new))
+
+        # An object that kept its name takes precedence over a rename
+        # candidate, even if the latter is more similar to the old one.
+        self.assertFalse(any(
+            list(cmd.get_subcommands(type=s_delta.RenameObject))
+            for cmds in deltas.values()
+            for cmd in cmds
+        ))
+        [foo_delta] = deltas['test::Foo']
+        self.assertIsInstance(foo_delta, s_objtypes.AlterObjectType)
+        [foo2_delta] = deltas['test::Foo2']
+        self.assertIsInstance(foo2_delta, s_objtypes.CreateObjectType)
+
 
 class TestGetMigration(tb.BaseSchemaLoadTest):
     """Test migration deparse consistency.
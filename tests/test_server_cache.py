@@ -0,0 +1,146 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import immutables
+
+from edb.server import cache
+from edb.server import server
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def test_server_cache_query_01(self):
+        qc = cache.QueryCache(maxsize=2)
+        self.assertIsNone(qc.get('a', 1))
+        qc.put('a', 1, 'A', 10)
+        qc.put('b', 1, 'B', 20)
+        self.assertEqual(qc.get('a', 1), 'A')
+
+        # The least recently used entry is evicted and its size is
+        # no longer accounted for.
+        qc.put('c', 1, 'C', 40)
+        self.assertIsNone(qc.get('b', 1))
+        self.assertEqual(qc.get('a', 1), 'A')
+        self.assertEqual(qc.get('c', 1), 'C')
+        self.assertEqual(qc.get_stats(), {
+            'entries': 2,
+            'maxsize': 2,
+            'size_bytes': 50,
+            'hits': 3,
+            'misses': 2,
+            'evictions': 1,
+        })
+
+        # Replacing an entry updates its size in place.
+        qc.put('a', 1, 'A2', 5)
+        self.assertEqual(qc.get('a', 1), 'A2')
+        self.assertEqual(qc.get_stats()['size_bytes'], 45)
+        self.assertEqual(qc.get_stats()['evictions'], 1)
+
+    def test_server_cache_query_02(self):
+        qc = cache.QueryCache(maxsize=10)
+        qc.put('a', 1, 'A', 10)
+        qc.put('b', 1, 'B', 20)
+
+        # A newer schema version drops all the entries at once.
+        self.assertIsNone(qc.get('a', 2))
+        stats = qc.get_stats()
+        self.assertEqual(stats['entries'], 0)
+        self.assertEqual(stats['size_bytes'], 0)
+        self.assertEqual(stats['evictions'], 2)
+
+        # Entries compiled for a superseded version are not stored.
+        qc.put('a', 1, 'A', 10)
+        self.assertEqual(len(qc), 0)
+        qc.put('a', 2, 'A', 10)
+        self.assertIsNone(qc.get('a', 1))
+        self.assertEqual(qc.get('a', 2), 'A')
+
+    def test_server_cache_query_03(self):
+        with self.assertRaisesRegex(ValueError, 'greater than 0'):
+            cache.QueryCache(maxsize=0)
+
+
+class TestQueryCacheSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._dir)
+        self.path = os.path.join(self._dir, '.s.EDGEDB.qcache.5656.0')
+
+    def get_queries(self):
+        key = (
+            'SELECT $__edb_lit_0\x00ICONST',
+            False,  # json mode
+            True,  # expect one
+            0,  # implicit limit
+            immutables.Map({None: 'default'}),
+            immutables.Map(),
+        )
+        return {'db': [(key, b'SELECT 1')], 'db2': []}
+
+    def test_server_cache_snapshot_01(self):
+        self.assertEqual(server.load_query_cache_snapshot(self.path), {})
+
+        queries = self.get_queries()
+        server.save_query_cache_snapshot(self.path, queries)
+        self.assertEqual(
+            server.load_query_cache_snapshot(self.path), queries)
+
+        # Saving replaces the snapshot atomically.
+        server.save_query_cache_snapshot(self.path, {})
+        self.assertEqual(server.load_query_cache_snapshot(self.path), {})
+        self.assertEqual(os.listdir(self._dir), [os.path.basename(self.path)])
+
+    def test_server_cache_snapshot_02(self):
+        # Corrupt snapshots are ignored.
+        server.save_query_cache_snapshot(self.path, self.get_queries())
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 10)
+        self.assertEqual(server.load_query_cache_snapshot(self.path), {})
+
+        with open(self.path, 'wb') as f:
+            f.write(server._QUERY_CACHE_SNAPSHOT_HEADER)
+            pickle.dump(['not', 'a', 'snapshot'], f)
+        self.assertEqual(server.load_query_cache_snapshot(self.path), {})
+
+        with open(self.path, 'wb') as f:
+            f.write(b'\x00' * 100)
+        self.assertEqual(server.load_query_cache_snapshot(self.path), {})
+
+    def test_server_cache_snapshot_03(self):
+        # Snapshots saved with another catalog version are not
+        # unpickled.
+        with mock.patch.object(
+                server, '_QUERY_CACHE_SNAPSHOT_HEADER',
+                b'EDGEDB QCACHE 0\n'):
+            server.save_query_cache_snapshot(self.path, self.get_queries())
+
+        with mock.patch.object(server.pickle, 'load') as load:
+            self.assertEqual(
+                server.load_query_cache_snapshot(self.path), {})
+        self.assertFalse(load.called)
@@ -17,8 +17,25 @@
 #
 
 
+import asyncio
+import os
+import pickle
+import shutil
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import immutables
+
+from edb import errors
+from edb.edgeql import normalization
+from edb.pgsql import compiler as pg_compiler
 from edb.testbase import lang as tb
 from edb.server import compiler
+from edb.server import defines
+from edb.server.compiler import compiler as compiler_mod
+from edb.server.compiler import dbstate
 
 
 class TestServerCompiler(tb.BaseSchemaLoadTest):
@@ -46,3 +63,270 @@ class TestServerCompiler(tb.BaseSchemaLoadTest):
                 }
             ''',
         )
+
+
+class TestServerCompilerSchemaSnapshots(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.schema = tb._load_std_schema()
+
+    def setUp(self):
+        super().setUp()
+        self._dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._dir)
+        self._compiler = compiler.Compiler(None, self._dir)
+
+    def test_server_compiler_schema_snapshot_01(self):
+        c = self._compiler
+        self.assertIsNone(c._load_schema_snapshot('db', 'v1'))
+
+        c._save_schema_snapshot('db', 'v1', self.schema)
+        schema = c._load_schema_snapshot('db', 'v1')
+        self.assertIsNotNone(schema.get('std::str', None))
+
+        # Snapshots are keyed on the database and the schema version.
+        self.assertIsNone(c._load_schema_snapshot('db', 'v2'))
+        self.assertIsNone(c._load_schema_snapshot('db2', 'v1'))
+
+        # Another compiler (e.g. in another worker, or after a restart)
+        # finds the snapshot.
+        c2 = compiler.Compiler(None, self._dir)
+        self.assertIsNotNone(c2._load_schema_snapshot('db', 'v1'))
+
+    def test_server_compiler_schema_snapshot_02(self):
+        c = self._compiler
+        c._save_schema_snapshot('db', 'v1', self.schema)
+        c._save_schema_snapshot('db2', 'v1', self.schema)
+        c._save_schema_snapshot('db', 'v2', self.schema)
+
+        # The snapshots of other versions of the database are pruned.
+        self.assertIsNone(c._load_schema_snapshot('db', 'v1'))
+        self.assertIsNotNone(c._load_schema_snapshot('db', 'v2'))
+        self.assertIsNotNone(c._load_schema_snapshot('db2', 'v1'))
+        self.assertEqual(len(os.listdir(self._dir)), 2)
+
+    def test_server_compiler_schema_snapshot_03(self):
+        # Corrupt snapshots are ignored.
+        c = self._compiler
+        c._save_schema_snapshot('db', 'v1', self.schema)
+        path = c._get_schema_snapshot_path('db', 'v1')
+
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) // 2)
+        self.assertIsNone(c._load_schema_snapshot('db', 'v1'))
+
+        with open(path, 'wb') as f:
+            pickle.dump({'not': 'a schema'}, f)
+        self.assertIsNone(c._load_schema_snapshot('db', 'v1'))
+
+    def test_server_compiler_schema_snapshot_04(self):
+        # Snapshots taken with another catalog version are not used.
+        c = self._compiler
+        c._save_schema_snapshot('db', 'v1', self.schema)
+        path = c._get_schema_snapshot_path('db', 'v1')
+
+        with mock.patch.object(
+                defines, 'EDGEDB_CATALOG_VERSION',
+                defines.EDGEDB_CATALOG_VERSION + 1):
+            self.assertNotEqual(
+                c._get_schema_snapshot_path('db', 'v1'), path)
+            self.assertIsNone(c._load_schema_snapshot('db', 'v1'))
+
+
+class TestServerCompilerLiterals(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._std_schema = tb._load_std_schema()
+
+    def setUp(self):
+        super().setUp()
+        self._compiler = compiler.Compiler(None)
+        self._compiler._std_schema = self._std_schema
+        state = dbstate.CompilerConnectionState(
+            0, self._std_schema, immutables.Map(), immutables.Map(),
+            compiler.Capability.ALL)
+        self._ctx = compiler_mod.CompileContext(
+            state=state,
+            output_format=pg_compiler.OutputFormat.NATIVE,
+            expected_cardinality_one=False,
+            stmt_mode=compiler.CompileStatementMode.SINGLE,
+        )
+
+    def compile(self, eql):
+        units = self._compiler._compile(ctx=self._ctx, eql=eql.encode())
+        self.assertEqual(len(units), 1)
+        return units[0]
+
+    def literals(self, eql):
+        return normalization.normalize(eql).literals
+
+    def test_server_compiler_literals_01(self):
+        q1 = "SELECT (1, -2.5, 'a', b'b') LIMIT 3"
+        q2 = "SELECT (10, -0.5, 'x', b'y') LIMIT 3"
+        u1 = self.compile(q1)
+        u2 = self.compile(q2)
+
+        self.assertEqual(u1.sql, u2.sql)
+        self.assertEqual(
+            u1.literal_args,
+            ((0, False), (1, True), (2, False), (3, False)))
+        self.assertEqual(u1.inline_literals, ((4, '3'),))
+
+        self.assertTrue(u1.matches_literals(self.literals(q2)))
+        self.assertFalse(u1.matches_literals(
+            self.literals("SELECT (10, -0.5, 'x', b'y') LIMIT 4")))
+
+        bound = u1.bind_literals(self.literals(q2))
+        self.assertEqual(
+            bound.literal_args_data,
+            b''.join([
+                struct.pack('!l', 8), struct.pack('!q', 10),
+                struct.pack('!l', 8), struct.pack('!d', -0.5),
+                struct.pack('!l', 1), b'x',
+                struct.pack('!l', 1), b'y',
+            ]))
+        self.assertEqual(u1.literal_args_data, b'')
+
+    def test_server_compiler_literals_02(self):
+        # Queries that cannot be compiled with parameters only apply
+        # to the same literal values.
+        q = 'SELECT (1, 2).0'
+        u = self.compile(q)
+        self.assertEqual(u.literal_args, ())
+        self.assertEqual(u.inline_literals, ((0, '1'), (1, '2'), (2, '0')))
+        self.assertTrue(u.matches_literals(self.literals(q)))
+        self.assertFalse(
+            u.matches_literals(self.literals('SELECT (1, 2).1')))
+        self.assertIs(u.bind_literals(self.literals(q)), u)
+
+    def test_server_compiler_literals_03(self):
+        u = self.compile('SELECT 1')
+        with self.assertRaises(errors.NumericOutOfRangeError):
+            u.bind_literals(self.literals('SELECT 9223372036854775808'))
+
+
+class TestServerCompilerUnitsStore(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._std_schema = tb._load_std_schema()
+
+    def setUp(self):
+        super().setUp()
+        self._dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._dir)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def new_compiler(self, dbver=1):
+        # Compiler workers of the same server share the store.
+        c = compiler.Compiler(None, self._dir)
+        c._std_schema = self._std_schema
+        c._dbs['db'] = compiler_mod.CompilerDatabaseState(
+            dbver=dbver, schema=self._std_schema)
+        return c
+
+    def compile(self, c, eql, *, dbver=1, **kwargs):
+        args = dict(
+            sess_modaliases=None,
+            sess_config=None,
+            json_mode=False,
+            expect_one=False,
+            implicit_limit=0,
+            stmt_mode=compiler.CompileStatementMode.SINGLE,
+            capability=compiler.Capability.ALL,
+            json_parameters=False,
+        )
+        args.update(kwargs)
+        with mock.patch.object(c, '_compile', wraps=c._compile) as comp:
+            units = self.loop.run_until_complete(
+                c.compile_eql('db', dbver, eql.encode(), **args))
+        self.assertEqual(len(units), 1)
+        return units[0], comp.called
+
+    def get_units(self, dbver=1):
+        path = os.path.join(self._dir, f'units-{b"db".hex()}-{dbver}')
+        return sorted(os.listdir(path))
+
+    def test_server_compiler_units_store_01(self):
+        unit, compiled = self.compile(self.new_compiler(), 'SELECT 1')
+        self.assertTrue(compiled)
+        self.assertEqual(len(self.get_units()), 1)
+
+        # Another worker loads the unit from the store.
+        loaded, compiled = self.compile(self.new_compiler(), 'SELECT 1')
+        self.assertFalse(compiled)
+        self.assertEqual(loaded.sql, unit.sql)
+        self.assertEqual(loaded.sql_hash, unit.sql_hash)
+        self.assertIsNone(loaded.compile_timings)
+
+    def test_server_compiler_units_store_02(self):
+        # Units compiled with a different session state or for
+        # a different protocol request are never shared.
+        variants = [
+            {},
+            {'sess_modaliases': immutables.Map({None: 'schema'})},
+            {'sess_config': immutables.Map({'foo': 'bar'})},
+            {'capability': compiler.Capability.QUERY},
+            {'json_mode': True},
+            {'expect_one': True},
+            {'implicit_limit': 10},
+            {'json_mode': True, 'json_parameters': True},
+        ]
+
+        for variant in variants:
+            with self.subTest(variant=variant):
+                _, compiled = self.compile(
+                    self.new_compiler(), 'SELECT 1', **variant)
+                self.assertTrue(compiled)
+
+        self.assertEqual(len(self.get_units()), len(variants))
+
+        for variant in variants:
+            with self.subTest(variant=variant):
+                _, compiled = self.compile(
+                    self.new_compiler(), 'SELECT 1', **variant)
+                self.assertFalse(compiled)
+
+    def test_server_compiler_units_store_03(self):
+        # Corrupt units are ignored.
+        self.compile(self.new_compiler(), 'SELECT 1')
+        [name] = self.get_units()
+        path = os.path.join(self._dir, f'units-{b"db".hex()}-1', name)
+
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) // 2)
+        _, compiled = self.compile(self.new_compiler(), 'SELECT 1')
+        self.assertTrue(compiled)
+
+        with open(path, 'wb') as f:
+            pickle.dump({'not': 'a unit'}, f)
+        _, compiled = self.compile(self.new_compiler(), 'SELECT 1')
+        self.assertTrue(compiled)
+
+    def test_server_compiler_units_store_04(self):
+        # Units compiled for another version of the database are
+        # not used, and are removed once the new version is stored.
+        self.compile(self.new_compiler(), 'SELECT 1')
+        [name] = self.get_units()
+
+        # A unit of the old version in the directory of the new one.
+        os.mkdir(os.path.join(self._dir, f'units-{b"db".hex()}-2'))
+        shutil.copy(
+            os.path.join(self._dir, f'units-{b"db".hex()}-1', name),
+            os.path.join(self._dir, f'units-{b"db".hex()}-2', name))
+
+        c = self.new_compiler(dbver=2)
+        _, compiled = self.compile(c, 'SELECT 1', dbver=2)
+        self.assertTrue(compiled)
+
+        shutil.rmtree(os.path.join(self._dir, f'units-{b"db".hex()}-2'))
+        self.compile(c, 'SELECT 2', dbver=2)
+        self.assertEqual(len(self.get_units(2)), 1)
+        self.assertFalse(os.path.exists(
+            os.path.join(self._dir, f'units-{b"db".hex()}-1')))
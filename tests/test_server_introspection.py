@@ -0,0 +1,121 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import unittest
+
+from edb.pgsql import intromech
+from edb.schema import schema as s_schema
+from edb.server import cluster as edgedb_cluster
+from edb.server.compiler import compiler
+from edb.testbase import server as tb
+
+
+class TestServerIntrospection(tb.QueryTestCase):
+
+    SCHEMA = os.path.join(os.path.dirname(__file__), 'schemas',
+                          'issues.esdl')
+
+    async def _connect_backend(self):
+        try:
+            return await self.cluster.connect_backend(
+                database=self.get_database_name())
+        except edgedb_cluster.ClusterError as e:
+            raise unittest.SkipTest(str(e)) from None
+
+    async def _introspect(self, **kwargs):
+        con = await self._connect_backend()
+        try:
+            std_schema = await compiler.load_std_schema(con)
+            im = intromech.IntrospectionMech(con, **kwargs)
+            return await im.readschema(
+                schema=std_schema,
+                exclude_modules=s_schema.STD_MODULES)
+        finally:
+            await con.close()
+
+    def _get_objects(self, schema):
+        return {
+            (type(obj).__name__, obj.id, str(obj.get_name(schema)))
+            for obj in schema.get_objects(
+                excluded_modules=s_schema.STD_MODULES)
+        }
+
+    async def test_server_introspection_concurrent_01(self):
+        connections = 0
+
+        async def connect():
+            nonlocal connections
+            connections += 1
+            return await self._connect_backend()
+
+        schema = await self._introspect()
+        concurrent_schema = await self._introspect(
+            connect=connect, concurrency=4)
+
+        self.assertEqual(connections, 3)
+        objects = self._get_objects(schema)
+        self.assertIn(
+            'test::Issue', {name for _, _, name in objects})
+        self.assertEqual(self._get_objects(concurrent_schema), objects)
+
+    async def test_server_introspection_concurrent_02(self):
+        # The catalog read through the snapshot of the transaction
+        # is the same as the one read on the main connection.
+        con = await self._connect_backend()
+        try:
+            connect = self._connect_backend
+            async with con.transaction(isolation='repeatable_read'):
+                im = intromech.IntrospectionMech(con)
+                catalog = await im.fetch_catalog(
+                    exclude_modules=s_schema.STD_MODULES)
+
+                im = intromech.IntrospectionMech(
+                    con, connect=connect, concurrency=4)
+                concurrent_catalog = await im.fetch_catalog(
+                    exclude_modules=s_schema.STD_MODULES,
+                    concurrent=True)
+        finally:
+            await con.close()
+
+        self.assertEqual(concurrent_catalog.keys(), catalog.keys())
+        for name, rows in catalog.items():
+            self.assertEqual(
+                [tuple(row) for row in concurrent_catalog[name]],
+                [tuple(row) for row in rows],
+                name)
+
+    async def test_server_introspection_concurrent_03(self):
+        # Failing to open the extra connections is not an error:
+        # all queries run on the main connection instead.
+        connections = 0
+
+        async def connect():
+            nonlocal connections
+            connections += 1
+            raise OSError('too many connections')
+
+        schema = await self._introspect()
+        fallback_schema = await self._introspect(
+            connect=connect, concurrency=4)
+
+        self.assertEqual(connections, 3)
+        self.assertEqual(
+            self._get_objects(fallback_schema),
+            self._get_objects(schema))
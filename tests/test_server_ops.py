@@ -111,3 +111,142 @@ class TestServerOps(tb.TestCase):
             if proc.returncode is None:
                 proc.terminate()
                 await proc.wait()
+
+    async def test_server_ops_workers(self):
+        # Test that every process of a multi-process server
+        # ("--workers") serves queries.
+
+        async def read_runtime_info(stdout: asyncio.StreamReader):
+            while True:
+                line = await stdout.readline()
+                if line.startswith(b'EDGEDB_SERVER_DATA:'):
+                    break
+
+            dataline = line.decode().split('EDGEDB_SERVER_DATA:', 1)[1]
+            data = json.loads(dataline)
+            return data
+
+        cmd = [
+            sys.executable, '-m', 'edb.tools', 'server',
+            '--port', 'auto',
+            '--temp-dir',
+            '--workers', '2',
+            '--echo-runtime-info'
+        ]
+
+        # Note: for debug comment "stderr=subprocess.DEVNULL".
+        proc: asyncio.Process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stderr=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+        )
+
+        try:
+            data = await asyncio.wait_for(
+                read_runtime_info(proc.stdout),
+                timeout=100)
+
+            port = data['port']
+
+            cons = []
+            try:
+                # The connections are balanced among the processes by
+                # the kernel.  Every process keeps its own query
+                # statistics, so the processes that served the
+                # connections can be told apart by them.
+                for i in range(32):
+                    con = await edgedb.async_connect(
+                        host='127.0.0.1', port=port,
+                        user='edgedb', database='edgedb')
+                    cons.append(con)
+                    self.assertEqual(
+                        await con.fetchone(
+                            f'WITH probe_{i} := {i} SELECT probe_{i}'),
+                        i)
+
+                processes = set()
+                for con in cons:
+                    queries = await con.fetchall('''
+                        WITH s := sys::get_query_stats()
+                        SELECT <str>s['query']
+                    ''')
+                    processes.add(frozenset(
+                        q for q in queries if q.startswith('WITH probe_')))
+
+                self.assertEqual(len(processes), 2)
+            finally:
+                for con in cons:
+                    await con.aclose()
+
+        finally:
+            if proc.returncode is None:
+                proc.terminate()
+                await proc.wait()
+
+    async def test_server_ops_workers_metrics_ports(self):
+        # Test that the metrics port of a multi-process server, served
+        # by every process on the port number plus the process number,
+        # is rejected if the ports would overlap with another port.
+
+        async def read_runtime_info(stdout: asyncio.StreamReader):
+            while True:
+                line = await stdout.readline()
+                if line.startswith(b'EDGEDB_SERVER_DATA:'):
+                    break
+
+            dataline = line.decode().split('EDGEDB_SERVER_DATA:', 1)[1]
+            data = json.loads(dataline)
+            return data
+
+        cmd = [
+            sys.executable, '-m', 'edb.tools', 'server',
+            '--port', 'auto',
+            '--temp-dir',
+            '--workers', '2',
+            '--echo-runtime-info'
+        ]
+
+        proc: asyncio.Process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stderr=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+        )
+
+        try:
+            data = await asyncio.wait_for(
+                read_runtime_info(proc.stdout),
+                timeout=100)
+
+            port = data['port']
+
+            con = await edgedb.async_connect(
+                host='127.0.0.1', port=port,
+                user='edgedb', database='edgedb')
+            try:
+                for metrics_port, msg in [
+                        (port - 1, f'overlaps with port {port}'),
+                        (65535, 'ports up to 65536')]:
+                    with self.assertRaisesRegex(
+                            edgedb.ConfigurationError, msg):
+                        await con.execute(f'''
+                            CONFIGURE SYSTEM INSERT Port {{
+                                protocol := "metrics+http",
+                                database := "edgedb",
+                                address := "127.0.0.1",
+                                port := {metrics_port},
+                                user := "edgedb",
+                                concurrency := 1,
+                            }};
+                        ''')
+
+                # The rejected ports have not been configured.
+                self.assertEqual(
+                    await con.fetchall('SELECT cfg::Config.ports.port'),
+                    [])
+            finally:
+                await con.aclose()
+
+        finally:
+            if proc.returncode is None:
+                proc.terminate()
+                await proc.wait()
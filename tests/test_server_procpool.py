@@ -0,0 +1,340 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import asyncio
+import os
+import signal
+import tempfile
+
+from edb.testbase import server as tb
+from edb.server import procpool as procpool_api
+from edb.server.procpool import amsg
+from edb.server.procpool import pool as procpool
+
+
+class _Worker:
+
+    def is_alive(self):
+        return True
+
+    async def call(self, method_name, *args):
+        return method_name, args
+
+
+class _Manager:
+
+    async def spawn_worker(self):
+        return _Worker()
+
+    async def stop(self):
+        pass
+
+
+class WarmWorker:
+
+    def __init__(self, fail_warm_up):
+        self._fail_warm_up = fail_warm_up
+        self._warm_pid = None
+
+    async def warm_up(self):
+        if self._fail_warm_up:
+            raise RuntimeError('cannot warm up')
+        self._warm_pid = os.getpid()
+
+    async def get_pids(self):
+        return os.getpid(), self._warm_pid
+
+
+class SleepWorker:
+
+    def __init__(self):
+        self._running = 0
+
+    async def _sleep(self, delay, value):
+        self._running += 1
+        try:
+            await asyncio.sleep(delay)
+            return value, self._running
+        finally:
+            self._running -= 1
+
+    @procpool_api.reentrant
+    async def sleep_reentrant(self, delay, value):
+        return await self._sleep(delay, value)
+
+    async def sleep(self, delay, value):
+        return await self._sleep(delay, value)
+
+
+class _Transport:
+
+    def __init__(self):
+        self.data = []
+
+    def writelines(self, data):
+        self.data.extend(data)
+
+    def write(self, data):
+        self.data.append(data)
+
+
+def _frame(req_id, payload):
+    return amsg._header.pack(len(payload), req_id) + payload
+
+
+class TestFramedProtocol(tb.TestCase):
+
+    def _new_hub(self):
+        pids = []
+        proto = amsg.HubProtocol(
+            loop=self.loop,
+            on_pid=lambda proto, tr, pid: pids.append(pid))
+        proto.connection_made(_Transport())
+        return proto, pids
+
+    def _send(self, proto):
+        waiter = self.loop.create_future()
+        proto.send(waiter, b'request')
+        return waiter
+
+    async def test_server_procpool_framing_01(self):
+        # The worker pid and the header of a message split
+        # across chunks.
+        proto, pids = self._new_hub()
+        waiter = self._send(proto)
+
+        data = amsg.pid_packer(1234) + _frame(1, b'reply')
+        for i in range(len(data)):
+            self.assertFalse(waiter.done())
+            proto.data_received(data[i:i + 1])
+
+        self.assertEqual(pids, [1234])
+        self.assertEqual(await waiter, b'reply')
+
+    async def test_server_procpool_framing_02(self):
+        # A large message spanning many chunks.
+        proto, _ = self._new_hub()
+        proto.data_received(amsg.pid_packer(1234))
+        waiter = self._send(proto)
+
+        payload = os.urandom(1024 * 1024)
+        data = _frame(1, payload)
+        for i in range(0, len(data), 1000):
+            self.assertFalse(waiter.done())
+            proto.data_received(data[i:i + 1000])
+
+        self.assertEqual(await waiter, payload)
+        self.assertEqual(proto._chunks_len, 0)
+
+    async def test_server_procpool_framing_03(self):
+        # Several messages, replied to out of order, in one chunk,
+        # the last one incomplete.
+        proto, _ = self._new_hub()
+        waiters = [self._send(proto) for _ in range(3)]
+
+        data = (
+            amsg.pid_packer(1234) +
+            _frame(3, b'reply 3') +
+            _frame(1, b'') +
+            _frame(2, b'reply 2')
+        )
+        proto.data_received(data[:-1])
+        self.assertEqual(await waiters[2], b'reply 3')
+        self.assertEqual(await waiters[0], b'')
+        self.assertFalse(waiters[1].done())
+
+        proto.data_received(data[-1:])
+        self.assertEqual(await waiters[1], b'reply 2')
+
+    async def test_server_procpool_framing_04(self):
+        # Replies to unknown or cancelled requests are dropped.
+        proto, _ = self._new_hub()
+        proto.data_received(amsg.pid_packer(1234))
+        cancelled = self._send(proto)
+        cancelled.cancel()
+        waiter = self._send(proto)
+
+        proto.data_received(_frame(1, b'late reply'))
+        proto.data_received(_frame(42, b'unknown'))
+        self.assertFalse(waiter.done())
+
+        proto.data_received(_frame(2, b'reply'))
+        self.assertEqual(await waiter, b'reply')
+
+    async def test_server_procpool_framing_05(self):
+        # Requests are framed with their IDs.
+        proto, _ = self._new_hub()
+        self._send(proto)
+        self._send(proto)
+        self.assertEqual(
+            b''.join(proto._transport.data),
+            _frame(1, b'request') + _frame(2, b'request'))
+
+    async def test_server_procpool_pipelining_01(self):
+        manager = await procpool.create_manager(
+            runstate_dir=tempfile.mkdtemp(),
+            name='test-pipelining',
+            worker_cls=SleepWorker,
+            worker_args=(),
+            pool_size=0)
+        try:
+            worker = await manager.spawn_worker()
+
+            # Requests for re-entrant methods are handled concurrently
+            # and replied to out of order.
+            done = []
+
+            async def call(method_name, delay, value):
+                res = await worker.call(method_name, delay, value)
+                done.append(res)
+
+            await asyncio.gather(
+                call('sleep_reentrant', 0.5, 1),
+                call('sleep_reentrant', 0.01, 2),
+            )
+            self.assertEqual(done, [(2, 2), (1, 1)])
+
+            # The other requests are handled one at a time, in order.
+            done.clear()
+            await asyncio.gather(
+                call('sleep', 0.5, 1),
+                call('sleep', 0.01, 2),
+            )
+            self.assertEqual(done, [(1, 1), (2, 1)])
+        finally:
+            await manager.stop()
+
+
+class TestPool(tb.TestCase):
+
+    async def _new_pool(self, **kwargs):
+        pool = procpool.Pool(manager=_Manager(), **kwargs)
+        await pool.start()
+        return pool
+
+    async def test_server_procpool_pool_held_01(self):
+        pool = await self._new_pool(
+            pool_size=4, acquire_timeout=0.1, max_held=3)
+
+        held = [await pool.acquire(hold=True) for _ in range(3)]
+
+        # Clients holding workers indefinitely cannot take the
+        # remaining worker...
+        with self.assertRaises(procpool.PoolTimeoutError):
+            await pool.acquire(hold=True)
+
+        # ...which stays available to the stateless requests.
+        self.assertEqual(
+            await pool.call('compile', 1), ('compile', (1,)))
+
+        pool.release(held.pop())
+        held.append(await pool.acquire(hold=True))
+
+        for worker in held:
+            pool.release(worker)
+        await pool.stop()
+
+    async def test_server_procpool_pool_held_02(self):
+        pool = await self._new_pool(pool_size=2, acquire_timeout=0.1)
+
+        # The workers acquired for stateless use are not counted
+        # against the limit of the held ones.
+        worker = await pool.acquire()
+        held = await pool.acquire(hold=True)
+        with self.assertRaises(procpool.PoolTimeoutError):
+            await pool.acquire()
+
+        pool.release(worker)
+        pool.release(held)
+        self.assertEqual(pool._held, set())
+        await pool.stop()
+
+
+class TestForkServer(tb.TestCase):
+
+    async def _new_pool(self, fail_warm_up=False):
+        runstate_dir = tempfile.mkdtemp()
+        return await procpool.create_pool(
+            runstate_dir=runstate_dir,
+            name='test-forkserver',
+            worker_cls=WarmWorker,
+            worker_args=(fail_warm_up,),
+            pool_size=2,
+            use_forkserver=True)
+
+    async def test_server_procpool_forkserver_01(self):
+        pool = await self._new_pool()
+        try:
+            forkserver_pid = pool._manager._forkserver._proc.pid
+
+            pids = set()
+            workers = [await pool.acquire() for _ in range(2)]
+            for worker in workers:
+                pid, warm_pid = await pool.call_on(worker, 'get_pids')
+                # The workers are forked from the forkserver and share
+                # the state it has warmed up.
+                self.assertNotEqual(pid, forkserver_pid)
+                self.assertEqual(warm_pid, forkserver_pid)
+                pids.add(pid)
+            self.assertEqual(len(pids), 2)
+            for worker in workers:
+                pool.release(worker)
+        finally:
+            await pool.stop()
+
+    async def test_server_procpool_forkserver_02(self):
+        pool = await self._new_pool()
+        try:
+            forkserver = pool._manager._forkserver
+            old_forkserver_pid = forkserver._proc.pid
+            os.kill(old_forkserver_pid, signal.SIGKILL)
+
+            worker = await pool.acquire()
+            pid, _ = await pool.call_on(worker, 'get_pids')
+            os.kill(pid, signal.SIGKILL)
+            pool.release(worker)
+
+            # The dead worker is replaced on the next acquire(), which
+            # needs to start a new forkserver as well.
+            for _ in range(100):
+                if not worker.is_alive():
+                    break
+                await asyncio.sleep(0.05)
+
+            workers = [await pool.acquire() for _ in range(2)]
+            self.assertIn(worker, workers)
+            new_pid, warm_pid = await pool.call_on(worker, 'get_pids')
+            self.assertNotEqual(new_pid, pid)
+            self.assertEqual(warm_pid, forkserver._proc.pid)
+            self.assertNotEqual(warm_pid, old_forkserver_pid)
+            for worker in workers:
+                pool.release(worker)
+        finally:
+            await pool.stop()
+
+    async def test_server_procpool_forkserver_03(self):
+        # Workers still start when the forkserver cannot warm up;
+        # they load their state lazily.
+        pool = await self._new_pool(fail_warm_up=True)
+        try:
+            pid, warm_pid = await pool.call('get_pids')
+            self.assertIsNone(warm_pid)
+            self.assertNotEqual(pid, os.getpid())
+        finally:
+            await pool.stop()
@@ -22,7 +22,9 @@ import uuid
 
 import edgedb
 
+from edb import errors
 from edb.common import taskgroup as tg
+from edb.testbase import protocol
 from edb.testbase import server as tb
 from edb.tools import test
 
@@ -1887,6 +1889,151 @@ class TestServerProto(tb.QueryTestCase):
             self.assertEqual(
                 result, "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa")
 
+    async def test_server_proto_tx_20(self):
+        # Compiler workers are shared between connections and are
+        # only pinned to a connection for the duration of a transaction.
+        # Make sure that concurrent transactions on more connections
+        # than there are compiler workers don't see each other's state.
+
+        cons = [self.con]
+        for _ in range(4):
+            cons.append(await self.connect(database=self.con.dbname))
+
+        try:
+            async def worker(con, n):
+                tx = con.transaction()
+                await tx.start()
+                try:
+                    await con.execute(f'''
+                        SET ALIAS tx20_{n} AS MODULE test;
+                    ''')
+
+                    for _ in range(3):
+                        await asyncio.sleep(0.01)
+                        self.assertEqual(
+                            await con.fetchone(f'''
+                                SELECT count(tx20_{n}::TransactionTest) >= 0
+                            '''),
+                            True)
+                finally:
+                    await tx.rollback()
+
+                # The alias must not survive the rollback.
+                with self.assertRaises(edgedb.InvalidReferenceError):
+                    await con.fetchone(f'''
+                        SELECT count(tx20_{n}::TransactionTest)
+                    ''')
+
+            await asyncio.gather(*[
+                worker(con, n) for n, con in enumerate(cons)
+            ])
+
+        finally:
+            for con in cons[1:]:
+                await con.aclose()
+
+    async def test_server_proto_tx_21(self):
+        # Backend connections are leased from a shared pool for the
+        # duration of a query only; make sure that the session state
+        # of a connection follows it from one lease to another.
+
+        cons = [self.con]
+        for _ in range(9):
+            cons.append(await self.connect(database=self.con.dbname))
+
+        try:
+            async def worker(con, n):
+                await con.execute(f'''
+                    SET ALIAS tx21_{n} AS MODULE test;
+                ''')
+
+                for _ in range(5):
+                    await asyncio.sleep(0.01)
+                    self.assertEqual(
+                        await con.fetchone(f'''
+                            SELECT count(tx21_{n}::TransactionTest) >= 0
+                        '''),
+                        True)
+
+                    m = (n + 1) % len(cons)
+                    with self.assertRaises(edgedb.InvalidReferenceError):
+                        await con.fetchone(f'''
+                            SELECT count(tx21_{m}::TransactionTest)
+                        ''')
+
+                await con.execute(f'''
+                    RESET ALIAS tx21_{n};
+                ''')
+
+            await asyncio.gather(*[
+                worker(con, n) for n, con in enumerate(cons)
+            ])
+
+        finally:
+            for con in cons[1:]:
+                await con.aclose()
+
+        self.assertTrue(await self.is_testmode_on())
+
+    async def test_server_proto_tx_22(self):
+        # The backend connection is released between the Parse and
+        # Execute messages of a query; the anonymous statement is only
+        # parsed again when it has been replaced in the meantime, and
+        # must never be confused with the statement of another client.
+
+        cons = [self.con]
+        for _ in range(9):
+            cons.append(await self.connect(database=self.con.dbname))
+
+        try:
+            async def worker(con, n):
+                for i in range(20):
+                    self.assertEqual(
+                        await con.fetchone(
+                            f'SELECT <int64>$x + {n} * 1000', x=i),
+                        n * 1000 + i)
+                    self.assertEqual(
+                        await con.fetchall(
+                            f'SELECT {{<str>$x, "tx22_{n}"}}', x=str(i)),
+                        [str(i), f'tx22_{n}'])
+
+            await asyncio.gather(*[
+                worker(con, n) for n, con in enumerate(cons)
+            ])
+
+        finally:
+            for con in cons[1:]:
+                await con.aclose()
+
+    async def test_server_proto_stream_01(self):
+        # Large results are fetched from the backend in several
+        # batches.
+        self.assertEqual(
+            await self.con.fetchall('SELECT _gen_series(1, 10500)'),
+            list(range(1, 10501)))
+
+        async with self.con.transaction():
+            self.assertEqual(
+                await self.con.fetchall('SELECT _gen_series(1, 10500)'),
+                list(range(1, 10501)))
+
+        self.assertEqual(await self.con.fetchone('SELECT 42'), 42)
+
+    async def test_server_proto_stream_02(self):
+        # An error in a later batch of rows.
+        with self.assertRaises(edgedb.DivisionByZeroError):
+            await self.con.fetchall(
+                'SELECT 1 // (_gen_series(1, 10500) - 5000)')
+
+        self.assertEqual(await self.con.fetchone('SELECT 42'), 42)
+
+        with self.assertRaises(edgedb.DivisionByZeroError):
+            async with self.con.transaction():
+                await self.con.fetchall(
+                    'SELECT 1 // (_gen_series(1, 10500) - 5000)')
+
+        self.assertEqual(await self.con.fetchone('SELECT 42'), 42)
+
 
 class TestServerProtoDDL(tb.NonIsolatedDDLTestCase):
 
@@ -2491,3 +2638,426 @@ class TestServerProtoDDL(tb.NonIsolatedDDLTestCase):
                 'SELECT {1, 2, 3}',
                 __limit__=-2,
             )
+
+
+class TestServerProtoMessages(tb.NonIsolatedDDLTestCase):
+
+    # The messages the client library doesn't send, spoken over a
+    # raw protocol connection.
+
+    SETUP = '''
+        CREATE ALIAS test::PSAlias := 1;
+
+        CREATE TYPE test::BatchItem {
+            CREATE PROPERTY n -> std::int64 {
+                CREATE CONSTRAINT std::exclusive;
+            };
+        };
+
+        CREATE TYPE test::BulkItem {
+            CREATE REQUIRED PROPERTY name -> std::str;
+            CREATE PROPERTY n -> std::int64;
+            CREATE REQUIRED MULTI PROPERTY tags -> std::str;
+        };
+
+        CREATE TYPE test::BulkDefault {
+            CREATE PROPERTY name -> std::str;
+            CREATE PROPERTY kind -> std::str {
+                SET default := 'k';
+            };
+        };
+    '''
+
+    async def _connect_raw(self):
+        return await protocol.Connection.connect(
+            **self.get_connect_args(database=self.get_database_name()))
+
+    async def _prepare(self, con, query, *, name):
+        res = await con.sync(protocol.prepare(query, name=name))
+        self.assertEqual(res[0][0], b'1')
+        return protocol.parse_prepare_complete(res[0][1])
+
+    async def _execute(self, con, *args, name):
+        res = await con.sync(protocol.execute(
+            protocol.encode_args(*args), name=name))
+        return protocol.get_data(res)
+
+    def _batch_args(self, *values):
+        return [
+            protocol.encode_args(protocol.encode_int64(v))
+            for v in values
+        ]
+
+    async def _get_batch_items(self):
+        return sorted(await self.con.fetchall(
+            'SELECT test::BatchItem.n'))
+
+    async def _bulk_insert(self, con, type_name, fields, *blocks):
+        con.send(protocol.bulk_insert(type_name, fields))
+        mtype, data = await con.recv()
+        if mtype == b'E':
+            await con.sync()
+            raise protocol.parse_error(data)
+        self.assertEqual(mtype, b'T')
+
+        res = await con.sync(
+            *(protocol.bulk_insert_data(objects) for objects in blocks),
+            protocol.bulk_insert_eof())
+        return protocol.get_status(res)
+
+    def _bulk_item(self, name, n, tags):
+        return protocol.encode_object(
+            None if name is None else protocol.encode_str(name),
+            None if n is None else protocol.encode_int64(n),
+            None if tags is None else protocol.encode_array(
+                [protocol.encode_str(t) for t in tags]),
+        )
+
+    async def _get_bulk_items(self):
+        items = await self.con.fetchall('''
+            SELECT test::BulkItem { name, n, tags } ORDER BY .name
+        ''')
+        return [(i.name, i.n, sorted(i.tags)) for i in items]
+
+    async def test_server_proto_prepared_01(self):
+        con = await self._connect_raw()
+        try:
+            await self._prepare(
+                con, 'SELECT 1 + <int64>$0', name=b'add')
+            # An anonymous statement doesn't replace a named one.
+            await self._prepare(con, 'SELECT 100', name=b'')
+
+            for arg in (1, 41):
+                data = await self._execute(
+                    con, protocol.encode_int64(arg), name=b'add')
+                self.assertEqual(
+                    [protocol.decode_int64(d) for d in data], [arg + 1])
+
+            res = await con.sync(protocol.describe(b'add'))
+            self.assertEqual(res[0][0], b'T')
+        finally:
+            await con.close()
+
+    async def test_server_proto_prepared_02(self):
+        con = await self._connect_raw()
+        try:
+            await self._prepare(con, 'SELECT test::PSAlias', name=b'st')
+            data = await self._execute(con, name=b'st')
+            self.assertEqual(protocol.decode_int64(data[0]), 1)
+
+            # The statement is recompiled once the DDL is committed.
+            await self.con.execute('''
+                DROP ALIAS test::PSAlias;
+                CREATE ALIAS test::PSAlias := 2;
+            ''')
+            data = await self._execute(con, name=b'st')
+            self.assertEqual(protocol.decode_int64(data[0]), 2)
+        finally:
+            await con.close()
+            await self.con.execute('''
+                DROP ALIAS test::PSAlias;
+                CREATE ALIAS test::PSAlias := 1;
+            ''')
+
+    async def test_server_proto_prepared_03(self):
+        con = await self._connect_raw()
+        try:
+            await self._prepare(con, 'SELECT test::PSAlias', name=b'st')
+
+            await con.execute_script('START TRANSACTION')
+            data = await self._execute(con, name=b'st')
+            self.assertEqual(protocol.decode_int64(data[0]), 1)
+
+            # DDL in the transaction doesn't change dbver, but the
+            # statement must see the schema of the transaction...
+            await con.execute_script('''
+                DROP ALIAS test::PSAlias;
+                CREATE ALIAS test::PSAlias := 2;
+            ''')
+            data = await self._execute(con, name=b'st')
+            self.assertEqual(protocol.decode_int64(data[0]), 2)
+
+            # ...and the one before it once the transaction is
+            # rolled back.
+            await con.execute_script('ROLLBACK')
+            self.assertEqual(con.tx_state, protocol.TX_IDLE)
+            data = await self._execute(con, name=b'st')
+            self.assertEqual(protocol.decode_int64(data[0]), 1)
+        finally:
+            await con.close()
+
+    async def test_server_proto_prepared_04(self):
+        con = await self._connect_raw()
+        try:
+            with self.assertRaisesRegex(
+                    errors.TypeSpecNotFoundError,
+                    "prepared statement 'nope' does not exist"):
+                await self._execute(con, name=b'nope')
+
+            with self.assertRaisesRegex(
+                    errors.TypeSpecNotFoundError,
+                    "prepared statement 'nope' does not exist"):
+                await con.sync(protocol.describe(b'nope'))
+
+            # The connection is still usable.
+            await self._prepare(con, 'SELECT 42', name=b'st')
+            data = await self._execute(con, name=b'st')
+            self.assertEqual(protocol.decode_int64(data[0]), 42)
+        finally:
+            await con.close()
+
+    async def test_server_proto_prepared_05(self):
+        con = await self._connect_raw()
+        try:
+            _, _, int_type_id = await self._prepare(
+                con, 'SELECT test::PSAlias', name=b'st')
+
+            # Preparing a statement under the same name replaces it.
+            _, _, str_type_id = await self._prepare(
+                con, "SELECT 'a'", name=b'st')
+            self.assertNotEqual(int_type_id, str_type_id)
+            data = await self._execute(con, name=b'st')
+            self.assertEqual(data, [b'a'])
+
+            await self._prepare(con, 'SELECT test::PSAlias', name=b'st')
+
+            # A schema change that changes the result type of the
+            # statement invalidates it.
+            await self.con.execute('''
+                DROP ALIAS test::PSAlias;
+                CREATE ALIAS test::PSAlias := 'a';
+            ''')
+            with self.assertRaisesRegex(
+                    errors.TypeSpecNotFoundError,
+                    'must be prepared again'):
+                await self._execute(con, name=b'st')
+            with self.assertRaisesRegex(
+                    errors.TypeSpecNotFoundError,
+                    'does not exist'):
+                await self._execute(con, name=b'st')
+
+            _, _, new_type_id = await self._prepare(
+                con, 'SELECT test::PSAlias', name=b'st')
+            self.assertEqual(new_type_id, str_type_id)
+            data = await self._execute(con, name=b'st')
+            self.assertEqual(data, [b'a'])
+        finally:
+            await con.close()
+            await self.con.execute('''
+                DROP ALIAS test::PSAlias;
+                CREATE ALIAS test::PSAlias := 1;
+            ''')
+
+    async def test_server_proto_batch_01(self):
+        con = await self._connect_raw()
+        try:
+            await self._prepare(
+                con, 'INSERT test::BatchItem { n := <int64>$0 }',
+                name=b'ins')
+            res = await con.sync(protocol.batch_execute(
+                self._batch_args(1, 2, 3), name=b'ins'))
+            # The status carries the number of rows of all executions.
+            self.assertEqual(protocol.get_status(res), b'INSERT 3')
+            self.assertEqual(await self._get_batch_items(), [1, 2, 3])
+
+            # A batch with no sets of arguments executes nothing.
+            res = await con.sync(protocol.batch_execute([], name=b'ins'))
+            self.assertEqual(protocol.get_status(res), b'INSERT 0')
+            self.assertEqual(await self._get_batch_items(), [1, 2, 3])
+        finally:
+            await con.close()
+            await self.con.execute('DELETE test::BatchItem')
+
+    async def test_server_proto_batch_02(self):
+        con = await self._connect_raw()
+        try:
+            await self._prepare(
+                con, 'INSERT test::BatchItem { n := <int64>$0 }',
+                name=b'ins')
+            await self._prepare(con, 'SELECT 42', name=b'sel')
+
+            # The executions of a batch share a transaction, so an
+            # error in the middle of it undoes the executions before.
+            with self.assertRaises(errors.ConstraintViolationError):
+                await con.sync(protocol.batch_execute(
+                    self._batch_args(1, 2, 1, 3), name=b'ins'))
+            self.assertEqual(con.tx_state, protocol.TX_IDLE)
+            self.assertEqual(await self._get_batch_items(), [])
+
+            # The same when the batch isn't immediately followed by
+            # a "Sync"; the messages up to the "Sync" are skipped.
+            with self.assertRaises(errors.ConstraintViolationError):
+                await con.sync(
+                    protocol.batch_execute(
+                        self._batch_args(1, 2, 1, 3), name=b'ins'),
+                    protocol.execute(name=b'sel'),
+                )
+            self.assertEqual(con.tx_state, protocol.TX_IDLE)
+            self.assertEqual(await self._get_batch_items(), [])
+
+            # The connection is still usable.
+            data = await self._execute(con, name=b'sel')
+            self.assertEqual(protocol.decode_int64(data[0]), 42)
+        finally:
+            await con.close()
+            await self.con.execute('DELETE test::BatchItem')
+
+    async def test_server_proto_batch_03(self):
+        con = await self._connect_raw()
+        try:
+            await self._prepare(
+                con, 'INSERT test::BatchItem { n := <int64>$0 }',
+                name=b'ins')
+
+            await con.execute_script('START TRANSACTION')
+            res = await con.sync(protocol.batch_execute(
+                self._batch_args(1, 2), name=b'ins'))
+            self.assertEqual(protocol.get_status(res), b'INSERT 2')
+            self.assertEqual(con.tx_state, protocol.TX_IN_TX)
+            await con.execute_script('COMMIT')
+            self.assertEqual(await self._get_batch_items(), [1, 2])
+
+            # An error in a batch fails the transaction, whether the
+            # batch is immediately followed by a "Sync" or not.
+            for follow_up in ([], [protocol.execute(name=b'ins')]):
+                await con.execute_script('START TRANSACTION')
+                await con.sync(protocol.batch_execute(
+                    self._batch_args(3), name=b'ins'))
+                with self.assertRaises(errors.ConstraintViolationError):
+                    await con.sync(
+                        protocol.batch_execute(
+                            self._batch_args(4, 1), name=b'ins'),
+                        *follow_up)
+                self.assertEqual(con.tx_state, protocol.TX_FAILED)
+
+                with self.assertRaises(errors.TransactionError):
+                    await con.sync(protocol.batch_execute(
+                        self._batch_args(5), name=b'ins'))
+
+                await con.execute_script('ROLLBACK')
+                self.assertEqual(con.tx_state, protocol.TX_IDLE)
+                self.assertEqual(await self._get_batch_items(), [1, 2])
+        finally:
+            await con.close()
+            await self.con.execute('DELETE test::BatchItem')
+
+    async def test_server_proto_bulk_insert_01(self):
+        con = await self._connect_raw()
+        try:
+            # Every data block is loaded with its own COPY commands.
+            status = await self._bulk_insert(
+                con, 'test::BulkItem', ['name', 'n', 'tags'],
+                [
+                    self._bulk_item('a', 1, ['x', 'y']),
+                    self._bulk_item('b', None, ['z']),
+                ],
+                [],
+                [self._bulk_item('c', 3, ['x'])],
+            )
+            self.assertEqual(status, b'INSERT 3')
+            self.assertEqual(con.tx_state, protocol.TX_IDLE)
+            self.assertEqual(await self._get_bulk_items(), [
+                ('a', 1, ['x', 'y']),
+                ('b', None, ['z']),
+                ('c', 3, ['x']),
+            ])
+
+            # The fields can be sent in any order.
+            status = await self._bulk_insert(
+                con, 'test::BulkItem', ['tags', 'name'],
+                [protocol.encode_object(
+                    protocol.encode_array([protocol.encode_str('w')]),
+                    protocol.encode_str('d'))],
+            )
+            self.assertEqual(status, b'INSERT 1')
+            self.assertEqual(
+                (await self._get_bulk_items())[-1], ('d', None, ['w']))
+        finally:
+            await con.close()
+            await self.con.execute('DELETE test::BulkItem')
+
+    async def test_server_proto_bulk_insert_02(self):
+        con = await self._connect_raw()
+        try:
+            with self.assertRaisesRegex(
+                    errors.MissingRequiredError,
+                    "required 'tags'"):
+                await self._bulk_insert(
+                    con, 'test::BulkItem', ['name'])
+
+            # Neither an empty set nor no value at all is a value
+            # for a required pointer.
+            for row in [self._bulk_item(None, 1, ['x']),
+                        self._bulk_item('a', 1, []),
+                        self._bulk_item('a', 1, None)]:
+                with self.assertRaises(errors.MissingRequiredError):
+                    await self._bulk_insert(
+                        con, 'test::BulkItem', ['name', 'n', 'tags'],
+                        [self._bulk_item('ok', 1, ['x']), row])
+                self.assertEqual(con.tx_state, protocol.TX_IDLE)
+
+            # Nothing has been inserted.
+            self.assertEqual(await self._get_bulk_items(), [])
+
+            # Defaults are not evaluated by bulk inserts.
+            with self.assertRaisesRegex(
+                    errors.QueryError, 'must be provided explicitly'):
+                await self._bulk_insert(
+                    con, 'test::BulkDefault', ['name'])
+
+            status = await self._bulk_insert(
+                con, 'test::BulkDefault', ['name', 'kind'],
+                [protocol.encode_object(
+                    protocol.encode_str('a'), None)],
+            )
+            self.assertEqual(status, b'INSERT 1')
+            # An explicit empty set overrides the default.
+            obj = await self.con.fetchone(
+                'SELECT test::BulkDefault { name, kind }')
+            self.assertEqual((obj.name, obj.kind), ('a', None))
+        finally:
+            await con.close()
+            await self.con.execute('''
+                DELETE test::BulkItem;
+                DELETE test::BulkDefault;
+            ''')
+
+    async def test_server_proto_bulk_insert_03(self):
+        con = await self._connect_raw()
+        try:
+            with self.assertRaisesRegex(
+                    errors.InvalidReferenceError, 'does not exist'):
+                await self._bulk_insert(con, 'test::Nope', ['name'])
+
+            with self.assertRaisesRegex(
+                    errors.InvalidReferenceError, "no link or property"):
+                await self._bulk_insert(
+                    con, 'test::BulkItem', ['name', 'tags', 'nope'])
+
+            with self.assertRaisesRegex(
+                    errors.BinaryProtocolError,
+                    'unexpected number of fields'):
+                await self._bulk_insert(
+                    con, 'test::BulkItem', ['name', 'n', 'tags'],
+                    [protocol.encode_object(protocol.encode_str('a'))])
+
+            # The values are validated by the backend.
+            with self.assertRaises(errors.EdgeDBError):
+                await self._bulk_insert(
+                    con, 'test::BulkItem', ['name', 'n', 'tags'],
+                    [protocol.encode_object(
+                        protocol.encode_str('a'),
+                        b'\x00\x01\x02',
+                        protocol.encode_array([protocol.encode_str('x')]),
+                    )])
+
+            self.assertEqual(con.tx_state, protocol.TX_IDLE)
+            self.assertEqual(await self._get_bulk_items(), [])
+
+            # The connection is still usable.
+            await self._prepare(con, 'SELECT 42', name=b'st')
+            data = await self._execute(con, name=b'st')
+            self.assertEqual(protocol.decode_int64(data[0]), 42)
+        finally:
+            await con.close()
+            await self.con.execute('DELETE test::BulkItem')
@@ -0,0 +1,148 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import unittest
+
+from edb.server import querystats
+
+
+class Unit:
+
+    def __init__(self, fingerprint: bytes) -> None:
+        self.fingerprint = fingerprint
+
+
+class TestQueryStats(unittest.TestCase):
+
+    def test_server_querystats_histogram_01(self):
+        hist = querystats.Histogram()
+        hist.observe(0.00005)
+        hist.observe(0.001)
+        hist.observe(100)
+
+        buckets = dict(hist.iter_cumulative())
+        self.assertEqual(buckets[0.0001], 1)
+        self.assertEqual(buckets[0.001], 2)
+        self.assertEqual(buckets[10.0], 2)
+        self.assertEqual(hist.count, 3)
+
+    def test_server_querystats_rolling_avg_01(self):
+        avg = querystats.RollingAverage(2)
+        self.assertEqual(avg.value, 0)
+        avg.add(1)
+        avg.add(2)
+        self.assertEqual(avg.value, 1.5)
+        avg.add(4)
+        self.assertEqual(avg.value, 3)
+
+    def test_server_querystats_registry_01(self):
+        stats = querystats.QueryStatsRegistry(maxsize=2)
+        unit = Unit(b'\x01')
+
+        # Statistics are only created when the query text is known.
+        stats.record('db', unit, None, {'execute': 0.1}, call=True)
+        self.assertEqual(list(stats.iter_queries('db')), [])
+
+        stats.record('db', unit, b'SELECT 1', {'cache_lookup': 0.0001},
+                     cache_hit=False)
+        stats.record('db', unit, None, {'execute': 0.1}, call=True)
+        stats.record('db', unit, b'SELECT 2', {'cache_lookup': 0.0001},
+                     cache_hit=True)
+
+        [q] = stats.iter_queries('db')
+        self.assertEqual(q.query, 'SELECT 1')
+        self.assertEqual(q.calls, 1)
+        self.assertEqual(q.cache_hits, 1)
+        self.assertEqual(q.cache_misses, 1)
+        self.assertEqual(list(stats.iter_queries('other')), [])
+
+        # The least recently used queries are discarded.
+        stats.record('db', Unit(b'\x02'), b'SELECT 3', {})
+        stats.record('db', Unit(b'\x03'), b'SELECT 4', {})
+        self.assertEqual(
+            sorted(q.query for q in stats.iter_queries('db')),
+            ['SELECT 3', 'SELECT 4'])
+
+    def test_server_querystats_prometheus_01(self):
+        stats = querystats.QueryStatsRegistry()
+        unit = Unit(b'\xab')
+        stats.record('db', unit, b'SELECT 1', {'compile': 0.002},
+                     cache_hit=False)
+        stats.record('db', unit, None, {'execute': 0.5}, call=True)
+
+        text = stats.render_prometheus('db')
+        self.assertIn(
+            'edgedb_query_stage_duration_seconds_bucket'
+            '{stage="compile",le="0.0025"} 1',
+            text)
+        self.assertIn(
+            'edgedb_query_stage_duration_seconds_bucket'
+            '{stage="execute",le="0.25"} 0',
+            text)
+        self.assertIn('edgedb_query_cache_misses_total 1', text)
+        self.assertIn(
+            'edgedb_query_fingerprint_calls_total'
+            '{database="db",fingerprint="ab"} 1',
+            text)
+
+        # The processes of a multi-process server label their samples.
+        text = stats.render_prometheus('db', worker_id=1)
+        self.assertIn(
+            'edgedb_query_stage_duration_seconds_bucket'
+            '{worker="1",stage="compile",le="0.0025"} 1',
+            text)
+        self.assertIn('edgedb_query_cache_misses_total{worker="1"} 1', text)
+        self.assertIn(
+            'edgedb_query_fingerprint_calls_total'
+            '{worker="1",database="db",fingerprint="ab"} 1',
+            text)
+
+    def test_server_querystats_prometheus_02(self):
+        stats = querystats.QueryStatsRegistry()
+        cache_stats = {
+            'entries': 2,
+            'maxsize': 2,
+            'size_bytes': 1024,
+            'hits': 5,
+            'misses': 3,
+            'evictions': 1,
+        }
+
+        text = stats.render_prometheus(
+            'db', worker_id=1,
+            query_caches=[('edgeql+http', 8889, cache_stats)])
+        labels = '{worker="1",protocol="edgeql+http",port="8889"}'
+        self.assertIn(f'edgedb_http_query_cache_hits_total{labels} 5', text)
+        self.assertIn(f'edgedb_http_query_cache_misses_total{labels} 3', text)
+        self.assertIn(
+            f'edgedb_http_query_cache_evictions_total{labels} 1', text)
+        self.assertIn(f'edgedb_http_query_cache_entries{labels} 2', text)
+        self.assertIn(
+            f'edgedb_http_query_cache_size_bytes{labels} 1024', text)
+
+    def test_server_querystats_publish_01(self):
+        stats = querystats.QueryStatsRegistry()
+        stats.record('db', Unit(b'\xab'), b"SELECT 'a'", {})
+
+        sql = stats.get_publish_sql('db').decode()
+        self.assertTrue(sql.startswith(
+            "SELECT set_config('edgedb.query_stats', "))
+        data = sql[len("SELECT set_config('edgedb.query_stats', "):]
+        data = data[1:-len("', false);")].replace("''", "'")
+        self.assertEqual(json.loads(data)[0]['query'], "SELECT 'a'")
@@ -0,0 +1,73 @@
+#
+# This source file is part of the EdgeDB open source project.
+#
+# Copyright 2020-present MagicStack Inc. and the EdgeDB authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import unittest
+
+from edb.server import sharedmem
+
+
+class TestVersionTable(unittest.TestCase):
+
+    def test_server_sharedmem_versions_01(self):
+        versions = sharedmem.VersionTable(nslots=16)
+
+        self.assertEqual(versions.get_dbver('db1'), 0)
+        self.assertEqual(versions.get_sys_config_ver(), 0)
+
+        v1 = versions.new_dbver('db1')
+        self.assertEqual(versions.get_dbver('db1'), v1)
+        v2 = versions.new_dbver('db1')
+        self.assertGreater(v2, v1)
+        self.assertEqual(versions.get_dbver('db1'), v2)
+        self.assertEqual(versions.get_sys_config_ver(), 0)
+
+        s1 = versions.new_sys_config_ver()
+        self.assertGreater(s1, v2)
+        self.assertEqual(versions.get_sys_config_ver(), s1)
+        self.assertEqual(versions.get_dbver('db1'), v2)
+
+    def test_server_sharedmem_versions_02(self):
+        versions = sharedmem.VersionTable()
+        v1 = versions.new_dbver('db1')
+
+        r, w = os.pipe()
+        pid = os.fork()
+        if not pid:
+            # A new version set by a forked process.
+            status = 1
+            try:
+                os.close(r)
+                os.write(w, str(versions.new_dbver('db1')).encode())
+                status = 0
+            finally:
+                os._exit(status)
+
+        os.close(w)
+        with os.fdopen(r, 'rb') as f:
+            v2 = int(f.read())
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+
+        self.assertGreater(v2, v1)
+        self.assertEqual(versions.get_dbver('db1'), v2)
+
+    def test_server_sharedmem_versions_03(self):
+        with self.assertRaises(ValueError):
+            sharedmem.VersionTable(nslots=1)